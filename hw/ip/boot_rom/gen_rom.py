@@ -1,25 +1,24 @@
 #!/usr/bin/env python3
 
+"""
+Generate the boot ROM sources from a binary image (.img) or an ELF file: a C header for the
+simulator, a SystemVerilog module for FPGA and ASIC, and optionally a $readmemh file (.mem).
+
+The functions can be imported, e.g. by FuseSoC generators and tests:
+
+    words = read_image("boot_rom.elf")
+    write_rom(words, "boot_rom", mem=True)
+"""
+
+from array import array
 from string import Template
 import argparse
 import os.path
 import sys
-import binascii
-
-
-parser = argparse.ArgumentParser(description='Convert binary file to verilog rom')
-parser.add_argument('filename', metavar='filename', nargs=1,
-                   help='filename of input binary')
 
-args = parser.parse_args()
-file = args.filename[0];
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../../util'))
+from elf_reader import ElfFile
 
-# check that file exists
-if not os.path.isfile(file):
-    print("File {} does not exist.".format(filename))
-    sys.exit(1)
-
-filename = os.path.splitext(file)[0]
 
 license = """\
 /* Copyright 2018 ETH Zurich and University of Bologna.
@@ -86,49 +85,122 @@ $content
 };
 """
 
-def read_bin():
+# Number of words formatted at once
+CHUNK_WORDS = 4096
+
+
+def read_image(file, max_size=1024):
+    """
+    Read a ROM image as little-endian 32-bit words, zero-padded to 4 bytes.
+
+    :param file: binary image (.img) or ELF file; the image of an ELF file is the one of
+        objcopy -O binary, truncated to max_size bytes
+    :param max_size: maximum size in bytes of the image read from an ELF file
+    :return: array of 32-bit words
+    """
+    with open(file, 'rb') as f:
+        is_elf = f.read(4) == b'\x7fELF'
+
+    if is_elf:
+        with ElfFile(file) as elf:
+            data = elf.binary_image()[1][:max_size]
+    else:
+        with open(file, 'rb') as f:
+            data = f.read()
+
+    words = array('I')
+    words.frombytes(bytes(data) + bytes(-len(data) % 4))
+    if sys.byteorder == 'big':
+        words.byteswap()
+    return words
+
+
+def write_words(f, words, prefix, reverse=False):
+    """
+    Write one word per line as 8 hexadecimal digits after a prefix, with a comma after every
+    word but the last one, chunk by chunk.
+    """
+    count = len(words)
+    for start in range(0, count, CHUNK_WORDS):
+        if reverse:
+            chunk = words[max(count - start - CHUNK_WORDS, 0):count - start][::-1]
+        else:
+            chunk = words[start:start + CHUNK_WORDS]
+        f.write(",\n".join(f"{prefix}{word:08x}" for word in chunk))
+        if start + CHUNK_WORDS < count:
+            f.write(",\n")
+
+
+def write_template(f, template, words, prefix, reverse=False, **fields):
+    """
+    Write a template whose $content is the list of words, without building the content as a
+    string.
+    """
+    head, tail = template.split("$content")
+    fields["size"] = len(words)
+    f.write(Template(head).substitute(fields))
+    write_words(f, words, prefix, reverse)
+    f.write(Template(tail).substitute(fields))
+
+
+def write_c_header(f, words):
+    """Write the C header used by the simulator."""
+    write_template(f, c_var, words, "    0x")
+
+
+def write_sv(f, words, name):
+    """Write the SystemVerilog ROM module for FPGA and ASIC, the last word first."""
+    f.write(license)
+    write_template(f, module, words, "    32'h", reverse=True, filename=name)
 
-    with open(filename + ".img", 'rb') as f:
-        rom = bytes.hex(f.read())
-        rom = list(map(''.join, zip(rom[::2], rom[1::2])))
 
-    # align to 32 bit
-    align = (int((len(rom) + 3) / 4 )) * 4;
+def write_mem(f, words):
+    """Write the words in the $readmemh format, the first word at address 0."""
+    for start in range(0, len(words), CHUNK_WORDS):
+        f.write("".join(f"{word:08x}\n" for word in words[start:start + CHUNK_WORDS]))
 
-    for i in range(len(rom), align):
-        rom.append("00")
 
-    return rom
+def write_rom(words, filename, mem=False):
+    """
+    Write filename.h and filename.sv, and filename.mem if mem is set. The ROM module is named
+    after the base name of filename.
+    """
+    name = os.path.basename(filename)
+    with open(filename + ".h", "w") as f:
+        write_c_header(f, words)
+    with open(filename + ".sv", "w") as f:
+        write_sv(f, words, name)
+    if mem:
+        with open(filename + ".mem", "w") as f:
+            write_mem(f, words)
 
-rom = read_bin()
 
-""" Generate C header file for simulator
-"""
-with open(filename + ".h", "w") as f:
-    rom_str = ""
-    # process in junks of 32 bit (4 byte)
-    for i in range(0, int(len(rom)/4)):
-        rom_str += "    0x" + "".join(rom[i*4:i*4+4][::-1]) + ",\n"
+def main():
+    parser = argparse.ArgumentParser(description='Convert binary file to verilog rom')
+    parser.add_argument('filename', metavar='filename', nargs=1,
+                       help='filename of input binary (.img) or ELF file')
+    parser.add_argument('--max-size', type=int, default=1024,
+                       help='maximum size in bytes of the image read from an ELF file')
+    parser.add_argument('--mem', action='store_true',
+                       help='also write the image in the $readmemh format (.mem)')
 
-    # remove the trailing comma
-    rom_str = rom_str[:-2]
+    args = parser.parse_args()
+    file = args.filename[0]
 
-    s = Template(c_var)
-    f.write(s.substitute(filename=filename, size=int(len(rom)/4), content=rom_str))
+    # check that file exists
+    if not os.path.isfile(file):
+        print("File {} does not exist.".format(file))
+        sys.exit(1)
 
-    f.close()
+    filename = os.path.splitext(file)[0]
 
-""" Generate SystemVerilog bootcode for FPGA and ASIC
-"""
-with open(filename + ".sv", "w") as f:
-    rom_str = ""
-    # process in junks of 32 bit (4 byte)
-    for i in reversed(range(int(len(rom)/4))):
-        rom_str += "    32'h" + "".join(rom[i*4:i*4+4][::-1]) + ",\n"
+    with open(file, 'rb') as f:
+        is_elf = f.read(4) == b'\x7fELF'
 
-    # remove the trailing comma
-    rom_str = rom_str[:-2]
+    # A binary image is read from filename.img
+    words = read_image(file if is_elf else filename + ".img", args.max_size)
+    write_rom(words, filename, args.mem)
 
-    f.write(license)
-    s = Template(module)
-    f.write(s.substitute(filename=filename, size=int(len(rom)/4), content=rom_str))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+# Copyright 2026 EPFL
+# Licensed under the Apache License, Version 2.0, see LICENSE for details.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Info: This script keeps the history of the memory footprint of the X-HEEP
+# applications, to catch code and data size regressions between builds.
+# The "record" command collects the footprint of a build with mem_usage.py
+# (usage of every region, linker memory section and physical bank, and size
+# of every allocated ELF section) and appends it to a store, keyed by app
+# name, MCU configuration, compiler, linker mode and git revision.
+# The store is an SQLite database, or a JSON Lines file when its name ends
+# with .jsonl.
+# The "compare" command compares, for every app, the latest footprint with
+# an older one and flags the sizes that grew beyond the given thresholds, as
+# well as the regions, sections and banks that no longer fit.
+
+
+import argparse
+from datetime import datetime, timezone
+import hashlib
+import json
+from pathlib import Path
+import sqlite3
+import subprocess
+import sys
+
+from mem_usage import DEFAULT_ELF_PATH, DEFAULT_LD_PATH, DEFAULT_MCU_PKG_PATH, X_HEEP_ROOT, collect_footprint
+
+KEY_FIELDS = ("app", "config", "compiler", "linker")
+
+
+class FootprintStore:
+    """
+    Append-only store of footprint records, backed by SQLite or by a JSON Lines file.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.is_jsonl = self.path.suffix == ".jsonl"
+
+    def _connect(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS footprints ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT, app TEXT, config TEXT, "
+            "compiler TEXT, linker TEXT, revision TEXT, footprint TEXT)"
+        )
+        return connection
+
+    def append(self, record):
+        if self.is_jsonl:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # A single write per record, so that concurrent builds do not interleave lines
+            with self.path.open("a", encoding="utf-8") as file:
+                file.write(json.dumps(record, sort_keys=True) + "\n")
+            return
+
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT INTO footprints (timestamp, app, config, compiler, linker, revision, footprint) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    record["timestamp"],
+                    record["app"],
+                    record["config"],
+                    record["compiler"],
+                    record["linker"],
+                    record["revision"],
+                    json.dumps(record["footprint"], sort_keys=True),
+                ),
+            )
+        connection.close()
+
+    def records(self):
+        """
+        Returns all the records, from the oldest to the newest.
+        """
+        if not self.path.is_file():
+            raise FileNotFoundError(f"Footprint store not found: {self.path}")
+
+        if self.is_jsonl:
+            with self.path.open("r", encoding="utf-8") as file:
+                return [json.loads(line) for line in file if line.strip()]
+
+        connection = self._connect()
+        try:
+            rows = connection.execute(
+                "SELECT timestamp, app, config, compiler, linker, revision, footprint FROM footprints ORDER BY id"
+            ).fetchall()
+        finally:
+            connection.close()
+        return [
+            {
+                "timestamp": timestamp,
+                "app": app,
+                "config": config,
+                "compiler": compiler,
+                "linker": linker,
+                "revision": revision,
+                "footprint": json.loads(footprint),
+            }
+            for timestamp, app, config, compiler, linker, revision, footprint in rows
+        ]
+
+
+def git_revision():
+    """
+    Returns the short git revision of X-HEEP, with a -dirty suffix when tracked files were modified.
+    """
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=X_HEEP_ROOT, capture_output=True, check=True, text=True
+        ).stdout.strip()
+        status = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=X_HEEP_ROOT,
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return revision + ("-dirty" if status.strip() else "")
+
+
+def config_label(mcu_pkg_path):
+    """
+    Names the MCU configuration after the content of its core_v_mini_mcu_pkg.sv.
+    """
+    return "cfg-" + hashlib.sha256(Path(mcu_pkg_path).read_bytes()).hexdigest()[:10]
+
+
+def record_footprint(
+    store_path,
+    app,
+    elf_file=DEFAULT_ELF_PATH,
+    ld_path=DEFAULT_LD_PATH,
+    mcu_pkg_path=DEFAULT_MCU_PKG_PATH,
+    compiler="",
+    linker="",
+    config=None,
+    revision=None,
+):
+    """
+    Collects the footprint of a build and appends it to the store.
+    Returns the stored record.
+    """
+    record = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "app": app,
+        "config": config if config else config_label(mcu_pkg_path),
+        "compiler": compiler,
+        "linker": linker,
+        "revision": revision if revision else git_revision(),
+        "footprint": collect_footprint(Path(elf_file), Path(ld_path), Path(mcu_pkg_path)),
+    }
+    FootprintStore(store_path).append(record)
+    return record
+
+
+def flatten_footprint(footprint):
+    """
+    Flattens a footprint into {metric: bytes}, e.g. "regions.Code.required" or "sections..text".
+    """
+    metrics = {}
+    for kind in ("regions", "memory_sections", "banks"):
+        for name, usage in footprint.get(kind, {}).items():
+            metrics[f"{kind}.{name}.required"] = usage["required"]
+    for name, size_B in footprint.get("sections", {}).items():
+        metrics[f"sections.{name}"] = size_B
+    return metrics
+
+
+def find_overflows(footprint):
+    """
+    Returns the regions, linker memory sections and banks whose content does not fit.
+    """
+    return [
+        (f"{kind}.{name}", usage["required"], usage["length"])
+        for kind in ("regions", "memory_sections", "banks")
+        for name, usage in footprint.get(kind, {}).items()
+        if usage["length"] and usage["required"] > usage["length"]
+    ]
+
+
+def select_pair(records, base_revision, head_revision):
+    """
+    Selects the head record (the newest one, or the newest one of head_revision) and the base
+    record (the newest one of base_revision, or the newest one of another revision) of an app.
+    """
+    heads = [record for record in records if head_revision is None or record["revision"] == head_revision]
+    if not heads:
+        return None, None
+    head = heads[-1]
+    older = records[: next(index for index, record in enumerate(records) if record is head)]
+
+    if base_revision is not None:
+        bases = [record for record in records if record["revision"] == base_revision and record is not head]
+    else:
+        bases = [record for record in older if record["revision"] != head["revision"]] or older
+    return (bases[-1] if bases else None), head
+
+
+def compare_footprints(records, base_revision=None, head_revision=None, threshold_pct=1.0, min_growth_B=64, apps=None):
+    """
+    Compares the footprints of every app and returns the flagged regressions as
+    (key, metric, base bytes, head bytes, message) tuples, and the number of compared apps.
+    """
+    by_key = {}
+    for record in records:
+        if apps and record["app"] not in apps:
+            continue
+        by_key.setdefault(tuple(record[field] for field in KEY_FIELDS), []).append(record)
+
+    flagged = []
+    compared = 0
+    for key, key_records in sorted(by_key.items()):
+        base, head = select_pair(key_records, base_revision, head_revision)
+        if head is None:
+            continue
+
+        for metric, required_B, length_B in find_overflows(head["footprint"]):
+            flagged.append((key, metric, length_B, required_B, f"does not fit in {length_B} B"))
+
+        if base is None:
+            continue
+        compared += 1
+
+        base_metrics = flatten_footprint(base["footprint"])
+        for metric, head_B in sorted(flatten_footprint(head["footprint"]).items()):
+            base_B = base_metrics.get(metric, 0)
+            growth_B = head_B - base_B
+            if growth_B < min_growth_B:
+                continue
+            if base_B and 100 * growth_B / base_B <= threshold_pct:
+                continue
+            growth = f"+{100 * growth_B / base_B:0.1f}%" if base_B else "new"
+            flagged.append(
+                (key, metric, base_B, head_B, f"grew by {growth_B} B ({growth}) since {base['revision']}")
+            )
+
+    return flagged, compared
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Track the memory footprint of X-HEEP applications across builds.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = subparsers.add_parser("record", help="Append the footprint of a build to the store.")
+    record_parser.add_argument("store", type=Path, help="Footprint store (SQLite, or JSON Lines if it ends with .jsonl).")
+    record_parser.add_argument("--app", required=True, help="Name of the application.")
+    record_parser.add_argument("--elf", type=Path, default=DEFAULT_ELF_PATH, help="Path to the ELF file to analyze.")
+    record_parser.add_argument("--ld", type=Path, default=DEFAULT_LD_PATH, help="Path to the linker script copy used for the build.")
+    record_parser.add_argument("--mcu-pkg", dest="mcu_pkg", type=Path, default=DEFAULT_MCU_PKG_PATH, help="Path to core_v_mini_mcu_pkg.sv.")
+    record_parser.add_argument("--compiler", default="", help="Compiler used for the build.")
+    record_parser.add_argument("--linker", default="", help="Linker mode used for the build.")
+    record_parser.add_argument("--config", help="Name of the MCU configuration (default: hash of the MCU package).")
+    record_parser.add_argument("--revision", help="Revision of the build (default: current git revision).")
+
+    compare_parser = subparsers.add_parser("compare", help="Flag the footprints that grew between two builds.")
+    compare_parser.add_argument("store", type=Path, help="Footprint store (SQLite, or JSON Lines if it ends with .jsonl).")
+    compare_parser.add_argument("--base", help="Base revision (default: the previous revision recorded for each app).")
+    compare_parser.add_argument("--head", help="Head revision (default: the latest record of each app).")
+    compare_parser.add_argument("--apps", help="Comma-separated list of apps to compare (default: all).")
+    compare_parser.add_argument("--threshold", type=float, default=1.0, help="Relative growth to flag, in percent.")
+    compare_parser.add_argument("--min-growth", dest="min_growth", type=int, default=64, help="Smallest growth to flag, in bytes.")
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    try:
+        if args.command == "record":
+            record = record_footprint(
+                args.store,
+                args.app,
+                args.elf,
+                args.ld,
+                args.mcu_pkg,
+                args.compiler,
+                args.linker,
+                args.config,
+                args.revision,
+            )
+            print(f"Recorded the footprint of {record['app']} ({record['config']}, {record['revision']}) in {args.store}")
+            return 0
+
+        flagged, compared = compare_footprints(
+            FootprintStore(args.store).records(),
+            args.base,
+            args.head,
+            args.threshold,
+            args.min_growth,
+            args.apps.split(",") if args.apps else None,
+        )
+    except (FileNotFoundError, RuntimeError, ValueError, sqlite3.Error) as error:
+        print(error, file=sys.stderr)
+        return 1
+
+    print(f"Compared the footprint of {compared} builds.")
+    for key, metric, base_B, head_B, message in flagged:
+        print(f"{'/'.join(field for field in key if field)}: {metric}: {base_B} B -> {head_B} B, {message}")
+    if flagged:
+        print(f"{len(flagged)} footprint regressions found.")
+        return 1
+    print("No footprint regression found.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -28,29 +28,32 @@
 # emits a warning instead of trying to represent FLASH-resident code in
 # the RAM bank visualization, and summarizes the amount of FLASH image
 # space occupied by the application.
+# With --symbols, the script also attributes every sized object and
+# function of the ELF symbol table to the physical banks holding it. For
+# IL groups, consecutive words are spread round-robin over the banks of
+# the group, so the exact share of each bank is computed instead of
+# assuming a homogeneous distribution. The result can be saved as JSON
+# (--json) and as an HTML heat map of the bank occupancy (--html).
 
 
 import argparse
+import html
+import json
 from pathlib import Path
 import re
-import subprocess
 import sys
 
 
 X_HEEP_ROOT = Path(__file__).resolve().parents[2]
+sys.path.append(str(X_HEEP_ROOT / "util"))
+
+from elf_reader import ElfFile
+
 DEFAULT_ELF_PATH = X_HEEP_ROOT / "sw" / "build" / "main.elf"
 DEFAULT_LD_PATH = X_HEEP_ROOT / "sw" / "build" / "main.ld"
 DEFAULT_MCU_PKG_PATH = X_HEEP_ROOT / "hw" / "core-v-mini-mcu" / "include" / "core_v_mini_mcu_pkg.sv"
 
 
-def is_readelf_available():
-    try:
-        subprocess.run(["readelf", "--version"], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        return True
-    except FileNotFoundError:
-        return False
-
-
 def parse_args():
     parser = argparse.ArgumentParser(description="Display the memory utilization of an X-HEEP application build.")
     parser.add_argument("--elf", type=Path, default=DEFAULT_ELF_PATH, help="Path to the ELF file to analyze.")
@@ -62,10 +65,15 @@ def parse_args():
         default=DEFAULT_MCU_PKG_PATH,
         help="Path to core_v_mini_mcu_pkg.sv.",
     )
+    parser.add_argument("--symbols", action="store_true", help="Attribute the symbols of the ELF to the memory banks.")
+    parser.add_argument("--top", type=int, default=5, help="Number of largest symbols listed per bank (with --symbols).")
+    parser.add_argument("--json", type=Path, help="Write the symbol-level memory map to this JSON file (implies --symbols).")
+    parser.add_argument("--html", type=Path, help="Write the bank occupancy heat map to this HTML file (implies --symbols).")
     args = parser.parse_args()
     args.elf = args.elf.expanduser().resolve(strict=False)
     args.ld = args.ld.expanduser().resolve(strict=False)
     args.mcu_pkg = args.mcu_pkg.expanduser().resolve(strict=False)
+    args.symbols = args.symbols or args.json is not None or args.html is not None
     return args
 
 
@@ -222,116 +230,66 @@ def get_memory_sections(ld_path):
     return sections
 
 
-def get_readelf_output(elf_file):
-    """
-    Executes readelf -W -S on the provided ELF file.
-    """
-    if not elf_file.is_file():
-        raise FileNotFoundError(f"ELF file not found: {elf_file}")
-
-    try:
-        result = subprocess.run(["readelf", "-W", "-S", str(elf_file)], check=True, capture_output=True, text=True)
-    except subprocess.CalledProcessError as error:
-        stderr = error.stderr.strip()
-        raise RuntimeError(f"readelf failed for {elf_file}: {stderr or error}") from error
-
-    return result.stdout
-
-
-def get_readelf_program_headers_output(elf_file):
-    """
-    Executes readelf -l on the provided ELF file.
-    """
-    if not elf_file.is_file():
-        raise FileNotFoundError(f"ELF file not found: {elf_file}")
-
-    try:
-        result = subprocess.run(["readelf", "-l", str(elf_file)], check=True, capture_output=True, text=True)
-    except subprocess.CalledProcessError as error:
-        stderr = error.stderr.strip()
-        raise RuntimeError(f"readelf failed for {elf_file}: {stderr or error}") from error
-
-    return result.stdout
-
-
-def parse_section_headers(readelf_output):
+def read_section_headers(elf):
     """
-    Parses the readelf output to extract allocated ELF section headers.
+    Extracts the allocated ELF section headers.
     """
     sections = []
 
-    for line in readelf_output.splitlines():
-        match = re.match(r"^\s*\[\s*(\d+)\]\s+(.*)$", line)
-        if not match:
-            continue
-
-        parts = match.group(2).split()
-        if len(parts) < 10:
+    for section in elf.alloc_sections():
+        if not section.name:
             continue
 
-        name, section_type, address, _, size, _, flags = parts[:7]
-        size_B = int(size, 16)
-        if not name or size_B == 0 or "A" not in flags:
-            continue
-
-        start_address = int(address, 16)
         sections.append(
             {
-                "name": name,
-                "type": section_type,
-                "flags": flags,
-                "start_add": start_address,
-                "size_B": size_B,
-                "end_add": start_address + size_B,
+                "name": section.name,
+                "type": section.type_name(),
+                "flags": section.flags_str(),
+                "start_add": section.address,
+                "size_B": section.size,
+                "end_add": section.end(),
             }
         )
 
     if not sections:
-        raise ValueError("No allocated ELF sections found in readelf output")
+        raise ValueError(f"No allocated ELF sections found in {elf.path}")
 
     return sorted(sections, key=lambda section: section["start_add"])
 
 
-def parse_program_headers(readelf_output):
+def read_program_headers(elf):
     """
-    Parses the readelf -l output to extract LOAD program headers.
+    Extracts the LOAD program headers.
     """
-    program_headers = []
-    headers_started = False
+    program_headers = [
+        {
+            "Type": segment.type_name(),
+            "Offset": segment.offset,
+            "VirtAddr": segment.vaddr,
+            "PhysAddr": segment.paddr,
+            "FileSiz": segment.filesz,
+            "MemSiz": segment.memsz,
+            "Flg": segment.flags_str(),
+            "Align": segment.align,
+        }
+        for segment in elf.load_segments()
+    ]
 
-    for line in readelf_output.splitlines():
-        stripped = line.strip()
-        if stripped == "Program Headers:":
-            headers_started = True
-            continue
-        if not headers_started:
-            continue
-        if stripped.startswith("Section to Segment mapping:"):
-            break
-        if not stripped or stripped.startswith("Type"):
-            continue
+    if not program_headers:
+        raise ValueError(f"No LOAD program headers found in {elf.path}")
 
-        parts = re.split(r"\s+", stripped)
-        if len(parts) < 8 or parts[0] != "LOAD":
-            continue
+    return program_headers
 
-        program_headers.append(
-            {
-                "Type": parts[0],
-                "Offset": int(parts[1], 16),
-                "VirtAddr": int(parts[2], 16),
-                "PhysAddr": int(parts[3], 16),
-                "FileSiz": int(parts[4], 16),
-                "MemSiz": int(parts[5], 16),
-                "Flg": "".join(parts[6:-1]),
-                "Align": int(parts[-1], 16),
-            }
-        )
 
-    if not program_headers:
-        raise ValueError("No LOAD program headers found in readelf output")
+def read_elf(elf_file):
+    """
+    Reads the allocated section headers and the LOAD program headers of the ELF file.
+    """
+    if not elf_file.is_file():
+        raise FileNotFoundError(f"ELF file not found: {elf_file}")
 
-    return program_headers
+    with ElfFile(elf_file) as elf:
+        return read_section_headers(elf), read_program_headers(elf)
 
 
 def get_regions(section_headers):
@@ -386,7 +344,7 @@ def get_regions(section_headers):
         )
 
     if not regions:
-        raise ValueError("No allocatable memory regions could be derived from readelf output")
+        raise ValueError("No allocatable memory regions could be derived from the ELF sections")
 
     return regions
 
@@ -605,7 +563,11 @@ def summarize_memory_bank(name, section, regions):
     }
 
 
-def print_summary_and_bank_usage(memory_sections, regions, program_headers, banks):
+def summarize_usage(memory_sections, regions, program_headers):
+    """
+    Summarizes the usage of the code and data regions, of the FLASH image and
+    of every RAM memory section of the linker script.
+    """
     summaries = {
         "Code": summarize_region(memory_sections, regions, "code", ("ram0", "FLASH0", "FLASH")),
         "ROData": summarize_region(memory_sections, regions, "rodata", ("ram0", "FLASH0", "FLASH")),
@@ -618,6 +580,11 @@ def print_summary_and_bank_usage(memory_sections, regions, program_headers, bank
         for name, section in sorted(memory_sections.items(), key=lambda item: item[1]["origin"])
         if not is_flash_section(name)
     ]
+    return summaries, flash_summary, ram_bank_summaries
+
+
+def print_summary_and_bank_usage(memory_sections, regions, program_headers, banks):
+    summaries, flash_summary, ram_bank_summaries = summarize_usage(memory_sections, regions, program_headers)
 
     continuous_sizes_kB = [int(bank["size"] / 1024) for bank in banks if bank["type"] == "Cont"]
     interleaved_sizes_kB = [int(bank["size"] / 1024) for bank in banks if bank["type"] == "IntL"]
@@ -692,30 +659,299 @@ def print_summary_and_bank_usage(memory_sections, regions, program_headers, bank
         print(bank["type"], bank_idx, bank["use"], f"\t{100*(utilization/bank['size']):5.1f}%")
 
 
-def main():
-    args = parse_args()
+def read_symbols(elf_file):
+    """
+    Extracts the sized data objects and functions of the ELF symbol table.
+    Aliases (several names for the same object) are reported once.
+    """
+    symbols = []
+    seen = set()
 
-    if not is_readelf_available():
-        print("readelf not available. Will not print the memory utilization report.", file=sys.stderr)
-        return 1
+    with ElfFile(elf_file) as elf:
+        sections = elf.sections()
+        for symbol in sorted(elf.symbols(), key=lambda item: (item.bind == "LOCAL", item.name)):
+            if symbol.type not in ("OBJECT", "FUNC") or symbol.size == 0 or not symbol.name:
+                continue
+            if not 0 < symbol.section_index < len(sections):
+                continue
+            section = sections[symbol.section_index]
+            if not section.is_alloc() or (symbol.value, symbol.size) in seen:
+                continue
+            seen.add((symbol.value, symbol.size))
 
-    try:
-        readelf_sections_output = get_readelf_output(args.elf)
-        readelf_program_headers_output = get_readelf_program_headers_output(args.elf)
-        section_headers = parse_section_headers(readelf_sections_output)
-        program_headers = parse_program_headers(readelf_program_headers_output)
-        regions = get_regions(section_headers)
+            symbols.append(
+                {
+                    "name": symbol.name,
+                    "type": symbol.type,
+                    "section_name": section.name,
+                    "start_add": symbol.value,
+                    "size_B": symbol.size,
+                    "end_add": symbol.value + symbol.size,
+                }
+            )
 
-        num_banks, _, bank_sizes_B, bank_origins, il_groups = get_banks_and_sizes(args.mcu_pkg)
-        memory_sections = get_memory_sections(args.ld)
+    return sorted(symbols, key=lambda symbol: symbol["start_add"])
 
-        ram_sections = [section for name, section in memory_sections.items() if not is_flash_section(name)]
-        if not ram_sections:
-            raise ValueError(f"No RAM sections found in linker script: {args.ld}")
 
-        ram_base_address = min(section["origin"] for section in ram_sections)
-        banks = create_banks(num_banks, bank_sizes_B, bank_origins, il_groups, ram_base_address)
+def il_bank_share(il_group, start_add, end_add):
+    """
+    Computes how many bytes of [start_add, end_add) fall in each bank of an IL group.
+
+    The bus sends word w of the group (counted from its origin) to bank w % num_banks of the
+    group, at word w // num_banks of that bank.
+    Returns, for each bank of the group, the number of bytes and the [start, end) byte range
+    they occupy inside the bank, or None when the bank holds no byte of the range.
+    """
+    group_bank_count = il_group["num_banks"]
+    period_B = 4 * group_bank_count
+    start = max(start_add, il_group["origin"]) - il_group["origin"]
+    end = min(end_add, il_group["end"]) - il_group["origin"]
+    if start >= end:
+        return [None] * group_bank_count
+
+    def bytes_before(offset, bank_pos):
+        # Bytes of [0, offset) that belong to the bank at position bank_pos of the group
+        full_periods, rest = divmod(offset, period_B)
+        return 4 * full_periods + min(max(rest - 4 * bank_pos, 0), 4)
+
+    def local_offset(offset, bank_pos, last):
+        # Offset inside the bank of the first (or last) byte of the range held by the bank
+        word, byte = divmod(offset, 4)
+        full_periods, word_pos = divmod(word, group_bank_count)
+        if word_pos == bank_pos:
+            return 4 * full_periods + byte
+        if last:
+            return 4 * (full_periods - (word_pos < bank_pos)) + 3
+        return 4 * (full_periods + (word_pos > bank_pos))
+
+    shares = []
+    for bank_pos in range(group_bank_count):
+        size_B = bytes_before(end, bank_pos) - bytes_before(start, bank_pos)
+        if size_B <= 0:
+            shares.append(None)
+            continue
+        local_start = local_offset(start, bank_pos, last=False)
+        local_end = local_offset(end - 1, bank_pos, last=True) + 1
+        shares.append((size_B, local_start, local_end))
+    return shares
+
+
+def bank_pieces(banks, start_add, end_add):
+    """
+    Splits an address range into the pieces stored by each physical bank.
+    Returns (bank index, bytes, local start, local end) tuples, where the local
+    range is the byte range occupied inside the bank.
+    """
+    pieces = []
+    for bank_idx, bank in enumerate(banks):
+        if bank["type"] == "Cont":
+            bank_start = bank["origin"]
+            overlap_start = max(start_add, bank_start)
+            overlap_end = min(end_add, bank_start + bank["size"])
+            if overlap_start < overlap_end:
+                pieces.append((bank_idx, overlap_end - overlap_start, overlap_start - bank_start, overlap_end - bank_start))
+            continue
+
+        il_group = bank["il_group"]
+        share = il_bank_share(il_group, start_add, end_add)[il_group["bank_indices"].index(bank_idx)]
+        if share is not None:
+            pieces.append((bank_idx,) + share)
+    return pieces
+
+
+def build_symbol_map(symbols, regions, banks, top, granularity_B=1024):
+    """
+    Attributes the symbols and the allocated sections to the physical banks.
+
+    For every bank, records the bytes used by the sections, the bytes covered by
+    symbols, the occupancy of each granularity_B block and its largest symbols.
+    """
+    bank_maps = []
+    for bank_idx, bank in enumerate(banks):
+        bank_maps.append(
+            {
+                "index": bank_idx,
+                "type": bank["type"],
+                "origin": bank["origin"],
+                "size_B": bank["size"],
+                "il_group": bank["il_group"]["index"] if bank["il_group"] is not None else None,
+                "used_B": 0,
+                "symbols_B": 0,
+                "occupancy": [0] * ((bank["size"] + granularity_B - 1) // granularity_B),
+                "symbols": [],
+            }
+        )
+
+    for region in regions:
+        if region["name"] == "FLASH data":
+            continue
+        for bank_idx, size_B, local_start, local_end in bank_pieces(banks, region["start_add"], region["end_add"]):
+            bank_maps[bank_idx]["used_B"] += size_B
+            occupancy = bank_maps[bank_idx]["occupancy"]
+            for block in range(local_start // granularity_B, (local_end - 1) // granularity_B + 1):
+                block_start = block * granularity_B
+                occupancy[block] += interval_overlap(local_start, local_end, block_start, block_start + granularity_B)
+
+    outside_banks = []
+    for symbol in symbols:
+        symbol["banks"] = {}
+        for bank_idx, size_B, _, _ in bank_pieces(banks, symbol["start_add"], symbol["end_add"]):
+            symbol["banks"][bank_idx] = size_B
+            bank_maps[bank_idx]["symbols_B"] += size_B
+            bank_maps[bank_idx]["symbols"].append(
+                {"name": symbol["name"], "type": symbol["type"], "section_name": symbol["section_name"], "size_B": size_B}
+            )
+        if not symbol["banks"]:
+            outside_banks.append(symbol)
+
+    for bank_map in bank_maps:
+        bank_map["occupancy"] = [min(1.0, used / granularity_B) for used in bank_map["occupancy"]]
+        bank_map["unattributed_B"] = max(0, bank_map["used_B"] - bank_map["symbols_B"])
+        bank_map["symbols"] = sorted(bank_map["symbols"], key=lambda item: (-item["size_B"], item["name"]))[:top]
+
+    return {
+        "granularity_B": granularity_B,
+        "banks": bank_maps,
+        "symbols": symbols,
+        "outside_banks": [symbol["name"] for symbol in outside_banks],
+    }
+
+
+def print_symbol_map(symbol_map):
+    print("")
+    print(f"{'Bank':<8} {'Used(kB)':>9} {'Syms(kB)':>9}    Largest symbols")
+    for bank_map in symbol_map["banks"]:
+        largest = ", ".join(f"{item['name']} ({item['size_B']/1024:0.1f} kB)" for item in bank_map["symbols"])
+        print(
+            f"{bank_map['type'] + ' ' + str(bank_map['index']):<8} {bank_map['used_B']/1024:9.1f} "
+            f"{bank_map['symbols_B']/1024:9.1f}    {largest if largest else '-'}"
+        )
+    if symbol_map["outside_banks"]:
+        print(f"{len(symbol_map['outside_banks'])} symbols are outside the RAM banks (e.g. in FLASH).")
+
+
+def write_symbol_map_json(symbol_map, elf_file, json_path):
+    report = dict(symbol_map, elf=str(elf_file))
+    report["symbols"] = [
+        dict(symbol, banks={str(bank_idx): size_B for bank_idx, size_B in symbol["banks"].items()})
+        for symbol in symbol_map["symbols"]
+    ]
+    json_path.parent.mkdir(parents=True, exist_ok=True)
+    with json_path.open("w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+
+
+def write_symbol_map_html(symbol_map, elf_file, html_path):
+    granularity_B = symbol_map["granularity_B"]
+    rows = []
+    for bank_map in symbol_map["banks"]:
+        cells = "".join(
+            f'<td style="background:hsl({int(120 * (1 - occupancy))},70%,{int(95 - 45 * occupancy)}%)" '
+            f'title="0x{block * granularity_B:X}: {100 * occupancy:0.0f}%"></td>'
+            for block, occupancy in enumerate(bank_map["occupancy"])
+        )
+        utilization = 0.0 if bank_map["size_B"] == 0 else 100 * bank_map["used_B"] / bank_map["size_B"]
+        largest = "".join(
+            f"<li>{html.escape(item['name'])} ({html.escape(item['section_name'])}): {item['size_B']} B</li>"
+            for item in bank_map["symbols"]
+        )
+        rows.append(
+            f"<tr><th>{bank_map['type']} {bank_map['index']}</th><td>0x{bank_map['origin']:08X}</td>"
+            f"<td>{bank_map['size_B'] // 1024} kB</td><td>{utilization:0.1f}%</td>"
+            f'<td><table class="heat"><tr>{cells}</tr></table></td><td><ul>{largest}</ul></td></tr>'
+        )
+
+    html_path.parent.mkdir(parents=True, exist_ok=True)
+    with html_path.open("w", encoding="utf-8") as file:
+        file.write(
+            "<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\">"
+            f"<title>Memory map of {html.escape(elf_file.name)}</title>"
+            "<style>body{font-family:sans-serif}table{border-collapse:collapse}"
+            "th,td{padding:2px 6px;text-align:left;vertical-align:top}"
+            ".heat td{width:6px;height:14px;padding:0;border:1px solid #fff}ul{margin:0}</style></head><body>\n"
+            f"<h1>Memory map of {html.escape(str(elf_file))}</h1>\n"
+            f"<p>Each cell is a {granularity_B} B block of the bank, from green (empty) to red (full).</p>\n"
+            "<table><tr><th>Bank</th><th>Origin</th><th>Size</th><th>Used</th><th>Occupancy</th><th>Largest symbols</th></tr>\n"
+            + "\n".join(rows)
+            + "\n</table></body></html>\n"
+        )
+
+
+def load_build(elf_file, ld_path, mcu_pkg_path):
+    """
+    Reads the ELF, the linker script and the MCU package of a build.
+    Returns the section headers, the program headers, the regions, the linker
+    memory sections and the physical banks.
+    """
+    section_headers, program_headers = read_elf(elf_file)
+    regions = get_regions(section_headers)
+
+    num_banks, _, bank_sizes_B, bank_origins, il_groups = get_banks_and_sizes(mcu_pkg_path)
+    memory_sections = get_memory_sections(ld_path)
+
+    ram_sections = [section for name, section in memory_sections.items() if not is_flash_section(name)]
+    if not ram_sections:
+        raise ValueError(f"No RAM sections found in linker script: {ld_path}")
+
+    ram_base_address = min(section["origin"] for section in ram_sections)
+    banks = create_banks(num_banks, bank_sizes_B, bank_origins, il_groups, ram_base_address)
+    return section_headers, program_headers, regions, memory_sections, banks
+
+
+def collect_footprint(elf_file, ld_path, mcu_pkg_path):
+    """
+    Collects the memory footprint of a build: the usage of every region, of
+    every linker memory section and of every physical bank, and the size of
+    every allocated ELF section.
+    """
+    section_headers, program_headers, regions, memory_sections, banks = load_build(elf_file, ld_path, mcu_pkg_path)
+    summaries, flash_summary, ram_bank_summaries = summarize_usage(memory_sections, regions, program_headers)
+    if flash_summary is not None:
+        summaries["Flash"] = flash_summary
+
+    bank_used_B = [0] * len(banks)
+    for region in regions:
+        if region["name"] == "FLASH data":
+            continue
+        for bank_idx, size_B, _, _ in bank_pieces(banks, region["start_add"], region["end_add"]):
+            bank_used_B[bank_idx] += size_B
+
+    sections = {}
+    for section in section_headers:
+        sections[section["name"]] = sections.get(section["name"], 0) + section["size_B"]
+
+    return {
+        "regions": {
+            name: {"used": summary["used"], "required": summary["required"], "length": summary["length"]}
+            for name, summary in summaries.items()
+            if summary is not None
+        },
+        "memory_sections": {
+            summary["name"]: {"used": summary["used"], "required": summary["required"], "length": summary["length"]}
+            for summary in ram_bank_summaries
+        },
+        "banks": {
+            str(bank_idx): {"used": bank_used_B[bank_idx], "required": bank_used_B[bank_idx], "length": bank["size"]}
+            for bank_idx, bank in enumerate(banks)
+        },
+        "sections": sections,
+    }
+
+
+def main():
+    args = parse_args()
+
+    try:
+        section_headers, program_headers, regions, memory_sections, banks = load_build(args.elf, args.ld, args.mcu_pkg)
         print_summary_and_bank_usage(memory_sections, regions, program_headers, banks)
+
+        if args.symbols:
+            symbol_map = build_symbol_map(read_symbols(args.elf), regions, banks, args.top)
+            print_symbol_map(symbol_map)
+            if args.json is not None:
+                write_symbol_map_json(symbol_map, args.elf, args.json)
+            if args.html is not None:
+                write_symbol_map_html(symbol_map, args.elf, args.html)
     except (FileNotFoundError, RuntimeError, ValueError) as error:
         print(error, file=sys.stderr)
         return 1
@@ -15,18 +15,18 @@
 
 # Author: Jose Miranda, Juan Sapriza (jose.mirandacalero / juan.sapriza @epfl.ch)
 
-build : build/Makefile
+build : $(SW_BUILD_DIR)/Makefile
 	@echo Build 
-	${MAKE} -s -C build
+	${MAKE} -s -C $(SW_BUILD_DIR)
 
-setup : build/Makefile
+setup : $(SW_BUILD_DIR)/Makefile
 
-build/Makefile : CMakeLists.txt ${CMAKE_DIR}/riscv.cmake
-	@if [ ! -d build ] ; then mkdir build ; fi
-	@cd build;  \
+$(SW_BUILD_DIR)/Makefile : CMakeLists.txt ${CMAKE_DIR}/riscv.cmake $(wildcard $(PERIPH_STRUCTS_HEADERS))
+	@if [ ! -d $(SW_BUILD_DIR) ] ; then mkdir -p $(SW_BUILD_DIR) ; fi
+	@cd $(SW_BUILD_DIR);  \
 		${CMAKE} \
 		    -G "Unix Makefiles" \
-			-DCMAKE_TOOLCHAIN_FILE=../${CMAKE_DIR}/riscv.cmake \
+			-DCMAKE_TOOLCHAIN_FILE=${ROOT_PROJECT}${CMAKE_DIR}/riscv.cmake \
 			-DROOT_PROJECT=${ROOT_PROJECT} \
 			-DSOURCE_PATH=${SOURCE_PATH} \
 			-DTARGET=${TARGET} \
@@ -39,10 +39,10 @@ build/Makefile : CMakeLists.txt ${CMAKE_DIR}/riscv.cmake
 			-DCOMPILER_FLAGS:STRING="${COMPILER_FLAGS}"\
 			-DCLANG_LINKER_USE_LD:BOOL=${CLANG_LINKER_USE_LD}\
 			-DVERBOSE:STRING=${VERBOSE} \
-		    ../ 
+		    ${ROOT_PROJECT} 
 
 clean:
-	rm -rf build
+	rm -rf $(SW_BUILD_DIR)
 
 .PHONY: setup build
 .SUFFIXES:
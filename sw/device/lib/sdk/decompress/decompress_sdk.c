@@ -0,0 +1,276 @@
+// Copyright 2026 EPFL
+// Solderpad Hardware License, Version 2.1, see LICENSE.md for details.
+// SPDX-License-Identifier: Apache-2.0 WITH SHL-2.1
+//
+// File: decompress_sdk.c
+// Author: X-HEEP team
+// Date: 18/10/2026
+// Description: Decoder of the datasets compressed by util/c_gen.py
+
+#include <stdint.h>
+
+#include "decompress_sdk.h"
+#include "dma_sdk.h"
+
+#ifdef __cplusplus
+extern "C"
+{
+#endif
+
+    /**********************************/
+    /* ---- FUNCTION DEFINITIONS ---- */
+    /**********************************/
+
+    static inline uint32_t load_element(const uint8_t *src, uint32_t element_size)
+    {
+        uint32_t value = 0;
+        for (uint32_t i = 0; i < element_size; i++)
+        {
+            value |= (uint32_t)src[i] << (8 * i);
+        }
+        return value;
+    }
+
+    static inline void store_element(uint8_t *dst, uint32_t value, uint32_t element_size)
+    {
+        for (uint32_t i = 0; i < element_size; i++)
+        {
+            dst[i] = (uint8_t)(value >> (8 * i));
+        }
+    }
+
+    // Widest DMA data type for which all the given addresses and sizes are aligned
+    static dma_data_type_t dma_type(uint32_t alignment)
+    {
+        if ((alignment & 3) == 0)
+        {
+            return DMA_DATA_TYPE_WORD;
+        }
+        if ((alignment & 1) == 0)
+        {
+            return DMA_DATA_TYPE_HALF_WORD;
+        }
+        return DMA_DATA_TYPE_BYTE;
+    }
+
+    // Copy bytes, with the DMA for the long copies
+    static void copy_bytes(uint8_t *dst, const uint8_t *src, uint32_t size, int8_t dma_channel)
+    {
+        if (dma_channel >= 0 && size >= DECOMPRESS_DMA_MIN_BYTES)
+        {
+            dma_data_type_t type = dma_type((uint32_t)(uintptr_t)dst | (uint32_t)(uintptr_t)src | size);
+            dma_copy((uint32_t)(uintptr_t)dst, (uint32_t)(uintptr_t)src, size / INCREMENT(type), (uint8_t)dma_channel, type, type, 0);
+            return;
+        }
+        for (uint32_t i = 0; i < size; i++)
+        {
+            dst[i] = src[i];
+        }
+    }
+
+    // Repeat an element, with the DMA for the long runs
+    static void fill_elements(uint8_t *dst, uint32_t value, uint32_t element_size, uint32_t count, int8_t dma_channel)
+    {
+        if (dma_channel >= 0 && count * element_size >= DECOMPRESS_DMA_MIN_BYTES &&
+            ((uint32_t)(uintptr_t)dst & (element_size - 1)) == 0)
+        {
+            dma_data_type_t type = dma_type(element_size);
+            dma_fill((uint32_t)(uintptr_t)dst, (uint32_t)(uintptr_t)&value, count, (uint8_t)dma_channel, type, type, 0);
+            return;
+        }
+        if (element_size == 1)
+        {
+            for (uint32_t i = 0; i < count; i++)
+            {
+                dst[i] = (uint8_t)value;
+            }
+            return;
+        }
+        for (uint32_t i = 0; i < count; i++, dst += element_size)
+        {
+            store_element(dst, value, element_size);
+        }
+    }
+
+    static int32_t decode_rle(const decompress_block_t *block, const uint8_t *payload, uint8_t *dst, int8_t dma_channel)
+    {
+        uint32_t element_size = block->element_size;
+        uint32_t position = 0;
+        uint32_t decoded = 0;
+
+        while (decoded < block->decoded_size)
+        {
+            if (position >= block->payload_size)
+            {
+                return DECOMPRESS_ERROR_FORMAT;
+            }
+            uint32_t control = payload[position++];
+            uint32_t count;
+            if (control < 0x80)
+            {
+                // Literal elements
+                count = (control + 1) * element_size;
+                if (position + count > block->payload_size || decoded + count > block->decoded_size)
+                {
+                    return DECOMPRESS_ERROR_FORMAT;
+                }
+                copy_bytes(dst + decoded, payload + position, count, dma_channel);
+                position += count;
+            }
+            else
+            {
+                // Repeated element
+                count = (control - 0x80 + 2) * element_size;
+                if (position + element_size > block->payload_size || decoded + count > block->decoded_size)
+                {
+                    return DECOMPRESS_ERROR_FORMAT;
+                }
+                fill_elements(dst + decoded, load_element(payload + position, element_size), element_size,
+                              count / element_size, dma_channel);
+                position += element_size;
+            }
+            decoded += count;
+        }
+        return (int32_t)decoded;
+    }
+
+    static int32_t decode_delta(const decompress_block_t *block, const uint8_t *payload, uint8_t *dst)
+    {
+        uint32_t element_size = block->element_size;
+        uint32_t count = block->decoded_size / element_size;
+        uint32_t delta_size = block->codec == DECOMPRESS_CODEC_DELTA8 ? 1 : 2;
+
+        if (count == 0 || block->payload_size != element_size + (count - 1) * delta_size)
+        {
+            return DECOMPRESS_ERROR_FORMAT;
+        }
+
+        uint32_t value = load_element(payload, element_size);
+        store_element(dst, value, element_size);
+        payload += element_size;
+        dst += element_size;
+        for (uint32_t i = 1; i < count; i++, dst += element_size)
+        {
+            if (delta_size == 1)
+            {
+                value += (uint32_t)(int32_t)(int8_t)payload[0];
+                payload += 1;
+            }
+            else
+            {
+                value += (uint32_t)(int32_t)(int16_t)(payload[0] | (payload[1] << 8));
+                payload += 2;
+            }
+            store_element(dst, value, element_size);
+        }
+        return (int32_t)block->decoded_size;
+    }
+
+    int32_t decompress_header(const void *header)
+    {
+        const uint32_t *words = (const uint32_t *)header;
+        if (words[0] != DECOMPRESS_MAGIC || words[1] > INT32_MAX)
+        {
+            return DECOMPRESS_ERROR_FORMAT;
+        }
+        return (int32_t)words[1];
+    }
+
+    int32_t decompress_block_header(const void *header, decompress_block_t *block)
+    {
+        const uint32_t *words = (const uint32_t *)header;
+        block->codec = (decompress_codec_t)(words[0] & 0xFF);
+        block->element_size = (uint8_t)((words[0] >> 8) & 0xFF);
+        block->decoded_size = (uint16_t)(words[0] >> 16);
+        block->payload_size = words[1];
+
+        if (block->codec > DECOMPRESS_CODEC_DELTA16 || block->payload_size > INT32_MAX - 3 ||
+            (block->element_size != 1 && block->element_size != 2 && block->element_size != 4) ||
+            block->decoded_size % block->element_size != 0)
+        {
+            return DECOMPRESS_ERROR_FORMAT;
+        }
+        return (int32_t)((block->payload_size + 3) & ~3u);
+    }
+
+    int32_t decompress_block(const decompress_block_t *block, const void *payload, void *dst, uint32_t capacity, int8_t dma_channel)
+    {
+        if (block->decoded_size > capacity)
+        {
+            return DECOMPRESS_ERROR_CAPACITY;
+        }
+
+        switch (block->codec)
+        {
+        case DECOMPRESS_CODEC_RAW:
+            if (block->payload_size != block->decoded_size)
+            {
+                return DECOMPRESS_ERROR_FORMAT;
+            }
+            copy_bytes((uint8_t *)dst, (const uint8_t *)payload, block->decoded_size, dma_channel);
+            return (int32_t)block->decoded_size;
+        case DECOMPRESS_CODEC_RLE:
+            return decode_rle(block, (const uint8_t *)payload, (uint8_t *)dst, dma_channel);
+        case DECOMPRESS_CODEC_DELTA8:
+        case DECOMPRESS_CODEC_DELTA16:
+            return decode_delta(block, (const uint8_t *)payload, (uint8_t *)dst);
+        default:
+            return DECOMPRESS_ERROR_FORMAT;
+        }
+    }
+
+    int32_t decompress(void *dst, uint32_t capacity, const void *src, uint32_t size, int8_t dma_channel)
+    {
+        const uint8_t *stream = (const uint8_t *)src;
+        uint8_t *output = (uint8_t *)dst;
+
+        if (size < DECOMPRESS_HEADER_SIZE)
+        {
+            return DECOMPRESS_ERROR_FORMAT;
+        }
+        int32_t total = decompress_header(stream);
+        if (total < 0)
+        {
+            return total;
+        }
+        if ((uint32_t)total > capacity)
+        {
+            return DECOMPRESS_ERROR_CAPACITY;
+        }
+
+        uint32_t position = DECOMPRESS_HEADER_SIZE;
+        uint32_t decoded = 0;
+        while (position < size)
+        {
+            decompress_block_t block;
+            if (size - position < DECOMPRESS_BLOCK_HEADER_SIZE)
+            {
+                return DECOMPRESS_ERROR_FORMAT;
+            }
+            int32_t padded_size = decompress_block_header(stream + position, &block);
+            position += DECOMPRESS_BLOCK_HEADER_SIZE;
+            if (padded_size < 0 || (uint32_t)padded_size > size - position)
+            {
+                return DECOMPRESS_ERROR_FORMAT;
+            }
+
+            int32_t result = decompress_block(&block, stream + position, output + decoded, (uint32_t)total - decoded, dma_channel);
+            if (result < 0)
+            {
+                // The blocks cannot decode to more than the size in the header
+                return result == DECOMPRESS_ERROR_CAPACITY ? DECOMPRESS_ERROR_FORMAT : result;
+            }
+            position += (uint32_t)padded_size;
+            decoded += (uint32_t)result;
+        }
+
+        if (decoded != (uint32_t)total)
+        {
+            return DECOMPRESS_ERROR_FORMAT;
+        }
+        return total;
+    }
+
+#ifdef __cplusplus
+}
+#endif
@@ -0,0 +1,106 @@
+// Copyright 2026 EPFL
+// Solderpad Hardware License, Version 2.1, see LICENSE.md for details.
+// SPDX-License-Identifier: Apache-2.0 WITH SHL-2.1
+//
+// File: decompress_sdk.h
+// Author: X-HEEP team
+// Date: 18/10/2026
+// Description: Decoder of the datasets compressed by util/c_gen.py (see util/c_compress.py)
+
+#ifndef DECOMPRESS_SDK_H_
+#define DECOMPRESS_SDK_H_
+
+#include <stdint.h>
+
+#ifdef __cplusplus
+extern "C"
+{
+#endif // __cplusplus
+
+/**
+ * A compressed stream is a header (DECOMPRESS_HEADER_SIZE bytes) followed by blocks, each made of
+ * a block header (DECOMPRESS_BLOCK_HEADER_SIZE bytes) and a payload padded to 4 bytes. The blocks
+ * are independent, so that a stream stored in flash can be read and decoded one block at a time
+ * in a buffer of DECOMPRESS_MAX_PAYLOAD_SIZE(block size) bytes.
+ */
+#define DECOMPRESS_MAGIC 0x315A4858 // "XHZ1"
+#define DECOMPRESS_HEADER_SIZE 8
+#define DECOMPRESS_BLOCK_HEADER_SIZE 8
+
+// Largest padded payload of a block of BLOCK_SIZE decoded bytes, the blocks that do not compress
+// are stored raw
+#define DECOMPRESS_MAX_PAYLOAD_SIZE(BLOCK_SIZE) (((BLOCK_SIZE) + 3) & ~3u)
+
+// Shortest runs copied or filled by the DMA, shorter runs are decoded by the CPU
+#ifndef DECOMPRESS_DMA_MIN_BYTES
+#define DECOMPRESS_DMA_MIN_BYTES 64
+#endif
+
+// Error codes
+#define DECOMPRESS_ERROR_FORMAT -1   // Corrupted stream or unknown codec
+#define DECOMPRESS_ERROR_CAPACITY -2 // Destination buffer too small
+
+typedef enum
+{
+    DECOMPRESS_CODEC_RAW = 0,
+    DECOMPRESS_CODEC_RLE = 1,
+    DECOMPRESS_CODEC_DELTA8 = 2,
+    DECOMPRESS_CODEC_DELTA16 = 3,
+} decompress_codec_t;
+
+typedef struct
+{
+    decompress_codec_t codec;
+    uint8_t element_size;  // Size of the elements of the dataset (1, 2 or 4 bytes)
+    uint16_t decoded_size; // Size of the decoded block in bytes
+    uint32_t payload_size; // Size of the payload in bytes, without padding
+} decompress_block_t;
+
+/**
+ * @brief Parse the header of a compressed stream.
+ *
+ * @param header Pointer to the DECOMPRESS_HEADER_SIZE bytes of the header, aligned to 4 bytes.
+ * @return int32_t Size of the decoded dataset in bytes, or DECOMPRESS_ERROR_FORMAT.
+ */
+int32_t decompress_header(const void *header);
+
+/**
+ * @brief Parse the header of a block.
+ *
+ * @param header Pointer to the DECOMPRESS_BLOCK_HEADER_SIZE bytes of the header, aligned to 4 bytes.
+ * @param block  Parsed header.
+ * @return int32_t Size of the padded payload that follows the header, to read before decoding
+ *                 it, or DECOMPRESS_ERROR_FORMAT.
+ */
+int32_t decompress_block_header(const void *header, decompress_block_t *block);
+
+/**
+ * @brief Decode the payload of a block.
+ *
+ * @param block       Parsed header of the block.
+ * @param payload     Pointer to the payload, aligned to 4 bytes.
+ * @param dst         Destination of the decoded bytes.
+ * @param capacity    Size of the destination in bytes.
+ * @param dma_channel DMA channel copying the raw data and filling the long runs, or -1 to decode
+ *                    with the CPU only. The DMA must have been initialized with dma_sdk_init().
+ * @return int32_t Number of decoded bytes, DECOMPRESS_ERROR_FORMAT or DECOMPRESS_ERROR_CAPACITY.
+ */
+int32_t decompress_block(const decompress_block_t *block, const void *payload, void *dst, uint32_t capacity, int8_t dma_channel);
+
+/**
+ * @brief Decode a whole compressed stream stored in addressable memory.
+ *
+ * @param dst         Destination of the decoded dataset.
+ * @param capacity    Size of the destination in bytes.
+ * @param src         Pointer to the compressed stream, aligned to 4 bytes.
+ * @param size        Size of the compressed stream in bytes.
+ * @param dma_channel DMA channel to use, or -1 to decode with the CPU only.
+ * @return int32_t Size of the decoded dataset, DECOMPRESS_ERROR_FORMAT or DECOMPRESS_ERROR_CAPACITY.
+ */
+int32_t decompress(void *dst, uint32_t capacity, const void *src, uint32_t size, int8_t dma_channel);
+
+#ifdef __cplusplus
+}
+#endif // __cplusplus
+
+#endif /* DECOMPRESS_SDK_H_ */
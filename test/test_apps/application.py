@@ -4,6 +4,7 @@
 
 import os
 import subprocess
+import time
 
 from simulator import SimResult
 from bcolors import BColors
@@ -31,6 +32,20 @@ class Application:
         # indicating the result of the simulation.
         self.simulation_results: dict = {}
 
+        # Simulated clock cycles for each simulator, for the successful simulations
+        self.simulation_cycles: dict = {}
+
+        # Wall time in seconds of the compilation with each compiler, and output of the
+        # failed compilations
+        self.compilation_times: dict = {}
+        self.compilation_logs: dict = {}
+
+        # Wall time in seconds, exit value and last lines of the output of the simulation
+        # with each simulator
+        self.simulation_times: dict = {}
+        self.simulation_exit_values: dict = {}
+        self.simulation_logs: dict = {}
+
     def set_compilation_status(self, compiler: str, success: bool):
         """
         Set if the compilation with the compiler was successful or not.
@@ -43,6 +58,23 @@ class Application:
         """
         self.simulation_results[simulator] = result
 
+    def add_simulation_cycles(self, simulator: str, cycles: int):
+        """
+        Add the number of clock cycles simulated by the simulator.
+        """
+        self.simulation_cycles[simulator] = cycles
+
+    def add_simulation_run(
+        self, simulator: str, seconds: float, exit_value: str, output: list
+    ):
+        """
+        Add the wall time, the exit value and the last lines of the output of the simulation
+        with the simulator.
+        """
+        self.simulation_times[simulator] = seconds
+        self.simulation_exit_values[simulator] = exit_value
+        self.simulation_logs[simulator] = output
+
     def compilation_succeeded(self):
         """
         Check if the compilation was successful with every compiler.
@@ -58,6 +90,8 @@ class Application:
         extra_parameters: str,
         dry_run: bool = False,
         verbose: bool = True,
+        build_dir: str = None,
+        cache=None,
     ):
         """
         Compile the application with the compiler and linker. Outputs if it finishes with errors or
@@ -70,6 +104,9 @@ class Application:
         :param str extra_parameters: Extra parameters to pass to the "make app" command.
         :param bool dry_run: If True, only print the compilation command without executing it.
         :param bool verbose: If True, print detailed messages about the compilation process.
+        :param str build_dir: The build directory of the application. If None, sw/build is used.
+        :param CompileCache cache: If set, the artifacts are restored from this cache when the
+            inputs of the compilation did not change, and stored in it after compiling.
 
         :return: True if the compilation succeded and False otherwise.
         """
@@ -80,9 +117,14 @@ class Application:
                 + BColors.ENDC,
                 flush=True,
             )
+        start_time = time.monotonic()
         try:
             compile_command = ["make", "app", f"PROJECT={self.name}"]
-            os.environ["RISCV_XHEEP"] = compiler_path
+            # Use a copy of the environment, several compilations may run in parallel
+            env = dict(os.environ)
+            env["RISCV_XHEEP"] = compiler_path
+            if build_dir:
+                compile_command.append(f"SW_BUILD_DIR={os.path.abspath(build_dir)}")
             if compiler_prefix:
                 compile_command.append(f"COMPILER_PREFIX={compiler_prefix}")
             if compiler:
@@ -103,7 +145,31 @@ class Application:
                     )
                 return True
 
-            _ = subprocess.run(compile_command, capture_output=True, check=True)
+            if cache is not None:
+                cache_key = cache.key(
+                    self.name,
+                    compiler_path,
+                    compiler_prefix,
+                    compiler,
+                    linker,
+                    extra_parameters,
+                )
+                if cache.restore(cache_key, build_dir if build_dir else "sw/build"):
+                    if verbose:
+                        print(
+                            BColors.OKGREEN
+                            + f"Restored {self.name} compiled with {compiler} ({compiler_prefix}) and linker {linker} from the cache."
+                            + BColors.ENDC,
+                            flush=True,
+                        )
+                    return True
+
+            _ = subprocess.run(
+                compile_command, capture_output=True, check=True, env=env
+            )
+
+            if cache is not None:
+                cache.store(cache_key, build_dir if build_dir else "sw/build")
         except subprocess.CalledProcessError as exc:
             print(
                 BColors.FAIL
@@ -111,6 +177,7 @@ class Application:
                 + BColors.ENDC
             )
             print(exc.stderr.decode("utf-8"), flush=True)
+            self.compilation_logs[compiler] = exc.stderr.decode("utf-8")
             return False
         else:
             if verbose:
@@ -121,3 +188,6 @@ class Application:
                     flush=True,
                 )
             return True
+        finally:
+            if not dry_run:
+                self.compilation_times[compiler] = time.monotonic() - start_time
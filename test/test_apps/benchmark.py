@@ -0,0 +1,395 @@
+# Copyright 2026 EPFL
+# Licensed under the Apache License, Version 2.0, see LICENSE for details.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+This script benchmarks a set of apps of X-HEEP over several MCU configurations
+(CPU, bus type and memory banks). For every configuration it generates the MCU,
+builds the model of the simulator, compiles and simulates the apps, and records
+their cycle counts in a CSV and/or JSON matrix. The matrix can be compared
+against a baseline matrix to flag the apps whose cycle count regressed.
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import shutil
+import subprocess
+
+from application import Application
+from bcolors import BColors
+from model_cache import ModelCache
+from simulator import SIMULATOR_BACKENDS, Simulator, SimResult, get_simulator
+from test_apps import COMPILER_PREFIXES, SIM_TIMEOUT_S
+
+# Apps benchmarked by default
+BENCHMARK_APPS = [
+    "coremark",
+    "example_matmul",
+    "example_fft",
+    "example_im2col",
+    "example_matadd_interleaved",
+    "example_dma_2d",
+]
+
+# Name of the metric holding the total number of simulated clock cycles
+TOTAL_METRIC = "total"
+
+
+def config_label(config: dict):
+    """
+    Name an MCU configuration, e.g. "cv32e40p-NtoM-banks4-il2". The parameters that keep
+    the value of the configuration file are left out.
+    """
+    parts = [config["cpu"] or "default", config["bus"] or "default"]
+    if config["memorybanks"]:
+        parts.append(f"banks{config['memorybanks']}")
+    if config["memorybanks_il"]:
+        parts.append(f"il{config['memorybanks_il']}")
+    return "-".join(parts)
+
+
+def generate_mcu(config: dict, x_heep_cfg: str, dry_run: bool):
+    """
+    Generate the MCU with the given configuration.
+
+    :return: True if the generation succeeded and False otherwise.
+    """
+    return run_mcu_gen(
+        [
+            f"X_HEEP_CFG={x_heep_cfg}",
+            f"CPU={config['cpu']}",
+            f"BUS={config['bus']}",
+            f"MEMORY_BANKS={config['memorybanks']}",
+            f"MEMORY_BANKS_IL={config['memorybanks_il']}",
+        ],
+        config_label(config),
+        dry_run,
+    )
+
+
+def restore_mcu(dry_run: bool):
+    """
+    Generate the MCU again with the configuration of the caller, i.e. the one "make mcu-gen"
+    uses without arguments (the defaults of the Makefile, or the variables given to
+    "make benchmark"), so that the tree is not left with the last benchmarked configuration.
+
+    :return: True if the generation succeeded and False otherwise.
+    """
+    return run_mcu_gen([], "with the caller's configuration", dry_run)
+
+
+def run_mcu_gen(variables: list, label: str, dry_run: bool):
+    """
+    Run "make mcu-gen" with the given make variables.
+
+    :param list variables: The make variables, as "NAME=value".
+    :param str label: The description of the generated MCU in the messages.
+
+    :return: True if the generation succeeded and False otherwise.
+    """
+    command = ["make", "mcu-gen"] + variables
+    print(
+        BColors.OKBLUE + f"Generating the MCU {label}..." + BColors.ENDC,
+        flush=True,
+    )
+    if dry_run:
+        print(BColors.OKCYAN + f"[DRY RUN] {' '.join(command)}" + BColors.ENDC)
+        return True
+
+    try:
+        subprocess.run(command, capture_output=True, check=True)
+    except subprocess.CalledProcessError as exc:
+        print(BColors.FAIL + f"Error generating the MCU {label}." + BColors.ENDC)
+        print(str(exc.stderr.decode("utf-8")), flush=True)
+        return False
+    return True
+
+
+def benchmark_config(config: dict, args, simulator: Simulator, model_cache=None):
+    """
+    Generate an MCU configuration, build its model and benchmark the apps on it. If
+    model_cache is set, the models of the configurations are kept in this ModelCache.
+
+    :return: A dictionary with, for every app, its result and its cycle counts.
+    """
+    label = config_label(config)
+    results = {}
+    if not generate_mcu(config, args.config, args.dry_run):
+        return {app: {"result": SimResult.FAILED, "cycles": {}} for app in args.apps}
+    simulator.build(args.dry_run, cache=model_cache)
+
+    for app_name in args.apps:
+        an_app = Application(app_name)
+        build_dir = os.path.join(args.work_dir, label, app_name, "sw")
+        run_dir = os.path.join(args.work_dir, label, app_name, "run")
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+        compiled = an_app.compile(
+            args.compiler_path,
+            args.compiler_prefix,
+            args.compiler,
+            args.linker,
+            None,
+            args.dry_run,
+            build_dir=build_dir,
+        )
+        if not compiled:
+            results[app_name] = {"result": "Compilation failed", "cycles": {}}
+            continue
+
+        result = simulator.run_app(
+            an_app,
+            args.timeout,
+            args.dry_run,
+            build_dir=build_dir,
+            run_dir=run_dir,
+        )
+        cycles = {}
+        if result == SimResult.PASSED and not args.dry_run:
+            if simulator.name in an_app.simulation_cycles:
+                cycles[TOTAL_METRIC] = an_app.simulation_cycles[simulator.name]
+        results[app_name] = {"result": result, "cycles": cycles}
+
+    return results
+
+
+def write_csv(path: str, labels: list, matrix: dict):
+    """
+    Write the cycle counts as a matrix with one row per app and metric, and one column
+    per MCU configuration.
+    """
+    rows = sorted(
+        {
+            (app, metric)
+            for label in labels
+            for app, entry in matrix[label].items()
+            for metric in entry["cycles"]
+        }
+    )
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(["app", "metric"] + labels)
+        for app, metric in rows:
+            writer.writerow(
+                [app, metric]
+                + [
+                    matrix[label].get(app, {}).get("cycles", {}).get(metric, "")
+                    for label in labels
+                ]
+            )
+
+
+def compare_to_baseline(matrix: dict, baseline: dict, threshold_pct: float):
+    """
+    Compare the cycle counts with the ones of a baseline matrix.
+
+    :param dict matrix: The results of this run, by configuration and app.
+    :param dict baseline: The results of the baseline run, in the same format.
+    :param float threshold_pct: The relative increase of cycles considered a regression.
+
+    :return: The list of (configuration, app, metric, baseline cycles, cycles, increase in %)
+        of the regressed metrics, and the number of compared metrics.
+    """
+    regressions = []
+    compared = 0
+    for label, apps in matrix.items():
+        for app, entry in apps.items():
+            base_cycles = baseline.get(label, {}).get(app, {}).get("cycles", {})
+            for metric, cycles in entry["cycles"].items():
+                base = base_cycles.get(metric)
+                if not base:
+                    continue
+                compared += 1
+                increase_pct = 100 * (cycles - base) / base
+                if increase_pct > threshold_pct:
+                    regressions.append((label, app, metric, base, cycles, increase_pct))
+    return regressions, compared
+
+
+def main():
+    """
+    Benchmarks the apps over the MCU configurations and writes the cycle count matrix.
+
+    It exits with error if any app failed to compile or run, or if a cycle count regressed
+    with respect to the baseline.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark script")
+    parser.add_argument(
+        "--apps",
+        default=",".join(BENCHMARK_APPS),
+        help="Comma-separated list of apps to benchmark.",
+    )
+    parser.add_argument(
+        "--cpus",
+        default="cv32e20",
+        help="Comma-separated list of CPUs (cv32e20, cv32e40p, cv32e40x, cv32e40px).",
+    )
+    parser.add_argument(
+        "--buses",
+        default="onetoM",
+        help="Comma-separated list of bus types (onetoM, NtoM).",
+    )
+    parser.add_argument(
+        "--memory-banks",
+        default="",
+        help="Comma-separated list of numbers of continuous memory banks (default: the ones of the configuration file).",
+    )
+    parser.add_argument(
+        "--memory-banks-il",
+        default="",
+        help="Comma-separated list of numbers of interleaved memory banks (default: the ones of the configuration file).",
+    )
+    parser.add_argument(
+        "--config",
+        default="configs/general.hjson",
+        help="MCU configuration file the configurations are derived from.",
+    )
+    parser.add_argument("--compiler", default="gcc", help="Compiler to use.")
+    parser.add_argument(
+        "--compiler-path",
+        default=os.environ.get("RISCV_XHEEP"),
+        help="Path of the compiler toolchain (default: $RISCV_XHEEP).",
+    )
+    parser.add_argument(
+        "--compiler-prefix",
+        default=COMPILER_PREFIXES[0],
+        help="Prefix of the compiler binaries.",
+    )
+    parser.add_argument("--linker", default="on_chip", help="Linker to use.")
+    parser.add_argument(
+        "--simulator",
+        default="verilator",
+        choices=list(SIMULATOR_BACKENDS),
+        help="Simulator the apps are run with (default: verilator).",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=int,
+        default=SIM_TIMEOUT_S,
+        help="Timeout of every simulation in seconds.",
+    )
+    parser.add_argument(
+        "--work-dir",
+        default="build/benchmark",
+        help="Directory where the apps are built and run.",
+    )
+    parser.add_argument(
+        "--model-cache-dir",
+        help="Cache the simulation model of every configuration in this directory.",
+    )
+    parser.add_argument("--csv", help="Write the cycle count matrix to this CSV file.")
+    parser.add_argument(
+        "--json", help="Write the results to this JSON file, usable as a baseline."
+    )
+    parser.add_argument(
+        "--baseline", help="JSON results of a previous run to compare the cycles with."
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=5.0,
+        help="Increase of cycles flagged as a regression, in percent.",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Print the commands that would be run without executing them",
+    )
+    args = parser.parse_args()
+    args.apps = [app for app in args.apps.split(",") if app]
+
+    baseline = None
+    if args.baseline:
+        try:
+            with open(args.baseline, "r", encoding="utf-8") as file:
+                baseline = json.load(file)["results"]
+        except (OSError, ValueError, KeyError) as exc:
+            print(
+                BColors.FAIL + f"Error reading the baseline: {exc}" + BColors.ENDC,
+                flush=True,
+            )
+            exit(1)
+
+    configs = [
+        {"cpu": cpu, "bus": bus, "memorybanks": banks, "memorybanks_il": banks_il}
+        for cpu, bus, banks, banks_il in itertools.product(
+            args.cpus.split(","),
+            args.buses.split(","),
+            args.memory_banks.split(","),
+            args.memory_banks_il.split(","),
+        )
+    ]
+
+    simulator = get_simulator(args.simulator)
+    model_cache = ModelCache(args.model_cache_dir) if args.model_cache_dir else None
+
+    matrix = {}
+    try:
+        for config in configs:
+            matrix[config_label(config)] = benchmark_config(
+                config, args, simulator, model_cache
+            )
+    finally:
+        restore_mcu(args.dry_run)
+    labels = list(matrix)
+
+    if args.dry_run:
+        return
+
+    if args.csv:
+        write_csv(args.csv, labels, matrix)
+        print(
+            BColors.OKCYAN + f"Cycle count matrix written to {args.csv}" + BColors.ENDC
+        )
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "configs": {config_label(config): config for config in configs},
+                    "results": matrix,
+                },
+                file,
+                indent=2,
+            )
+        print(BColors.OKCYAN + f"Results written to {args.json}" + BColors.ENDC)
+
+    print(BColors.BOLD + "=" * 80 + BColors.ENDC)
+    failed = []
+    for label in labels:
+        for app, entry in matrix[label].items():
+            if entry["result"] != SimResult.PASSED:
+                failed.append((label, app))
+                print(BColors.FAIL + f"{label}: {app} {entry['result']}" + BColors.ENDC)
+                continue
+            cycles = ", ".join(
+                f"{metric}={value}" for metric, value in sorted(entry["cycles"].items())
+            )
+            print(BColors.OKGREEN + f"{label}: {app}: {cycles}" + BColors.ENDC)
+
+    regressions = []
+    if baseline is not None:
+        regressions, compared = compare_to_baseline(matrix, baseline, args.threshold)
+        print(
+            BColors.OKCYAN
+            + f"Compared {compared} cycle counts with {args.baseline}."
+            + BColors.ENDC
+        )
+        for label, app, metric, base, cycles, increase_pct in regressions:
+            print(
+                BColors.FAIL
+                + f"{label}: {app}: {metric} regressed from {base} to {cycles} cycles (+{increase_pct:0.1f}%)"
+                + BColors.ENDC
+            )
+        if not regressions:
+            print(BColors.OKGREEN + "No cycle count regression found." + BColors.ENDC)
+    print(BColors.BOLD + "=" * 80 + BColors.ENDC, flush=True)
+
+    if failed or regressions:
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
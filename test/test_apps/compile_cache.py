@@ -0,0 +1,177 @@
+# Copyright 2026 EPFL
+# Licensed under the Apache License, Version 2.0, see LICENSE for details.
+# SPDX-License-Identifier: Apache-2.0
+
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+
+# Folders of sw/ that never contain inputs of the compilation
+IGNORED_DIRS = {"build", "__pycache__"}
+
+# Variables read by "make app" from the environment, which change the compilation result
+ENV_VARIABLES = [
+    "ARCH",
+    "TARGET",
+    "COMPILER_FLAGS",
+    "CLANG_LINKER_USE_LD",
+    "LINK_FOLDER",
+    "SOURCE",
+]
+
+# Prefix of the artifacts of the compilation stored in the cache
+ARTIFACT_PREFIX = "main."
+
+
+def hash_tree(digest, root: str, skip: str = None):
+    """
+    Add the relative path and the content of every file under root to digest.
+
+    :param digest: The hashlib object to update.
+    :param str root: The directory to hash.
+    :param str skip: A subdirectory of root that is not hashed.
+    """
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(
+            d
+            for d in dirnames
+            if d not in IGNORED_DIRS
+            and not d.startswith("build")
+            and os.path.join(dirpath, d) != skip
+        )
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            digest.update(os.path.relpath(path, root).encode() + b"\0")
+            if not os.path.isfile(path):
+                # Dangling link to a file that is not generated yet
+                digest.update(b"missing")
+                continue
+            with open(path, "rb") as file:
+                digest.update(hashlib.sha256(file.read()).digest())
+
+
+class CompileCache:
+    """
+    Content-addressed cache of the compiled apps. An entry is keyed by the sources of the app,
+    the rest of sw/ (device library, generated headers, linker scripts and build system), the
+    compiler and the linker mode, and stores the main.* artifacts of the build directory.
+    """
+
+    def __init__(self, cache_dir: str, sw_dir: str = "sw"):
+        """
+        Constructor for CompileCache.
+
+        :param str cache_dir: The directory where the entries are stored.
+        :param str sw_dir: The software directory of X-HEEP.
+        """
+        self.cache_dir = cache_dir
+        self.sw_dir = sw_dir
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._sw_digest = None
+        self._compiler_digests = {}
+
+    def _shared_digest(self):
+        """
+        Hash sw/ without the applications once, it is shared by every app of the run.
+        """
+        with self._lock:
+            if self._sw_digest is None:
+                digest = hashlib.sha256()
+                hash_tree(
+                    digest, self.sw_dir, os.path.join(self.sw_dir, "applications")
+                )
+                self._sw_digest = digest.hexdigest()
+            return self._sw_digest
+
+    def _compiler_digest(self, compiler_path: str, compiler_prefix: str, compiler: str):
+        """
+        Identify the toolchain by the path, size and modification time of its binaries.
+        """
+        key = (compiler_path, compiler_prefix, compiler)
+        with self._lock:
+            if key not in self._compiler_digests:
+                digest = hashlib.sha256(repr(key).encode())
+                bin_dir = os.path.join(compiler_path or "", "bin")
+                if os.path.isdir(bin_dir):
+                    for name in sorted(os.listdir(bin_dir)):
+                        stat = os.stat(os.path.join(bin_dir, name))
+                        digest.update(
+                            f"{name}:{stat.st_size}:{stat.st_mtime_ns}".encode()
+                        )
+                self._compiler_digests[key] = digest.hexdigest()
+            return self._compiler_digests[key]
+
+    def key(
+        self,
+        app_name: str,
+        compiler_path: str,
+        compiler_prefix: str,
+        compiler: str,
+        linker: str,
+        extra_parameters: str,
+    ):
+        """
+        Compute the key of the compilation of an app.
+
+        :return: The hexadecimal key of the entry.
+        """
+        digest = hashlib.sha256()
+        digest.update(self._shared_digest().encode())
+        digest.update(
+            self._compiler_digest(compiler_path, compiler_prefix, compiler).encode()
+        )
+        digest.update(repr((app_name, linker, extra_parameters)).encode())
+        digest.update(
+            repr([(var, os.environ.get(var)) for var in ENV_VARIABLES]).encode()
+        )
+        hash_tree(digest, os.path.join(self.sw_dir, "applications", app_name))
+        return digest.hexdigest()
+
+    def restore(self, key: str, build_dir: str):
+        """
+        Restore the artifacts of an entry into the build directory, replacing its content.
+
+        :return: True if the entry was found, False otherwise.
+        """
+        entry_dir = os.path.join(self.cache_dir, key)
+        if not os.path.isdir(entry_dir):
+            with self._lock:
+                self.misses += 1
+            return False
+
+        shutil.rmtree(build_dir, ignore_errors=True)
+        shutil.copytree(entry_dir, build_dir)
+        with self._lock:
+            self.hits += 1
+        return True
+
+    def store(self, key: str, build_dir: str):
+        """
+        Store the artifacts of the build directory in a new entry.
+        """
+        entry_dir = os.path.join(self.cache_dir, key)
+        if os.path.isdir(entry_dir):
+            return
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Fill a temporary directory and rename it, several runs may share the cache
+        tmp_dir = tempfile.mkdtemp(dir=self.cache_dir, prefix=".tmp")
+        for name in os.listdir(build_dir):
+            path = os.path.join(build_dir, name)
+            if name.startswith(ARTIFACT_PREFIX) and os.path.isfile(path):
+                shutil.copy2(path, tmp_dir)
+        try:
+            os.rename(tmp_dir, entry_dir)
+        except OSError:
+            # Another run stored the same entry meanwhile
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def stats(self):
+        """
+        :return: The number of cache hits and misses.
+        """
+        return self.hits, self.misses
@@ -0,0 +1,1084 @@
+# Copyright 2026 EPFL
+# Licensed under the Apache License, Version 2.0, see LICENSE for details.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Description: Instruction set simulator (ISS) of X-HEEP, used by test_apps.py as a fast functional
+#   backend. It runs main.elf on a RV32IMC_Zicsr core, with the memory map of the X-HEEP model
+#   built by mcu_gen.py: the RAM banks, the memory-mapped flash and the peripheral domains.
+#   soc_ctrl and the UART are modeled well enough to print the output of the apps and their exit
+#   value, every other peripheral is a bank of plain registers. Interrupts, timers, the DMA and
+#   the SPI flash are not modeled, so the apps waiting for them do not finish.
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../..")
+sys.path.append(os.path.join(ROOT, "util"))
+sys.path.append(os.path.join(ROOT, "util/xheep_gen"))
+from elf_reader import ElfFile, SHT_NOBITS
+
+MASK = 0xFFFFFFFF
+
+# soc_ctrl registers, see hw/ip/soc_ctrl/data/soc_ctrl.hjson.tpl
+SOC_CTRL_EXIT_VALID = 0x0
+SOC_CTRL_EXIT_VALUE = 0x4
+SOC_CTRL_BOOT_ADDRESS = 0x10
+SOC_CTRL_USE_SPIMEMIO = 0x14
+SOC_CTRL_SYSTEM_FREQUENCY_HZ = 0x1C
+SOC_CTRL_XHEEP_AO_PERIPHERAL_CONFIG = 0x24
+SOC_CTRL_XHEEP_PERIPHERAL_CONFIG = 0x28
+
+# Peripherals reported by the XHEEP_*_PERIPHERAL_CONFIG registers, in bit order
+AO_PERIPHERAL_CONFIG = ["spi_flash", "dma", "pad_control", "gpio_ao"]
+PERIPHERAL_CONFIG = [
+    "rv_plic",
+    "spi_host",
+    "gpio",
+    "i2c",
+    "rv_timer",
+    "spi2",
+    "pdm2pcm",
+    "i2s",
+    "uart",
+]
+
+# UART registers, see sw/device/lib/drivers/uart/uart_regs.h
+UART_STATUS = 0x10
+UART_WDATA = 0x18
+# TX FIFO empty, TX idle, RX idle and RX FIFO empty
+UART_STATUS_IDLE = 0x3C
+
+# Counter CSRs (mcycle, minstret, cycle, time, instret and their upper halves), which all
+# count the executed instructions
+COUNTER_CSRS = {
+    0xB00: False,
+    0xB02: False,
+    0xC00: False,
+    0xC01: False,
+    0xC02: False,
+    0xB80: True,
+    0xB82: True,
+    0xC80: True,
+    0xC81: True,
+    0xC82: True,
+}
+CSR_MSTATUS = 0x300
+CSR_MISA = 0x301
+CSR_MTVEC = 0x305
+CSR_MEPC = 0x341
+CSR_MCAUSE = 0x342
+CSR_MTVAL = 0x343
+CSR_MHARTID = 0xF14
+
+# RV32IMC in misa
+MISA_RV32IMC = (1 << 30) | (1 << 2) | (1 << 8) | (1 << 12)
+
+MCAUSE_BREAKPOINT = 3
+MCAUSE_ECALL_M = 11
+
+# Size of the pages of the memory watched for writes to decoded instructions
+CODE_PAGE_SHIFT = 8
+
+
+class SimulationError(Exception):
+    """
+    The program did something the simulator cannot execute.
+    """
+
+
+class ProgramExit(Exception):
+    """
+    The program wrote soc_ctrl.EXIT_VALID.
+    """
+
+    def __init__(self, value: int):
+        super().__init__(value)
+        self.value = value
+
+
+class SystemInstruction(Exception):
+    """
+    Raised by the instructions that need the number of executed instructions (CSR accesses,
+    traps), which the run loop passes to their handler.
+    """
+
+    def __init__(self, handler):
+        super().__init__()
+        self.handler = handler
+
+
+def sext(value: int, bits: int):
+    """
+    Sign-extend the lowest bits of value.
+    """
+    sign = 1 << (bits - 1)
+    return (value & (sign - 1)) - (value & sign)
+
+
+def signed(value: int):
+    """
+    Interpret a 32-bit register value as a signed integer.
+    """
+    return value - 0x100000000 if value & 0x80000000 else value
+
+
+class Registers:
+    """
+    Peripheral modeled as a bank of 32-bit registers: reads return the last value written, or
+    the reset value.
+    """
+
+    def __init__(self, name: str, resets: dict = None):
+        self.name = name
+        self.regs = dict(resets) if resets else {}
+
+    def read(self, offset: int):
+        return self.regs.get(offset, 0)
+
+    def write(self, offset: int, value: int):
+        self.regs[offset] = value
+
+
+class SocCtrl(Registers):
+    """
+    soc_ctrl, whose EXIT_VALID register ends the program.
+    """
+
+    def write(self, offset: int, value: int):
+        super().write(offset, value)
+        if offset == SOC_CTRL_EXIT_VALID and value & 1:
+            raise ProgramExit(self.regs.get(SOC_CTRL_EXIT_VALUE, 0))
+
+
+class Uart(Registers):
+    """
+    UART that is always ready to transmit, and writes the transmitted bytes to a file.
+    """
+
+    def __init__(self, name: str, outputs: list):
+        """
+        :param list outputs: The binary files where the transmitted bytes are written.
+        """
+        super().__init__(name)
+        self.outputs = outputs
+
+    def read(self, offset: int):
+        if offset == UART_STATUS:
+            return UART_STATUS_IDLE
+        return super().read(offset)
+
+    def write(self, offset: int, value: int):
+        if offset == UART_WDATA:
+            data = bytes([value & 0xFF])
+            for output in self.outputs:
+                output.write(data)
+        else:
+            super().write(offset, value)
+
+
+class Memory:
+    """
+    Memory map of the simulated system: memory regions backed by NumPy arrays, and
+    peripherals. The RAM has a fast path for the aligned accesses.
+    """
+
+    def __init__(self, ram_base: int, ram_size: int):
+        self.regions = []
+        self.devices = []
+        self.code_pages = set()
+        self.code_written = None
+
+        self.ram_base = ram_base
+        self.ram_size = ram_size
+        self.ram = self.add_region(ram_base, ram_size)
+        view = memoryview(self.ram)
+        self.ram_bytes = view
+        self.ram_halves = view.cast("H")
+        self.ram_words = view.cast("I")
+
+    def add_region(self, base: int, size: int):
+        """
+        Map a memory region.
+
+        :return: The NumPy array holding its content.
+        """
+        array = np.zeros(size, dtype=np.uint8)
+        self.regions.append((base, base + size, memoryview(array), array))
+        return array
+
+    def add_device(self, base: int, size: int, device: Registers):
+        """
+        Map a peripheral.
+        """
+        self.devices.append((base, base + size, device))
+
+    def load_image(self, address: int, data: bytes):
+        """
+        Copy data into the memory regions, e.g. a segment of an ELF file.
+        """
+        for base, end, _, array in self.regions:
+            if base <= address and address + len(data) <= end:
+                offset = address - base
+                array[offset : offset + len(data)] = np.frombuffer(data, np.uint8)
+                return
+        raise SimulationError(
+            f"cannot load {len(data)} bytes at unmapped address {address:#010x}"
+        )
+
+    def _load(self, address: int, size: int):
+        for base, end, view, _ in self.regions:
+            if base <= address and address + size <= end:
+                offset = address - base
+                return int.from_bytes(view[offset : offset + size], "little")
+        for base, end, device in self.devices:
+            if base <= address < end:
+                offset = address - base
+                if (offset & 3) + size > 4:
+                    raise SimulationError(
+                        f"misaligned access to {device.name} at {address:#010x}"
+                    )
+                value = device.read(offset & ~3) >> (8 * (offset & 3))
+                return value & ((1 << (8 * size)) - 1)
+        raise SimulationError(f"load from unmapped address {address:#010x}")
+
+    def _store(self, address: int, size: int, value: int):
+        for base, end, view, _ in self.regions:
+            if base <= address and address + size <= end:
+                offset = address - base
+                view[offset : offset + size] = value.to_bytes(size, "little")
+                self._check_code(address, size)
+                return
+        for base, end, device in self.devices:
+            if base <= address < end:
+                offset = address - base
+                shift = 8 * (offset & 3)
+                if shift + 8 * size > 32:
+                    raise SimulationError(
+                        f"misaligned access to {device.name} at {address:#010x}"
+                    )
+                if size < 4:
+                    # Merge the written bytes into the current register value
+                    mask = ((1 << (8 * size)) - 1) << shift
+                    value = (device.read(offset & ~3) & ~mask) | (value << shift)
+                device.write(offset & ~3, value & MASK)
+                return
+        raise SimulationError(f"store to unmapped address {address:#010x}")
+
+    def _check_code(self, address: int, size: int):
+        if (address >> CODE_PAGE_SHIFT) in self.code_pages or (
+            (address + size - 1) >> CODE_PAGE_SHIFT
+        ) in self.code_pages:
+            self.code_written(address, size)
+
+    def load_word(self, address: int):
+        offset = address - self.ram_base
+        if 0 <= offset < self.ram_size and not offset & 3:
+            return self.ram_words[offset >> 2]
+        return self._load(address, 4)
+
+    def load_half(self, address: int):
+        offset = address - self.ram_base
+        if 0 <= offset < self.ram_size and not offset & 1:
+            return self.ram_halves[offset >> 1]
+        return self._load(address, 2)
+
+    def load_byte(self, address: int):
+        offset = address - self.ram_base
+        if 0 <= offset < self.ram_size:
+            return self.ram_bytes[offset]
+        return self._load(address, 1)
+
+    def store_word(self, address: int, value: int):
+        offset = address - self.ram_base
+        if 0 <= offset < self.ram_size and not offset & 3:
+            self.ram_words[offset >> 2] = value
+            if (address >> CODE_PAGE_SHIFT) in self.code_pages:
+                self.code_written(address, 4)
+        else:
+            self._store(address, 4, value)
+
+    def store_half(self, address: int, value: int):
+        offset = address - self.ram_base
+        if 0 <= offset < self.ram_size and not offset & 1:
+            self.ram_halves[offset >> 1] = value & 0xFFFF
+            if (address >> CODE_PAGE_SHIFT) in self.code_pages:
+                self.code_written(address, 2)
+        else:
+            self._store(address, 2, value & 0xFFFF)
+
+    def store_byte(self, address: int, value: int):
+        offset = address - self.ram_base
+        if 0 <= offset < self.ram_size:
+            self.ram_bytes[offset] = value & 0xFF
+            if (address >> CODE_PAGE_SHIFT) in self.code_pages:
+                self.code_written(address, 1)
+        else:
+            self._store(address, 1, value & 0xFF)
+
+
+def _i_type(opcode, rd, funct3, rs1, imm):
+    return ((imm & 0xFFF) << 20) | (rs1 << 15) | (funct3 << 12) | (rd << 7) | opcode
+
+
+def _r_type(opcode, rd, funct3, rs1, rs2, funct7=0):
+    return (
+        (funct7 << 25) | (rs2 << 20) | (rs1 << 15) | (funct3 << 12) | (rd << 7) | opcode
+    )
+
+
+def _s_type(funct3, rs1, rs2, imm):
+    return (
+        ((imm >> 5 & 0x7F) << 25)
+        | (rs2 << 20)
+        | (rs1 << 15)
+        | (funct3 << 12)
+        | ((imm & 0x1F) << 7)
+        | 0x23
+    )
+
+
+def _b_type(funct3, rs1, rs2, imm):
+    return (
+        ((imm >> 12 & 1) << 31)
+        | ((imm >> 5 & 0x3F) << 25)
+        | (rs2 << 20)
+        | (rs1 << 15)
+        | (funct3 << 12)
+        | ((imm >> 1 & 0xF) << 8)
+        | ((imm >> 11 & 1) << 7)
+        | 0x63
+    )
+
+
+def _j_type(rd, imm):
+    return (
+        ((imm >> 20 & 1) << 31)
+        | ((imm >> 1 & 0x3FF) << 21)
+        | ((imm >> 11 & 1) << 20)
+        | ((imm >> 12 & 0xFF) << 12)
+        | (rd << 7)
+        | 0x6F
+    )
+
+
+def _bits(value, high, low):
+    return (value >> low) & ((1 << (high - low + 1)) - 1)
+
+
+def expand_compressed(inst: int):
+    """
+    Expand a 16-bit instruction of the C extension into the equivalent 32-bit instruction.
+
+    :return: The 32-bit instruction, or None if inst is not a valid RV32C instruction.
+    """
+    quadrant = inst & 3
+    funct3 = inst >> 13
+    rd = _bits(inst, 11, 7)
+    rs2 = _bits(inst, 6, 2)
+    rd_c = 8 + _bits(inst, 4, 2)
+    rs1_c = 8 + _bits(inst, 9, 7)
+    imm6 = sext((_bits(inst, 12, 12) << 5) | rs2, 6)
+
+    if quadrant == 0:
+        # Memory offsets of c.lw and c.sw
+        uimm = (
+            (_bits(inst, 12, 10) << 3)
+            | (_bits(inst, 6, 6) << 2)
+            | (_bits(inst, 5, 5) << 6)
+        )
+        if funct3 == 0:
+            nzuimm = (
+                (_bits(inst, 12, 11) << 4)
+                | (_bits(inst, 10, 7) << 6)
+                | (_bits(inst, 6, 6) << 2)
+                | (_bits(inst, 5, 5) << 3)
+            )
+            if nzuimm == 0:
+                return None
+            return _i_type(0x13, rd_c, 0, 2, nzuimm)  # c.addi4spn
+        if funct3 == 2:
+            return _i_type(0x03, rd_c, 2, rs1_c, uimm)  # c.lw
+        if funct3 == 6:
+            return _s_type(2, rs1_c, rd_c, uimm)  # c.sw
+        return None
+
+    if quadrant == 1:
+        jump = sext(
+            (_bits(inst, 12, 12) << 11)
+            | (_bits(inst, 11, 11) << 4)
+            | (_bits(inst, 10, 9) << 8)
+            | (_bits(inst, 8, 8) << 10)
+            | (_bits(inst, 7, 7) << 6)
+            | (_bits(inst, 6, 6) << 7)
+            | (_bits(inst, 5, 3) << 1)
+            | (_bits(inst, 2, 2) << 5),
+            12,
+        )
+        if funct3 == 0:
+            return _i_type(0x13, rd, 0, rd, imm6)  # c.addi
+        if funct3 == 1:
+            return _j_type(1, jump)  # c.jal
+        if funct3 == 2:
+            return _i_type(0x13, rd, 0, 0, imm6)  # c.li
+        if funct3 == 3:
+            if rd == 2:
+                imm = sext(
+                    (_bits(inst, 12, 12) << 9)
+                    | (_bits(inst, 6, 6) << 4)
+                    | (_bits(inst, 5, 5) << 6)
+                    | (_bits(inst, 4, 3) << 7)
+                    | (_bits(inst, 2, 2) << 5),
+                    10,
+                )
+                if imm == 0:
+                    return None
+                return _i_type(0x13, 2, 0, 2, imm)  # c.addi16sp
+            if imm6 == 0:
+                return None
+            return ((imm6 & 0xFFFFF) << 12) | (rd << 7) | 0x37  # c.lui
+        if funct3 == 4:
+            funct2 = _bits(inst, 11, 10)
+            if funct2 == 0:
+                return _r_type(0x13, rs1_c, 5, rs1_c, rs2)  # c.srli
+            if funct2 == 1:
+                return _r_type(0x13, rs1_c, 5, rs1_c, rs2, 0x20)  # c.srai
+            if funct2 == 2:
+                return _i_type(0x13, rs1_c, 7, rs1_c, imm6)  # c.andi
+            if _bits(inst, 12, 12):
+                return None
+            # c.sub, c.xor, c.or, c.and
+            funct3_alu, funct7 = [(0, 0x20), (4, 0), (6, 0), (7, 0)][_bits(inst, 6, 5)]
+            return _r_type(0x33, rs1_c, funct3_alu, rs1_c, rd_c, funct7)
+        if funct3 == 5:
+            return _j_type(0, jump)  # c.j
+        branch = sext(
+            (_bits(inst, 12, 12) << 8)
+            | (_bits(inst, 11, 10) << 3)
+            | (_bits(inst, 6, 5) << 6)
+            | (_bits(inst, 4, 3) << 1)
+            | (_bits(inst, 2, 2) << 5),
+            9,
+        )
+        return _b_type(funct3 - 6, rs1_c, 0, branch)  # c.beqz, c.bnez
+
+    if quadrant == 2:
+        if funct3 == 0:
+            if _bits(inst, 12, 12):
+                return None
+            return _r_type(0x13, rd, 1, rd, rs2)  # c.slli
+        if funct3 == 2:
+            if rd == 0:
+                return None
+            uimm = (
+                (_bits(inst, 12, 12) << 5)
+                | (_bits(inst, 6, 4) << 2)
+                | (_bits(inst, 3, 2) << 6)
+            )
+            return _i_type(0x03, rd, 2, 2, uimm)  # c.lwsp
+        if funct3 == 4:
+            if not _bits(inst, 12, 12):
+                if rs2 == 0:
+                    return None if rd == 0 else _i_type(0x67, 0, 0, rd, 0)  # c.jr
+                return _r_type(0x33, rd, 0, 0, rs2)  # c.mv
+            if rd == 0 and rs2 == 0:
+                return 0x00100073  # c.ebreak
+            if rs2 == 0:
+                return _i_type(0x67, 1, 0, rd, 0)  # c.jalr
+            return _r_type(0x33, rd, 0, rd, rs2)  # c.add
+        if funct3 == 6:
+            uimm = (_bits(inst, 12, 9) << 2) | (_bits(inst, 8, 7) << 6)
+            return _s_type(2, 2, rs2, uimm)  # c.swsp
+    return None
+
+
+def _div(a, b):
+    sa, sb = signed(a), signed(b)
+    if sb == 0:
+        return MASK
+    if sa == -(1 << 31) and sb == -1:
+        return a
+    quotient = abs(sa) // abs(sb)
+    return (-quotient if (sa < 0) != (sb < 0) else quotient) & MASK
+
+
+def _rem(a, b):
+    sa, sb = signed(a), signed(b)
+    if sb == 0:
+        return a
+    if sa == -(1 << 31) and sb == -1:
+        return 0
+    remainder = abs(sa) % abs(sb)
+    return (-remainder if sa < 0 else remainder) & MASK
+
+
+# Operations of the OP and OP-IMM instructions on unsigned 32-bit values, by (funct7, funct3)
+ALU_OPS = {
+    (0x00, 0): lambda a, b: (a + b) & MASK,
+    (0x20, 0): lambda a, b: (a - b) & MASK,
+    (0x00, 1): lambda a, b: (a << (b & 31)) & MASK,
+    (0x00, 2): lambda a, b: int(signed(a) < signed(b)),
+    (0x00, 3): lambda a, b: int(a < b),
+    (0x00, 4): lambda a, b: a ^ b,
+    (0x00, 5): lambda a, b: a >> (b & 31),
+    (0x20, 5): lambda a, b: (signed(a) >> (b & 31)) & MASK,
+    (0x00, 6): lambda a, b: a | b,
+    (0x00, 7): lambda a, b: a & b,
+    (0x01, 0): lambda a, b: (a * b) & MASK,
+    (0x01, 1): lambda a, b: ((signed(a) * signed(b)) >> 32) & MASK,
+    (0x01, 2): lambda a, b: ((signed(a) * b) >> 32) & MASK,
+    (0x01, 3): lambda a, b: (a * b) >> 32,
+    (0x01, 4): _div,
+    (0x01, 5): lambda a, b: a // b if b else MASK,
+    (0x01, 6): _rem,
+    (0x01, 7): lambda a, b: a % b if b else a,
+}
+
+# Conditions of the branches on unsigned 32-bit values, by funct3
+BRANCH_CONDITIONS = {
+    0: lambda a, b: a == b,
+    1: lambda a, b: a != b,
+    4: lambda a, b: signed(a) < signed(b),
+    5: lambda a, b: signed(a) >= signed(b),
+    6: lambda a, b: a < b,
+    7: lambda a, b: a >= b,
+}
+
+
+class DecodeCache(dict):
+    """
+    Decoded instructions by address, decoded on their first execution.
+    """
+
+    def __init__(self, core):
+        super().__init__()
+        self.core = core
+
+    def __missing__(self, pc):
+        operation = self.core.decode(pc)
+        self[pc] = operation
+        return operation
+
+
+class Core:
+    """
+    RV32IMC_Zicsr core in machine mode. Every instruction is decoded once into a closure that
+    executes it and returns the address of the next instruction.
+    """
+
+    def __init__(self, memory: Memory, pc: int):
+        self.memory = memory
+        self.pc = pc
+        # x0 is never written: the instructions writing x0 write the extra register x32
+        self.x = [0] * 33
+        self.csrs = {CSR_MISA: MISA_RV32IMC, CSR_MHARTID: 0}
+        self.counter_offset = 0
+        self.instret = 0
+        self.decoded = DecodeCache(self)
+        memory.code_written = self.code_written
+
+    def code_written(self, address: int, size: int):
+        """
+        Forget the decoded instructions overwritten by a store.
+        """
+        for pc in range((address - 2) & ~1, address + size, 2):
+            self.decoded.pop(pc, None)
+
+    def run(self, max_instructions: int = None):
+        """
+        Run the program until it exits or max_instructions instructions were executed.
+
+        :return: The exit value of the program, or None if it did not finish.
+        """
+        limit = max_instructions if max_instructions is not None else 1 << 62
+        decoded = self.decoded
+        pc = self.pc
+        start = count = self.instret
+        try:
+            while start < limit:
+                try:
+                    for count in range(start, limit):
+                        pc = decoded[pc]()
+                    start = limit
+                except SystemInstruction as exc:
+                    pc = exc.handler(count)
+                    start = count + 1
+            self.instret = limit
+            return None
+        except ProgramExit as exc:
+            self.instret = count + 1
+            return exc.value
+        except SimulationError:
+            self.instret = count
+            raise
+        finally:
+            self.pc = pc
+
+    def read_csr(self, csr: int, count: int):
+        if csr in COUNTER_CSRS:
+            value = count - self.counter_offset
+            return (value >> 32) & MASK if COUNTER_CSRS[csr] else value & MASK
+        return self.csrs.get(csr, 0)
+
+    def write_csr(self, csr: int, value: int, count: int):
+        if csr in COUNTER_CSRS:
+            if not COUNTER_CSRS[csr]:
+                # Restart the counters from value, e.g. to measure a section of the program
+                self.counter_offset = count - value
+        else:
+            self.csrs[csr] = value
+
+    def trap(self, pc: int, cause: int, value: int = 0):
+        """
+        Take an exception: the vectored mode of mtvec only applies to interrupts.
+
+        :return: The address of the trap handler.
+        """
+        mtvec = self.csrs.get(CSR_MTVEC, 0) & ~3
+        if mtvec == 0:
+            raise SimulationError(f"exception {cause} without trap handler")
+        self.csrs[CSR_MEPC] = pc
+        self.csrs[CSR_MCAUSE] = cause
+        self.csrs[CSR_MTVAL] = value
+        mstatus = self.csrs.get(CSR_MSTATUS, 0)
+        # MPIE = MIE, MIE = 0, MPP = M
+        self.csrs[CSR_MSTATUS] = (mstatus & ~0x88) | ((mstatus & 0x8) << 4) | (3 << 11)
+        return mtvec
+
+    def decode(self, pc: int):
+        """
+        Decode the instruction at pc.
+
+        :return: A function executing it and returning the address of the next instruction.
+        """
+        memory = self.memory
+        inst = memory.load_half(pc)
+        if inst & 3 == 3:
+            inst |= memory.load_half(pc + 2) << 16
+            nxt = (pc + 4) & MASK
+        else:
+            inst = expand_compressed(inst)
+            if inst is None:
+                raise SimulationError(
+                    f"illegal instruction {memory.load_half(pc):#06x}"
+                )
+            nxt = (pc + 2) & MASK
+        memory.code_pages.add(pc >> CODE_PAGE_SHIFT)
+        memory.code_pages.add((nxt - 1) >> CODE_PAGE_SHIFT)
+
+        operation = self._decode(pc, nxt, inst)
+        if operation is None:
+            raise SimulationError(f"illegal instruction {inst:#010x}")
+        return operation
+
+    def _decode(self, pc, nxt, inst):
+        x = self.x
+        memory = self.memory
+        opcode = inst & 0x7F
+        rd = (inst >> 7) & 31 or 32
+        funct3 = (inst >> 12) & 7
+        rs1 = (inst >> 15) & 31
+        rs2 = (inst >> 20) & 31
+        funct7 = inst >> 25
+        imm_i = sext(inst >> 20, 12)
+
+        if opcode == 0x13:  # OP-IMM
+            if funct3 == 0:
+
+                def addi():
+                    x[rd] = (x[rs1] + imm_i) & MASK
+                    return nxt
+
+                return addi
+            if funct3 in (1, 5):
+                if funct7 not in (0, 0x20) or (funct3 == 1 and funct7):
+                    return None
+                function = ALU_OPS[(funct7, funct3)]
+                operand = rs2
+            else:
+                function = ALU_OPS[(0, funct3)]
+                operand = imm_i & MASK
+
+            def op_imm():
+                x[rd] = function(x[rs1], operand)
+                return nxt
+
+            return op_imm
+
+        if opcode == 0x33:  # OP
+            if (funct7, funct3) not in ALU_OPS:
+                return None
+            if (funct7, funct3) == (0, 0):
+
+                def add():
+                    x[rd] = (x[rs1] + x[rs2]) & MASK
+                    return nxt
+
+                return add
+            function = ALU_OPS[(funct7, funct3)]
+
+            def op():
+                x[rd] = function(x[rs1], x[rs2])
+                return nxt
+
+            return op
+
+        if opcode == 0x37:  # LUI
+            value = inst & 0xFFFFF000
+
+            def lui():
+                x[rd] = value
+                return nxt
+
+            return lui
+
+        if opcode == 0x17:  # AUIPC
+            value = (pc + (inst & 0xFFFFF000)) & MASK
+
+            def auipc():
+                x[rd] = value
+                return nxt
+
+            return auipc
+
+        if opcode == 0x6F:  # JAL
+            target = (
+                pc
+                + sext(
+                    ((inst >> 31) << 20)
+                    | (((inst >> 12) & 0xFF) << 12)
+                    | (((inst >> 20) & 1) << 11)
+                    | (((inst >> 21) & 0x3FF) << 1),
+                    21,
+                )
+            ) & MASK
+
+            def jal():
+                x[rd] = nxt
+                return target
+
+            return jal
+
+        if opcode == 0x67 and funct3 == 0:  # JALR
+
+            def jalr():
+                target = (x[rs1] + imm_i) & 0xFFFFFFFE
+                x[rd] = nxt
+                return target
+
+            return jalr
+
+        if opcode == 0x63:  # BRANCH
+            if funct3 not in BRANCH_CONDITIONS:
+                return None
+            target = (
+                pc
+                + sext(
+                    ((inst >> 31) << 12)
+                    | (((inst >> 7) & 1) << 11)
+                    | (((inst >> 25) & 0x3F) << 5)
+                    | (((inst >> 8) & 0xF) << 1),
+                    13,
+                )
+            ) & MASK
+            if funct3 == 0:
+
+                def beq():
+                    return target if x[rs1] == x[rs2] else nxt
+
+                return beq
+            if funct3 == 1:
+
+                def bne():
+                    return target if x[rs1] != x[rs2] else nxt
+
+                return bne
+            condition = BRANCH_CONDITIONS[funct3]
+
+            def branch():
+                return target if condition(x[rs1], x[rs2]) else nxt
+
+            return branch
+
+        if opcode == 0x03:  # LOAD
+            if funct3 == 2:
+                load_word = memory.load_word
+
+                def lw():
+                    x[rd] = load_word((x[rs1] + imm_i) & MASK)
+                    return nxt
+
+                return lw
+            if funct3 not in (0, 1, 4, 5):
+                return None
+            load = memory.load_byte if funct3 & 3 == 0 else memory.load_half
+            bits = 8 if funct3 & 3 == 0 else 16
+            if funct3 & 4:
+
+                def load_unsigned():
+                    x[rd] = load((x[rs1] + imm_i) & MASK)
+                    return nxt
+
+                return load_unsigned
+
+            def load_signed():
+                x[rd] = sext(load((x[rs1] + imm_i) & MASK), bits) & MASK
+                return nxt
+
+            return load_signed
+
+        if opcode == 0x23:  # STORE
+            if funct3 > 2:
+                return None
+            store = [memory.store_byte, memory.store_half, memory.store_word][funct3]
+            imm_s = sext(((inst >> 25) << 5) | ((inst >> 7) & 31), 12)
+
+            def store_op():
+                store((x[rs1] + imm_s) & MASK, x[rs2])
+                return nxt
+
+            return store_op
+
+        if opcode == 0x0F:  # FENCE, FENCE.I
+
+            def fence():
+                return nxt
+
+            return fence
+
+        if opcode == 0x73:  # SYSTEM
+            return self._decode_system(pc, nxt, inst, rd, funct3, rs1)
+
+        return None
+
+    def _decode_system(self, pc, nxt, inst, rd, funct3, rs1):
+        x = self.x
+        csr = inst >> 20
+
+        if funct3 == 0:
+            if inst == 0x00000073:  # ECALL
+
+                def handler(count):
+                    return self.trap(pc, MCAUSE_ECALL_M)
+
+            elif inst == 0x00100073:  # EBREAK
+
+                def handler(count):
+                    return self.trap(pc, MCAUSE_BREAKPOINT)
+
+            elif inst == 0x30200073:  # MRET
+
+                def handler(count):
+                    mstatus = self.csrs.get(CSR_MSTATUS, 0)
+                    # MIE = MPIE, MPIE = 1
+                    self.csrs[CSR_MSTATUS] = (
+                        (mstatus & ~0x8) | ((mstatus >> 4) & 0x8) | 0x80
+                    )
+                    return self.csrs.get(CSR_MEPC, 0)
+
+            elif inst == 0x10500073:  # WFI, there are no interrupts to wait for
+
+                def wfi():
+                    return nxt
+
+                return wfi
+            else:
+                return None
+
+            def system():
+                raise SystemInstruction(handler)
+
+            return system
+
+        if funct3 == 4:
+            return None
+
+        def handler(count):
+            # The immediate forms use the rs1 field as the operand
+            operand = rs1 if funct3 & 4 else x[rs1]
+            old = self.read_csr(csr, count)
+            kind = funct3 & 3
+            if kind == 1:
+                self.write_csr(csr, operand, count)
+            elif rs1 != 0:
+                value = old | operand if kind == 2 else old & ~operand
+                self.write_csr(csr, value, count)
+            x[rd] = old
+            return nxt
+
+        def csr_access():
+            raise SystemInstruction(handler)
+
+        return csr_access
+
+
+def root_path(path: str):
+    """
+    Resolve a path relative to the X-HEEP root, as the paths of the Makefile variables, when it
+    does not exist from the current directory.
+    """
+    if not path or os.path.isabs(path) or os.path.exists(path):
+        return path
+    return os.path.join(ROOT, path)
+
+
+def load_memory_map(args):
+    """
+    Build the X-HEEP model with mcu_gen.py and map its memories and peripherals.
+
+    :return: The Memory and the UART, or None if the model has no UART.
+    """
+    # Imported here as mcu_gen imports the whole generator
+    import mcu_gen
+
+    # mcu_gen prints the pad ring while loading the configuration
+    with contextlib.redirect_stdout(io.StringIO()):
+        xheep, config = mcu_gen.load_xheep(args)
+        kwargs = mcu_gen.configure_xheep(
+            xheep, config, args.cpu, args.bus, args.memorybanks, args.memorybanks_il
+        )
+
+    memory_ss = xheep.memory_ss()
+    memory = Memory(memory_ss.ram_start_address(), memory_ss.ram_size_address())
+    memory.add_region(
+        int(kwargs["flash_mem_start_address"], 16),
+        int(kwargs["flash_mem_size_address"], 16),
+    )
+
+    base_domain = xheep.get_base_peripheral_domain()
+    user_domain = xheep.get_user_peripheral_domain()
+    resets = {
+        SOC_CTRL_BOOT_ADDRESS: 0x180,
+        SOC_CTRL_USE_SPIMEMIO: 1,
+        SOC_CTRL_SYSTEM_FREQUENCY_HZ: 1,
+        SOC_CTRL_XHEEP_AO_PERIPHERAL_CONFIG: sum(
+            1 << bit
+            for bit, name in enumerate(AO_PERIPHERAL_CONFIG)
+            if base_domain.contains_peripheral(name)
+        ),
+        SOC_CTRL_XHEEP_PERIPHERAL_CONFIG: sum(
+            1 << bit
+            for bit, name in enumerate(PERIPHERAL_CONFIG)
+            if user_domain.contains_peripheral(name)
+        ),
+    }
+
+    uart = None
+    for domain in (base_domain, user_domain):
+        for peripheral in domain.get_peripherals():
+            name = peripheral.get_name()
+            if name == "soc_ctrl":
+                device = SocCtrl(name, resets)
+            elif name == "uart":
+                device = uart = Uart(name, [])
+            else:
+                device = Registers(name)
+            memory.add_device(
+                domain.get_start_address() + peripheral.get_address(),
+                peripheral.get_length(),
+                device,
+            )
+    return memory, uart
+
+
+def load_elf(memory: Memory, path: str):
+    """
+    Load the sections of an ELF file at their load addresses, where the boot ROM or the flash
+    controller makes them visible.
+
+    :return: The entry point.
+    """
+    with ElfFile(path) as elf:
+        for section in elf.alloc_sections():
+            if section.type != SHT_NOBITS and section.size:
+                memory.load_image(elf.load_address(section), elf.section_data(section))
+        return elf.entry
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="iss",
+        description="Run an X-HEEP application on an instruction set simulator",
+    )
+    parser.add_argument(
+        "elf", help="ELF file of the application, e.g. sw/build/main.elf"
+    )
+    parser.add_argument(
+        "--config",
+        default=os.environ.get("X_HEEP_CFG") or "configs/general.hjson",
+        help="HJSON configuration of X-HEEP, $X_HEEP_CFG by default",
+    )
+    parser.add_argument(
+        "--python_config",
+        default=os.environ.get("PYTHON_X_HEEP_CFG", ""),
+        help="Python configuration of X-HEEP, $PYTHON_X_HEEP_CFG by default",
+    )
+    parser.add_argument(
+        "--pads_cfg",
+        default=os.environ.get("PADS_CFG") or "configs/pad_cfg.py",
+        help="Pad ring configuration, $PADS_CFG by default",
+    )
+    parser.add_argument("--cpu", default=os.environ.get("CPU", ""))
+    parser.add_argument("--bus", default=os.environ.get("BUS", ""))
+    parser.add_argument("--memorybanks", default=os.environ.get("MEMORY_BANKS", ""))
+    parser.add_argument(
+        "--memorybanks_il", default=os.environ.get("MEMORY_BANKS_IL", "")
+    )
+    parser.add_argument("--config_cache", default=None)
+    parser.add_argument(
+        "--max-instructions",
+        type=int,
+        default=None,
+        help="Stop the simulation after this number of instructions",
+    )
+    parser.add_argument(
+        "--uart-log",
+        default="uart0.log",
+        help="File where the UART output is written, uart0.log by default",
+    )
+    parser.add_argument(
+        "--uart-stdout",
+        action="store_true",
+        help="Also print the UART output",
+    )
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+    args.config = root_path(args.config)
+    args.python_config = root_path(args.python_config)
+    args.pads_cfg = root_path(args.pads_cfg)
+
+    try:
+        memory, uart = load_memory_map(args)
+        entry = load_elf(memory, args.elf)
+    except (OSError, ValueError, SimulationError) as exc:
+        print(f"%Error: {exc}", flush=True)
+        return 1
+
+    core = Core(memory, entry)
+    with open(args.uart_log, "wb") as uart_log:
+        if uart is not None:
+            uart.outputs.append(uart_log)
+            if args.uart_stdout:
+                uart.outputs.append(sys.stdout.buffer)
+        try:
+            exit_value = core.run(args.max_instructions)
+        except SimulationError as exc:
+            sys.stdout.flush()
+            print(f"%Error: {exc} at pc {core.pc:#010x}", flush=True)
+            return 1
+
+    sys.stdout.flush()
+    print(f"Simulation finished after {core.instret} instructions")
+    if exit_value is None:
+        print("Simulation was terminated before program finished", flush=True)
+    else:
+        print(f"Program Finished with value {exit_value}", flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+# Copyright 2026 EPFL
+# Licensed under the Apache License, Version 2.0, see LICENSE for details.
+# SPDX-License-Identifier: Apache-2.0
+
+import glob
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+
+from compile_cache import hash_tree
+
+# Folders with the RTL, the testbenches and the FuseSoC cores of the model, including the
+# files generated by mcu-gen
+RTL_DIRS = ["hw", "tb"]
+
+# Top-level FuseSoC core of X-HEEP, whose name gives the FuseSoC build directory
+TOP_CORE = "core-v-mini-mcu.core"
+
+# Variables read by the model build targets, which change the built model
+ENV_VARIABLES = ["FUSESOC_PARAM", "FUSESOC_FLAGS", "FUSESOC_CORES_ROOT"]
+
+# Files of the FuseSoC work root that are only needed to build the model, not to run it
+BUILD_ONLY_SUFFIXES = (".o", ".a", ".d")
+
+
+def fusesoc_build_dir(root: str = "."):
+    """
+    Get the FuseSoC build directory of X-HEEP, e.g.
+    build/openhwgroup.org_systems_core-v-mini-mcu_1.0.5, from the name of its core.
+    """
+    with open(os.path.join(root, TOP_CORE), "r", encoding="utf-8") as file:
+        match = re.search(r"^name:\s*(\S+)", file.read(), re.MULTILINE)
+    return os.path.join(root, "build", match.group(1).replace(":", "_"))
+
+
+class ModelCache:
+    """
+    Content-addressed cache of the simulation models. An entry is keyed by the RTL and the
+    testbenches (hw/ and tb/, with the files generated by mcu-gen), the FuseSoC cores, the
+    FuseSoC parameters and flags, the simulator build target and the Verilator version, and
+    stores the FuseSoC work root of the model without its object files.
+    """
+
+    def __init__(self, cache_dir: str, root: str = "."):
+        """
+        Constructor for ModelCache.
+
+        :param str cache_dir: The directory where the entries are stored.
+        :param str root: The root directory of X-HEEP.
+        """
+        self.cache_dir = cache_dir
+        self.root = root
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._rtl_digest = None
+
+    def _shared_digest(self):
+        """
+        Hash the RTL and the FuseSoC cores once, they are shared by every simulator.
+        """
+        with self._lock:
+            if self._rtl_digest is None:
+                digest = hashlib.sha256()
+                for rtl_dir in RTL_DIRS:
+                    hash_tree(digest, os.path.join(self.root, rtl_dir))
+                for core in sorted(glob.glob(os.path.join(self.root, "*.core"))):
+                    digest.update(os.path.basename(core).encode() + b"\0")
+                    with open(core, "rb") as file:
+                        digest.update(hashlib.sha256(file.read()).digest())
+                self._rtl_digest = digest.hexdigest()
+            return self._rtl_digest
+
+    @staticmethod
+    def tool_version():
+        """
+        :return: The version of Verilator, or "unknown" if it is not installed.
+        """
+        try:
+            return subprocess.run(
+                ["verilator", "--version"], capture_output=True, check=True, text=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return "unknown"
+
+    def key(self, simulator):
+        """
+        Compute the key of the model of a simulator.
+
+        :param Simulator simulator: The simulator whose model is built.
+
+        :return: The hexadecimal key of the entry.
+        """
+        digest = hashlib.sha256()
+        digest.update(self._shared_digest().encode())
+        digest.update(
+            repr(
+                (simulator.name, simulator.build_target, simulator.model_path)
+            ).encode()
+        )
+        digest.update(
+            repr([(var, os.environ.get(var)) for var in ENV_VARIABLES]).encode()
+        )
+        digest.update(self.tool_version().encode())
+        return digest.hexdigest()
+
+    def _work_root(self, simulator):
+        return os.path.join(
+            fusesoc_build_dir(self.root), os.path.dirname(simulator.model_path)
+        )
+
+    def restore(self, key: str, simulator):
+        """
+        Restore the model of an entry into the FuseSoC build directory, replacing the
+        previous model.
+
+        :return: True if the entry was found, False otherwise.
+        """
+        entry_dir = os.path.join(self.cache_dir, key)
+        if not os.path.isdir(entry_dir):
+            with self._lock:
+                self.misses += 1
+            return False
+
+        work_root = self._work_root(simulator)
+        shutil.rmtree(work_root, ignore_errors=True)
+        shutil.copytree(entry_dir, work_root, symlinks=True)
+        with self._lock:
+            self.hits += 1
+        return True
+
+    def store(self, key: str, simulator):
+        """
+        Store the model built in the FuseSoC build directory in a new entry.
+        """
+        entry_dir = os.path.join(self.cache_dir, key)
+        work_root = self._work_root(simulator)
+        if os.path.isdir(entry_dir) or not os.path.isfile(
+            os.path.join(work_root, os.path.basename(simulator.model_path))
+        ):
+            return
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Fill a temporary directory and rename it, several runs may share the cache
+        tmp_dir = tempfile.mkdtemp(dir=self.cache_dir, prefix=".tmp")
+        shutil.rmtree(tmp_dir)
+        shutil.copytree(
+            work_root,
+            tmp_dir,
+            symlinks=True,
+            ignore=lambda _, names: [
+                name for name in names if name.endswith(BUILD_ONLY_SUFFIXES)
+            ],
+        )
+        try:
+            os.rename(tmp_dir, entry_dir)
+        except OSError:
+            # Another run stored the same entry meanwhile
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def stats(self):
+        """
+        :return: The number of cache hits and misses.
+        """
+        return self.hits, self.misses
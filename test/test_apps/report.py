@@ -0,0 +1,245 @@
+# Copyright 2026 EPFL
+# Licensed under the Apache License, Version 2.0, see LICENSE for details.
+# SPDX-License-Identifier: Apache-2.0
+
+import json
+import time
+import xml.etree.ElementTree as ET
+
+from simulator import SimResult
+from bcolors import BColors
+from utils import in_list
+
+# Number of output lines of a failed stage kept in the reports
+REPORT_LOG_LINES = 50
+
+
+def log_tail(output):
+    """
+    Get the last lines of the output of a stage.
+
+    :param output: The output, as a string or as a list of lines.
+
+    :return: The last REPORT_LOG_LINES lines as a string.
+    """
+    if output is None:
+        return ""
+    lines = output.splitlines(True) if isinstance(output, str) else list(output)
+    return "".join(lines[-REPORT_LOG_LINES:])
+
+
+def app_report(an_app, skipped: bool):
+    """
+    Collect the results and timings of the stages of an app.
+
+    :param Application an_app: The tested application.
+    :param bool skipped: If the app was skipped.
+
+    :return: A dictionary with the compilation of every compiler and the simulation of
+        every simulator.
+    """
+    compilation = {}
+    for compiler, success in an_app.compilation_success.items():
+        if success is None:
+            status = "skipped"
+        else:
+            status = "passed" if success else "failed"
+        compilation[compiler] = {
+            "status": status,
+            "seconds": an_app.compilation_times.get(compiler),
+            "log": log_tail(an_app.compilation_logs.get(compiler)),
+        }
+
+    simulation = {}
+    for simulator, result in an_app.simulation_results.items():
+        simulation[simulator] = {
+            "result": result,
+            "seconds": an_app.simulation_times.get(simulator),
+            "cycles": an_app.simulation_cycles.get(simulator),
+            "exit_value": an_app.simulation_exit_values.get(simulator),
+            "log": (
+                log_tail(an_app.simulation_logs.get(simulator))
+                if result != SimResult.PASSED
+                else ""
+            ),
+        }
+
+    return {"skipped": skipped, "compilation": compilation, "simulation": simulation}
+
+
+def build_report(app_list: list, blacklist: list, total_seconds: float):
+    """
+    Build the report of a run of the tests.
+
+    :param list app_list: The list of all the apps.
+    :param list blacklist: The list of apps that were skipped.
+    :param float total_seconds: The wall time of the whole run.
+
+    :return: The report, as a dictionary that can be written as JSON.
+    """
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "total_seconds": total_seconds,
+        "apps": {
+            an_app.name: app_report(an_app, in_list(an_app.name, blacklist))
+            for an_app in sorted(app_list, key=lambda app: app.name)
+        },
+    }
+
+
+def write_json_report(path: str, report: dict):
+    """
+    Write the report as JSON.
+    """
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+
+
+def write_junit_report(path: str, report: dict):
+    """
+    Write the report as JUnit XML, with a test case for every compilation and every
+    simulation of every app.
+    """
+    suite = ET.Element("testsuite", name="test_apps")
+    tests = failures = skipped = 0
+    total_s = 0.0
+
+    for app_name, app in report["apps"].items():
+        stages = [
+            (
+                f"compile[{compiler}]",
+                stage["status"] == "failed",
+                app["skipped"] or stage["status"] == "skipped",
+                stage,
+            )
+            for compiler, stage in app["compilation"].items()
+        ] + [
+            (
+                f"simulate[{simulator}]",
+                stage["result"] in (SimResult.FAILED, SimResult.TIMED_OUT),
+                stage["result"] == SimResult.SKIPPED,
+                stage,
+            )
+            for simulator, stage in app["simulation"].items()
+        ]
+        if app["skipped"] and not stages:
+            stages = [("test", False, True, {})]
+
+        for name, failed, is_skipped, stage in stages:
+            seconds = stage.get("seconds") or 0.0
+            case = ET.SubElement(
+                suite,
+                "testcase",
+                classname=f"test_apps.{app_name}",
+                name=name,
+                time=f"{seconds:.3f}",
+            )
+            tests += 1
+            total_s += seconds
+            if stage.get("cycles") is not None:
+                properties = ET.SubElement(case, "properties")
+                ET.SubElement(
+                    properties, "property", name="cycles", value=str(stage["cycles"])
+                )
+            if is_skipped:
+                skipped += 1
+                ET.SubElement(case, "skipped")
+            elif failed:
+                failures += 1
+                message = stage.get("result", "Failed")
+                if stage.get("exit_value") is not None:
+                    message += f" with value {stage['exit_value']}"
+                failure = ET.SubElement(case, "failure", message=message)
+                failure.text = stage.get("log", "")
+
+    suite.set("tests", str(tests))
+    suite.set("failures", str(failures))
+    suite.set("errors", "0")
+    suite.set("skipped", str(skipped))
+    suite.set("time", f"{total_s:.3f}")
+    suite.set("timestamp", report["timestamp"])
+
+    tree = ET.ElementTree(suite)
+    ET.indent(tree)
+    tree.write(path, encoding="utf-8", xml_declaration=True)
+
+
+def stage_metrics(report: dict):
+    """
+    Flatten the timings and cycle counts of a report.
+
+    :return: A dictionary from (app, stage, metric) to its value.
+    """
+    metrics = {}
+    for app_name, app in report.get("apps", {}).items():
+        for compiler, stage in app.get("compilation", {}).items():
+            if stage.get("status") == "passed" and stage.get("seconds") is not None:
+                metrics[(app_name, f"compile[{compiler}]", "seconds")] = stage[
+                    "seconds"
+                ]
+        for simulator, stage in app.get("simulation", {}).items():
+            if stage.get("result") != SimResult.PASSED:
+                continue
+            for metric in ("seconds", "cycles"):
+                if stage.get(metric) is not None:
+                    metrics[(app_name, f"simulate[{simulator}]", metric)] = stage[
+                        metric
+                    ]
+    return metrics
+
+
+def compare_reports(
+    report: dict, baseline: dict, threshold_pct: float, min_seconds: float
+):
+    """
+    Compare the timings and cycle counts of a report with the ones of a baseline report.
+
+    :param dict report: The report of this run.
+    :param dict baseline: The report of the baseline run.
+    :param float threshold_pct: The relative increase flagged as a slowdown.
+    :param float min_seconds: The smallest increase of a wall time flagged as a slowdown,
+        to ignore the noise of the short stages.
+
+    :return: The list of (app, stage, metric, baseline value, value, increase in %) of the
+        slowdowns, sorted from the largest increase, and the number of compared metrics.
+    """
+    base_metrics = stage_metrics(baseline)
+    slowdowns = []
+    compared = 0
+    for key, value in stage_metrics(report).items():
+        base = base_metrics.get(key)
+        if not base:
+            continue
+        compared += 1
+        increase_pct = 100 * (value - base) / base
+        if increase_pct <= threshold_pct:
+            continue
+        if key[2] == "seconds" and value - base < min_seconds:
+            continue
+        slowdowns.append(key + (base, value, increase_pct))
+    slowdowns.sort(key=lambda slowdown: slowdown[-1], reverse=True)
+    return slowdowns, compared
+
+
+def print_slowdowns(slowdowns: list, compared: int, baseline_path: str):
+    """
+    Print the slowdowns found by compare_reports.
+    """
+    print(
+        BColors.OKCYAN
+        + f"Compared {compared} timings and cycle counts with {baseline_path}."
+        + BColors.ENDC
+    )
+    for app_name, stage, metric, base, value, increase_pct in slowdowns:
+        if metric == "seconds":
+            change = f"{base:.1f} s -> {value:.1f} s"
+        else:
+            change = f"{base} -> {value} cycles"
+        print(
+            BColors.WARNING
+            + f"    - {app_name} {stage}: {change} (+{increase_pct:.0f}%)"
+            + BColors.ENDC
+        )
+    if not slowdowns:
+        print(BColors.OKGREEN + "No slowdown found." + BColors.ENDC)
+    print(flush=True)
@@ -2,11 +2,120 @@
 # Licensed under the Apache License, Version 2.0, see LICENSE for details.
 # SPDX-License-Identifier: Apache-2.0
 
+import collections
+import contextlib
+import glob
+import json
+import os
+import signal
 import subprocess
 import re
+import sys
+import tempfile
+import threading
+import time
+from typing import NamedTuple
 
 from bcolors import BColors
 
+# FuseSoC build directories of the simulation models
+FUSESOC_BUILD_DIRS = "build/openhwgroup.org_systems_core-v-mini-mcu_*"
+
+# Number of output lines kept to report a failed simulation
+OUTPUT_TAIL_LINES = 200
+
+# UART output of the simulation, written by the testbench in the directory where it runs. FuseSoC
+# only prints it after the simulation ends by itself, so it is read directly when it is stopped.
+UART_LOG = "uart0.log"
+
+# Margins applied to the history of an app to bound its next simulation
+HISTORY_CYCLES_FACTOR = 2
+HISTORY_CYCLES_MARGIN = 100000
+HISTORY_TIME_FACTOR = 4
+HISTORY_MIN_TIMEOUT_S = 30
+
+
+class StreamOutcome(NamedTuple):
+    """
+    What was read from the output of a simulation.
+    """
+
+    exit_value: str
+    cycles: int
+    timed_out: bool
+    output: list
+
+
+def kill_process_group(process):
+    """
+    Kill a process started in its own session and all its children.
+    """
+    if process.poll() is not None:
+        return
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+class SimHistory:
+    """
+    Cycle count and duration of the last successful simulation of every app, used to bound
+    the next simulations instead of applying the same timeout to every app.
+    """
+
+    def __init__(self, path: str):
+        """
+        Constructor for SimHistory.
+
+        :param str path: The JSON file storing the history. It is created if it does not exist.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                self._runs = json.load(file)
+        except (OSError, ValueError):
+            self._runs = {}
+
+    def budget(self, simulator: str, app: str):
+        """
+        Get the limits of the next simulation of an app.
+
+        :return: The maximum number of cycles and the timeout in seconds, or None if the app
+            was never simulated successfully.
+        """
+        with self._lock:
+            run = self._runs.get(simulator, {}).get(app)
+        if run is None:
+            return None
+        max_cycles = HISTORY_CYCLES_FACTOR * run["cycles"] + HISTORY_CYCLES_MARGIN
+        timeout = max(HISTORY_MIN_TIMEOUT_S, HISTORY_TIME_FACTOR * run["seconds"])
+        return max_cycles, timeout
+
+    def update(self, simulator: str, app: str, cycles: int, seconds: float):
+        """
+        Record a successful simulation of an app.
+        """
+        with self._lock:
+            self._runs.setdefault(simulator, {})[app] = {
+                "cycles": cycles,
+                "seconds": round(seconds, 3),
+            }
+
+    def save(self):
+        """
+        Write the history to its file.
+        """
+        with self._lock:
+            data = json.dumps(self._runs, indent=2, sort_keys=True)
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            file.write(data)
+        os.replace(tmp_path, self.path)
+
 
 class SimResult:
     """
@@ -21,10 +130,28 @@ class SimResult:
 
 class Simulator:
     """
-    Represents a simulator.
+    Represents a simulator. By default, its model is built with "make <name>-build" and the
+    apps are run with "make <name>-run". The backends of SIMULATOR_BACKENDS override the
+    class attributes to describe their model.
     """
 
-    def __init__(self, name: str, error_pattern: str):
+    # Path of the model binary relative to the FuseSoC build directory. If set, the binary is
+    # run directly, so that several simulations can run in parallel from different directories.
+    model_path = None
+
+    # If the model accepts +max_sim_time=<cycles> to bound the simulation
+    supports_max_cycles = False
+
+    def __init__(
+        self,
+        name: str,
+        error_pattern: str,
+        failure_patterns: list = None,
+        timeout_pattern: str = None,
+        cycles_pattern: str = None,
+        build_target: str = None,
+        run_target: str = None,
+    ):
         """
         Constructor for Simulator.
 
@@ -32,13 +159,47 @@ class Simulator:
         :param str error_pattern: The pattern to look for in the output of the simulator. This
             pattern should contain a group that captures the return value of the program. For
             example, "Program Finished with value (\d+)".
+        :param list failure_patterns: Patterns that mean that the simulation failed, such as
+            assertion errors. The simulation is stopped as soon as one of them is printed.
+        :param str timeout_pattern: Pattern printed when the simulation reached its maximum
+            number of cycles.
+        :param str cycles_pattern: Pattern capturing the number of simulated cycles.
+        :param str build_target: The make target building the model, "<name>-build" by default.
+        :param str run_target: The make target running an app, "<name>-run" by default.
         """
         self.name = name
+        self.build_target = build_target if build_target else f"{name}-build"
+        self.run_target = run_target if run_target else f"{name}-run"
         self.error_pattern = error_pattern
+        self.failure_patterns = failure_patterns if failure_patterns else []
+        self.timeout_pattern = timeout_pattern
+        self.cycles_pattern = cycles_pattern
+        self._run_lock = threading.Lock()
+
+    def model_binary(self):
+        """
+        Get the prebuilt model binary of the simulator, which can run several simulations in
+        parallel from different directories.
+
+        :return: The absolute path of the binary, or None if the simulator has no standalone
+            binary or if it was not built.
+        """
+        if self.model_path is None:
+            return None
+        for build_dir in sorted(glob.glob(FUSESOC_BUILD_DIRS)):
+            binary = os.path.join(build_dir, self.model_path)
+            if os.path.isfile(binary):
+                return os.path.abspath(binary)
+        return None
 
-    def build(self, dry_run=False, verbose=True):
+    def build(self, dry_run=False, verbose=True, cache=None):
         """
         Build the simulator model.
+
+        :param bool dry_run: If True, only print the build command without executing it.
+        :param bool verbose: If True, print detailed messages about the build.
+        :param ModelCache cache: If set, the model is restored from this cache when its inputs
+            did not change, and stored in it after building.
         """
         if verbose:
             print(
@@ -49,20 +210,35 @@ class Simulator:
         if dry_run:
             if verbose:
                 print(
-                    BColors.OKCYAN + f"[DRY RUN] make {self.name}-build" + BColors.ENDC,
+                    BColors.OKCYAN
+                    + f"[DRY RUN] make {self.build_target}"
+                    + BColors.ENDC,
                     flush=True,
                 )
             return
 
+        if cache is not None and self.model_path is not None:
+            cache_key = cache.key(self)
+            if cache.restore(cache_key, self):
+                print(
+                    BColors.OKGREEN
+                    + f"Restored {self.name} model from the cache."
+                    + BColors.ENDC,
+                    flush=True,
+                )
+                return
+
         try:
             _ = subprocess.run(
-                ["make", f"{self.name}-build"], capture_output=True, check=True
+                ["make", self.build_target], capture_output=True, check=True
             )
         except subprocess.CalledProcessError as exc:
             print(BColors.FAIL + f"Error building {self.name} model." + BColors.ENDC)
             print(str(exc.stderr.decode("utf-8")), flush=True)
             exit(1)
         else:
+            if cache is not None and self.model_path is not None:
+                cache.store(cache_key, self)
             print(
                 BColors.OKGREEN
                 + f"Generated {self.name} model successfully."
@@ -70,15 +246,31 @@ class Simulator:
                 flush=True,
             )
 
-    def run_app(self, an_app, simulation_timeout, dry_run=False, verbose=True):
+    def run_app(
+        self,
+        an_app,
+        simulation_timeout,
+        dry_run=False,
+        verbose=True,
+        build_dir=None,
+        run_dir=None,
+        history=None,
+    ):
         """
         Runs an_app with the simulator. Checks if it times out. Outputs if it finishes with errors or
-        without.
+        without. The output of the simulator is read while it runs, and the simulation is stopped
+        as soon as its result is known.
 
         :param Application an_app: The application to run.
         :param int simulation_timeout: The timeout for the simulation in seconds.
         :param bool dry_run: If True, only print the simulation command without executing it.
         :param bool verbose: If True, print detailed messages about the simulation process.
+        :param str build_dir: The build directory of the application. If None, sw/build is used.
+        :param str run_dir: The directory where the simulation runs. If set, the prebuilt model
+            binary is run directly from this directory, so that several simulations can run in
+            parallel without sharing their output files.
+        :param SimHistory history: If set, the timeout and the maximum number of cycles of the
+            simulation are derived from the last successful run of an_app, which is then updated.
 
         :return: SimResult for the simulation of an_app.
         """
@@ -90,49 +282,335 @@ class Simulator:
                 flush=True,
             )
 
+        timeout = simulation_timeout
+        max_cycles = None
+        budget = history.budget(self.name, an_app.name) if history else None
+        if budget is not None:
+            max_cycles, timeout = budget
+
+        if not self.supports_max_cycles:
+            max_cycles = None
+
+        command = self.run_command(build_dir, run_dir, max_cycles, dry_run)
+        if command is None:
+            print(
+                BColors.FAIL
+                + f"The {self.name} model was not built, cannot run {an_app.name}."
+                + BColors.ENDC,
+                flush=True,
+            )
+            return SimResult.FAILED
+        run_command, run_dir, run_lock = command
+
         if dry_run:
             if verbose:
+                cwd_str = f"(in {run_dir}) " if run_dir else ""
                 print(
-                    BColors.OKCYAN + f"[DRY RUN] make {self.name}-run" + BColors.ENDC,
+                    BColors.OKCYAN
+                    + f"[DRY RUN] {cwd_str}{' '.join(str(arg) for arg in run_command)}"
+                    + BColors.ENDC,
                     flush=True,
                 )
             return SimResult.PASSED
 
-        try:
-            run_output = subprocess.run(
-                ["make", f"{self.name}-run"],
-                capture_output=True,
-                timeout=simulation_timeout,
-                check=False,
-            )
-        except subprocess.TimeoutExpired:
+        if run_dir:
+            os.makedirs(run_dir, exist_ok=True)
+
+        start_time = time.monotonic()
+        with run_lock:
+            uart_log_path = self.uart_log_path(run_dir)
+            uart_log_mtime = self.log_mtime(uart_log_path)
+            outcome = self.stream(run_command, timeout, cwd=run_dir)
+            output = outcome.output
+            # The simulation was killed, so the UART output was not printed by FuseSoC
+            if outcome.timed_out or outcome.exit_value != "0":
+                output = output + self.uart_log(uart_log_path, uart_log_mtime)
+        elapsed_s = time.monotonic() - start_time
+        an_app.add_simulation_run(self.name, elapsed_s, outcome.exit_value, output)
+
+        if outcome.timed_out:
             print(
                 BColors.FAIL
                 + f"Simulation of {an_app.name} with {self.name} timed out."
                 + BColors.ENDC,
                 flush=True,
             )
+            print(BColors.FAIL + "".join(output) + BColors.ENDC)
             return SimResult.TIMED_OUT
-        else:
-            match = re.search(
-                self.error_pattern, str(run_output.stdout.decode("utf-8"))
-            )
-            if match and match.group(1) == "0":
-                if verbose:
-                    print(
-                        BColors.OKGREEN
-                        + f"Ran {an_app.name} with {self.name} successfully."
-                        + BColors.ENDC,
-                        flush=True,
-                    )
-                return SimResult.PASSED
-            else:
-                print(
-                    BColors.FAIL
-                    + f"Simulation of {an_app.name} with {self.name} failed."
-                    + BColors.ENDC
-                )
+        elif outcome.exit_value == "0":
+            if outcome.cycles is not None:
+                an_app.add_simulation_cycles(self.name, outcome.cycles)
+                if history is not None:
+                    history.update(self.name, an_app.name, outcome.cycles, elapsed_s)
+            if verbose:
                 print(
-                    BColors.FAIL + str(run_output.stdout.decode("utf-8")) + BColors.ENDC
+                    BColors.OKGREEN
+                    + f"Ran {an_app.name} with {self.name} successfully."
+                    + BColors.ENDC,
+                    flush=True,
                 )
-                return SimResult.FAILED
+            return SimResult.PASSED
+        else:
+            print(
+                BColors.FAIL
+                + f"Simulation of {an_app.name} with {self.name} failed."
+                + BColors.ENDC
+            )
+            print(BColors.FAIL + "".join(output) + BColors.ENDC)
+            return SimResult.FAILED
+
+    def run_command(self, build_dir, run_dir, max_cycles, dry_run=False):
+        """
+        Build the command running an app.
+
+        :param str build_dir: The build directory of the application, or None for sw/build.
+        :param str run_dir: The directory where the simulation should run, or None.
+        :param int max_cycles: The maximum number of simulated cycles, or None.
+        :param bool dry_run: If True, the model binary does not need to exist.
+
+        :return: The command, the directory where it runs and the lock held while it runs, or
+            None if the model binary was not built.
+        """
+        run_command = ["make", self.run_target]
+        if build_dir:
+            run_command.append(f"SW_BUILD_DIR={os.path.abspath(build_dir)}")
+        if max_cycles is not None:
+            run_command.append(f"MAX_SIM_TIME={max_cycles}")
+        run_lock = contextlib.nullcontext()
+        if run_dir and self.model_path is not None:
+            model_binary = self.model_binary()
+            if model_binary is None and not dry_run:
+                return None
+            firmware = os.path.join(
+                os.path.abspath(build_dir if build_dir else "sw/build"), "main.hex"
+            )
+            run_command = [
+                model_binary if model_binary else self.model_path,
+                f"+firmware={firmware}",
+            ]
+            if max_cycles is not None:
+                run_command.append(f"+max_sim_time={max_cycles}")
+        elif run_dir:
+            # The simulation runs in the shared FuseSoC directory, one at a time
+            run_dir = None
+            run_lock = self._run_lock
+        return run_command, run_dir, run_lock
+
+    def uart_log_path(self, run_dir):
+        """
+        :param str run_dir: The directory where the simulation runs, or None if it runs in the
+            FuseSoC directory of the model.
+
+        :return: The path of the UART log written by the testbench, or None if it is unknown.
+        """
+        if run_dir is None:
+            model_binary = self.model_binary() if self.model_path else None
+            if model_binary is None:
+                return None
+            run_dir = os.path.dirname(model_binary)
+        return os.path.join(run_dir, UART_LOG)
+
+    @staticmethod
+    def log_mtime(path):
+        """
+        :return: The modification time of a file, or None if it does not exist.
+        """
+        try:
+            return os.stat(path).st_mtime_ns if path else None
+        except OSError:
+            return None
+
+    def uart_log(self, path, previous_mtime):
+        """
+        Read the UART output of a simulation from the log written by the testbench.
+
+        :param str path: The path returned by uart_log_path().
+        :param int previous_mtime: The modification time of the log before the simulation. If
+            it did not change, the log was left by another simulation and is ignored.
+
+        :return: The last lines of the UART output, after a header line, or an empty list if
+            there is no log.
+        """
+        mtime = self.log_mtime(path)
+        if mtime is None or mtime == previous_mtime:
+            return []
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as log:
+                lines = collections.deque(log, maxlen=OUTPUT_TAIL_LINES)
+        except OSError:
+            return []
+        if lines and not lines[-1].endswith("\n"):
+            lines[-1] += "\n"
+        return [f"--- {path} ---\n", *lines]
+
+    def stream(self, command, timeout, cwd=None):
+        """
+        Runs a simulation and reads its output line by line. The simulation is killed as soon as
+        the program finishes, a failure pattern is printed or the timeout expires.
+
+        :param list command: The command running the simulation.
+        :param float timeout: The timeout in seconds.
+        :param str cwd: The directory where the command runs.
+
+        :return: The StreamOutcome of the simulation.
+        """
+        output = collections.deque(maxlen=OUTPUT_TAIL_LINES)
+        exit_value = None
+        cycles = None
+
+        # Run the simulation in its own process group, so that killing it also kills the
+        # simulator started by make and FuseSoC
+        process = subprocess.Popen(
+            command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            cwd=cwd,
+            start_new_session=True,
+        )
+        expired = threading.Event()
+
+        def kill():
+            expired.set()
+            kill_process_group(process)
+
+        timer = threading.Timer(timeout, kill)
+        timer.start()
+        try:
+            for raw_line in process.stdout:
+                line = raw_line.decode("utf-8", errors="replace")
+                output.append(line)
+
+                if self.cycles_pattern:
+                    match = re.search(self.cycles_pattern, line)
+                    if match:
+                        cycles = int(match.group(1))
+                match = re.search(self.error_pattern, line)
+                if match:
+                    exit_value = match.group(1)
+                    break
+                if self.timeout_pattern and re.search(self.timeout_pattern, line):
+                    expired.set()
+                    break
+                if any(re.search(pattern, line) for pattern in self.failure_patterns):
+                    break
+        finally:
+            timer.cancel()
+            kill_process_group(process)
+            process.stdout.close()
+            process.wait()
+
+        return StreamOutcome(
+            exit_value, cycles, expired.is_set() and exit_value is None, list(output)
+        )
+
+
+# Verilator patterns of the end of the program, of the failures and of the cycle count
+VERILATOR_ERROR_PATTERN = r"Program Finished with value (\d+)"
+VERILATOR_FAILURE_PATTERNS = [r"%Error", r"%Fatal", r"Assertion failed"]
+VERILATOR_TIMEOUT_PATTERN = r"Simulation was terminated before program finished"
+VERILATOR_CYCLES_PATTERN = r"Simulation finished after (\d+) clock cycles"
+
+
+class VerilatorSimulator(Simulator):
+    """
+    Verilator model with the C++ testbench.
+    """
+
+    model_path = "sim-verilator/Vtestharness"
+    supports_max_cycles = True
+
+    def __init__(self):
+        super().__init__(
+            "verilator",
+            VERILATOR_ERROR_PATTERN,
+            VERILATOR_FAILURE_PATTERNS,
+            VERILATOR_TIMEOUT_PATTERN,
+            VERILATOR_CYCLES_PATTERN,
+        )
+
+
+class VerilatorSCSimulator(Simulator):
+    """
+    Verilator model with the SystemC testbench.
+    """
+
+    model_path = "sim_sc-verilator/Vtestharness"
+
+    def __init__(self):
+        super().__init__(
+            "verilator-sc",
+            VERILATOR_ERROR_PATTERN,
+            VERILATOR_FAILURE_PATTERNS,
+            build_target="verilator-build-sc",
+            run_target="verilator-run-sc",
+        )
+
+
+# Script of the instruction set simulator, and its patterns of the failures and of the number
+# of executed instructions
+ISS_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "iss.py")
+ISS_FAILURE_PATTERNS = [r"%Error"]
+ISS_INSTRUCTIONS_PATTERN = r"Simulation finished after (\d+) instructions"
+
+
+class IssSimulator(Simulator):
+    """
+    Instruction set simulator of iss.py, a fast functional model of X-HEEP that needs no build.
+    It counts executed instructions instead of cycles, and reads the X-HEEP configuration from
+    the variables of the Makefile (X_HEEP_CFG, PYTHON_X_HEEP_CFG, PADS_CFG, CPU, BUS,
+    MEMORY_BANKS and MEMORY_BANKS_IL).
+    """
+
+    supports_max_cycles = True
+
+    def __init__(self):
+        super().__init__(
+            "iss",
+            VERILATOR_ERROR_PATTERN,
+            ISS_FAILURE_PATTERNS,
+            VERILATOR_TIMEOUT_PATTERN,
+            ISS_INSTRUCTIONS_PATTERN,
+        )
+
+    def build(self, dry_run=False, verbose=True, cache=None):
+        """
+        The instruction set simulator has no model to build.
+        """
+        if verbose:
+            print(
+                BColors.OKGREEN
+                + f"The {self.name} model needs no build."
+                + BColors.ENDC,
+                flush=True,
+            )
+
+    def run_command(self, build_dir, run_dir, max_cycles, dry_run=False):
+        """
+        Run iss.py on main.elf. Without a run directory, the UART log is written in the build
+        directory of the application.
+        """
+        build_dir = os.path.abspath(build_dir if build_dir else "sw/build")
+        run_command = [sys.executable, ISS_SCRIPT, os.path.join(build_dir, "main.elf")]
+        if max_cycles is not None:
+            run_command += ["--max-instructions", str(max_cycles)]
+        return run_command, run_dir if run_dir else build_dir, contextlib.nullcontext()
+
+
+# Available simulator backends, by name. Each one is built without arguments.
+SIMULATOR_BACKENDS = {
+    "verilator": VerilatorSimulator,
+    "verilator-sc": VerilatorSCSimulator,
+    "iss": IssSimulator,
+}
+
+
+def get_simulator(name: str):
+    """
+    Create the backend of a simulator.
+
+    :param str name: The name of the simulator, a key of SIMULATOR_BACKENDS.
+
+    :return: The Simulator, or None if there is no backend with this name.
+    """
+    backend = SIMULATOR_BACKENDS.get(name)
+    return backend() if backend else None
@@ -10,9 +10,23 @@ FUTURE WORK:
 """
 
 import argparse
+import json
 import os
+import shutil
+import sys
+import threading
+import time
 
-from simulator import Simulator, SimResult
+from simulator import SIMULATOR_BACKENDS, SimHistory, SimResult, get_simulator
+from compile_cache import CompileCache
+from model_cache import ModelCache
+from report import (
+    build_report,
+    compare_reports,
+    print_slowdowns,
+    write_json_report,
+    write_junit_report,
+)
 from bcolors import BColors
 from utils import (
     in_list,
@@ -22,25 +36,28 @@ from utils import (
     print_table_header,
     print_table_row,
     print_table_summary,
+    WorkStealingPool,
+)
+
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../scripts/building")
 )
+from mem_history import record_footprint
 
 # Default available compilers
 COMPILERS = ["gcc", "clang"]
 COMPILER_PATH = [os.environ.get("RISCV_XHEEP") for _ in COMPILERS]
 COMPILER_PREFIXES = ["riscv32-unknown-" for _ in COMPILERS]
 
-# Available simulators
+# Default simulators, among the backends of SIMULATOR_BACKENDS
 SIMULATORS = ["verilator"]
 
-# Pattern to look for when simulating an app to see if the app finished
-# correctly or not
-ERROR_PATTERN_DICT = {
-    "verilator": r"Program Finished with value (\d+)",
-}
-
 # Timeout for the simulation in seconds
 SIM_TIMEOUT_S = 180
 
+# Smallest increase of a compilation or simulation time reported by --compare, in seconds
+MIN_SLOWDOWN_S = 1.0
+
 # Whitelist of apps. Has priority over the blacklist.
 # Useful if you only want to test certain apps
 WHITELIST = []
@@ -62,10 +79,122 @@ BLACKLIST = [
 # Blacklist of apps to skip with clang
 CLANG_BLACKLIST = []
 
-# Blacklist of apps to skip with verilator
+# Blacklist of apps to skip with the verilator backends
 VERILATOR_BLACKLIST = []
 
 
+def compile_app(
+    an_app,
+    args,
+    compilers,
+    compiler_paths,
+    compiler_prefixes,
+    build_dir="sw/build",
+    cache=None,
+):
+    """
+    Compiles an app with every compiler, storing the results in the app. The build directory
+    keeps the result of the last compiler, which is the one that is simulated.
+
+    :param Application an_app: The application to compile.
+    :param args: The command line arguments.
+    :param list compilers: The compilers to use.
+    :param list compiler_paths: The path of each compiler.
+    :param list compiler_prefixes: The prefix of each compiler.
+    :param str build_dir: The build directory of the application.
+    :param CompileCache cache: The cache of the compiled apps, if used.
+    """
+    # Compile the app with every compiler, leaving gcc for last
+    #   so the simulation is done with gcc
+    for compiler_path, compiler_prefix, compiler in zip(
+        compiler_paths, compiler_prefixes, compilers
+    ):
+        if in_list(an_app.name, CLANG_BLACKLIST) and compiler == "clang":
+            if not args.table:
+                print(
+                    BColors.WARNING
+                    + f"Skipping compiling {an_app.name} with {compiler}..."
+                    + BColors.ENDC,
+                    flush=True,
+                )
+            an_app.set_compilation_status(compiler, None)  # Mark as skipped
+        else:
+            compilation_result = an_app.compile(
+                compiler_path,
+                compiler_prefix,
+                compiler,
+                "on_chip",
+                None,
+                args.dry_run,
+                verbose=not args.table,
+                build_dir=build_dir,
+                cache=cache,
+            )
+            an_app.set_compilation_status(compiler, compilation_result)
+
+            if args.footprints and compilation_result and not args.dry_run:
+                try:
+                    record_footprint(
+                        args.footprints,
+                        an_app.name,
+                        elf_file=os.path.join(build_dir, "main.elf"),
+                        ld_path=os.path.join(build_dir, "main.ld"),
+                        compiler=compiler,
+                        linker="on_chip",
+                    )
+                except (FileNotFoundError, RuntimeError, ValueError) as exc:
+                    print(
+                        BColors.WARNING
+                        + f"Could not record the footprint of {an_app.name} with {compiler}: {exc}"
+                        + BColors.ENDC,
+                        flush=True,
+                    )
+
+
+def simulate_app(
+    an_app,
+    args,
+    simulator,
+    build_dir="sw/build",
+    run_dir=None,
+    history=None,
+):
+    """
+    Runs a compiled app with a simulator, storing the result in the app.
+
+    :param Application an_app: The application to run.
+    :param args: The command line arguments.
+    :param Simulator simulator: The simulator to use.
+    :param str build_dir: The build directory of the application.
+    :param str run_dir: The directory where the simulation runs. If None, the simulation runs
+        through make in the FuseSoC directory.
+    :param SimHistory history: The history of the simulations, if used.
+    """
+    # Only run the app with verilator if it is not in the verilator_blacklist
+    if simulator.name.startswith("verilator") and in_list(
+        an_app.name, VERILATOR_BLACKLIST
+    ):
+        an_app.add_simulation_result(simulator.name, SimResult.SKIPPED)
+        if not args.table:
+            print(
+                BColors.WARNING
+                + f"Skipping running {an_app.name} with {simulator.name}..."
+                + BColors.ENDC,
+                flush=True,
+            )
+    else:
+        simulation_result = simulator.run_app(
+            an_app,
+            SIM_TIMEOUT_S,
+            args.dry_run,
+            verbose=not args.table,
+            build_dir=build_dir,
+            run_dir=run_dir,
+            history=history,
+        )
+        an_app.add_simulation_result(simulator.name, simulation_result)
+
+
 def main():
     """
     Compiles and runs all the apps in X-HEEP.
@@ -98,7 +227,70 @@ def main():
         "--compiler-prefixes",
         help="Override default compiler prefixes. Can be a single prefix (shared among all the compilers) or a comma-separated list (a different prefix for each compiler).",
     )
+    parser.add_argument(
+        "--footprints",
+        help="Record the memory footprint of every compiled app in this store (SQLite, or JSON Lines if it ends with .jsonl). Compare the records with scripts/building/mem_history.py compare.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of compilations and simulations run in parallel. Each app is built in its own directory and each simulation runs in its own directory, sharing the prebuilt model.",
+    )
+    parser.add_argument(
+        "--work-dir",
+        default="build/test_apps",
+        help="Directory where the apps are built and run in parallel (with --jobs).",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="Cache the compiled apps in this directory. An app is restored from the cache instead of being compiled when its sources, sw/ (device library, generated headers, linker scripts), the compiler and the linker mode did not change.",
+    )
+    parser.add_argument(
+        "--sim-history",
+        help="Keep the cycle count and duration of the last successful simulation of every app in this JSON file, and use them to stop the next simulations that run much longer, instead of waiting for the global timeout.",
+    )
+    parser.add_argument(
+        "--model-cache-dir",
+        help="Cache the simulation models in this directory. A model is restored from the cache instead of being built when the RTL (hw/ and tb/, including the files generated by mcu-gen), the FuseSoC cores, FUSESOC_PARAM, FUSESOC_FLAGS and the Verilator version did not change.",
+    )
+    parser.add_argument(
+        "--simulators",
+        help=f"Override default list of simulators to test, among: {', '.join(SIMULATOR_BACKENDS)}.",
+    )
+    parser.add_argument(
+        "--json-report",
+        help="Write a JSON report with, for every app, the compilation time with every compiler, the simulation time, cycle count and exit value with every simulator, and the last lines of the output of the failed stages.",
+    )
+    parser.add_argument(
+        "--junit",
+        help="Write a JUnit XML report with a test case for every compilation and every simulation.",
+    )
+    parser.add_argument(
+        "--compare",
+        help="JSON report of a previous run. The compilations and simulations that got slower, and the simulations that need more cycles, are highlighted.",
+    )
+    parser.add_argument(
+        "--slowdown-threshold",
+        type=float,
+        default=20.0,
+        help="Increase of a timing or cycle count highlighted by --compare, in percent.",
+    )
     args = parser.parse_args()
+    start_time = time.monotonic()
+
+    baseline = None
+    if args.compare:
+        try:
+            with open(args.compare, "r", encoding="utf-8") as file:
+                baseline = json.load(file)
+        except (OSError, ValueError) as exc:
+            print(
+                BColors.FAIL
+                + f"Error reading the report to compare with: {exc}"
+                + BColors.ENDC
+            )
+            exit(1)
 
     # Override the default list of compilers if specified
     compilers = COMPILERS
@@ -144,21 +336,27 @@ def main():
     # Get a list with all the applications we want to test
     app_list = get_apps("sw/applications", WHITELIST, BLACKLIST)
 
+    # Override the default list of simulators if specified
+    simulator_names = SIMULATORS
+    if args.simulators:
+        simulator_names = args.simulators.split(",")
+
     simulators = []
-    for simulator_name in SIMULATORS:
-        error_pattern = ERROR_PATTERN_DICT.get(simulator_name)
-        if error_pattern is None:
+    for simulator_name in simulator_names:
+        simulator = get_simulator(simulator_name)
+        if simulator is None:
             print(
                 BColors.FAIL
-                + f"Error: No error pattern defined for simulator {simulator_name}."
+                + f"Error: No backend for simulator {simulator_name}. Available simulators: {', '.join(SIMULATOR_BACKENDS)}."
                 + BColors.ENDC
             )
             exit(1)
-        simulators.append(Simulator(simulator_name, error_pattern))
+        simulators.append(simulator)
 
+    model_cache = ModelCache(args.model_cache_dir) if args.model_cache_dir else None
     if not args.compile_only:
         for simulator in simulators:
-            simulator.build(args.dry_run, verbose=not args.table)
+            simulator.build(args.dry_run, verbose=not args.table, cache=model_cache)
 
     if args.table:
         max_app_name_len, max_col_width = print_table_header(
@@ -170,7 +368,11 @@ def main():
             simulators,
         )
 
+    cache = CompileCache(args.cache_dir) if args.cache_dir else None
+    history = SimHistory(args.sim_history) if args.sim_history else None
+
     # Compile every app and run with the simulators
+    apps_to_test = []
     for an_app in app_list:
         # If the app is in the blacklist, print a message and skip it
         if in_list(an_app.name, BLACKLIST):
@@ -180,55 +382,14 @@ def main():
                     flush=True,
                 )
         else:
-            # Compile the app with every compiler, leaving gcc for last
-            #   so the simulation is done with gcc
-            for compiler_path, compiler_prefix, compiler in zip(
-                compiler_paths, compiler_prefixes, compilers
-            ):
-                if in_list(an_app.name, CLANG_BLACKLIST) and compiler == "clang":
-                    if not args.table:
-                        print(
-                            BColors.WARNING
-                            + f"Skipping compiling {an_app.name} with {compiler}..."
-                            + BColors.ENDC,
-                            flush=True,
-                        )
-                    an_app.set_compilation_status(compiler, None)  # Mark as skipped
-                else:
-                    compilation_result = an_app.compile(
-                        compiler_path,
-                        compiler_prefix,
-                        compiler,
-                        "on_chip",
-                        None,
-                        args.dry_run,
-                        verbose=not args.table,
-                    )
-                    an_app.set_compilation_status(compiler, compilation_result)
+            apps_to_test.append(an_app)
 
-            # Run the app with every simulator if the compilation was successful
-            if not args.compile_only and an_app.compilation_succeeded():
-                for simulator in simulators:
-                    # Only run the app with verilator if it is not in the verilator_blacklist
-                    if simulator.name == "verilator" and in_list(
-                        an_app.name, VERILATOR_BLACKLIST
-                    ):
-                        an_app.add_simulation_result(simulator.name, SimResult.SKIPPED)
-                        if not args.table:
-                            print(
-                                BColors.WARNING
-                                + f"Skipping running {an_app.name} with verilator..."
-                                + BColors.ENDC,
-                                flush=True,
-                            )
-                    else:
-                        simulation_result = simulator.run_app(
-                            an_app, SIM_TIMEOUT_S, args.dry_run, verbose=not args.table
-                        )
-                        an_app.add_simulation_result(simulator.name, simulation_result)
-
-            # Print table row if table mode is enabled
-            if args.table:
+    print_lock = threading.Lock()
+
+    def print_row(an_app):
+        # Print table row if table mode is enabled
+        if args.table:
+            with print_lock:
                 print_table_row(
                     an_app,
                     max_app_name_len,
@@ -239,6 +400,60 @@ def main():
                     simulators,
                 )
 
+    if args.jobs > 1:
+        # Every compilation and every simulation of the (app x simulator) matrix is a task of
+        # the pool. The simulations of an app are submitted once it is compiled, in its own
+        # build directory, and each one runs in its own directory.
+        pool = WorkStealingPool(args.jobs)
+        remaining_simulations = {}
+        remaining_lock = threading.Lock()
+
+        def simulate_task(an_app, simulator, build_dir):
+            run_dir = os.path.join(args.work_dir, an_app.name, f"run-{simulator.name}")
+            # Start from a clean run directory, the simulation outputs belong to a single run
+            shutil.rmtree(run_dir, ignore_errors=True)
+            simulate_app(an_app, args, simulator, build_dir, run_dir, history)
+            with remaining_lock:
+                remaining_simulations[an_app.name] -= 1
+                done = remaining_simulations[an_app.name] == 0
+            if done:
+                print_row(an_app)
+
+        def compile_task(an_app):
+            build_dir = os.path.join(args.work_dir, an_app.name, "sw")
+            compile_app(
+                an_app,
+                args,
+                compilers,
+                compiler_paths,
+                compiler_prefixes,
+                build_dir,
+                cache,
+            )
+            if args.compile_only or not an_app.compilation_succeeded():
+                print_row(an_app)
+                return
+            with remaining_lock:
+                remaining_simulations[an_app.name] = len(simulators)
+            for simulator in simulators:
+                pool.submit(simulate_task, an_app, simulator, build_dir)
+
+        for an_app in apps_to_test:
+            pool.submit(compile_task, an_app)
+        pool.run()
+    else:
+        for an_app in apps_to_test:
+            compile_app(
+                an_app, args, compilers, compiler_paths, compiler_prefixes, cache=cache
+            )
+            if not args.compile_only and an_app.compilation_succeeded():
+                for simulator in simulators:
+                    simulate_app(an_app, args, simulator, history=history)
+            print_row(an_app)
+
+    if history is not None and not args.dry_run:
+        history.save()
+
     # Filter and print the results
     (
         skipped_apps,
@@ -256,6 +471,7 @@ def main():
             compilation_failed_apps,
             simulation_failed_apps,
             simulation_timed_out_apps,
+            cache.stats() if cache is not None else None,
         )
     else:
         print_table_summary(
@@ -265,8 +481,29 @@ def main():
             compilation_failed_apps,
             simulation_failed_apps,
             simulation_timed_out_apps,
+            cache.stats() if cache is not None else None,
         )
 
+    if not args.dry_run and (args.json_report or args.junit or baseline is not None):
+        report = build_report(app_list, BLACKLIST, time.monotonic() - start_time)
+        if args.json_report:
+            write_json_report(args.json_report, report)
+            print(
+                BColors.OKCYAN
+                + f"JSON report written to {args.json_report}"
+                + BColors.ENDC
+            )
+        if args.junit:
+            write_junit_report(args.junit, report)
+            print(
+                BColors.OKCYAN + f"JUnit report written to {args.junit}" + BColors.ENDC
+            )
+        if baseline is not None:
+            slowdowns, compared = compare_reports(
+                report, baseline, args.slowdown_threshold, MIN_SLOWDOWN_S
+            )
+            print_slowdowns(slowdowns, compared, args.compare)
+
     # Exit with error if any app failed to compile or run
     if len(compilation_failed_apps) > 0 or len(simulation_failed_apps) > 0:
         exit(1)
@@ -2,7 +2,9 @@
 # Licensed under the Apache License, Version 2.0, see LICENSE for details.
 # SPDX-License-Identifier: Apache-2.0
 
+import collections
 import os
+import threading
 
 from simulator import SimResult
 from application import Application
@@ -44,6 +46,94 @@ def get_apps(apps_dir: str, whitelist: list, blacklist: list):
     return app_list
 
 
+class WorkStealingPool:
+    """
+    Pool of worker threads, each with its own deque of tasks. A worker runs its most recent
+    task first, so the tasks submitted by a task run next on the same worker, and takes the
+    oldest task of another worker when its own deque is empty. Long tasks thus never keep
+    the short ones waiting while other workers are idle.
+    """
+
+    def __init__(self, workers: int):
+        """
+        Constructor for WorkStealingPool.
+
+        :param int workers: The number of worker threads.
+        """
+        self._deques = [collections.deque() for _ in range(max(1, workers))]
+        self._condition = threading.Condition()
+        self._local = threading.local()
+        self._pending = 0
+        self._next_deque = 0
+        self._errors = []
+
+    def submit(self, task, *args):
+        """
+        Add a task, called as task(*args). A task submitted from a worker goes to the deque of
+        this worker, the others are spread over all the deques.
+        """
+        with self._condition:
+            index = getattr(self._local, "index", None)
+            if index is None:
+                index = self._next_deque
+                self._next_deque = (self._next_deque + 1) % len(self._deques)
+            self._deques[index].append((task, args))
+            self._pending += 1
+            self._condition.notify_all()
+
+    def _take(self, index: int):
+        """
+        Take the next task of a worker, stealing it from another worker if needed. Must be
+        called with the condition held.
+        """
+        if self._deques[index]:
+            return self._deques[index].pop()
+        for offset in range(1, len(self._deques)):
+            victim = self._deques[(index + offset) % len(self._deques)]
+            if victim:
+                return victim.popleft()
+        return None
+
+    def _work(self, index: int):
+        self._local.index = index
+        while True:
+            with self._condition:
+                item = self._take(index)
+                while item is None:
+                    # Running tasks may still submit new ones
+                    if self._pending == 0:
+                        return
+                    self._condition.wait()
+                    item = self._take(index)
+
+            task, args = item
+            try:
+                task(*args)
+            except BaseException as exc:
+                with self._condition:
+                    self._errors.append(exc)
+            finally:
+                with self._condition:
+                    self._pending -= 1
+                    self._condition.notify_all()
+
+    def run(self):
+        """
+        Run the tasks until all of them, including the ones they submitted, are done.
+        Raises the first exception raised by a task.
+        """
+        threads = [
+            threading.Thread(target=self._work, args=(index,), daemon=True)
+            for index in range(len(self._deques))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if self._errors:
+            raise self._errors[0]
+
+
 def filter_results(app_list: list, blacklist: list):
     """
     Filters the results from compiling or running the apps and divides
@@ -58,6 +148,9 @@ def filter_results(app_list: list, blacklist: list):
     - compilation_failed_apps
     - simulation_failed_apps
     - simulation_timed_out_apps
+
+    The simulation lists contain one (app, simulator) cell for every simulator with which
+    the app failed or timed out.
     """
 
     skipped_apps = []
@@ -76,12 +169,12 @@ def filter_results(app_list: list, blacklist: list):
         else:
             # Check if the app failed in any simulator
             all_sim_passed = True
-            for _, res in app.simulation_results.items():
+            for sim, res in app.simulation_results.items():
                 if res == SimResult.FAILED:
-                    simulation_failed_apps.append(app)
+                    simulation_failed_apps.append((app, sim))
                     all_sim_passed = False
                 elif res == SimResult.TIMED_OUT:
-                    simulation_timed_out_apps.append(app)
+                    simulation_timed_out_apps.append((app, sim))
                     all_sim_passed = False
             if all_sim_passed:
                 ok_apps.append(app)
@@ -102,6 +195,7 @@ def print_results(
     compilation_failed_apps: list,
     simulation_failed_apps: list,
     simulation_timed_out_apps: list,
+    cache_stats: tuple = None,
 ):
     """
     Print the results of the tests.
@@ -110,8 +204,9 @@ def print_results(
     :param list skipped_apps: The list of apps that were skipped.
     :param list ok_apps: The list of apps that finished successfully.
     :param list compilation_failed_apps: The list of apps that failed to compile.
-    :param list simulation_failed_apps: The list of apps that failed to run.
-    :param list simulation_timed_out_apps: The list of apps that timed out.
+    :param list simulation_failed_apps: The (app, simulator) cells that failed to run.
+    :param list simulation_timed_out_apps: The (app, simulator) cells that timed out.
+    :param tuple cache_stats: The number of hits and misses of the compilation cache, if used.
     """
     print(BColors.BOLD + "=================================" + BColors.ENDC)
     print(BColors.BOLD + "Results:" + BColors.ENDC)
@@ -142,32 +237,30 @@ def print_results(
     if len(simulation_failed_apps) > 0:
         print(
             BColors.FAIL
-            + f"{len(simulation_failed_apps)} apps failed to run."
+            + f"{len(simulation_failed_apps)} simulations failed."
             + BColors.ENDC
         )
-        for app in simulation_failed_apps:
-            for sim, res in app.simulation_results.items():
-                if res == SimResult.FAILED:
-                    print(
-                        BColors.FAIL
-                        + f"    - {app.name} with {sim} failed"
-                        + BColors.ENDC
-                    )
+        for app, sim in simulation_failed_apps:
+            print(BColors.FAIL + f"    - {app.name} with {sim} failed" + BColors.ENDC)
 
     if len(simulation_timed_out_apps) > 0:
         print(
             BColors.FAIL
-            + f"{len(simulation_timed_out_apps)} apps timed out."
+            + f"{len(simulation_timed_out_apps)} simulations timed out."
+            + BColors.ENDC
+        )
+        for app, sim in simulation_timed_out_apps:
+            print(
+                BColors.FAIL + f"    - {app.name} with {sim} timed out" + BColors.ENDC
+            )
+
+    if cache_stats is not None:
+        hits, misses = cache_stats
+        print(
+            BColors.OKCYAN
+            + f"Compilation cache: {hits} hits, {misses} misses."
             + BColors.ENDC
         )
-        for app in simulation_timed_out_apps:
-            for sim, res in app.simulation_results.items():
-                if res == SimResult.TIMED_OUT:
-                    print(
-                        BColors.FAIL
-                        + f"    - {app.name} with {sim} timed out"
-                        + BColors.ENDC
-                    )
 
     print(BColors.BOLD + "=================================" + BColors.ENDC, flush=True)
 
@@ -290,6 +383,7 @@ def print_table_summary(
     compilation_failed_apps: list,
     simulation_failed_apps: list,
     simulation_timed_out_apps: list,
+    cache_stats: tuple = None,
 ):
     """
     Print a summary of the results after the table.
@@ -298,8 +392,9 @@ def print_table_summary(
     :param list skipped_apps: The list of apps that were skipped.
     :param list ok_apps: The list of apps that finished successfully.
     :param list compilation_failed_apps: The list of apps that failed to compile.
-    :param list simulation_failed_apps: The list of apps that failed to run.
-    :param list simulation_timed_out_apps: The list of apps that timed out.
+    :param list simulation_failed_apps: The (app, simulator) cells that failed to run.
+    :param list simulation_timed_out_apps: The (app, simulator) cells that timed out.
+    :param tuple cache_stats: The number of hits and misses of the compilation cache, if used.
     """
     print()
     print(
@@ -316,12 +411,27 @@ def print_table_summary(
             + BColors.ENDC
         )
     if len(simulation_failed_apps) > 0:
+        cells = ", ".join(
+            f"{app.name} with {sim}" for app, sim in simulation_failed_apps
+        )
         print(
             BColors.FAIL
-            + f"Simulation failed: {len(simulation_failed_apps)}"
+            + f"Simulation failed: {len(simulation_failed_apps)} ({cells})"
             + BColors.ENDC
         )
     if len(simulation_timed_out_apps) > 0:
+        cells = ", ".join(
+            f"{app.name} with {sim}" for app, sim in simulation_timed_out_apps
+        )
         print(
-            BColors.FAIL + f"Timed out: {len(simulation_timed_out_apps)}" + BColors.ENDC
+            BColors.FAIL
+            + f"Timed out: {len(simulation_timed_out_apps)} ({cells})"
+            + BColors.ENDC
+        )
+    if cache_stats is not None:
+        hits, misses = cache_stats
+        print(
+            BColors.OKCYAN
+            + f"Compilation cache: {hits} hits, {misses} misses"
+            + BColors.ENDC
         )
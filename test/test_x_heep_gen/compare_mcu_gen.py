@@ -5,18 +5,47 @@
 # Author(s): David Mallasen
 # Description: Utility to compare the outputs of mcu-gen between the current branch and main. This
 #   can be useful to manually check if changes in the configuration or in the MCU-Gen code have an
-#   effect on the generated files.
-
+#   effect on the generated files. The outputs of main are generated in a persistent worktree and
+#   cached by commit, so that they are only generated once per commit of main. Both are kept in the
+#   user cache directory, outside of the source tree, so that neither FuseSoC nor the templates
+#   search of the Makefile find the files of the baseline.
+
+import argparse
+import difflib
+import hashlib
+import os
+import re
 import subprocess
 import pathlib
 import shutil
 import tempfile
-from typing import List
+from typing import Dict, List, Tuple
 import filecmp
 
 REPO_ROOT = pathlib.Path(__file__).resolve().parents[2]
 TEST_X_HEEP_GEN_DIR = pathlib.Path(__file__).resolve().parent
 
+# Directory of the user cache holding, for every repository, the persistent worktree where the
+# baseline is generated and the cache of the baseline outputs by commit
+STATE_DIR = (
+    pathlib.Path(os.environ.get("XDG_CACHE_HOME", pathlib.Path.home() / ".cache"))
+    / "x-heep"
+    / "compare-mcu-gen"
+)
+MAX_BASELINES = 8
+
+# Parameters of the SystemVerilog files and macros of the C files, in normalized lines
+SV_SUFFIXES = {".sv", ".svh", ".v", ".vh"}
+C_SUFFIXES = {".h", ".c"}
+SV_PARAMETER = re.compile(
+    r"\b(?:localparam|parameter)\b[^=;]*?\b(\w+)\s*=\s*([^;]*?)\s*;"
+)
+C_DEFINE = re.compile(r"#\s*define\s+(\w+)\s+(.*?)\s*(?://.*)?$")
+
+# Parameters reported as addresses
+ADDRESS_NAME = re.compile(r"ADDR|OFFSET|START|END|BASE", re.IGNORECASE)
+HEX_VALUE = re.compile(r"'h[0-9a-fA-F_]+|\b0x[0-9a-fA-F]+")
+
 
 def run(cmd: List[str], cwd=None, check=True, env=None):
     """
@@ -90,13 +119,24 @@ def list_diff_files(left: pathlib.Path, right: pathlib.Path) -> List[str]:
 
     :param left: First directory to compare.
     :param right: Second directory to compare.
-    :return: List of relative file paths that differ between the two directories.
+    :return: List of relative file paths that differ between the two directories. The
+        directories present on one side only are listed file by file.
     """
 
+    def expand(root: pathlib.Path, rel: pathlib.Path) -> List[str]:
+        # Directories found on one side only are replaced by the files they contain
+        path = root / rel
+        if not path.is_dir():
+            return [str(rel)]
+        files = [str(rel / f.relative_to(path)) for f in path.rglob("*") if f.is_file()]
+        return sorted(files) if files else [str(rel)]
+
     def walk(cmp: filecmp.dircmp, rel: pathlib.Path) -> List[str]:
-        diffs = []
-        for name in cmp.diff_files + cmp.left_only + cmp.right_only:
-            diffs.append(str(rel / name))
+        diffs = [str(rel / name) for name in cmp.diff_files + cmp.common_funny]
+        for name in cmp.left_only:
+            diffs.extend(expand(left, rel / name))
+        for name in cmp.right_only:
+            diffs.extend(expand(right, rel / name))
         for subname, subcmp in cmp.subdirs.items():
             diffs.extend(walk(subcmp, rel / subname))
         return diffs
@@ -104,61 +144,278 @@ def list_diff_files(left: pathlib.Path, right: pathlib.Path) -> List[str]:
     return walk(filecmp.dircmp(left, right), pathlib.Path("."))
 
 
-def get_main_commit(repo_root: pathlib.Path) -> str:
+def get_commit(repo_root: pathlib.Path, rev: str = "refs/heads/main") -> str:
     """
-    Get the commit hash of the main branch.
+    Get the commit hash of a revision, by default the main branch.
     """
     return subprocess.check_output(
-        ["git", "rev-parse", "refs/heads/main"],
+        ["git", "rev-parse", "--verify", f"{rev}^{{commit}}"],
         cwd=repo_root,
         text=True,
     ).strip()
 
 
-def main():
-    with tempfile.TemporaryDirectory(prefix="mcu-gen-main-") as tmp:
-        tmp = pathlib.Path(tmp)
+def state_dir(repo_root: pathlib.Path) -> pathlib.Path:
+    """
+    Get the directory of the baseline worktree and outputs of a repository, creating it if
+    needed. It is named after the git directory shared by all the worktrees of the repository, and
+    contains a FUSESOC_IGNORE file in case the FuseSoC cores root includes the cache directory.
 
-        main_commit = get_main_commit(REPO_ROOT)
+    :param repo_root: Root of the repository.
+    :return: Path of the directory.
+    """
+    git_dir = subprocess.check_output(
+        ["git", "rev-parse", "--git-common-dir"], cwd=repo_root, text=True
+    ).strip()
+    git_dir = (repo_root / git_dir).resolve()
+    path = STATE_DIR / hashlib.sha256(str(git_dir).encode()).hexdigest()[:16]
+    path.mkdir(parents=True, exist_ok=True)
+    (path / "FUSESOC_IGNORE").touch()
+    return path
 
-        print(f"Creating detached worktree for main ({main_commit[:8]})...")
-        run(["git", "worktree", "add", "--detach", tmp, main_commit])
 
-        out_main = TEST_X_HEEP_GEN_DIR / "_mcu_gen_main"
-        out_curr = TEST_X_HEEP_GEN_DIR / "_mcu_gen_current"
+def prepare_worktree(repo_root: pathlib.Path, worktree: pathlib.Path, commit: str):
+    """
+    Check out a commit in the persistent worktree of the baseline, creating the worktree if
+    needed. The ignored files, such as the build directory with its caches, are kept.
 
-        shutil.rmtree(out_main, ignore_errors=True)
-        shutil.rmtree(out_curr, ignore_errors=True)
+    :param repo_root: Root of the repository.
+    :param worktree: Path of the worktree.
+    :param commit: Commit to check out.
+    """
+    worktrees = subprocess.check_output(
+        ["git", "worktree", "list", "--porcelain"], cwd=repo_root, text=True
+    )
+    if f"worktree {worktree}\n" in worktrees and worktree.is_dir():
+        print(f"Reusing worktree {worktree}...")
+        run(["git", "checkout", "--detach", "--force", commit], cwd=worktree)
+        run(["git", "clean", "-fdq"], cwd=worktree)
+    else:
+        shutil.rmtree(worktree, ignore_errors=True)
+        run(["git", "worktree", "prune"], cwd=repo_root)
+        print(f"Creating detached worktree {worktree}...")
+        run(["git", "worktree", "add", "--detach", worktree, commit], cwd=repo_root)
+
+
+def baseline_outputs(
+    repo_root: pathlib.Path, commit: str, refresh: bool = False
+) -> pathlib.Path:
+    """
+    Get the mcu-gen outputs of a commit, generating them in the persistent worktree if they are
+    not cached yet. Only the most recent MAX_BASELINES baselines are kept.
 
-        print("\n=== Generating on main ===")
-        mcu_gen(
-            repo_root=tmp,
-            outdir=out_main,
-        )
+    :param repo_root: Root of the repository.
+    :param commit: Commit hash of the baseline.
+    :param refresh: Whether to generate the outputs even if they are cached.
+    :return: Directory of the outputs.
+    """
+    state = state_dir(repo_root)
+    worktree = state / "worktree"
+    cache_dir = state / "baselines"
+    cached = cache_dir / commit
+    if cached.is_dir() and not refresh:
+        print(f"Using the cached outputs of {commit[:8]}.")
+        cached.touch()
+        return cached
+
+    prepare_worktree(repo_root, worktree, commit)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    # Generate in a temporary directory and rename it, so that an interrupted run is not cached
+    tmp = pathlib.Path(tempfile.mkdtemp(dir=cache_dir, prefix=".tmp"))
+    mcu_gen(repo_root=worktree, outdir=tmp)
+    shutil.rmtree(cached, ignore_errors=True)
+    tmp.rename(cached)
+
+    baselines = sorted(
+        (path for path in cache_dir.iterdir() if not path.name.startswith(".")),
+        key=lambda path: path.stat().st_mtime,
+        reverse=True,
+    )
+    for old in baselines[MAX_BASELINES:]:
+        shutil.rmtree(old, ignore_errors=True)
+    return cached
 
-        print("\nCleaning up worktree...")
-        run(["git", "worktree", "remove", "--force", tmp])
 
-        print("\n=== Generating on current branch ===")
-        mcu_gen(
-            repo_root=REPO_ROOT,
-            outdir=out_curr,
-        )
+def read_lines(path: pathlib.Path) -> List[str]:
+    """
+    Read a file as lines normalized for the comparison: whitespace runs are collapsed and blank
+    lines dropped.
+    """
+    if not path.is_file():
+        return []
+    with open(path, "r", encoding="utf-8", errors="replace") as file:
+        lines = (" ".join(line.split()) for line in file)
+        return [line for line in lines if line]
+
+
+def path_kind(path: pathlib.Path) -> str:
+    """
+    Describe what a path of the outputs is, for the differences that have no lines to show.
+    """
+    if path.is_file():
+        return "file"
+    if path.is_dir():
+        return "directory"
+    return "missing"
+
+
+def extract_values(path: pathlib.Path, lines: List[str]) -> Dict[str, str]:
+    """
+    Extract the SystemVerilog parameters or the C macros defined in a file.
+
+    :param path: Path of the file, whose suffix selects the syntax.
+    :param lines: Normalized lines of the file.
+    :return: Dictionary of the values by name. Names defined several times map to all their
+        values.
+    """
+    values = {}
+    if path.suffix in SV_SUFFIXES:
+        matches = SV_PARAMETER.findall("\n".join(lines))
+    elif path.suffix in C_SUFFIXES:
+        matches = [m.groups() for m in map(C_DEFINE.match, lines) if m is not None]
+    else:
+        return values
+    for name, value in matches:
+        value = " ".join(value.split())
+        values[name] = f"{values[name]} | {value}" if name in values else value
+    return values
+
+
+def is_address(name: str, value: str) -> bool:
+    """
+    Tell whether a parameter is an address (or an address range) from its name or its value.
+    """
+    return bool(ADDRESS_NAME.search(name) or HEX_VALUE.search(value))
+
 
-        print("\n=== MCU-GEN DIFF ===")
-        print(f"Comparing {out_main} and {out_curr}...")
-        diff_files = list_diff_files(out_main, out_curr)
-        if not diff_files:
-            print("No differences found.")
-        else:
-            print(f"Found {len(diff_files)} differing file(s):")
-            for path in diff_files:
-                print(f" - {path}")
-
-        print(
-            "\nRemember to make sure that your main branch is up to date with the latest changes from the remote repository before running this script."
-            "\nYou can update your main branch with 'git fetch origin main' or 'git fetch upstream main' depending on your remote setup."
+def compare_outputs(
+    left: pathlib.Path, right: pathlib.Path, context: int = 3
+) -> Tuple[List[str], List[str], List[Tuple[str, str, str, str, bool]]]:
+    """
+    Compare the outputs of two mcu-gen runs, ignoring whitespace.
+
+    :param left: Outputs of the baseline.
+    :param right: Outputs of the current branch.
+    :param context: Number of context lines of the unified diffs.
+    :return: The files that differ only in whitespace, the unified diffs of the files that
+        differ, and the changed values as (file, name, old value, new value, is address), with
+        "-" for a missing value.
+    """
+    whitespace_only = []
+    diffs = []
+    changes = []
+    for rel in list_diff_files(left, right):
+        left_lines = read_lines(left / rel)
+        right_lines = read_lines(right / rel)
+        # Anything that is not a file on both sides (missing file, empty directory...) is a real
+        # difference, even if there are no lines to compare
+        if (
+            left_lines == right_lines
+            and (left / rel).is_file()
+            and (right / rel).is_file()
+        ):
+            whitespace_only.append(rel)
+            continue
+        diff = "\n".join(
+            difflib.unified_diff(
+                left_lines,
+                right_lines,
+                f"main/{rel}",
+                f"current/{rel}",
+                n=context,
+                lineterm="",
+            )
         )
+        # e.g. an empty file or directory present on one side only
+        diffs.append(
+            diff
+            or f"main/{rel} ({path_kind(left / rel)}) and current/{rel} ({path_kind(right / rel)}) differ"
+        )
+
+        left_values = extract_values(pathlib.Path(rel), left_lines)
+        right_values = extract_values(pathlib.Path(rel), right_lines)
+        for name in sorted(left_values.keys() | right_values.keys()):
+            old = left_values.get(name, "-")
+            new = right_values.get(name, "-")
+            if old != new:
+                changes.append((rel, name, old, new, is_address(name, old + new)))
+    return whitespace_only, diffs, changes
+
+
+def print_report(whitespace_only, diffs, changes):
+    """
+    Print the comparison of the outputs: the unified diffs, then a summary of the changed
+    parameters and addresses.
+    """
+    if not diffs and not whitespace_only:
+        print("No differences found.")
+        return
+
+    for diff in diffs:
+        print(diff)
+        print()
+
+    print(f"Found {len(diffs)} differing file(s).")
+    if whitespace_only:
+        print(f"{len(whitespace_only)} file(s) differ only in whitespace:")
+        for path in whitespace_only:
+            print(f" - {path}")
+
+    for title, addresses in [("addresses", True), ("parameters", False)]:
+        selected = [change for change in changes if change[4] == addresses]
+        if selected:
+            print(f"Changed {title}:")
+            for rel, name, old, new, _ in selected:
+                print(f" - {rel}: {name}: {old} -> {new}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the outputs of mcu-gen between the current branch and main"
+    )
+    parser.add_argument(
+        "--base",
+        default="refs/heads/main",
+        help="Revision to compare against (default: main)",
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Generate the outputs of the base revision even if they are cached",
+    )
+    parser.add_argument(
+        "--context",
+        type=int,
+        default=3,
+        help="Number of context lines of the diffs (default: 3)",
+    )
+    args = parser.parse_args()
+
+    base_commit = get_commit(REPO_ROOT, args.base)
+
+    out_main = TEST_X_HEEP_GEN_DIR / "_mcu_gen_main"
+    out_curr = TEST_X_HEEP_GEN_DIR / "_mcu_gen_current"
+
+    shutil.rmtree(out_main, ignore_errors=True)
+    shutil.rmtree(out_curr, ignore_errors=True)
+
+    print(f"\n=== Generating on {args.base} ({base_commit[:8]}) ===")
+    shutil.copytree(baseline_outputs(REPO_ROOT, base_commit, args.refresh), out_main)
+
+    print("\n=== Generating on current branch ===")
+    mcu_gen(
+        repo_root=REPO_ROOT,
+        outdir=out_curr,
+    )
+
+    print("\n=== MCU-GEN DIFF ===")
+    print(f"Comparing {out_main} and {out_curr}...")
+    print_report(*compare_outputs(out_main, out_curr, args.context))
+
+    print(
+        "\nRemember to make sure that your main branch is up to date with the latest changes from the remote repository before running this script."
+        "\nYou can update your main branch with 'git fetch origin main' or 'git fetch upstream main' depending on your remote setup."
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,72 @@
+# Copyright 2026 EPFL
+# Licensed under the Apache License, Version 2.0, see LICENSE for details.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Description: Checks that compare_mcu_gen.py does not change the cores found by FuseSoC in the
+#   repository, nor the templates rendered by make mcu-gen, i.e. that the baseline worktree it keeps
+#   is outside of the source tree.
+
+import argparse
+import pathlib
+import subprocess
+import sys
+
+from compare_mcu_gen import get_mcu_gen_templates
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[2]
+COMPARE_MCU_GEN = pathlib.Path(__file__).resolve().parent / "compare_mcu_gen.py"
+
+
+def core_list(fusesoc: str) -> str:
+    """
+    List the cores found by FuseSoC with the repository as cores root.
+
+    :param fusesoc: FuseSoC executable.
+    :return: The output of the core list command, with the VLNV and location of every core.
+    """
+    return subprocess.check_output(
+        [fusesoc, "--cores-root", ".", "core", "list"],
+        cwd=REPO_ROOT,
+        text=True,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check that compare_mcu_gen.py leaves the FuseSoC core list unchanged"
+    )
+    parser.add_argument(
+        "--fusesoc", default="fusesoc", help="FuseSoC executable (default: fusesoc)"
+    )
+    # The other options, e.g. --base <revision>, are passed to compare_mcu_gen.py
+    args, compare_args = parser.parse_known_args()
+
+    before = core_list(args.fusesoc)
+    templates_before = get_mcu_gen_templates(REPO_ROOT)
+    subprocess.run(
+        [sys.executable, str(COMPARE_MCU_GEN), *compare_args],
+        cwd=REPO_ROOT,
+        check=True,
+    )
+    after = core_list(args.fusesoc)
+    templates_after = get_mcu_gen_templates(REPO_ROOT)
+
+    failed = False
+    if before != after:
+        print("FuseSoC core list changed after compare_mcu_gen.py:")
+        print("\n".join(sorted(set(after.splitlines()) - set(before.splitlines()))))
+        failed = True
+    if templates_before != templates_after:
+        print("mcu-gen templates changed after compare_mcu_gen.py:")
+        print("\n".join(map(str, sorted(set(templates_after) - set(templates_before)))))
+        failed = True
+    if failed:
+        sys.exit(1)
+    print(
+        'Test "FuseSoC cores and mcu-gen templates unchanged after compare_mcu_gen.py" passed'
+    )
+
+
+if __name__ == "__main__":
+    main()
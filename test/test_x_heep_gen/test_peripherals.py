@@ -6,26 +6,94 @@ directory = pathlib.Path(__file__).resolve().parent.parent.parent
 sys.path.append(str(directory.joinpath("util/xheep_gen")))
 
 import mcu_gen
+import argparse
+import contextlib
+import io
+import json
 import os
-import hjson
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import load_config
+from xheep import XHeep
+from bus_type import BusType
+from cpu.cpu import CPU
+from memory_ss.memory_ss import MemorySS
+from memory_ss.linker_section import LinkerSection
+from peripherals.base_peripherals_domain import BasePeripheralDomain
+from peripherals.user_peripherals_domain import UserPeripheralDomain
+from peripherals.base_peripherals import (
+    SOC_ctrl,
+    Bootrom,
+    SPI_flash,
+    SPI_memio,
+    DMA,
+    Power_manager,
+    RV_timer_ao,
+    Fast_intr_ctrl,
+    Ext_peripheral,
+    Pad_control,
+    GPIO_ao,
+)
+from peripherals.user_peripherals import (
+    RV_plic,
+    SPI_host,
+    GPIO,
+    I2C,
+    RV_timer,
+    SPI2,
+    PDM2PCM,
+    I2S,
+    UART,
+    SerialLink,
+    SerialLinkReg,
+    SerialLinkReceiverFifo,
+)
 
 
-x_heep_cfg = "configs/general.hjson"
 pads_cfg = "configs/pad_cfg.py"
-config_directory = "test/test_x_heep_gen/configs/"
+config_directory = "test/test_x_heep_gen/configs"
 existing_extensions = [".hjson", ".py"]
-output_directory = "test/test_x_heep_gen/outputs"
-template = "test/test_x_heep_gen/template.hjson.tpl"
-
-
-def output_filename(example, extension):
-    """
-    Generate the output filename for the given example and extension
-    :param example: the example number to run
-    :param extension: the extension of the configuration file
-    :return: the output filename
-    """
-    return f"{output_directory}/example{example}-{extension[1:]}.hjson"
+config_cache = "build/mcu_gen_cache"
+
+# Configuration of the random tests, whose peripherals are replaced by random ones. By default,
+# the number of random configurations grows with the number of worker processes, so that the
+# test takes about the same time on any machine.
+random_base_config = f"{config_directory}/example1.hjson"
+random_cases_per_job = 100
+random_chunk_size = 50
+
+# Base peripherals of the random configurations, in the order of the HJSON configurations, with
+# their offset and whether they are optional
+base_peripherals = {
+    "soc_ctrl": (SOC_ctrl, 0x00000000, False),
+    "bootrom": (Bootrom, 0x00010000, False),
+    "spi_flash": (SPI_flash, 0x00020000, False),
+    "spi_memio": (SPI_memio, 0x00028000, False),
+    "dma": (DMA, 0x00030000, False),
+    "power_manager": (Power_manager, 0x00040000, False),
+    "rv_timer_ao": (RV_timer_ao, 0x00050000, False),
+    "fast_intr_ctrl": (Fast_intr_ctrl, 0x00060000, False),
+    "ext_peripheral": (Ext_peripheral, 0x00070000, False),
+    "pad_control": (Pad_control, 0x00080000, True),
+    "gpio_ao": (GPIO_ao, 0x00090000, True),
+}
+
+# User peripherals of the random configurations, all optional
+user_peripherals = {
+    "rv_plic": RV_plic,
+    "spi_host": SPI_host,
+    "gpio": GPIO,
+    "i2c": I2C,
+    "rv_timer": RV_timer,
+    "spi2": SPI2,
+    "pdm2pcm": PDM2PCM,
+    "i2s": I2S,
+    "uart": UART,
+    "serial_link": SerialLink,
+    "serial_link_reg": SerialLinkReg,
+    "serial_link_receiver_fifo": SerialLinkReceiverFifo,
+}
 
 
 class PeripheralsDescription:
@@ -33,257 +101,347 @@ class PeripheralsDescription:
     Contains all attributes concerning peripherals that are generated by mcu_gen
     """
 
-    def __init__(self, example, extension):
-        print(output_filename(example, extension))
-        with open(output_filename(example, extension), "r") as file:
-            content = hjson.load(file)
-
-        self.ao_peripheral_start_address = content["ao_peripheral_start_address"]
-        self.ao_peripheral_size_address = content["ao_peripheral_size_address"]
-
-        # Standardize the ao_peripherals
-        self.ao_peripherals = [p for p in content["ao_peripherals"]]
-        self.ao_peripherals_count = content["ao_peripherals_count"]
-        self.dma_ch_count = content["dma_ch_count"]
-        self.dma_ch_size = content["dma_ch_size"]
-        self.num_dma_master_ports = content["num_dma_master_ports"]
-        self.num_dma_xbar_channels_per_master_port = content[
-            "num_dma_xbar_channels_per_master_port"
+    # Attributes compared by differences(), the lists are compared item by item
+    compared_attributes = [
+        "ao_peripheral_start_address",
+        "ao_peripheral_size_address",
+        "ao_peripherals",
+        "ao_peripherals_count",
+        "dma_ch_count",
+        "dma_ch_size",
+        "num_dma_master_ports",
+        "num_dma_xbar_channels_per_master_port",
+        "dma_xbar_masters_array",
+        "peripheral_start_address",
+        "peripheral_size_address",
+        "peripherals",
+        "peripherals_count",
+        "pdm2pcm_cic_only",
+    ]
+
+    def __init__(self, kwargs, label):
+        """
+        :param kwargs: the template variables returned by mcu_gen.generate()
+        :param label: the name of the configuration, printed with the differences
+        """
+        xheep = kwargs["xheep"]
+        base_peripheral_domain = xheep.get_base_peripheral_domain()
+        user_peripheral_domain = xheep.get_user_peripheral_domain()
+        dma = base_peripheral_domain.get_dma()
+        pdm2pcm = user_peripheral_domain.get_pdm2pcm()
+
+        self.ao_peripheral_start_address = base_peripheral_domain.get_start_address()
+        self.ao_peripheral_size_address = base_peripheral_domain.get_length()
+        self.ao_peripherals = [
+            p.get_name() for p in base_peripheral_domain.get_peripherals()
         ]
-        self.fifo_depth = content["fifo_depth"]
-        self.addr_mode_en = content["addr_mode_en"]
-        self.subaddr_mode_en = content["subaddr_mode_en"]
-        self.hw_fifo_mode_en = content["hw_fifo_mode_en"]
-        self.zero_padding_en = content["zero_padding_en"]
-        self.dma_xbar_masters_array = content["dma_xbar_masters_array"]
-        self.peripheral_start_address = content["peripheral_start_address"]
-        self.peripheral_size_address = content["peripheral_size_address"]
-
-        try:
-            self.pdm2pcm_cic_only = content["pdm2pcm_cic_only"]
-        except:
-            self.pdm2pcm_cic_only = None
-
-        # Standardize the peripherals
-        added = 0
-        filtered_peripherals = []
-        # Reconstructs the peripherals list with the is_included field removed
-        for name, info in content["peripherals"].items():
-            if info.get("is_included") == "yes":
-                peripheral_info = dict(info)
-                peripheral_info["name"] = name
-                del peripheral_info[
-                    "offset"
-                ]  # offset changes between configurations (hardcoded in hjson, computed in python), thus they wan't be the same
-                del peripheral_info["is_included"]
-                filtered_peripherals.append(peripheral_info)
-                added += 1
-        self.peripherals = filtered_peripherals
-        self.peripherals_count = added
-
-        self.extension = extension
+        self.ao_peripherals_count = len(self.ao_peripherals)
+
+        self.dma_ch_count = dma.get_num_channels()
+        self.dma_ch_size = dma.get_ch_length()
+        self.num_dma_master_ports = dma.get_num_master_ports()
+        self.num_dma_xbar_channels_per_master_port = (
+            dma.get_num_channels_per_master_port()
+        )
+        self.fifo_depth = dma.get_fifo_depth()
+        self.addr_mode_en = dma.get_addr_mode()
+        self.subaddr_mode_en = dma.get_subaddr_mode()
+        self.hw_fifo_mode_en = dma.get_hw_fifo_mode()
+        self.zero_padding_en = dma.get_zero_padding()
+        self.dma_xbar_masters_array = dma.get_xbar_array()
+
+        self.peripheral_start_address = user_peripheral_domain.get_start_address()
+        self.peripheral_size_address = user_peripheral_domain.get_length()
+        self.pdm2pcm_cic_only = pdm2pcm.get_cic_mode() if pdm2pcm is not None else None
+
+        # The offsets are given in hjson but can be computed in python, so are not compared,
+        # and neither is the order of the peripherals, which follows the order they were added in
+        self.peripherals = sorted(
+            (
+                {"name": p.get_name(), "size": p.get_length()}
+                for p in user_peripheral_domain.get_peripherals()
+            ),
+            key=lambda p: p["name"],
+        )
+        self.peripherals_count = len(self.peripherals)
+
+        self.label = label
+
+    def differences(self, other):
+        """
+        List the differences with another description
+        :param other: the other description
+        :return: one message per difference
+        """
+        differences = []
+        for attribute in self.compared_attributes:
+            own = getattr(self, attribute)
+            others = getattr(other, attribute)
+            if not isinstance(own, list):
+                if own != others:
+                    differences.append(
+                        f"{attribute}: {own} ({self.label}) != {others} ({other.label})"
+                    )
+            elif len(own) != len(others):
+                differences.append(
+                    f"{attribute} length mismatch: {len(own)} ({self.label}) != {len(others)} ({other.label})"
+                )
+            else:
+                for i, (own_item, other_item) in enumerate(zip(own, others)):
+                    if own_item != other_item:
+                        differences.append(
+                            f"{attribute} {i}: {own_item} ({self.label}) != {other_item} ({other.label})"
+                        )
+        return differences
 
     def __eq__(self, other):
+        return len(self.differences(other)) == 0
+
+
+def describe(build, label):
+    """
+    Build a configuration and describe its peripherals, the messages printed by mcu_gen are dropped
+    :param build: function returning the template variables of the configuration
+    :param label: the name of the configuration
+    :return: the description, or the error message if the configuration is rejected
+    """
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return PeripheralsDescription(build(), label)
+    except (SystemExit, Exception) as error:
+        return f"{type(error).__name__}: {error}"
 
-        eq = True
-        if self.ao_peripheral_start_address != other.ao_peripheral_start_address:
-            eq = False
-            print(
-                f"ao_peripheral_start_address: {self.ao_peripheral_start_address} ({self.extension[1:]}) != {other.ao_peripheral_start_address} ({other.extension[1:]})"
-            )
-        if self.ao_peripheral_size_address != other.ao_peripheral_size_address:
-            eq = False
-            print(
-                f"ao_peripheral_size_address: {self.ao_peripheral_size_address} ({self.extension[1:]}) != {other.ao_peripheral_size_address} ({other.extension[1:]})"
-            )
-        if len(self.ao_peripherals) != len(other.ao_peripherals):
-            eq = False
-            print(
-                f"ao_peripherals length mismatch: {len(self.ao_peripherals)} ({self.extension[1:]}) != {len(other.ao_peripherals)} ({other.extension[1:]})"
-            )
-        else:
-            for i, (self_p, other_p) in enumerate(
-                zip(self.ao_peripherals, other.ao_peripherals)
-            ):
-                if self_p != other_p:
-                    eq = False
-                    print(
-                        f"ao_peripheral {i}: {self_p} ({self.extension[1:]}) != {other_p} ({other.extension[1:]})"
-                    )
-        if self.ao_peripherals_count != other.ao_peripherals_count:
-            eq = False
-            print(
-                f"ao_peripherals_count: {self.ao_peripherals_count} ({self.extension[1:]}) != {other.ao_peripherals_count} ({other.extension[1:]})"
-            )
-        if self.dma_ch_count != other.dma_ch_count:
-            eq = False
-            print(
-                f"dma_ch_count: {self.dma_ch_count} ({self.extension[1:]}) != {other.dma_ch_count} ({other.extension[1:]})"
-            )
-        if self.dma_ch_size != other.dma_ch_size:
-            eq = False
-            print(
-                f"dma_ch_size: {self.dma_ch_size} ({self.extension[1:]}) != {other.dma_ch_size} ({other.extension[1:]})"
-            )
-        if self.num_dma_master_ports != other.num_dma_master_ports:
-            eq = False
-            print(
-                f"num_dma_master_ports: {self.num_dma_master_ports} ({self.extension[1:]}) != {other.num_dma_master_ports} ({other.extension[1:]})"
-            )
-        if (
-            self.num_dma_xbar_channels_per_master_port
-            != other.num_dma_xbar_channels_per_master_port
-        ):
-            eq = False
-            print(
-                f"num_dma_xbar_channels_per_master_port: {self.num_dma_xbar_channels_per_master_port} ({self.extension[1:]}) != {other.num_dma_xbar_channels_per_master_port} ({other.extension[1:]})"
-            )
-        if self.dma_xbar_masters_array != other.dma_xbar_masters_array:
-            eq = False
-            print(
-                f"dma_xbar_masters_array: {self.dma_xbar_masters_array} ({self.extension[1:]}) != {other.dma_xbar_masters_array} ({other.extension[1:]})"
-            )
-        if self.peripheral_start_address != other.peripheral_start_address:
-            eq = False
-            print(
-                f"peripheral_start_address: {self.peripheral_start_address} ({self.extension[1:]}) != {other.peripheral_start_address} ({other.extension[1:]})"
-            )
-        if self.peripheral_size_address != other.peripheral_size_address:
-            eq = False
-            print(
-                f"peripheral_size_address: {self.peripheral_size_address} ({self.extension[1:]}) != {other.peripheral_size_address} ({other.extension[1:]})"
-            )
-        if len(self.peripherals) != len(other.peripherals):
-            eq = False
-            print(
-                f"peripherals length mismatch: {len(self.peripherals)} ({self.extension[1:]}) != {len(other.peripherals)} ({other.extension[1:]})"
-            )
-        else:
-            for i, (self_p, other_p) in enumerate(
-                zip(self.peripherals, other.peripherals)
-            ):
-                if self_p != other_p:
-                    eq = False
-                    print(
-                        f"peripheral {i}: {self_p} ({self.extension[1:]}) != {other_p} ({other.extension[1:]})"
-                    )
-        if self.peripherals_count != other.peripherals_count:
-            eq = False
-            print(
-                f"peripherals_count: {self.peripherals_count} ({self.extension[1:]}) != {other.peripherals_count} ({other.extension[1:]})"
-            )
-        if self.pdm2pcm_cic_only != other.pdm2pcm_cic_only:
-            eq = False
-            print(
-                f"pdm2pcm_cic_only: {self.pdm2pcm_cic_only} ({self.extension[1:]}) != {other.pdm2pcm_cic_only} ({other.extension[1:]})"
-            )
 
-        return eq
+def compare(hjson_output, py_output):
+    """
+    Compare the descriptions of the same configuration loaded from hjson and from python
+    :return: the differences, none if both describe the same peripherals or are rejected with the same error
+    """
+    if isinstance(hjson_output, str) or isinstance(py_output, str):
+        if hjson_output == py_output:
+            return []
+        return [
+            f"{output.label if not isinstance(output, str) else output} ({extension})"
+            for output, extension in ((hjson_output, "hjson"), (py_output, "py"))
+        ]
+    return hjson_output.differences(py_output)
 
 
 def run_test(example, example_name):
     """
-    Compare the output of mcu_gen with an hjson config and a python config. Mcu_gen has to be called before running this script.
+    Compare the output of mcu_gen with an hjson config and a python config.
     :param example: the example number to run
+    :param example_name: the name of the test
 
-    :return: True if the test passed, False otherwise
+    :return: the name of the test and its differences, none if the test passed
     """
 
-    # Writes the output in a PeripheralsDescription object
-    hjson_output = PeripheralsDescription(example, ".hjson")
-    py_output = PeripheralsDescription(example, ".py")
+    def build(extension):
+        python_config = (
+            f"{config_directory}/example{example}.py" if extension == ".py" else ""
+        )
+        _, kwargs = mcu_gen.generate(
+            config=f"{config_directory}/example{example}.hjson",
+            python_config=python_config,
+            pads_cfg=pads_cfg,
+            config_cache=config_cache,
+        )
+        return kwargs
 
-    result = hjson_output == py_output
+    hjson_output = describe(lambda: build(".hjson"), "hjson")
+    py_output = describe(lambda: build(".py"), "py")
 
-    if result:
-        print(f'Test "{example_name}" passed')
-    else:
-        print(f'Test "{example_name}" failed')
+    differences = compare(hjson_output, py_output)
+    return example_name, [(example_name, differences)] if differences else []
 
-    return result
 
+def random_peripherals(rng):
+    """
+    Draw a random peripheral configuration
+    :param rng: the random generator
+    :return: the peripherals, as dictionaries of the fields of the hjson configuration, with the
+        python-only "auto" field set when the python configuration does not give the offset
+    """
+    num_channels = rng.randint(1, 8)
+    num_master_ports = rng.randint(1, min(num_channels, 4))
+    dma = {
+        "ch_length": hex(rng.choice([0x40, 0x100, 0x400])),
+        "num_channels": hex(num_channels),
+        "num_master_ports": hex(num_master_ports),
+        "num_channels_per_master_port": hex(
+            num_channels
+            if num_master_ports == 1 or rng.random() < 0.1
+            else rng.randint(1, num_channels)
+        ),
+        "fifo_depth": hex(rng.choice([2, 4, 8, 16])),
+        "addr_mode_en": rng.choice(["yes", "no"]),
+        "subaddr_mode_en": rng.choice(["yes", "no"]),
+        "hw_fifo_mode_en": rng.choice(["yes", "no"]),
+        "zero_padding_en": rng.choice(["yes", "no"]),
+    }
+
+    ao_peripherals = {}
+    for name, (_, offset, optional) in base_peripherals.items():
+        peripheral = {"offset": hex(offset), "length": "0x00010000"}
+        if name == "spi_flash" or name == "spi_memio":
+            peripheral["length"] = "0x00008000"
+        if name == "dma":
+            peripheral.update(dma)
+        if optional:
+            peripheral["is_included"] = rng.choice(["yes", "no"])
+        peripheral["auto"] = rng.random() < 0.3
+        ao_peripherals[name] = peripheral
+
+    # The user peripherals are laid out in random order, from the start of the domain
+    peripherals = {}
+    names = list(user_peripherals)
+    rng.shuffle(names)
+    offset = 0
+    for name in names:
+        length = rng.choice([0x1000, 0x4000, 0x10000])
+        included = rng.random() < 0.5
+        if not included and rng.random() < 0.5:
+            continue  # Not included peripherals can be left out of the hjson configuration
+        peripherals[name] = {
+            "offset": hex(offset),
+            "length": hex(length),
+            "is_included": "yes" if included else "no",
+            "auto": rng.random() < 0.5,
+        }
+        offset += 0x10000
+
+    return ao_peripherals, peripherals
+
+
+def hjson_system(ao_peripherals, peripherals, config):
+    """
+    Load a random peripheral configuration with the hjson loader
+    :return: the XHeep object
+    """
+    strip = lambda fields: {k: v for k, v in fields.items() if k != "auto"}
+    src = dict(config)
+    src["ao_peripherals"] = {
+        "address": "0x20000000",
+        "length": "0x00100000",
+        **{name: strip(fields) for name, fields in ao_peripherals.items()},
+    }
+    src["peripherals"] = {
+        "address": "0x30000000",
+        "length": "0x00100000",
+        **{name: strip(fields) for name, fields in peripherals.items()},
+    }
+    return load_config.load_cfg_hjson(json.dumps(src))
+
+
+def python_system(ao_peripherals, peripherals, config):
+    """
+    Build a random peripheral configuration with the python classes, as a python configuration does
+    :return: the XHeep object
+    """
+    system = XHeep(BusType(config["bus_type"]))
+    system.set_cpu(CPU(config["cpu_type"]))
+
+    memory_ss = MemorySS()
+    memory_ss.add_ram_banks([32] * 2)
+    memory_ss.add_linker_section(LinkerSection.by_size("code", 0, 0x00000E800))
+    memory_ss.add_linker_section(LinkerSection("data", 0x00000E800, None))
+    system.set_memory_ss(memory_ss)
+
+    base_peripheral_domain = BasePeripheralDomain()
+    for name, fields in ao_peripherals.items():
+        peripheral_class, _, _ = base_peripherals[name]
+        if fields.get("is_included", "yes") == "no":
+            continue
+        offset = None if fields["auto"] else int(fields["offset"], 16)
+        length = int(fields["length"], 16)
+        if name == "dma":
+            peripheral = DMA(
+                offset,
+                length,
+                ch_length=int(fields["ch_length"], 16),
+                num_channels=int(fields["num_channels"], 16),
+                num_master_ports=int(fields["num_master_ports"], 16),
+                num_channels_per_master_port=int(
+                    fields["num_channels_per_master_port"], 16
+                ),
+                fifo_depth=int(fields["fifo_depth"], 16),
+                addr_mode=fields["addr_mode_en"],
+                subaddr_mode=fields["subaddr_mode_en"],
+                hw_fifo_mode=fields["hw_fifo_mode_en"],
+                zero_padding=fields["zero_padding_en"],
+            )
+        else:
+            peripheral = peripheral_class(offset, length)
+        base_peripheral_domain.add_peripheral(peripheral)
+
+    user_peripheral_domain = UserPeripheralDomain()
+    for name, fields in peripherals.items():
+        if fields["is_included"] == "yes":
+            offset = None if fields["auto"] else int(fields["offset"], 16)
+            user_peripheral_domain.add_peripheral(
+                user_peripherals[name](offset, int(fields["length"], 16))
+            )
 
-def __generate_argv(
-    example_number: int,
-    config_dir: str,
-    output_dir: str,
-    extension: str,
-    template: str,
-):
+    system.add_peripheral_domain(base_peripheral_domain)
+    system.add_peripheral_domain(user_peripheral_domain)
+    return system
 
-    python_config = (
-        f"{config_dir}/example{example_number}.py" if extension == "py" else ""
-    )
 
-    return [
-        "mcu_gen.py",
-        "--config",
-        f"{config_dir}/example{example_number}.hjson",
-        "--python_config",
-        python_config,
-        "--pads_cfg",
-        pads_cfg,
-        "--outfile",
-        f"{output_dir}/example{example_number}-{extension}.hjson",
-        "--outtpl",
-        template,
-    ]
+# Configuration and pad ring of the random tests, loaded once per process by random_context()
+_random_context = None
 
 
-def generate_examples(
-    num_examples: int,
-    config_dir: str,
-    output_dir: str,
-    template: str,
-):
-    """
-    Generate examples with both Python and HJSON configurations.
+def random_context():
+    global _random_context
+    if _random_context is None:
+        with contextlib.redirect_stdout(io.StringIO()):
+            base = load_config.load_hjson_file(pathlib.PurePath(random_base_config))
+            xheep = load_config.load_cfg_file(pathlib.PurePath(random_base_config))
+            pad_ring = load_config.load_pad_cfg(pathlib.PurePath(pads_cfg), xheep)
+        config = {
+            "bus_type": base["bus_type"],
+            "cpu_type": base["cpu_type"],
+            "ram_banks": base["ram_banks"],
+            "linker_sections": base["linker_sections"],
+        }
+        _random_context = (base, config, pad_ring)
+    return _random_context
 
-    :param num_examples: Number of tests to run
-    :param config_dir: Directory containing example (test) configurations
-    :param output_dir: Directory to store generated outputs
-    :param template: Path to template file to drop mcu_gen.py outputs (kwargs)
-    """
-
-    # Reset the output directory
-    output_path = pathlib.Path(output_dir)
-    if output_path.exists():
-        os.system(f"rm -rf {output_path}")
-    output_path.mkdir(parents=True)
 
-    # Store original sys.argv
-    original_argv = sys.argv.copy()
+def run_random_tests(seed, first, count):
+    """
+    Compare the hjson and python loaders on random peripheral configurations
+    :param seed: the seed of the random tests
+    :param first: the index of the first configuration
+    :param count: the number of configurations
 
-    try:
-        for i in range(1, num_examples + 1):
-            print(f"Processing example {i}")
-
-            # Generate with Python configuration
-            print(f"Running Python configuration for example {i}")
-            sys.argv = __generate_argv(
-                example_number=i,
-                config_dir=config_dir,
-                output_dir=output_dir,
-                template=template,
-                extension="py",
-            )
-            mcu_gen.main()
-
-            # Generate with HJSON configuration
-            print(f"Running HJSON configuration for example {i}")
-            sys.argv = __generate_argv(
-                example_number=i,
-                config_dir=config_dir,
-                output_dir=output_dir,
-                template=template,
-                extension="hjson",
+    :return: the name of the configurations and the differences of the failed ones
+    """
+    base, config, pad_ring = random_context()
+    failures = []
+
+    def build(load, ao_peripherals, peripherals):
+        xheep = load(ao_peripherals, peripherals, config)
+        xheep.set_padring(pad_ring)
+        return mcu_gen.configure_xheep(xheep, base)
+
+    for case in range(first, first + count):
+        rng = random.Random(f"{seed}-{case}")
+        ao_peripherals, peripherals = random_peripherals(rng)
+        hjson_output = describe(
+            lambda: build(hjson_system, ao_peripherals, peripherals), "hjson"
+        )
+        py_output = describe(
+            lambda: build(python_system, ao_peripherals, peripherals), "py"
+        )
+        differences = compare(hjson_output, py_output)
+        if differences:
+            differences.append(
+                f"peripherals: {json.dumps([ao_peripherals, peripherals])}"
             )
-            mcu_gen.main()
-            print(f"Example {i} processed")
+            failures.append((f"Random configuration {case} (seed {seed})", differences))
 
-    finally:
-        # Restore original sys.argv
-        sys.argv = original_argv
+    return f"{count} random configurations ({first} to {first + count - 1})", failures
 
 
 def main():
@@ -297,26 +455,64 @@ def main():
     - Append the name of the test in test_names
 
     Current extension supported : .py and .hjson
+
+    The examples and random configurations are independent tests, run in parallel.
     """
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--random",
+        type=int,
+        default=None,
+        help=f"Number of random configurations (default: {random_cases_per_job} per job)",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Seed of the random configurations (default: 0)",
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of worker processes (default: one per CPU)",
+    )
+    args = parser.parse_args()
+    if args.random is None:
+        args.random = random_cases_per_job * args.jobs
 
     test_names = []
     test_names.append("All peripherals included except PDM2PCM")
     test_names.append("No user peripheral")
     test_names.append("All user peripherals included")
 
-    # Generate examples
-    generate_examples(
-        num_examples=len(test_names),
-        config_dir="test/test_x_heep_gen/configs",
-        output_dir="test/test_x_heep_gen/outputs",
-        template="test/test_x_heep_gen/template.hjson.tpl",
-    )
+    tests = [(run_test, i, name) for i, name in enumerate(test_names, 1)]
+    tests += [
+        (
+            run_random_tests,
+            args.seed,
+            first,
+            min(random_chunk_size, args.random - first),
+        )
+        for first in range(0, args.random, random_chunk_size)
+    ]
 
-    test_results = []
+    if args.jobs > 1:
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            futures = [pool.submit(*test) for test in tests]
+            results = [future.result() for future in futures]
+    else:
+        results = [test[0](*test[1:]) for test in tests]
 
-    # Run examples
-    for i in range(1, len(test_names) + 1):
-        test_results.append(run_test(i, test_names[i - 1]))
+    test_results = []
+    for name, failures in results:
+        for failure_name, differences in failures:
+            print("\n".join(differences))
+            if failure_name != name:
+                print(f'Test "{failure_name}" failed')
+        print(f'Test "{name}" {"failed" if failures else "passed"}')
+        test_results.append(not failures)
 
     if not all(test_results):
         exit(1)  # Exit with error if any test failed
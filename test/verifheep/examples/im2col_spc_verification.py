@@ -108,7 +108,7 @@ def im2col_function(input_array, parameters):
     kernel_size = (filter_height, filter_width)
 
     # Convert the input array into a PyTorch tensor with the correct shape
-    input_tensor = torch.tensor(input_array).view(batch_size, channels, image_height, image_width)
+    input_tensor = torch.from_numpy(input_array.astype(np.int64)).view(batch_size, channels, image_height, image_width)
 
     dilation = 1
     # Ensure kernel_size, stride, padding, and dilation are tuples
@@ -131,8 +131,8 @@ def im2col_function(input_array, parameters):
     channel_dim = padded_input.size(1)
     unfolded_tensor = unfolded.contiguous().view(-1, channel_dim * kernel_size[0] * kernel_size[1]).t()
 
-    # Convert the PyTorch tensor to a NumPy array and then to a list (simple array)
-    unfolded_array = unfolded_tensor.numpy().flatten().tolist()
+    # Convert the PyTorch tensor to a flat NumPy array
+    unfolded_array = unfolded_tensor.numpy().flatten()
 
     return unfolded_array, ""
 
@@ -27,7 +27,10 @@
 #              and to compare it against a golden output, also defined in a header. 
 #              Both the name and directories of these datasets can be provided as arguments.
 #              It is also possible to generate a golden result starting from a custom input dataset, provided that it was produced
-#              using the same structure.#              
+#              using the same structure.
+#              The datasets are generated with NumPy, from a generator that can be seeded for reproducible runs, and the golden
+#              function receives the input dataset as a NumPy array, kept in memory (or in a .npy sidecar file) instead
+#              of being parsed back from the generated file.
 #
 #           3) The library provides methods to estimate the remaining time of the execution of a loop, based on the average duration
 #              of the iterations that have already been executed. 
@@ -41,18 +44,36 @@ import serial
 import pexpect
 import threading
 import queue
-import random
 import os
+import numpy as np
 
 # Set this to True to enable debugging prints
 DEBUG_MODE = False
 
+LICENSE = "/*\n\tCopyright EPFL contributors.\n\tLicensed under the Apache License, Version 2.0, see LICENSE for details.\n\tSPDX-License-Identifier: Apache-2.0\n*/\n\n"
+
+# Supported datatypes of the generated datasets
+DATATYPES = {
+    "uint8_t": np.uint8,
+    "uint16_t": np.uint16,
+    "uint32_t": np.uint32,
+    "int8_t": np.int8,
+    "int16_t": np.int16,
+    "int32_t": np.int32,
+    "float": np.float32,
+}
+DATATYPE_ERROR = "Error: invalid datatype. Choose one among:\n- float\n- u/int8_t\n- u/int16_t\n- u/int32_t\n"
+
+# Number of values formatted at once when writing a dataset, and size of the write buffer
+ARRAY_CHUNK_SIZE = 1 << 16
+WRITE_BUFFER_SIZE = 1 << 20
+
 def PRINT_DEB(*args, **kwargs):
     if DEBUG_MODE:
         print(*args, **kwargs)
 
 class VerifHeep:
-    def __init__(self, target, xheep_dir, opt_en=False):
+    def __init__(self, target, xheep_dir, opt_en=False, seed=None):
         self.target = target
         if target not in ['verilator', 'questasim', 'pynq-z2']:
             raise Exception(f'Target {target} not supported. Choose one among:\n- verilator\n- questasim (with optional optimization)\n- pynq-z2\n')
@@ -64,9 +85,14 @@ class VerifHeep:
         self.results = []
         self.it_times = []
 
+        # Generator of the datasets, and datasets generated so far with the modification time of their file
+        self.rng = np.random.default_rng(seed)
+        self.datasets = {}
+
     def resetAll(self):
         self.results = []
         self.it_times = []
+        self.datasets = {}
         if self.ser.is_open:
           self.ser.close()
         self.ser = None
@@ -243,218 +269,123 @@ class VerifHeep:
     
     # Data generation methods
 
-    def genInputDataset(self, dataset_size, parameters="", row_size=0, range_min=0, range_max=1, dataset_dir="input_dataset.h", dataset_dir_c="", dataset_name="input_dataset", datatype="uint32_t"):
-        
-        if dataset_dir_c == "":
-          with open(dataset_dir, 'w') as f:
-            # Add license
-            f.write(f"#ifndef {dataset_name.upper()}_H\n")
-            f.write(f"#define {dataset_name.upper()}_H\n\n")
-            license = "/*\n\tCopyright EPFL contributors.\n\tLicensed under the Apache License, Version 2.0, see LICENSE for details.\n\tSPDX-License-Identifier: Apache-2.0\n*/\n\n"
-            f.write(license)
-            f.write(f"#include <stdint.h>\n\n")
-
-            # Write the parameters, if there are any
-            if parameters:
-                for key, value in parameters.items():
-                    f.write(f"#define {key} {value}\n")
-
-            # Vector declaration
-            f.write(f"const {datatype} {dataset_name}[{dataset_size}] = " + "{\n")
-            
-            # Generate the random vector
-            for i in range(dataset_size):
-                if 'float' in datatype:
-                    value = random.uniform(range_min, range_max)  # float
-                elif 'uint' in datatype:
-                    if ('8' in datatype or '16' in datatype or '32' in datatype) and range_min >= 0 and range_max > 0:
-                        value = random.randint(range_min, range_max)
-                    else:
-                        print("Error: invalid datatype. Choose one among:\n- float\n- u/int8_t\n- u/int16_t\n- u/int32_t\n")
-                        exit(1)
-                elif 'int' in datatype:
-                    if ('8' in datatype or '16' in datatype or '32' in datatype):
-                        value = random.randint(range_min, range_max)
-                    else:
-                        print("Error: invalid datatype. Choose one among:\n- float\n- u/int8_t\n- u/int16_t\n- u/int32_t\n")
-                        exit(1)
-                else:
-                  print("Error: invalid datatype. Choose one among:\n- float\n- u/int8_t\n- u/int16_t\n- u/int32_t\n")
-                  exit(1)
-
-                if i < dataset_size - 1:
-                    f.write(f" {value},")
-                else:
-                    f.write(f" {value}")
-              
-                if row_size > 0 and (i + 1) % row_size == 0:
-                  f.write("\n")
-            
-            # Close the file
-            f.write("};\n\n")
-            f.write(f"#endif // {dataset_name.upper()}_H\n")
-        else:
-          with open(dataset_dir_c, 'w') as f:
-            # Add license
-            license = "/*\n\tCopyright EPFL contributors.\n\tLicensed under the Apache License, Version 2.0, see LICENSE for details.\n\tSPDX-License-Identifier: Apache-2.0\n*/\n\n"
-            f.write(license)
-            f.write(f'#include "{os.path.basename(dataset_dir)}"\n\n')
-            
-            # Vector declaration
-            f.write(f"const {datatype} {dataset_name}[{dataset_size}] = " + "{\n")
-            
-            # Generate the random vector
-            for i in range(dataset_size):
-                if 'float' in datatype:
-                    value = random.uniform(range_min, range_max)  # float
-                elif 'uint' in datatype:
-                    if ('8' in datatype or '16' in datatype or '32' in datatype) and range_min >= 0 and range_max > 0:
-                        value = random.randint(range_min, range_max)
-                    else:
-                        print("Error: invalid datatype. Choose one among:\n- float\n- u/int8_t\n- u/int16_t\n- u/int32_t\n")
-                        exit(1)
-                elif 'int' in datatype:
-                    if ('8' in datatype or '16' in datatype or '32' in datatype):
-                        value = random.randint(range_min, range_max)
-                    else:
-                        print("Error: invalid datatype. Choose one among:\n- float\n- u/int8_t\n- u/int16_t\n- u/int32_t\n")
-                        exit(1)
-                else:
-                  print("Error: invalid datatype. Choose one among:\n- float\n- u/int8_t\n- u/int16_t\n- u/int32_t\n")
-                  exit(1)
-
-                if i < dataset_size - 1:
-                    f.write(f" {value},")
-                else:
-                    f.write(f" {value}")
-              
-                if row_size > 0 and (i + 1) % row_size == 0:
-                  f.write("\n")
-              
-            # Close the file
-            f.write("};\n\n")
-          
-          with open(dataset_dir, 'w') as f:
-            # Add license
-            f.write(f"#ifndef {dataset_name.upper()}_H\n")
-            f.write(f"#define {dataset_name.upper()}_H\n\n")
-            license = "/*\n\tCopyright EPFL contributors.\n\tLicensed under the Apache License, Version 2.0, see LICENSE for details.\n\tSPDX-License-Identifier: Apache-2.0\n*/\n\n"
-            f.write(license)
-            f.write(f"#include <stdint.h>\n\n")
-
-            # Write the parameters, if there are any
-            if parameters:
-                for key, value in parameters.items():
-                    f.write(f"#define {key} {value}\n")
-            
-            f.write("\n")
-
-            # Vector declaration
-            f.write(f"extern const {datatype} {dataset_name}[{dataset_size}];\n\n")
-            
-            # Close the file
-            f.write(f"#endif // {dataset_name.upper()}_H\n")
-
-    def genGoldenResult(self, function, golden_size, parameters, row_size=0, output_datatype="uint32_t",  input_dataset_dir="input_dataset.h", golden_dir_c="", golden_dir="golden_output.h", golden_name = "golden_output"):
-        
-        # Recover the input dataset
-        with open(input_dataset_dir, 'r') as f:
-            content = f.read()
-
-        # Use regular expressions to find the array data
-        pattern = re.compile(r"{(.*?)}", re.DOTALL)
-        match = pattern.search(content)
+    def setSeed(self, seed):
+        self.rng = np.random.default_rng(seed)
 
-        if not match:
-            raise ValueError("No array data found in the file.")
-
-        array_data = match.group(1)
-        # Remove extra whitespace and split the string into individual values
-        array_data = array_data.replace('\n', '').replace(' ', '')
-        values = array_data.split(',')
-
-        # Convert values to the appropriate type
-        if "float" in content:
-            values = [float(value) for value in values]
-        elif "uint8_t" in content or "uint16_t" in content or "uint32_t" in content:
-            values = [int(value) for value in values]
-        elif "int8_t" in content or "int16_t" in content or "int32_t" in content:
-            values = [int(value) for value in values]
-
-        # Generate the golden result
-        (golden_values, output_parameters) = function(values, parameters)
-
-        if golden_dir_c == "":
-          with open(golden_dir, 'w') as f:
-            # Write the golden result to a file
-            f.write(f"#ifndef {golden_name.upper()}_H\n")
-            f.write(f"#define {golden_name.upper()}_H\n\n")
-            license = "/*\n\tCopyright EPFL contributors.\n\tLicensed under the Apache License, Version 2.0, see LICENSE for details.\n\tSPDX-License-Identifier: Apache-2.0\n*/\n\n"
-            f.write(license)
-            f.write(f"#include <stdint.h>\n\n")
-
-            # Write the parameters that could have been returned from the function
-            if output_parameters:
-              for key, value in output_parameters.items():
-                  f.write(f"#define {key} {value}\n")
-            
+    def _dtype(self, datatype):
+        dtype = DATATYPES.get(datatype)
+        if dtype is None:
+            print(DATATYPE_ERROR)
+            exit(1)
+        return dtype
+
+    def _writeArray(self, f, values, row_size=0):
+        # Format the values in bulk, one chunk of lines at a time, instead of one write per value.
+        # Without rows, the chunks are parts of a single line.
+        values = values.ravel()
+        line_size = row_size if row_size > 0 else ARRAY_CHUNK_SIZE
+        separator = ",\n" if row_size > 0 else ","
+        chunk_size = max(ARRAY_CHUNK_SIZE // line_size, 1) * line_size
+        for start in range(0, len(values), chunk_size):
+            strings = values[start:start + chunk_size].astype(str).tolist()
+            f.write(separator.join(" " + ", ".join(strings[i:i + line_size]) for i in range(0, len(strings), line_size)))
+            if start + chunk_size < len(values):
+                f.write(separator)
+        if row_size > 0 and len(values) > 0 and len(values) % row_size == 0:
             f.write("\n")
 
-            # Vector declaration
-            f.write(f"const {output_datatype} {golden_name}[{golden_size}] = " + "{\n")
-
-            for i in range(golden_size):
-              if i < golden_size - 1:
-                f.write(f" {golden_values[i]},")
-              else:
-                f.write(f" {golden_values[i]}")
-              
-              if row_size > 0 and (i + 1) % row_size == 0:
+    def _writeDataset(self, values, parameters, row_size, header_dir, c_dir, name, datatype):
+        with open(header_dir if c_dir == "" else c_dir, 'w', buffering=WRITE_BUFFER_SIZE) as f:
+            if c_dir == "":
+                f.write(f"#ifndef {name.upper()}_H\n")
+                f.write(f"#define {name.upper()}_H\n\n")
+                f.write(LICENSE)
+                f.write(f"#include <stdint.h>\n\n")
+
+                # Write the parameters, if there are any
+                if parameters:
+                    for key, value in parameters.items():
+                        f.write(f"#define {key} {value}\n")
                 f.write("\n")
+            else:
+                f.write(LICENSE)
+                f.write(f'#include "{os.path.basename(header_dir)}"\n\n')
 
-            # Close the file
+            # Vector definition
+            f.write(f"const {datatype} {name}[{len(values)}] = " + "{\n")
+            self._writeArray(f, values, row_size)
             f.write("};\n\n")
-            f.write(f"#endif // {golden_name.upper()}_H\n")
-        else:
-          with open(golden_dir_c, 'w') as f:
-            # Write the golden result to a file
-            license = "/*\n\tCopyright EPFL contributors.\n\tLicensed under the Apache License, Version 2.0, see LICENSE for details.\n\tSPDX-License-Identifier: Apache-2.0\n*/\n\n"
-            f.write(license)
-            f.write(f'#include "{os.path.basename(golden_dir)}"\n\n')
-            
-            # Vector declaration
-            f.write(f"const {output_datatype} {golden_name}[{golden_size}] = " + "{\n")
-
-            for i in range(golden_size):
-              if i < golden_size - 1:
-                f.write(f" {golden_values[i]},")
-              else:
-                f.write(f" {golden_values[i]}")
-                
-              if row_size > 0 and (i + 1) % row_size == 0:
+            if c_dir == "":
+                f.write(f"#endif // {name.upper()}_H\n")
+
+        if c_dir != "":
+            with open(header_dir, 'w') as f:
+                f.write(f"#ifndef {name.upper()}_H\n")
+                f.write(f"#define {name.upper()}_H\n\n")
+                f.write(LICENSE)
+                f.write(f"#include <stdint.h>\n\n")
+
+                # Write the parameters, if there are any
+                if parameters:
+                    for key, value in parameters.items():
+                        f.write(f"#define {key} {value}\n")
                 f.write("\n")
 
-            # Close the file
-            f.write("};\n\n")
+                # Vector declaration
+                f.write(f"extern const {datatype} {name}[{len(values)}];\n\n")
+                f.write(f"#endif // {name.upper()}_H\n")
 
-          with open(golden_dir, 'w') as f:
-            # Write the golden result to a file
-            f.write(f"#ifndef {golden_name.upper()}_H\n")
-            f.write(f"#define {golden_name.upper()}_H\n\n")
-            license = "/*\n\tCopyright EPFL contributors.\n\tLicensed under the Apache License, Version 2.0, see LICENSE for details.\n\tSPDX-License-Identifier: Apache-2.0\n*/\n\n"
-            f.write(license)
-            f.write(f"#include <stdint.h>\n\n")
+    def genInputDataset(self, dataset_size, parameters="", row_size=0, range_min=0, range_max=1, dataset_dir="input_dataset.h", dataset_dir_c="", dataset_name="input_dataset", datatype="uint32_t", save_npy=False):
+
+        # Generate the random vector
+        dtype = self._dtype(datatype)
+        if np.issubdtype(dtype, np.floating):
+            values = self.rng.uniform(range_min, range_max, dataset_size).astype(dtype)
+        else:
+            limits = np.iinfo(dtype)
+            if range_min < limits.min or range_max > limits.max or range_min > range_max or (np.issubdtype(dtype, np.unsignedinteger) and range_max == 0):
+                print(f"Error: range [{range_min}, {range_max}] not supported by {datatype}\n")
+                exit(1)
+            values = self.rng.integers(range_min, range_max, dataset_size, dtype=dtype, endpoint=True)
+
+        self._writeDataset(values, parameters, row_size, dataset_dir, dataset_dir_c, dataset_name, datatype)
+
+        # Keep the dataset, so that the golden result is computed without parsing the file back
+        written_dir = dataset_dir if dataset_dir_c == "" else dataset_dir_c
+        self.datasets[os.path.abspath(written_dir)] = (os.stat(written_dir).st_mtime_ns, values)
+        if save_npy:
+            np.save(written_dir + ".npy", values)
+        return values
+
+    def loadInputDataset(self, input_dataset_dir):
+        path = os.path.abspath(input_dataset_dir)
+        mtime = os.stat(path).st_mtime_ns
+
+        # Dataset generated by this object, if the file was not modified since
+        if path in self.datasets and self.datasets[path][0] == mtime:
+            return self.datasets[path][1]
+
+        # Sidecar written by genInputDataset(save_npy=True)
+        if os.path.isfile(path + ".npy") and os.stat(path + ".npy").st_mtime_ns >= mtime:
+            return np.load(path + ".npy")
+
+        # Parse the array data of a custom dataset
+        with open(path, 'r') as f:
+            content = f.read()
+        match = re.search(r"(\w+)\s+\w+\s*\[[^\]]*\]\s*=\s*{(.*?)}", content, re.DOTALL)
+        if not match:
+            raise ValueError("No array data found in the file.")
+        dtype = DATATYPES.get(match.group(1), np.int64)
+        return np.array(match.group(2).replace(',', ' ').split(), dtype=np.float64 if np.issubdtype(dtype, np.floating) else np.int64).astype(dtype)
 
-            # Write the parameters that could have been returned from the function
-            if output_parameters:
-              for key, value in output_parameters.items():
-                  f.write(f"#define {key} {value}\n")
+    def genGoldenResult(self, function, golden_size, parameters, row_size=0, output_datatype="uint32_t",  input_dataset_dir="input_dataset.h", golden_dir_c="", golden_dir="golden_output.h", golden_name = "golden_output"):
 
-            # Vector declaration
-            f.write(f"extern const {output_datatype} {golden_name}[{golden_size}];\n\n")
+        # Recover the input dataset and generate the golden result
+        values = self.loadInputDataset(input_dataset_dir)
+        (golden_values, output_parameters) = function(values, parameters)
+        golden_values = np.asarray(golden_values)[:golden_size]
 
-            # Close the file
-            f.write(f"#endif // {golden_name.upper()}_H\n")
+        self._writeDataset(golden_values, output_parameters, row_size, golden_dir, golden_dir_c, golden_name, output_datatype)
 
     def modifyFile(self, file_dir, pattern, replacement):
         
@@ -0,0 +1,237 @@
+# Copyright 2026 EPFL
+# Licensed under the Apache License, Version 2.0, see LICENSE for details.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Description: Block-wise compression of the datasets embedded by c_gen.py, decoded on the target
+#   by sw/device/lib/sdk/decompress/decompress_sdk.c. Every block is encoded with the codec that
+#   gives the smallest payload among raw, run-length and delta, after a NumPy estimate of the byte
+#   entropy that stores the incompressible blocks raw without trying the other codecs.
+#
+#   Stream format (little-endian):
+#     header: "XHZ1" magic, decoded size (32 bits)
+#     blocks: codec (8 bits), element size (8 bits), decoded size (16 bits), payload size (32 bits),
+#             payload padded to 4 bytes
+#   Codecs:
+#     RAW:     the decoded bytes.
+#     RLE:     control bytes, each followed by (control + 1) literal elements if control < 0x80,
+#              or by one element repeated (control - 0x80 + 2) times.
+#     DELTA8:  the first element, then the difference of every element with the previous one as
+#     DELTA16: a signed 8-bit (DELTA8) or 16-bit (DELTA16) value.
+
+import numpy as np
+
+MAGIC = b"XHZ1"
+
+CODEC_RAW = 0
+CODEC_RLE = 1
+CODEC_DELTA8 = 2
+CODEC_DELTA16 = 3
+
+# Default size of the decoded blocks, which is the smallest buffer the target needs to stream them
+BLOCK_SIZE = 4096
+MAX_BLOCK_SIZE = 0xFFFF
+
+# Blocks whose byte entropy is above this number of bits per byte are stored raw
+RAW_ENTROPY_BITS = 7.5
+
+# Longest literal and repeated runs of an RLE control byte
+RLE_MAX_LITERAL = 0x80
+RLE_MAX_REPEAT = 0x81
+
+UNSIGNED_TYPES = {1: np.uint8, 2: np.uint16, 4: np.uint32}
+
+
+def entropy_bits(data: np.ndarray) -> float:
+    """
+    Estimate the entropy of a block from the frequency of its bytes.
+
+    :param data: The bytes of the block.
+    :return: The entropy in bits per byte, between 0 and 8.
+    """
+    if data.size == 0:
+        return 0.0
+    counts = np.bincount(data, minlength=256)
+    probabilities = counts[counts > 0] / data.size
+    return float(-(probabilities * np.log2(probabilities)).sum())
+
+
+def encode_rle(elements: np.ndarray) -> bytes:
+    """
+    Run-length encode elements.
+
+    :param elements: The elements, as unsigned integers.
+    :return: The payload.
+    """
+    element_bytes = elements.astype(elements.dtype.newbyteorder("<")).tobytes()
+    size = elements.itemsize
+    # Start and length of the runs of equal elements
+    starts = np.flatnonzero(np.diff(elements) != 0) + 1
+    starts = np.concatenate(([0], starts))
+    lengths = np.diff(np.concatenate((starts, [elements.size])))
+
+    payload = bytearray()
+    literal_start = 0
+    literal_end = 0
+
+    def flush_literals(start, end):
+        while start < end:
+            count = min(end - start, RLE_MAX_LITERAL)
+            payload.append(count - 1)
+            payload.extend(element_bytes[start * size : (start + count) * size])
+            start += count
+
+    for start, length in zip(starts.tolist(), lengths.tolist()):
+        if length < 2:
+            literal_end = start + length
+            continue
+        flush_literals(literal_start, literal_end)
+        while length >= 2:
+            count = min(length, RLE_MAX_REPEAT)
+            payload.append(0x80 + count - 2)
+            payload.extend(element_bytes[start * size : (start + 1) * size])
+            start += count
+            length -= count
+        # A single remaining element starts the next literals
+        literal_start = start
+        literal_end = start + length
+    flush_literals(literal_start, literal_end)
+    return bytes(payload)
+
+
+def encode_delta(elements: np.ndarray):
+    """
+    Delta encode elements of 2 or 4 bytes, if the differences fit in 8 or 16 bits.
+
+    :param elements: The elements, as unsigned integers.
+    :return: The codec and the payload, or None if the differences are too large.
+    """
+    size = elements.itemsize
+    bits = 8 * size
+    differences = np.diff(elements.astype(np.int64)) % (1 << bits)
+    differences = np.where(
+        differences >= (1 << (bits - 1)), differences - (1 << bits), differences
+    )
+    first = int(elements[0]).to_bytes(size, "little")
+    if differences.size == 0 or np.abs(differences).max() < 0x80:
+        return CODEC_DELTA8, first + differences.astype("<i1").tobytes()
+    if size == 4 and np.abs(differences).max() < 0x8000:
+        return CODEC_DELTA16, first + differences.astype("<i2").tobytes()
+    return None
+
+
+def encode_block(data: np.ndarray, element_size: int):
+    """
+    Encode a block with the codec giving the smallest payload.
+
+    :param data: The bytes of the block, a multiple of element_size.
+    :param element_size: The size of the elements of the dataset (1, 2 or 4 bytes).
+    :return: The codec and the payload.
+    """
+    best = (CODEC_RAW, data.tobytes())
+    if entropy_bits(data) > RAW_ENTROPY_BITS:
+        return best
+
+    elements = data.view(np.dtype(UNSIGNED_TYPES[element_size]).newbyteorder("<"))
+    candidates = [(CODEC_RLE, encode_rle(elements))]
+    if element_size > 1:
+        delta = encode_delta(elements)
+        if delta is not None:
+            candidates.append(delta)
+    for codec, payload in candidates:
+        if len(payload) < len(best[1]):
+            best = (codec, payload)
+    return best
+
+
+def compress(data, element_size: int = 1, block_size: int = BLOCK_SIZE) -> bytes:
+    """
+    Compress a dataset.
+
+    :param data: The bytes of the dataset, as bytes or as a NumPy array.
+    :param element_size: The size of the elements of the dataset (1, 2 or 4 bytes), which are
+        never split across blocks.
+    :param block_size: The size of the decoded blocks, a multiple of 4 up to 65532 bytes.
+    :return: The compressed stream, padded to 4 bytes.
+    """
+    if element_size not in UNSIGNED_TYPES:
+        raise ValueError("element_size must be 1, 2 or 4")
+    if block_size <= 0 or block_size % 4 != 0 or block_size > MAX_BLOCK_SIZE:
+        raise ValueError("block_size must be a multiple of 4 up to 65532")
+
+    if isinstance(data, np.ndarray):
+        data = np.ascontiguousarray(data).view(np.uint8).reshape(-1)
+    else:
+        data = np.frombuffer(data, dtype=np.uint8)
+    if data.size % element_size != 0:
+        raise ValueError("the dataset size must be a multiple of element_size")
+
+    chunks = [MAGIC, data.size.to_bytes(4, "little")]
+    for start in range(0, data.size, block_size):
+        block = data[start : start + block_size]
+        codec, payload = encode_block(block, element_size)
+        header = codec | (element_size << 8) | (block.size << 16)
+        chunks.append(header.to_bytes(4, "little"))
+        chunks.append(len(payload).to_bytes(4, "little"))
+        chunks.append(payload)
+        chunks.append(b"\0" * (-len(payload) % 4))
+    return b"".join(chunks)
+
+
+def decompress(stream: bytes) -> bytes:
+    """
+    Decode a compressed stream, as the target does.
+
+    :param stream: The compressed stream.
+    :return: The decoded dataset.
+    :raise ValueError: if the stream is corrupted.
+    """
+    if stream[:4] != MAGIC or len(stream) < 8:
+        raise ValueError("not a compressed stream")
+    size = int.from_bytes(stream[4:8], "little")
+    output = bytearray()
+    offset = 8
+    while offset < len(stream):
+        header = int.from_bytes(stream[offset : offset + 4], "little")
+        payload_size = int.from_bytes(stream[offset + 4 : offset + 8], "little")
+        codec, element_size, decoded = header & 0xFF, (header >> 8) & 0xFF, header >> 16
+        payload = stream[offset + 8 : offset + 8 + payload_size]
+        offset += 8 + payload_size + (-payload_size % 4)
+
+        if codec == CODEC_RAW:
+            block = payload
+        elif codec == CODEC_RLE:
+            block = bytearray()
+            position = 0
+            while len(block) < decoded:
+                control = payload[position]
+                position += 1
+                if control < 0x80:
+                    count = (control + 1) * element_size
+                    block += payload[position : position + count]
+                    position += count
+                else:
+                    block += payload[position : position + element_size] * (
+                        control - 0x80 + 2
+                    )
+                    position += element_size
+        elif codec in (CODEC_DELTA8, CODEC_DELTA16):
+            delta_type = "<i1" if codec == CODEC_DELTA8 else "<i2"
+            first = int.from_bytes(payload[:element_size], "little")
+            differences = np.frombuffer(payload[element_size:], dtype=delta_type)
+            values = first + np.concatenate(
+                ([0], np.cumsum(differences, dtype=np.int64))
+            )
+            block = (
+                (values % (1 << (8 * element_size)))
+                .astype(np.dtype(UNSIGNED_TYPES[element_size]).newbyteorder("<"))
+                .tobytes()
+            )
+        else:
+            raise ValueError(f"unknown codec {codec}")
+        if len(block) != decoded:
+            raise ValueError("corrupted block")
+        output += block
+
+    if len(output) != size:
+        raise ValueError("corrupted stream")
+    return bytes(output)
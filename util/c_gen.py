@@ -2,9 +2,101 @@
 # matrix, and the instruction stream.
 
 import os
+import re
 import sys
+import time
 import numpy as np
 
+import c_compress
+
+# Number of array elements formatted at once, which bounds the memory used to write large arrays
+CHUNK_ELEMENTS = 1 << 18
+
+# ASCII codes of the hexadecimal digits, indexed by their value
+HEX_DIGITS = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+HEX_DIGITS_UPPER = np.frombuffer(b"0123456789ABCDEF", dtype=np.uint8)
+
+# Indentation of the array elements
+INDENT = b"    "
+
+
+def format_hex_rows(
+    values: np.ndarray,
+    upper: bool = False,
+    line_start: bool = True,
+    line_end: bool = True,
+    final: bool = False,
+) -> bytes:
+    """
+    Format a 2-D array of unsigned integers as C hexadecimal literals with fixed-width NumPy
+    operations instead of formatting every element: each row becomes an indented line of
+    comma-separated values.
+
+    :param values: The unsigned values, one line per row.
+    :param upper: Use uppercase hexadecimal digits.
+    :param line_start: The rows start a line. False when continuing a row split in chunks.
+    :param line_end: The rows end a line. False when the next chunk continues the row.
+    :param final: The last row is the end of the array and has no trailing comma.
+    :return: The ASCII text of the rows.
+    """
+    rows, cols = values.shape
+    digits = values.dtype.itemsize * 2
+    cell = 2 + digits + 2
+    indent = len(INDENT) if line_start else 0
+
+    text = np.empty((rows, indent + cols * cell), dtype=np.uint8)
+    if indent:
+        text[:, :indent] = np.frombuffer(INDENT, dtype=np.uint8)
+    cells = text[:, indent:].reshape(rows, cols, cell)
+    cells[:, :, 0] = ord("0")
+    cells[:, :, 1] = ord("x")
+    shifts = np.arange(4 * (digits - 1), -1, -4).astype(values.dtype)
+    nibbles = (values[:, :, None] >> shifts) & 0xF
+    cells[:, :, 2 : 2 + digits] = (HEX_DIGITS_UPPER if upper else HEX_DIGITS)[nibbles]
+    cells[:, :, -2] = ord(",")
+    cells[:, :, -1] = ord(" ")
+    if line_end:
+        cells[:, -1, -1] = ord("\n")
+    text = text.reshape(-1)
+    if final:
+        # The last element of the array has no comma
+        text[-2] = ord("\n")
+        text = text[:-1]
+    return text.tobytes()
+
+
+def iter_hex_array(values: np.ndarray, upper: bool = False):
+    """
+    Format a 2-D array of unsigned integers as the lines of a C initializer, a chunk of at
+    most CHUNK_ELEMENTS elements at a time.
+
+    :param values: The unsigned values, one line per row.
+    :param upper: Use uppercase hexadecimal digits.
+    :return: A generator of the text chunks.
+    """
+    rows, cols = values.shape
+    if rows * cols == 0:
+        yield "\n"
+    elif cols <= CHUNK_ELEMENTS:
+        step = CHUNK_ELEMENTS // cols
+        for start in range(0, rows, step):
+            end = min(rows, start + step)
+            yield format_hex_rows(values[start:end], upper, final=end == rows).decode(
+                "ascii"
+            )
+    else:
+        # Rows longer than a chunk are split
+        for row in range(rows):
+            for start in range(0, cols, CHUNK_ELEMENTS):
+                end = min(cols, start + CHUNK_ELEMENTS)
+                yield format_hex_rows(
+                    values[row : row + 1, start:end],
+                    upper,
+                    line_start=start == 0,
+                    line_end=end == cols,
+                    final=end == cols and row == rows - 1,
+                ).decode("ascii")
+
 
 class CFileGen:
     """
@@ -19,6 +111,7 @@ class CFileGen:
         macros_hex (List[Tuple[str, str, Optional[str]]]): A list of string macros to include in the generated C file (e.g., hex values).
         macros_raw (List[Tuple[str, str, Optional[str]]]): A list of macros in raw format to include in the generated C file.
         attributes (List[str]): A list of C attributes to apply to the generated C arrays.
+        compression_block (int): The size of the decoded blocks of the compressed binaries and matrices, 0 if they are not compressed.
     """
 
     def __init__(self) -> None:
@@ -31,6 +124,8 @@ class CFileGen:
         self.macros_raw = []
         self.attributes = []
         self.storage_class = ""
+        self.compression_block = 0
+        self.compressed = {}
 
     # Add a new binary file
     def add_binary(
@@ -76,6 +171,14 @@ class CFileGen:
     def set_storage_class(self, value: str) -> None:
         self.storage_class = value.strip()
 
+    # Compress the binaries and matrices in blocks of block_size decoded bytes (see c_compress.py),
+    # to be decoded on the target with the decompress SDK. 0 disables the compression.
+    def set_compression(self, block_size: int = c_compress.BLOCK_SIZE) -> None:
+        if block_size != 0 and (block_size % 4 != 0 or not 0 < block_size <= 0xFFFF):
+            raise ValueError("block_size must be a multiple of 4 up to 65532")
+        self.compression_block = block_size
+        self.compressed = {}
+
     def format_array_decl(self, base_type: str, name: str) -> str:
         parts = []
         if self.storage_class:
@@ -93,6 +196,9 @@ class CFileGen:
             "int8": np.uint8,
             "int16": np.uint16,
             "int32": np.uint32,
+            "uint8": np.uint8,
+            "uint16": np.uint16,
+            "uint32": np.uint32,
         }[str(dtype)]
 
     # Convert numpy dtype to C type
@@ -106,35 +212,58 @@ class CFileGen:
             "uint32": "uint32_t",
         }[str(dtype)]
 
+    # Size of a binary file once padded, in bytes
+    def binary_size(self, file: str, prefix_pad: int = 0, suffix_pad: int = 0) -> int:
+        file_size = os.path.getsize(file) + prefix_pad + suffix_pad
+        # Pad data to 4-byte alignment (possibly zero padding)
+        return file_size + (-file_size % 4)
+
+    # Padded content of a binary file as 32-bit words, read chunk by chunk
+    def binary_words(self, file: str, prefix_pad: int = 0, suffix_pad: int = 0):
+        file_size = os.path.getsize(file)
+        total = self.binary_size(file, prefix_pad, suffix_pad)
+
+        chunk_bytes = 4 * CHUNK_ELEMENTS
+        with open(file, "rb") as f:
+            for start in range(0, total, chunk_bytes):
+                end = min(start + chunk_bytes, total)
+                chunk = np.zeros(end - start, dtype=np.uint8)
+                low = max(start, prefix_pad)
+                high = min(end, prefix_pad + file_size)
+                if low < high:
+                    f.seek(low - prefix_pad)
+                    f.readinto(chunk[low - start : high - start])
+                yield chunk.view("<u4")
+
+    # Format chunks of 32-bit words as a C array, one word per line
+    def iter_word_array(self, name: str, chunks, count: int):
+        declaration = self.format_array_decl("uint32_t", f"{name}[]")
+        yield f"{declaration} = {{\n"
+        remaining = count
+        if remaining == 0:
+            yield "\n"
+        for words in chunks:
+            remaining -= len(words)
+            yield format_hex_rows(
+                words.astype(np.uint32).reshape(-1, 1), upper=True, final=remaining == 0
+            ).decode("ascii")
+        yield "};\n"
+
+    # Format binary file content as C array, chunk by chunk
+    def iter_binary(
+        self, name: str, file: str, prefix_pad: int = 0, suffix_pad: int = 0
+    ):
+        yield from self.iter_word_array(
+            name,
+            self.binary_words(file, prefix_pad, suffix_pad),
+            self.binary_size(file, prefix_pad, suffix_pad) // 4,
+        )
+
     # Format binary file content as C array
     def format_binary(
         self, name: str, file: str, prefix_pad: int = 0, suffix_pad: int = 0
     ) -> str:
-        # Read binary file
-        with open(file, "rb") as f:
-            content = f.read()
-
-        if prefix_pad > 0:
-            content = (b"\x00" * prefix_pad) + content
-        if suffix_pad > 0:
-            content += b"\x00" * suffix_pad
-
-        # Pad data to 4-byte alignment (possibly zero padding)
-        data_len = len(content) // 4
-        if len(content) % 4 != 0:
-            data_len += 1
-            content += b"\x00" * (4 - (len(content) % 4))
-
-        # Write C data content
-        declaration = self.format_array_decl("uint32_t", f"{name}[]")
-        array_contents = f"{declaration} = {{\n"
-        for i in range(data_len):
-            element = int.from_bytes(content[i * 4 : (i + 1) * 4], byteorder="little")
-            array_contents += f"    0x{element:08X}"
-            if i != data_len - 1:
-                array_contents += ",\n"
-        array_contents += "\n};\n"
-        return array_contents
+        return "".join(self.iter_binary(name, file, prefix_pad, suffix_pad))
 
     # Format matrix size macros
     def format_matrix_size(self, matrix: np.ndarray, name: str) -> str:
@@ -148,32 +277,55 @@ class CFileGen:
         size_contents = f"#define {name.upper()}_SIZE {len(code)*4}\n"
         return size_contents
 
-    # Format matrix for C
-    def format_matrix(self, matrix: np.ndarray, name: str) -> str:
-        # Determine the number of bits based on the dtype
-        dtype: np.dtype = matrix.dtype
-        num_bits = dtype.itemsize * 8
-
-        array_ctype = self.dtype_to_ctype(dtype)
-        utype = self.signed2unsigned(dtype)
-        matrix = matrix.astype(utype)
-
-        # Convert the signed array to 2's complement hexadecimal values
-        rows = []
-        for row in matrix:
-            hex_values = [f"{element:#0{2+num_bits//4}x}" for element in row]
-            rows.append(hex_values)
+    # Matrix as unsigned values, one row per line of the C initializer
+    def matrix_rows(self, matrix: np.ndarray) -> np.ndarray:
+        utype = self.signed2unsigned(matrix.dtype)
+        # Reinterpret the signed values as their 2's complement, without copying the matrix
+        values = np.ascontiguousarray(matrix).view(utype)
+        return values.reshape(matrix.shape[0], -1)
 
-        # Format the matrix
+    # Format matrix for C, chunk by chunk
+    def iter_matrix(self, matrix: np.ndarray, name: str):
+        array_ctype = self.dtype_to_ctype(matrix.dtype)
         declaration = self.format_array_decl(array_ctype, f"{name} []")
-        matrix_contents = f"{declaration} = {{\n"
-        if len(rows) > 1:
-            matrix_contents += ",\n".join([f"    {', '.join(row)}" for row in rows])
-        else:
-            matrix_contents += f"    {', '.join(rows[0])}"
-        matrix_contents += "\n};\n\n"
+        yield f"{declaration} = {{\n"
+        yield from iter_hex_array(self.matrix_rows(matrix))
+        yield "};\n\n"
 
-        return matrix_contents
+    # Format matrix for C
+    def format_matrix(self, matrix: np.ndarray, name: str) -> str:
+        return "".join(self.iter_matrix(matrix, name))
+
+    # Compressed stream of a binary file or a matrix as 32-bit words, computed once. Binary files
+    # are compressed as 32-bit elements, matrices as elements of their type.
+    def compressed_words(self, name: str) -> np.ndarray:
+        if name not in self.compressed:
+            for binary in self.binaries:
+                if binary[0] == name:
+                    data = np.concatenate(
+                        [np.zeros(0, dtype="<u4")]
+                        + list(self.binary_words(*binary[1:]))
+                    )
+                    break
+            else:
+                matrix = dict(self.input_matrices + self.output_matrices)[name]
+                data = self.matrix_rows(matrix)
+            stream = c_compress.compress(data, data.itemsize, self.compression_block)
+            self.compressed[name] = np.frombuffer(stream, dtype="<u4")
+        return self.compressed[name]
+
+    # Compressed size macro
+    def format_compressed_size(self, name: str) -> str:
+        return f"#define {name.upper()}_COMPRESSED_SIZE {self.compressed_words(name).nbytes}\n"
+
+    # Format the compressed stream of a binary file or a matrix as a C array
+    def iter_compressed(self, name: str):
+        words = self.compressed_words(name)
+        chunks = (
+            words[start : start + CHUNK_ELEMENTS]
+            for start in range(0, len(words), CHUNK_ELEMENTS)
+        )
+        yield from self.iter_word_array(f"{name}_compressed", chunks, len(words))
 
     def format_code(self, code: str, name: str) -> str:
         # Format the array
@@ -188,129 +340,256 @@ class CFileGen:
         code_contents += "\n};\n"
         return code_contents
 
-    # Write the header file
-    def gen_header(self, header_macro: str = None) -> str:
+    # Name of the array holding a binary or a matrix
+    def data_name(self, name: str) -> str:
+        return f"{name}_compressed" if self.compression_block else name
+
+    # Generate the header file chunk by chunk, so that large arrays are never held as one string.
+    # In blob mode, the binaries and matrices are only declared, their content is written by
+    # write_blobs(). With compression, they are written as <name>_compressed arrays and their size
+    # macros give the decoded size.
+    def iter_header(self, header_macro: str = None, blob: bool = False):
         if header_macro is not None:
             # Header guard
-            header_contents = f"#ifndef {header_macro}\n#define {header_macro}\n\n"
+            yield f"#ifndef {header_macro}\n#define {header_macro}\n\n"
             # Include stdint.h
-            header_contents += "#include <stdint.h>\n\n"
+            yield "#include <stdint.h>\n\n"
 
         # Macros
         if len(self.macros) > 0 or len(self.macros_hex) > 0 or len(self.macros_raw) > 0:
-            header_contents += "// Macros\n"
-            header_contents += "// ------\n"
+            yield "// Macros\n"
+            yield "// ------\n"
         for name, value, comment in self.macros:
-            header_contents += f"#define {name.upper()} {value}"
+            yield f"#define {name.upper()} {value}"
             if comment is not None:
-                header_contents += f" // {comment}\n"
+                yield f" // {comment}\n"
             else:
-                header_contents += "\n"
+                yield "\n"
         for name, value, comment in self.macros_hex:
-            header_contents += f"#define {name.upper()} 0x{value:08X}"
+            yield f"#define {name.upper()} 0x{value:08X}"
             if comment is not None:
-                header_contents += f" // {comment}\n"
+                yield f" // {comment}\n"
             else:
-                header_contents += "\n"
+                yield "\n"
         for name in self.macros_raw:
-            header_contents += name
+            yield name
         if len(self.macros) > 0 or len(self.macros_hex) > 0 or len(self.macros_raw) > 0:
-            header_contents += "\n"
+            yield "\n"
 
         # Macros with array sizes
         if len(self.binaries) > 0:
-            header_contents += "// Binary size\n"
-            header_contents += "// -----------\n"
+            yield "// Binary size\n"
+            yield "// -----------\n"
             for name, file, prefix_pad, suffix_pad in self.binaries:
-                file_size = os.path.getsize(file) + prefix_pad + suffix_pad
-                if file_size % 4 != 0:
-                    file_size += 4 - (file_size % 4)
-                header_contents += f"#define {name.upper()}_SIZE {file_size}\n"
-            header_contents += "\n"
+                file_size = self.binary_size(file, prefix_pad, suffix_pad)
+                yield f"#define {name.upper()}_SIZE {file_size}\n"
+                if self.compression_block:
+                    yield self.format_compressed_size(name)
+            yield "\n"
 
         if len(self.input_matrices) > 0:
-            header_contents += "// Input matrix size\n"
+            yield "// Input matrix size\n"
             for name, matrix in self.input_matrices:
-                header_contents += self.format_matrix_size(matrix, name)
-            header_contents += "\n"
+                yield self.format_matrix_size(matrix, name)
+                if self.compression_block:
+                    yield self.format_compressed_size(name)
+            yield "\n"
 
         if len(self.output_matrices) > 0:
-            header_contents += "// Output matrix size\n"
+            yield "// Output matrix size\n"
             for name, matrix in self.output_matrices:
-                header_contents += self.format_matrix_size(matrix, name)
-            header_contents += "\n"
+                yield self.format_matrix_size(matrix, name)
+                if self.compression_block:
+                    yield self.format_compressed_size(name)
+            yield "\n"
 
         if len(self.codes) > 0:
-            header_contents += "// Code size\n"
+            yield "// Code size\n"
             for name, code in self.codes:
-                header_contents += self.format_code_size(code, name)
-            header_contents += "\n"
+                yield self.format_code_size(code, name)
+            yield "\n"
 
         # Write binary files
         if len(self.binaries) > 0:
-            header_contents += "// Binary files\n"
-            header_contents += "// ------------\n"
+            yield "// Binary files\n"
+            yield "// ------------\n"
             for name, file, prefix_pad, suffix_pad in self.binaries:
-                header_contents += self.format_binary(
-                    name, file, prefix_pad, suffix_pad
-                )
-            header_contents += "\n"
+                if blob:
+                    yield f"extern uint32_t {self.data_name(name)}[];\n"
+                elif self.compression_block:
+                    yield from self.iter_compressed(name)
+                else:
+                    yield from self.iter_binary(name, file, prefix_pad, suffix_pad)
+            yield "\n"
 
         # Write code arrays
         if len(self.codes) > 0:
-            header_contents += "// Code\n"
-            header_contents += "// ----\n"
+            yield "// Code\n"
+            yield "// ----\n"
             for name, code in self.codes:
-                header_contents += self.format_code(code, name)
-            header_contents += "\n"
-
-        # Write input matrices
-        if len(self.input_matrices) > 0:
-            header_contents += "// Input matrices\n"
-            header_contents += "// --------------\n"
-            for name, matrix in self.input_matrices:
-                header_contents += self.format_matrix(matrix, name)
-
-        # Write output matrices
-        if len(self.output_matrices) > 0:
-            header_contents += "// Output matrices\n"
-            header_contents += "// ---------------\n"
-            for name, matrix in self.output_matrices:
-                header_contents += self.format_matrix(matrix, name)
+                yield self.format_code(code, name)
+            yield "\n"
+
+        # Write input and output matrices
+        for title, matrices in [
+            ("Input matrices", self.input_matrices),
+            ("Output matrices", self.output_matrices),
+        ]:
+            if len(matrices) > 0:
+                yield f"// {title}\n"
+                yield f"// {'-' * len(title)}\n"
+            for name, matrix in matrices:
+                if blob and self.compression_block:
+                    yield f"extern uint32_t {self.data_name(name)}[];\n"
+                elif blob:
+                    yield f"extern {self.dtype_to_ctype(matrix.dtype)} {name}[];\n"
+                elif self.compression_block:
+                    yield from self.iter_compressed(name)
+                    yield "\n"
+                else:
+                    yield from self.iter_matrix(matrix, name)
+            if blob and len(matrices) > 0:
+                yield "\n"
 
         if header_macro is not None:
-            header_contents += f"#endif // {header_macro}\n"
+            yield f"#endif // {header_macro}\n"
 
-        # Return the header contents
-        return header_contents
+    # Write the header file
+    def gen_header(self, header_macro: str = None) -> str:
+        return "".join(self.iter_header(header_macro))
+
+    # Section and alignment of the blobs, from the section() and aligned() attributes. Without
+    # section attribute, the blobs go to .data like the C arrays.
+    def blob_section(self, name: str):
+        section = f".data.{name}"
+        alignment = 4
+        for attribute in self.attributes:
+            match = re.fullmatch(r'\s*section\s*\(\s*"([^"]+)"\s*\)\s*', attribute)
+            if match:
+                section = match.group(1)
+            match = re.fullmatch(r"\s*aligned\s*\(\s*(\w+)\s*\)\s*", attribute)
+            if match:
+                alignment = max(alignment, int(match.group(1), 0))
+        return section, alignment
+
+    # Write the content of the binaries and matrices as raw little-endian files, and an assembly
+    # file including them with .incbin in their linker sections. The assembly file must be built
+    # with the application, with the directory of the blobs in the include path (e.g. both in the
+    # application folder).
+    def write_blobs(self, directory: str, asm_name: str) -> None:
+        blobs = []
+        for name, file, prefix_pad, suffix_pad in self.binaries:
+            blob_name = f"{name}_blob.bin"
+            with open(os.path.join(directory, blob_name), "wb") as blob_file:
+                if self.compression_block:
+                    self.compressed_words(name).tofile(blob_file)
+                else:
+                    for words in self.binary_words(file, prefix_pad, suffix_pad):
+                        words.tofile(blob_file)
+            blobs.append((self.data_name(name), blob_name))
+        for name, matrix in self.input_matrices + self.output_matrices:
+            blob_name = f"{name}_blob.bin"
+            if self.compression_block:
+                self.compressed_words(name).tofile(os.path.join(directory, blob_name))
+            else:
+                values = self.matrix_rows(matrix)
+                values.astype(values.dtype.newbyteorder("<"), copy=False).tofile(
+                    os.path.join(directory, blob_name)
+                )
+            blobs.append((self.data_name(name), blob_name))
+
+        with open(os.path.join(directory, asm_name), "w") as asm_file:
+            asm_file.write("/* Data included by util/c_gen.py */\n")
+            for name, blob_name in blobs:
+                section, alignment = self.blob_section(name)
+                asm_file.write(
+                    f'\n    .section {section}, "aw", @progbits\n'
+                    f"    .balign {alignment}\n"
+                    f"    .global {name}\n"
+                    f"    .type {name}, @object\n"
+                    f"{name}:\n"
+                    f'    .incbin "{blob_name}"\n'
+                    f"    .size {name}, . - {name}\n"
+                )
 
-    def write_header(self, directory: str, file_name: str) -> None:
+    def write_header(self, directory: str, file_name: str, blob: bool = False) -> None:
         # Header file path
         header_path = os.path.join(directory, file_name)
         header_base = os.path.basename(header_path)
         header_macro = header_base.upper().replace(".", "_") + "_"
 
-        # Generate header
-        header_contents = self.gen_header(header_macro)
-
-        # Write header file
+        # Generate and write the header file, chunk by chunk
         with open(header_path, "w") as header_file:
-            header_file.write(header_contents)
+            for chunk in self.iter_header(header_macro, blob):
+                header_file.write(chunk)
 
-    def append_header(self, file, header_macro: str = None):
-        # Generate header
-        header_contents = self.gen_header(header_macro)
+        # In blob mode, the data goes to <name>_blob.bin files included by <header>.S
+        if blob:
+            self.write_blobs(directory, os.path.splitext(header_base)[0] + ".S")
 
-        # Write header file
-        file.write(header_contents)
+    def append_header(self, file, header_macro: str = None):
+        # Generate and write the header, chunk by chunk
+        for chunk in self.iter_header(header_macro):
+            file.write(chunk)
+
+
+# Generate a dataset of size_mib MiB as a binary file and as a matrix, in C arrays and in blob
+# mode, and print the time and the peak memory of every generation
+def benchmark(size_mib: int = 64) -> None:
+    import tempfile
+    import tracemalloc
+
+    rng = np.random.default_rng(0)
+    matrix = rng.integers(
+        -(2**31), 2**31, size=(size_mib * 256, 1024), dtype=np.int64
+    ).astype(np.int32)
+
+    with tempfile.TemporaryDirectory() as directory:
+        bin_path = os.path.join(directory, "dataset.bin")
+        matrix.tofile(bin_path)
+
+        print(f"Generating a {size_mib} MiB dataset in {directory}")
+        for kind in ["binary", "matrix"]:
+            for blob in [False, True]:
+                header_gen = CFileGen()
+                if kind == "binary":
+                    header_gen.add_binary("dataset", bin_path)
+                else:
+                    header_gen.add_input_matrix("dataset", matrix)
+
+                tracemalloc.start()
+                start = time.perf_counter()
+                header_gen.write_header(directory, "dataset.h", blob)
+                elapsed = time.perf_counter() - start
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+                written = sum(
+                    os.path.getsize(os.path.join(directory, name))
+                    for name in os.listdir(directory)
+                    if name.startswith("dataset") and name != "dataset.bin"
+                )
+                print(
+                    f"  {kind:6} {'blob' if blob else 'C array':7}: {elapsed:6.2f} s, "
+                    f"{written / 2**20:6.1f} MiB written, {peak / 2**20:6.1f} MiB peak memory"
+                )
+                for name in os.listdir(directory):
+                    if name != "dataset.bin":
+                        os.remove(os.path.join(directory, name))
 
 
 # When launched as a standalone script, convert a binary file (e.g., compiled firmware) into a C header
 if __name__ == "__main__":
+    # Benchmark the generation of a large dataset
+    if len(sys.argv) > 1 and sys.argv[1] == "--benchmark":
+        benchmark(int(sys.argv[2], 0) if len(sys.argv) > 2 else 64)
+        sys.exit(0)
+
     # Check the number of arguments
     if len(sys.argv) < 3:
         print(
-            "Usage: python c_gen.py <header_file> <bin_file> [--prefix-pad <bytes>] [--prefix-pad=<bytes>] [--suffix-pad <bytes>] [--suffix-pad=<bytes>] [--static] [--attribute <attr>] [--attribute=<attr>] [<src_file> ...]"
+            "Usage: python c_gen.py <header_file> <bin_file> [--prefix-pad <bytes>] [--prefix-pad=<bytes>] [--suffix-pad <bytes>] [--suffix-pad=<bytes>] [--static] [--attribute <attr>] [--attribute=<attr>] [--blob] [--compress] [--compress=<block bytes>] [<src_file> ...]\n"
+            "       python c_gen.py --benchmark [<MiB>]"
         )
         sys.exit(1)
 
@@ -322,6 +601,8 @@ if __name__ == "__main__":
     storage_class = ""
     src_files = []
     suffix_pad = 0
+    blob = False
+    compression_block = 0
 
     # Parse optional arguments
     remaining_args = sys.argv[3:]
@@ -374,6 +655,17 @@ if __name__ == "__main__":
             i += 1
         elif arg == "--static":
             storage_class = "static"
+        elif arg == "--blob":
+            blob = True
+        elif arg == "--compress":
+            compression_block = c_compress.BLOCK_SIZE
+        elif arg.startswith("--compress="):
+            value = arg.split("=", 1)[1]
+            try:
+                compression_block = int(value, 0)
+            except ValueError:
+                print(f"Invalid value for --compress: '{value}'")
+                sys.exit(1)
         else:
             src_files.append(arg)
         i += 1
@@ -396,6 +688,12 @@ if __name__ == "__main__":
         header_gen.set_storage_class(storage_class)
     for attribute in attributes:
         header_gen.add_attribute(attribute)
+    if compression_block:
+        try:
+            header_gen.set_compression(compression_block)
+        except ValueError as error:
+            print(f"Invalid value for --compress: {error}")
+            sys.exit(1)
     header_gen.add_binary(header_name, bin_file, prefix_pad, suffix_pad)
 
     # Extract #define's from source file (e.g., the file that the firmware was compiled from)
@@ -405,4 +703,4 @@ if __name__ == "__main__":
 
     # Write header file
     print(f"Writing header file '{os.path.join(out_dir, header_file)}'...")
-    header_gen.write_header(out_dir, header_file)
+    header_gen.write_header(out_dir, header_file, blob)
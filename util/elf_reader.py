@@ -0,0 +1,470 @@
+# Copyright 2026 EPFL
+# Licensed under the Apache License, Version 2.0, see LICENSE for details.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Description: Dependency-free ELF reader, used instead of readelf/objcopy by the X-HEEP scripts
+#   (mem_usage.py, gen_rom.py, the test runners). It reads the section headers, the program
+#   headers and the symbol table directly from a memory-mapped file. ELF32 is the X-HEEP target
+#   format; ELF64 files are also accepted so that host binaries can be inspected.
+
+import mmap
+import struct
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+ELF_MAGIC = b"\x7fELF"
+
+# e_ident fields
+_EI_CLASS = 4
+_EI_DATA = 5
+_ELFCLASS32 = 1
+_ELFCLASS64 = 2
+_ELFDATA2LSB = 1
+_ELFDATA2MSB = 2
+
+# Special section indices
+SHN_UNDEF = 0
+SHN_ABS = 0xFFF1
+
+# Section types
+SHT_SYMTAB = 2
+SHT_NOBITS = 8
+SHT_DYNSYM = 11
+
+SECTION_TYPES = {
+    0: "NULL",
+    1: "PROGBITS",
+    2: "SYMTAB",
+    3: "STRTAB",
+    4: "RELA",
+    5: "HASH",
+    6: "DYNAMIC",
+    7: "NOTE",
+    8: "NOBITS",
+    9: "REL",
+    11: "DYNSYM",
+    14: "INIT_ARRAY",
+    15: "FINI_ARRAY",
+    16: "PREINIT_ARRAY",
+    17: "GROUP",
+    18: "SYMTAB_SHNDX",
+    0x6FFFFFF6: "GNU_HASH",
+    0x6FFFFFFD: "VERDEF",
+    0x6FFFFFFE: "VERNEED",
+    0x6FFFFFFF: "VERSYM",
+    0x70000003: "RISCV_ATTRIBUTES",
+}
+"""Names of the section types, as printed by readelf."""
+
+# Section flags, with the letter readelf uses for each of them
+SHF_WRITE = 0x1
+SHF_ALLOC = 0x2
+SHF_EXECINSTR = 0x4
+_SECTION_FLAG_LETTERS = [
+    (SHF_WRITE, "W"),
+    (SHF_ALLOC, "A"),
+    (SHF_EXECINSTR, "X"),
+    (0x10, "M"),
+    (0x20, "S"),
+    (0x40, "I"),
+    (0x80, "L"),
+    (0x100, "O"),
+    (0x200, "G"),
+    (0x400, "T"),
+]
+
+# Program header types and flags
+PT_LOAD = 1
+SEGMENT_TYPES = {
+    0: "NULL",
+    1: "LOAD",
+    2: "DYNAMIC",
+    3: "INTERP",
+    4: "NOTE",
+    6: "PHDR",
+    7: "TLS",
+    0x70000003: "RISCV_ATTRIBUTES",
+}
+"""Names of the program header types, as printed by readelf."""
+
+PF_X = 0x1
+PF_W = 0x2
+PF_R = 0x4
+
+SYMBOL_TYPES = {0: "NOTYPE", 1: "OBJECT", 2: "FUNC", 3: "SECTION", 4: "FILE", 6: "TLS"}
+"""Names of the symbol types, as printed by readelf."""
+
+SYMBOL_BINDS = {0: "LOCAL", 1: "GLOBAL", 2: "WEAK"}
+"""Names of the symbol bindings, as printed by readelf."""
+
+
+class ElfSection(NamedTuple):
+    """
+    A section header.
+    """
+
+    index: int
+    name: str
+    type: int
+    flags: int
+    address: int
+    offset: int
+    size: int
+    link: int
+    info: int
+    align: int
+    entsize: int
+
+    def type_name(self) -> str:
+        """
+        :return: the name of the section type (e.g. PROGBITS).
+        :rtype: str
+        """
+        return SECTION_TYPES.get(self.type, f"{self.type:#x}")
+
+    def flags_str(self) -> str:
+        """
+        :return: the flags of the section as readelf letters (e.g. WA).
+        :rtype: str
+        """
+        return "".join(
+            letter for flag, letter in _SECTION_FLAG_LETTERS if self.flags & flag
+        )
+
+    def is_alloc(self) -> bool:
+        """
+        :return: `True` if the section occupies memory at run time.
+        :rtype: bool
+        """
+        return bool(self.flags & SHF_ALLOC)
+
+    def end(self) -> int:
+        """
+        :return: the address following the section.
+        :rtype: int
+        """
+        return self.address + self.size
+
+
+class ElfSegment(NamedTuple):
+    """
+    A program header.
+    """
+
+    type: int
+    offset: int
+    vaddr: int
+    paddr: int
+    filesz: int
+    memsz: int
+    flags: int
+    align: int
+
+    def type_name(self) -> str:
+        """
+        :return: the name of the segment type (e.g. LOAD).
+        :rtype: str
+        """
+        return SEGMENT_TYPES.get(self.type, f"{self.type:#x}")
+
+    def flags_str(self) -> str:
+        """
+        :return: the flags of the segment as readelf letters (e.g. RWE).
+        :rtype: str
+        """
+        return (
+            ("R" if self.flags & PF_R else "")
+            + ("W" if self.flags & PF_W else "")
+            + ("E" if self.flags & PF_X else "")
+        )
+
+
+class ElfSymbol(NamedTuple):
+    """
+    An entry of the symbol table.
+    """
+
+    name: str
+    value: int
+    size: int
+    type: str
+    bind: str
+    section_index: int
+
+
+class ElfFile:
+    """
+    Read-only view of an ELF file. Headers are decoded lazily and cached, the file content is
+    memory-mapped and never copied unless a section is read.
+
+    Can be used as a context manager to release the file.
+
+    :param str path: the ELF file.
+    :raise FileNotFoundError: if the file does not exist.
+    :raise ValueError: if the file is not a valid ELF file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as file:
+            try:
+                self._data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files cannot be mapped
+                raise ValueError(f"{path} is not an ELF file") from None
+
+        if len(self._data) < 16 or self._data[:4] != ELF_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not an ELF file")
+
+        elf_class = self._data[_EI_CLASS]
+        endianness = self._data[_EI_DATA]
+        if elf_class not in (_ELFCLASS32, _ELFCLASS64) or endianness not in (
+            _ELFDATA2LSB,
+            _ELFDATA2MSB,
+        ):
+            self.close()
+            raise ValueError(f"{path} has an unsupported ELF class or data encoding")
+
+        self.is_64 = elf_class == _ELFCLASS64
+        e = "<" if endianness == _ELFDATA2LSB else ">"
+        if self.is_64:
+            self._ehdr = struct.Struct(e + "HHIQQQIHHHHHH")
+            self._shdr = struct.Struct(e + "IIQQQQIIQQ")
+            self._phdr = struct.Struct(e + "IIQQQQQQ")
+            self._sym = struct.Struct(e + "IBBHQQ")
+        else:
+            self._ehdr = struct.Struct(e + "HHIIIIIHHHHHH")
+            self._shdr = struct.Struct(e + "IIIIIIIIII")
+            self._phdr = struct.Struct(e + "IIIIIIII")
+            self._sym = struct.Struct(e + "IIIBBH")
+
+        try:
+            (
+                self.type,
+                self.machine,
+                _,
+                self.entry,
+                self._phoff,
+                self._shoff,
+                self.flags,
+                _,
+                self._phentsize,
+                self._phnum,
+                self._shentsize,
+                self._shnum,
+                self._shstrndx,
+            ) = self._ehdr.unpack_from(self._data, 16)
+        except struct.error:
+            self.close()
+            raise ValueError(f"{path} has a truncated ELF header") from None
+
+        self._sections: Optional[List[ElfSection]] = None
+        self._segments: Optional[List[ElfSegment]] = None
+        self._symbols: Optional[List[ElfSymbol]] = None
+
+    def __enter__(self) -> "ElfFile":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """
+        Releases the memory-mapped file. The headers already read stay available.
+        """
+        if self._data is not None:
+            self._data.close()
+            self._data = None
+
+    def _string(self, table_offset: int, index: int) -> str:
+        start = table_offset + index
+        end = self._data.find(b"\0", start)
+        return self._data[start:end].decode("utf-8", errors="replace")
+
+    def sections(self) -> List[ElfSection]:
+        """
+        :return: all the section headers, in file order.
+        :rtype: List[ElfSection]
+        """
+        if self._sections is None:
+            raw = []
+            for i in range(self._shnum if self._shoff else 0):
+                fields = self._shdr.unpack_from(
+                    self._data, self._shoff + i * self._shentsize
+                )
+                raw.append(fields)
+
+            names_offset = raw[self._shstrndx][4] if self._shstrndx < len(raw) else None
+            self._sections = []
+            for i, (
+                name,
+                typ,
+                flags,
+                addr,
+                off,
+                size,
+                link,
+                info,
+                align,
+                entsize,
+            ) in enumerate(raw):
+                self._sections.append(
+                    ElfSection(
+                        i,
+                        (
+                            self._string(names_offset, name)
+                            if names_offset is not None
+                            else ""
+                        ),
+                        typ,
+                        flags,
+                        addr,
+                        off,
+                        size,
+                        link,
+                        info,
+                        align,
+                        entsize,
+                    )
+                )
+        return self._sections
+
+    def section(self, name: str) -> Optional[ElfSection]:
+        """
+        :param str name: the name of the section (e.g. .text).
+        :return: the first section with this name, or None.
+        :rtype: Optional[ElfSection]
+        """
+        return next((s for s in self.sections() if s.name == name), None)
+
+    def alloc_sections(self) -> List[ElfSection]:
+        """
+        :return: the non-empty sections that occupy memory at run time, sorted by address.
+        :rtype: List[ElfSection]
+        """
+        return sorted(
+            (s for s in self.sections() if s.is_alloc() and s.size > 0),
+            key=lambda s: s.address,
+        )
+
+    def section_data(self, section: ElfSection) -> bytes:
+        """
+        :param ElfSection section: a section of this file.
+        :return: the content of the section, zeros for sections without content in the file (.bss).
+        :rtype: bytes
+        """
+        if section.type == SHT_NOBITS:
+            return bytes(section.size)
+        return self._data[section.offset : section.offset + section.size]
+
+    def segments(self) -> List[ElfSegment]:
+        """
+        :return: all the program headers, in file order.
+        :rtype: List[ElfSegment]
+        """
+        if self._segments is None:
+            self._segments = []
+            for i in range(self._phnum if self._phoff else 0):
+                fields = self._phdr.unpack_from(
+                    self._data, self._phoff + i * self._phentsize
+                )
+                if self.is_64:
+                    typ, flags, off, vaddr, paddr, filesz, memsz, align = fields
+                else:
+                    typ, off, vaddr, paddr, filesz, memsz, flags, align = fields
+                self._segments.append(
+                    ElfSegment(typ, off, vaddr, paddr, filesz, memsz, flags, align)
+                )
+        return self._segments
+
+    def load_segments(self) -> List[ElfSegment]:
+        """
+        :return: the LOAD program headers.
+        :rtype: List[ElfSegment]
+        """
+        return [s for s in self.segments() if s.type == PT_LOAD]
+
+    def symbols(self) -> List[ElfSymbol]:
+        """
+        :return: the entries of the symbol table (.symtab, or .dynsym if the file is stripped).
+        :rtype: List[ElfSymbol]
+        """
+        if self._symbols is None:
+            sections = self.sections()
+            table = next((s for s in sections if s.type == SHT_SYMTAB), None)
+            if table is None:
+                table = next((s for s in sections if s.type == SHT_DYNSYM), None)
+
+            self._symbols = []
+            if table is not None and table.entsize > 0:
+                strtab = sections[table.link].offset
+                for offset in range(
+                    table.offset, table.offset + table.size, table.entsize
+                ):
+                    fields = self._sym.unpack_from(self._data, offset)
+                    if self.is_64:
+                        name, info, _, shndx, value, size = fields
+                    else:
+                        name, value, size, info, _, shndx = fields
+                    self._symbols.append(
+                        ElfSymbol(
+                            self._string(strtab, name),
+                            value,
+                            size,
+                            SYMBOL_TYPES.get(info & 0xF, str(info & 0xF)),
+                            SYMBOL_BINDS.get(info >> 4, str(info >> 4)),
+                            shndx,
+                        )
+                    )
+        return self._symbols
+
+    def symbol_map(self, types=("OBJECT", "FUNC")) -> Dict[str, ElfSymbol]:
+        """
+        :param types: the symbol types to keep.
+        :return: the defined symbols of the given types, by name. Global symbols win over local ones with the same name.
+        :rtype: Dict[str, ElfSymbol]
+        """
+        symbols = {}
+        for sym in self.symbols():
+            if sym.type not in types or sym.section_index == SHN_UNDEF or not sym.name:
+                continue
+            if sym.name not in symbols or sym.bind != "LOCAL":
+                symbols[sym.name] = sym
+        return symbols
+
+    def load_address(self, section: ElfSection) -> int:
+        """
+        :param ElfSection section: a section of this file.
+        :return: the physical (load) address of the section, which differs from its address when it is copied at boot (e.g. .data loaded from flash).
+        :rtype: int
+        """
+        for seg in self.load_segments():
+            if (
+                section.type != SHT_NOBITS
+                and seg.offset <= section.offset < seg.offset + seg.filesz
+            ):
+                return seg.paddr + section.offset - seg.offset
+        return section.address
+
+    def binary_image(self) -> Tuple[int, bytes]:
+        """
+        Flattens the content of the allocated sections at their load addresses, like
+        ``objcopy -O binary`` does.
+
+        :return: the load address of the first byte and the image.
+        :rtype: Tuple[int, bytes]
+        """
+        sections = [
+            (self.load_address(s), s)
+            for s in self.alloc_sections()
+            if s.type != SHT_NOBITS
+        ]
+        if not sections:
+            return 0, b""
+
+        base = min(lma for lma, _ in sections)
+        image = bytearray(max(lma + s.size for lma, s in sections) - base)
+        for lma, s in sections:
+            start = lma - base
+            image[start : start + s.size] = self.section_data(s)
+        return base, bytes(image)
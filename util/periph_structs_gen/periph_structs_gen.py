@@ -3,6 +3,11 @@ from math import ceil
 import string
 import argparse
 import sys
+import os
+import re
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
 from datetime import date
 
 ############################################################
@@ -44,6 +49,20 @@ line_comment_end = "*/"
 struct_comment = "Structure used for bit access"
 word_comment = "Type used for word access"
 
+# DMA definitions #
+dma_peri_define = "#define dma_peri ((volatile dma *) DMA_START_ADDRESS)"
+dma_channel_peri_define = "#define dma_peri(channel) ((volatile dma *) (DMA_START_ADDRESS + DMA_CH_SIZE * channel))"
+
+# Generation date in the headers, ignored when comparing a header with its previous version #
+date_regex = re.compile(
+    r"^(\*\* date     : |\* @date   )\d{2}/\d{2}/\d{4}", re.MULTILINE
+)
+
+# BATCH MODE definitions #
+batch_dirs = ["hw/ip", "hw/vendor"]  # searched for register descriptions
+batch_output_dir = "sw/device/lib/drivers"  # where the headers are generated
+manifest_version = 2  # bump it to invalidate every existing manifest
+
 
 def read_hjson(hjson_file):
     """
@@ -95,6 +114,27 @@ def write_output(out_file, out_string):
         f.write(out_string)
 
 
+def write_if_changed(out_file, out_string):
+    """
+    Writes the final out_string into the specified out_file, unless the file already has the
+    same content apart from the generation date. Its modification time is then preserved, so the
+    sources including it are not recompiled.
+    :param out_file: path of the file to write
+    :param out_string: content to write
+    :return: True if the file was written
+    """
+    try:
+        with open(out_file) as f:
+            previous = f.read()
+        if date_regex.sub(r"\1", previous) == date_regex.sub(r"\1", out_string):
+            return False
+    except FileNotFoundError:
+        pass
+
+    write_output(out_file, out_string)
+    return True
+
+
 def generate_enum(enum_field, name):
     """
     Generates an enum with the values specified.
@@ -403,10 +443,7 @@ def format_dma_channels(file_path):
             content = file.read()
 
         # Replace 'DMA_START_ADDRESS' with 'new_address'
-        updated_content = content.replace(
-            "#define dma_peri ((volatile dma *) DMA_START_ADDRESS)",
-            "#define dma_peri(channel) ((volatile dma *) (DMA_START_ADDRESS + DMA_CH_SIZE * channel))",
-        )
+        updated_content = content.replace(dma_peri_define, dma_channel_peri_define)
 
         # Write the updated content back to the file
         with open(file_path, "w") as file:
@@ -418,6 +455,244 @@ def format_dma_channels(file_path):
         print(f"An error occurred: {str(e)}")
 
 
+def generate_header(data, template_filename, header_filename):
+    """
+    Generates the structs and enums of a peripheral and formats them using the template.
+    :param data: content of the hjson file describing the registers of the peripheral
+    :param template_filename: filename of the template
+    :param header_filename: name of the file in which register addresses are found
+    :return: the string containing the content of the header
+    """
+    # Two strings used to store all the structs and enums #
+    structs_definitions = "typedef struct {\n"  # used to store all the struct definitions to write in the template in the end
+    enums_definitions = ""  # used to store all the enums definitions, if present
+
+    # START OF THE GENERATION #
+
+    reg_structs, reg_enums = add_registers(data)
+    structs_definitions += reg_structs
+    enums_definitions += reg_enums
+
+    structs_definitions += "}} {};".format(data["name"])
+
+    final_output = write_template(
+        template_filename,
+        structs_definitions,
+        enums_definitions,
+        data["name"],
+        header_filename,
+    )
+
+    # The DMA registers are replicated for every channel
+    if data["name"].lower() == "dma":
+        final_output = final_output.replace(dma_peri_define, dma_channel_peri_define)
+
+    return final_output
+
+
+def find_descriptions(dirs):
+    """
+    Finds the hjson files describing the registers of a peripheral.
+    :param dirs: list of the directories to search, recursively
+    :return: the sorted list of the paths of the register descriptions
+    """
+    descriptions = []
+    for top in dirs:
+        for root, subdirs, files in os.walk(top):
+            subdirs[:] = [d for d in subdirs if not d.startswith(".")]
+            for name in files:
+                # Skip the vendoring descriptions, which are hjson files as well
+                if not name.endswith(".hjson") or name.endswith(
+                    (".vendor.hjson", ".lock.hjson")
+                ):
+                    continue
+                path = os.path.join(root, name)
+                with open(path, errors="replace") as f:
+                    text = f.read()
+                if "regwidth" in text and "registers" in text:
+                    descriptions.append(path)
+    return sorted(descriptions)
+
+
+def input_digest(hjson_filename, template_filename, header_filename, output_dir):
+    """
+    Hashes all the inputs of a header: the register description, the template, the header
+    filename, the directory of the drivers and the sources of this generator.
+    :return: the hexadecimal SHA-256 digest of the inputs
+    """
+    h = hashlib.sha256()
+    h.update(str(manifest_version).encode())
+    h.update(header_filename.encode())
+    h.update(os.path.abspath(output_dir).encode())
+    for path in (__file__, template_filename, hjson_filename):
+        with open(path, "rb") as f:
+            h.update(hashlib.sha256(f.read()).digest())
+    return h.hexdigest()
+
+
+def file_digest(path):
+    """
+    :param path: path of the file to hash, symbolic links are followed
+    :return: the hexadecimal SHA-256 digest of the content of the file, None if it does not exist
+    """
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def batch_output_filename(output_dir, name):
+    """
+    :param output_dir: directory of the drivers
+    :param name: name of the peripheral in its register description
+    :return: the path of the header of the peripheral, <output_dir>/<name>/<name>_structs.h
+    """
+    return os.path.join(output_dir, name.lower(), name.lower() + "_structs.h")
+
+
+def batch_generate(hjson_filename, template_filename, output_dir, header_filename):
+    """
+    Generates the header of one register description in batch mode. Only the headers that
+    already exist in output_dir are generated, the other descriptions are not used by the drivers.
+    :return: a dictionary with the name of the peripheral, the path of its header, the header
+        (None if unused), the digest of the header on disk (None if missing), whether it was
+        written and the error message, if the generation failed
+    """
+    result = {
+        "name": None,
+        "path": None,
+        "header": None,
+        "header_digest": None,
+        "written": False,
+        "error": None,
+    }
+    try:
+        data = read_hjson(hjson_filename)
+        result["name"] = data["name"]
+        header = batch_output_filename(output_dir, data["name"])
+        result["path"] = header
+        # The header can be a symbolic link to a file generated by FuseSoC, which may not exist yet
+        if not os.path.lexists(header):
+            return result
+        result["header"] = header
+        header = os.path.realpath(header)
+        os.makedirs(os.path.dirname(header), exist_ok=True)
+        content = generate_header(data, template_filename, header_filename)
+        result["written"] = write_if_changed(header, content)
+        result["header_digest"] = file_digest(header)
+    except Exception as e:
+        result["error"] = "{}: {}".format(type(e).__name__, e)
+    return result
+
+
+def load_manifest(manifest_filename):
+    """
+    Reads the manifest of a previous batch generation.
+    :return: a dictionary with, for each register description, the digest of its inputs, the path
+        of its header, the header if used and the digest of the header written. It is empty if the manifest is missing, corrupted or from another version.
+    """
+    try:
+        with open(manifest_filename) as f:
+            content = json.load(f)
+        if content.get("version") == manifest_version:
+            return content.get("sources", {})
+    except (OSError, ValueError):
+        pass
+    return {}
+
+
+def run_batch(args):
+    """
+    Generates the headers of every register description found in args.batch.
+    :return: the exit status, 1 if the generation of a header failed
+    """
+    manifest = load_manifest(args.manifest) if args.manifest else {}
+    sources = {}
+    pending = []
+    for path in find_descriptions(args.batch):
+        digest = input_digest(
+            path, args.template_filename, args.header_filename, args.output_dir
+        )
+        entry = manifest.get(path)
+        # Unchanged description whose header was not modified (nor created, if it was unused)
+        # since it was generated, the header is kept as is
+        if (
+            entry is not None
+            and entry.get("digest") == digest
+            and entry.get("path") is not None
+            and file_digest(entry["path"]) == entry.get("header_digest")
+        ):
+            sources[path] = entry
+        else:
+            pending.append((path, digest))
+
+    call_args = [
+        (path, args.template_filename, args.output_dir, args.header_filename)
+        for path, _ in pending
+    ]
+    if args.jobs > 1 and len(call_args) > 1:
+        with ProcessPoolExecutor(max_workers=min(args.jobs, len(call_args))) as pool:
+            results = list(pool.map(batch_generate, *zip(*call_args)))
+    else:
+        results = [batch_generate(*a) for a in call_args]
+
+    status = 0
+    for (path, digest), result in zip(pending, results):
+        if result["error"] is not None:
+            print("{}: {}".format(path, result["error"]), file=sys.stderr)
+            status = 1
+            continue
+        sources[path] = {
+            "digest": digest,
+            "path": result["path"],
+            "header": result["header"],
+            "header_digest": result["header_digest"],
+        }
+        if result["written"]:
+            print("Generated {}".format(result["header"]))
+
+    headers = {}
+    for path, entry in sorted(sources.items()):
+        if entry["header"] is None:
+            continue
+        if entry["header"] in headers:
+            print(
+                "{}: {} is also generated from {}".format(
+                    path, entry["header"], headers[entry["header"]]
+                ),
+                file=sys.stderr,
+            )
+            status = 1
+        headers[entry["header"]] = path
+    print(
+        "{} headers, {} up to date, {} regenerated".format(
+            len(headers),
+            len(headers) - sum(r["written"] for r in results),
+            sum(r["written"] for r in results),
+        )
+    )
+
+    if args.manifest:
+        os.makedirs(os.path.dirname(os.path.abspath(args.manifest)), exist_ok=True)
+        write_output(
+            args.manifest,
+            json.dumps(
+                {"version": manifest_version, "sources": sources},
+                indent=2,
+                sort_keys=True,
+            ),
+        )
+    # Rewritten only when the list changes, as the CMake build is configured again in that case
+    if args.header_list:
+        os.makedirs(os.path.dirname(os.path.abspath(args.header_list)), exist_ok=True)
+        write_if_changed(
+            args.header_list,
+            "".join(os.path.abspath(h) + "\n" for h in sorted(headers)),
+        )
+    return status
+
+
 def main(arg_vect):
 
     parser = argparse.ArgumentParser(
@@ -428,6 +703,7 @@ def main(arg_vect):
     )
     parser.add_argument(
         "--template_filename",
+        default=os.path.join(os.path.dirname(__file__), "periph_structs.tpl"),
         help="filename of the template for the final file generation",
     )
     parser.add_argument(
@@ -445,39 +721,54 @@ def main(arg_vect):
         help="name of the file in which register addresses are found, and which should be included on top.",
     )
 
+    parser.add_argument(
+        "--batch",
+        nargs="*",
+        metavar="DIR",
+        help="generates, in one run, the headers of all the register descriptions found in "
+        "the given directories (default: {}). Only the headers that already exist in "
+        "--output_dir are generated.".format(" ".join(batch_dirs)),
+    )
+    parser.add_argument(
+        "--output_dir",
+        default=batch_output_dir,
+        help="directory of the drivers, in which the <name>/<name>_structs.h headers are "
+        "generated in batch mode (default: {})".format(batch_output_dir),
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of processes generating the headers in batch mode (default: 1)",
+    )
+    parser.add_argument(
+        "--manifest",
+        help="JSON file storing the digest of the inputs of every header in batch mode, so "
+        "that the unchanged register descriptions are skipped in the next run",
+    )
+    parser.add_argument(
+        "--header_list",
+        help="file listing the headers generated in batch mode, one per line",
+    )
+
     args = parser.parse_args(arg_vect)
 
+    if args.batch is not None:
+        if not args.batch:
+            args.batch = batch_dirs
+        if args.jobs < 1:
+            parser.error("--jobs must be at least 1")
+        return run_batch(args)
+
     input_template = args.template_filename
     input_hjson_file = args.hjson_filename
     output_filename = args.output_filename
     header_filename = args.header_filename
 
     data = read_hjson(input_hjson_file)
-
-    # Two strings used to store all the structs and enums #
-    structs_definitions = "typedef struct {\n"  # used to store all the struct definitions to write in the template in the end
-    enums_definitions = ""  # used to store all the enums definitions, if present
-
-    # START OF THE GENERATION #
-
-    reg_structs, reg_enums = add_registers(data)
-    structs_definitions += reg_structs
-    enums_definitions += reg_enums
-
-    structs_definitions += "}} {};".format(data["name"])
-
-    final_output = write_template(
-        input_template,
-        structs_definitions,
-        enums_definitions,
-        data["name"],
-        header_filename,
-    )
-    write_output(output_filename, final_output)
-
-    if data["name"].lower() == "dma":
-        format_dma_channels(output_filename)
+    final_output = generate_header(data, input_template, header_filename)
+    write_if_changed(output_filename, final_output)
 
 
 if __name__ == "__main__":
-    main(sys.argv[1:])
+    sys.exit(main(sys.argv[1:]))
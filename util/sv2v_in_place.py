@@ -6,6 +6,9 @@
 # pylint: disable=raise-missing-from, unused-argument, consider-merging-isinstance
 # pylint: disable=redefined-builtin, global-statement, subprocess-run-check, consider-using-sys-exit
 import argparse
+import concurrent.futures
+import filecmp
+import hashlib
 import logging
 import os
 import re
@@ -13,7 +16,7 @@ import shlex
 import shutil
 import subprocess
 import tempfile
-from typing import List, Pattern, Tuple
+from typing import List, Optional, Pattern, Tuple
 
 
 def read_file_list(path: str) -> List[str]:
@@ -65,6 +68,102 @@ def transform_one(
             )
 
 
+def sv2v_version(sv2v: str) -> str:
+    """Identify the sv2v binary for the cache keys, by its version and, as
+    development builds share a version, by its path, size and modification time"""
+    version = "unknown"
+    for flag in ["--numeric-version", "--version"]:
+        try:
+            proc = subprocess.run([sv2v, flag], capture_output=True, text=True)
+        except OSError:
+            break
+        if proc.returncode == 0 and proc.stdout.strip():
+            version = proc.stdout.strip()
+            break
+    path = shutil.which(sv2v)
+    if path is not None:
+        stat = os.stat(path)
+        version += " {} {} {}".format(path, stat.st_size, stat.st_mtime_ns)
+    return version
+
+
+def hash_files(digest, paths: List[str]) -> None:
+    """Add the names and contents of files to a digest"""
+    for path in paths:
+        digest.update(path.encode() + b"\0")
+        with open(path, "rb") as handle:
+            digest.update(hashlib.sha256(handle.read()).digest())
+
+
+def include_files(incdirs: List[str], exclude: Optional[str] = None) -> List[str]:
+    """List the files that can be included from the include directories,
+    including those in their subdirectories (e.g. `include "sub/file.svh"),
+    apart from the ones in the exclude directory"""
+    exclude = os.path.realpath(exclude) if exclude is not None else None
+    paths = []
+    for incdir in incdirs:
+        for root, dirs, files in os.walk(incdir):
+            dirs[:] = sorted(
+                d
+                for d in dirs
+                if not d.startswith(".")
+                and os.path.realpath(os.path.join(root, d)) != exclude
+            )
+            paths += sorted(
+                os.path.join(root, name)
+                for name in files
+                if os.path.isfile(os.path.join(root, name))
+            )
+    return paths
+
+
+class Sv2vCache:
+    """Converted files, keyed by everything that changes the output of sv2v:
+    the file, the packages, the defines, the include directories and the files
+    they contain, and the version of sv2v."""
+
+    def __init__(
+        self, cache_dir: str, sv2v: str, incdirs: List[str], pkg_paths: List[str]
+    ) -> None:
+        self.cache_dir = cache_dir
+        # Hash the inputs shared by every file once, before any file is replaced
+        digest = hashlib.sha256()
+        digest.update(sv2v_version(sv2v).encode() + b"\0")
+        digest.update(repr(incdirs).encode() + b"\0")
+        hash_files(digest, include_files(incdirs, exclude=cache_dir))
+        digest.update(repr(pkg_paths).encode() + b"\0")
+        hash_files(digest, pkg_paths)
+        self.shared_digest = digest.digest()
+
+    def key(self, defines: List[str], sv_path: str) -> str:
+        """Compute the key of a file converted with some defines"""
+        digest = hashlib.sha256(self.shared_digest)
+        digest.update(repr(defines).encode() + b"\0")
+        hash_files(digest, [sv_path])
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + ".v")
+
+    def get(self, key: str, dst_path: str) -> bool:
+        """Copy a cached conversion to dst_path, if there is one"""
+        try:
+            shutil.copyfile(self._path(key), dst_path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def put(self, key: str, path: str) -> None:
+        """Store the conversion in path"""
+        cache_path = self._path(key)
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        # Write to a temporary file and rename it, several runs may share the cache
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path))
+        os.close(fd)
+        shutil.copyfile(path, tmp_path)
+        os.replace(tmp_path, cache_path)
+
+
 def parse_define_if(arg: str) -> Tuple[Pattern[str], str]:
     """Handle a --define-if argument"""
     parts = arg.rsplit(":", 1)
@@ -105,34 +204,60 @@ def transform(
     incdirs: List[str],
     pkg_paths: List[str],
     sv_paths: List[str],
+    jobs: int = 1,
+    cache_dir: Optional[str] = None,
 ) -> None:
-    """Run sv2v to transform a list of files in-place"""
+    """Run sv2v to transform a list of files in-place, running up to jobs
+    conversions at once and reusing the conversions stored in cache_dir"""
+    cache = None
+    if cache_dir is not None:
+        cache = Sv2vCache(cache_dir, sv2v, incdirs, pkg_paths)
+
+    def convert(src_path: str, dst_path: str) -> bool:
+        extra_file_defines = []
+        for regex, define in defines_if:
+            if regex.search(src_path):
+                extra_file_defines.append(define)
+        file_defines = defines + extra_file_defines
+
+        if cache is not None:
+            key = cache.key(file_defines, src_path)
+            if cache.get(key, dst_path):
+                logging.info("Using the cached conversion of {}".format(src_path))
+                return True
+
+        transform_one(sv2v, file_defines, incdirs, pkg_paths, src_path, dst_path)
+        if cache is not None:
+            cache.put(key, dst_path)
+        return False
+
     with tempfile.TemporaryDirectory() as tmpdir:
         # First write each file to a file in a temporary directory, then copy
         # everything back. We have to do it like this because otherwise we
         # might trash a file that needs to be included by a later one.
-        dst_paths = []
-        for idx, src_path in enumerate(sv_paths):
-            dst_path = os.path.join(tmpdir, str(idx))
-
-            extra_file_defines = []
-            for regex, define in defines_if:
-                if regex.search(src_path):
-                    extra_file_defines.append(define)
-
-            transform_one(
-                sv2v,
-                defines + extra_file_defines,
-                incdirs,
-                pkg_paths,
-                src_path,
-                dst_path,
+        dst_paths = [os.path.join(tmpdir, str(idx)) for idx in range(len(sv_paths))]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+            futures = [
+                executor.submit(convert, src_path, dst_path)
+                for src_path, dst_path in zip(sv_paths, dst_paths)
+            ]
+            try:
+                hits = sum(future.result() for future in futures)
+            except RuntimeError:
+                executor.shutdown(cancel_futures=True)
+                raise
+        if cache is not None:
+            logging.info(
+                "Reused {} of {} conversions from the cache.".format(
+                    hits, len(sv_paths)
+                )
             )
-            dst_paths.append(dst_path)
 
-        # Now copy everything back, overwriting the original code
+        # Now copy everything back, overwriting the original code. The files
+        # that did not change are left untouched, with their timestamps.
         for dst_path, src_path in zip(dst_paths, sv_paths):
-            shutil.copy(dst_path, src_path)
+            if not filecmp.cmp(dst_path, src_path, shallow=False):
+                shutil.copy(dst_path, src_path)
 
 
 def main() -> int:
@@ -191,6 +316,23 @@ def main() -> int:
         help=("Specify the name or path of the sv2v binary. " "Defaults to 'sv2v'."),
     )
 
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="Number of sv2v conversions run at once. 0 runs one per CPU.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=os.environ.get("SV2V_CACHE_DIR"),
+        help=(
+            "Directory where the converted files are cached, to skip the "
+            "conversion of the files that did not change. Defaults to "
+            "$SV2V_CACHE_DIR, no cache if it is not set."
+        ),
+    )
+
     parser.add_argument(
         "--merge",
         "-m",
@@ -253,9 +395,18 @@ def main() -> int:
                         outfile.write(line)
         sv_paths = ['design.sv']
 
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count()
+
     try:
         transform(
-            args.sv2v, args.defines, args.defines_if, args.incdirs, pkg_paths, sv_paths
+            args.sv2v,
+            args.defines,
+            args.defines_if,
+            args.incdirs,
+            pkg_paths,
+            sv_paths,
+            jobs,
+            args.cache_dir,
         )
     except RuntimeError as err:
         logging.error(err)
@@ -0,0 +1,433 @@
+# Copyright 2026 EPFL
+# Licensed under the Apache License, Version 2.0, see LICENSE for details.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Description: Address range allocator shared by the peripheral domains and the memory
+#   subsystem. Allocated ranges are kept in sorted arrays and free ranges in a treap
+#   augmented with the largest free length of each subtree, so that overlap queries and
+#   first-fit searches are O(log n).
+
+import argparse
+import random
+import time
+from bisect import bisect_left, bisect_right, insort
+from enum import Enum
+from typing import Any, Iterator, List, NamedTuple, Optional, Tuple
+
+
+class AllocationPolicy(Enum):
+    """
+    Strategy used to choose the free range where a new range is allocated.
+    """
+
+    FIRST_FIT = "first_fit"
+    """Lowest free address where the range fits."""
+
+    BEST_FIT = "best_fit"
+    """Smallest free range where the range fits, the lowest one on ties."""
+
+
+class AddressRange(NamedTuple):
+    """
+    An allocated range of addresses, from start (included) to end (excluded).
+    """
+
+    start: int
+    end: int
+    owner: Any
+
+
+def next_pow2(n: int) -> int:
+    """
+    :param int n: a positive number.
+    :return: the smallest power of two greater than or equal to n.
+    :rtype: int
+    """
+    return 1 << (n - 1).bit_length()
+
+
+def _align_up(address: int, alignment: int) -> int:
+    return (address + alignment - 1) & ~(alignment - 1)
+
+
+class _FreeNode:
+    __slots__ = ("start", "end", "priority", "left", "right", "max_length")
+
+    def __init__(self, start: int, end: int, priority: float):
+        self.start = start
+        self.end = end
+        self.priority = priority
+        self.left: Optional["_FreeNode"] = None
+        self.right: Optional["_FreeNode"] = None
+        self.max_length = end - start
+
+
+def _update(node: _FreeNode):
+    node.max_length = node.end - node.start
+    if node.left is not None and node.left.max_length > node.max_length:
+        node.max_length = node.left.max_length
+    if node.right is not None and node.right.max_length > node.max_length:
+        node.max_length = node.right.max_length
+
+
+def _split(node: Optional[_FreeNode], key: int):
+    """
+    Splits a treap into the nodes starting before key and the nodes starting at or after key.
+    """
+    if node is None:
+        return None, None
+    if node.start < key:
+        node.right, right = _split(node.right, key)
+        _update(node)
+        return node, right
+    left, node.left = _split(node.left, key)
+    _update(node)
+    return left, node
+
+
+def _merge(left: Optional[_FreeNode], right: Optional[_FreeNode]):
+    """
+    Merges two treaps, all the nodes of left starting before the nodes of right.
+    """
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        _update(left)
+        return left
+    right.left = _merge(left, right.left)
+    _update(right)
+    return right
+
+
+class _FreeRanges:
+    """
+    The free ranges of an allocator, indexed both by address (treap) and by length (sorted list).
+    """
+
+    def __init__(self):
+        self._root: Optional[_FreeNode] = None
+        self._by_length: List[Tuple[int, int]] = []
+        # The shape of the treap does not change the results, only its balance
+        self._random = random.Random(0)
+
+    def add(self, start: int, end: int):
+        if end <= start:
+            return
+        left, right = _split(self._root, start)
+        node = _FreeNode(start, end, self._random.random())
+        self._root = _merge(_merge(left, node), right)
+        insort(self._by_length, (end - start, start))
+
+    def remove(self, start: int, end: int):
+        left, right = _split(self._root, start)
+        _, right = _split(right, start + 1)
+        self._root = _merge(left, right)
+        del self._by_length[bisect_left(self._by_length, (end - start, start))]
+
+    def containing(self, address: int) -> Optional[Tuple[int, int]]:
+        """
+        :return: the free range containing address, or None if it is not free.
+        """
+        node = self._root
+        found = None
+        while node is not None:
+            if node.start <= address:
+                found = node
+                node = node.right
+            else:
+                node = node.left
+        if found is not None and address < found.end:
+            return found.start, found.end
+        return None
+
+    def first_fit(self, length: int, alignment: int) -> Optional[Tuple[int, int]]:
+        """
+        :return: the lowest free range where length bytes aligned on alignment fit.
+        """
+        stack = []
+        node = self._root
+        # In-order traversal that skips the subtrees without any range long enough
+        while stack or node is not None:
+            if node is not None and node.max_length >= length:
+                stack.append(node)
+                node = node.left
+                continue
+            if not stack:
+                break
+            node = stack.pop()
+            if _align_up(node.start, alignment) + length <= node.end:
+                return node.start, node.end
+            node = node.right
+        return None
+
+    def best_fit(self, length: int, alignment: int) -> Optional[Tuple[int, int]]:
+        """
+        :return: the smallest free range where length bytes aligned on alignment fit.
+        """
+        for i in range(
+            bisect_left(self._by_length, (length, -1)), len(self._by_length)
+        ):
+            free_length, start = self._by_length[i]
+            if _align_up(start, alignment) + length <= start + free_length:
+                return start, start + free_length
+        return None
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        for free_length, start in sorted(self._by_length, key=lambda f: f[1]):
+            yield start, start + free_length
+
+
+class AddressAllocator:
+    """
+    Allocates non-overlapping address ranges in [0, length).
+
+    Ranges can either be reserved at a fixed address or allocated by the allocator according to its
+    policy. Overlap queries, reservations and first-fit allocations are O(log n) in the number of
+    ranges (plus the insertion in the sorted arrays, which is a memory move).
+
+    :param int length: the size of the managed address space.
+    :param AllocationPolicy policy: how allocate() chooses the free range.
+    :param bool natural_alignment: if `True`, allocated ranges are aligned on their length rounded up to a power of two.
+    :raise ValueError: if length is not positive.
+    """
+
+    def __init__(
+        self,
+        length: int,
+        policy: AllocationPolicy = AllocationPolicy.FIRST_FIT,
+        natural_alignment: bool = False,
+    ):
+        if length <= 0:
+            raise ValueError(f"The allocator length should be positive, got {length}")
+
+        self._length = length
+        self._policy = policy
+        self._natural_alignment = natural_alignment
+
+        # Allocated ranges, sorted by start address
+        self._starts: List[int] = []
+        self._ends: List[int] = []
+        self._owners: List[Any] = []
+
+        self._free = _FreeRanges()
+        self._free.add(0, length)
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def __iter__(self) -> Iterator[AddressRange]:
+        """
+        :return: an iterator over the allocated ranges, sorted by address.
+        """
+        for start, end, owner in zip(self._starts, self._ends, self._owners):
+            yield AddressRange(start, end, owner)
+
+    def length(self) -> int:
+        """
+        :return: the size of the managed address space.
+        :rtype: int
+        """
+        return self._length
+
+    def free_ranges(self) -> List[Tuple[int, int]]:
+        """
+        :return: the free ranges as (start, end) pairs, sorted by address.
+        :rtype: List[Tuple[int, int]]
+        """
+        return list(self._free)
+
+    def find_overlap(self, start: int, length: int) -> Optional[AddressRange]:
+        """
+        :param int start: the start address of the queried range.
+        :param int length: the length of the queried range.
+        :return: the allocated range with the lowest address that overlaps the queried range, or None.
+        :rtype: Optional[AddressRange]
+        """
+        end = start + length
+        i = bisect_right(self._starts, start) - 1
+        if i >= 0 and self._ends[i] > start:
+            return AddressRange(self._starts[i], self._ends[i], self._owners[i])
+        i += 1
+        if i < len(self._starts) and self._starts[i] < end:
+            return AddressRange(self._starts[i], self._ends[i], self._owners[i])
+        return None
+
+    def find(self, address: int) -> Optional[AddressRange]:
+        """
+        :param int address: an address.
+        :return: the allocated range containing address, or None.
+        :rtype: Optional[AddressRange]
+        """
+        return self.find_overlap(address, 1)
+
+    def reserve(self, start: int, length: int, owner: Any = None) -> AddressRange:
+        """
+        Reserves a range at a fixed address.
+
+        :param int start: the start address of the range.
+        :param int length: the length of the range.
+        :param Any owner: the object the range belongs to, returned by the queries.
+        :return: the reserved range.
+        :rtype: AddressRange
+        :raise ValueError: if the range is empty, out of the address space or overlaps another range.
+        """
+        if length <= 0:
+            raise ValueError(f"The length of a range should be positive, got {length}")
+        if start < 0 or start + length > self._length:
+            raise ValueError(
+                f"The range {start:#x}-{start + length:#x} is out of the address space 0x0-{self._length:#x}"
+            )
+
+        overlap = self.find_overlap(start, length)
+        if overlap is not None:
+            raise ValueError(
+                f"The range {start:#x}-{start + length:#x} overlaps the range {overlap.start:#x}-{overlap.end:#x}"
+            )
+
+        # The range is free, so a single free range contains all of it
+        free_start, free_end = self._free.containing(start)
+        self._take(free_start, free_end, start, start + length, owner)
+        return AddressRange(start, start + length, owner)
+
+    def allocate(self, length: int, owner: Any = None) -> Optional[AddressRange]:
+        """
+        Allocates a range anywhere in the address space, according to the policy of the allocator.
+
+        :param int length: the length of the range.
+        :param Any owner: the object the range belongs to, returned by the queries.
+        :return: the allocated range, or None if there is no free range large enough.
+        :rtype: Optional[AddressRange]
+        :raise ValueError: if the length is not positive.
+        """
+        if length <= 0:
+            raise ValueError(f"The length of a range should be positive, got {length}")
+
+        alignment = next_pow2(length) if self._natural_alignment else 1
+        if self._policy == AllocationPolicy.BEST_FIT:
+            free = self._free.best_fit(length, alignment)
+        else:
+            free = self._free.first_fit(length, alignment)
+        if free is None:
+            return None
+
+        start = _align_up(free[0], alignment)
+        self._take(free[0], free[1], start, start + length, owner)
+        return AddressRange(start, start + length, owner)
+
+    def _take(self, free_start: int, free_end: int, start: int, end: int, owner: Any):
+        """
+        Marks [start, end) as allocated, it must be inside the free range [free_start, free_end).
+        """
+        self._free.remove(free_start, free_end)
+        self._free.add(free_start, start)
+        self._free.add(end, free_end)
+
+        i = bisect_left(self._starts, start)
+        self._starts.insert(i, start)
+        self._ends.insert(i, end)
+        self._owners.insert(i, owner)
+
+
+def _linear_first_fit(length: int, fixed, lengths):
+    """
+    Reference placement with a linear scan of a list of free ranges, used by the benchmark.
+    """
+    free_space = [[0, length]]
+    for start, size in sorted(fixed):
+        for j, (free_start, free_end) in enumerate(free_space):
+            if free_start <= start and start + size <= free_end:
+                free_space[j : j + 1] = [
+                    r
+                    for r in ([free_start, start], [start + size, free_end])
+                    if r[1] > r[0]
+                ]
+                break
+
+    offsets = []
+    for size in lengths:
+        for j in range(len(free_space)):
+            if size <= free_space[j][1] - free_space[j][0]:
+                offsets.append(free_space[j][0])
+                if free_space[j][0] + size == free_space[j][1]:
+                    free_space.pop(j)
+                else:
+                    free_space[j][0] += size
+                break
+        else:
+            offsets.append(None)
+    return offsets
+
+
+def benchmark(num_peripherals: int = 10000, seed: int = 0, compare: bool = True):
+    """
+    Places synthetic peripherals, a tenth of them at fixed addresses, in a domain large enough for
+    all of them, with every policy. With compare, the first-fit placement is checked against (and
+    timed with) a linear scan of the free ranges.
+
+    :param int num_peripherals: number of synthetic peripherals.
+    :param int seed: seed of the random peripheral sizes.
+    :param bool compare: also run the linear reference implementation.
+    """
+    rng = random.Random(seed)
+    sizes = [0x100 << rng.randrange(5) for _ in range(num_peripherals)]
+    domain_length = next_pow2(sum(sizes))
+
+    # One in ten peripherals gets a fixed address, spread over the domain
+    fixed = []
+    step = domain_length // max(1, num_peripherals // 10)
+    for i, size in enumerate(sizes[::10]):
+        fixed.append((i * step, size))
+    lengths = sorted(sizes[i] for i in range(num_peripherals) if i % 10 != 0)[::-1]
+
+    print(
+        f"Placing {num_peripherals} peripherals ({len(fixed)} fixed) in {domain_length:#x} bytes"
+    )
+
+    offsets = None
+    for policy, natural_alignment in [
+        (AllocationPolicy.FIRST_FIT, False),
+        (AllocationPolicy.BEST_FIT, False),
+        (AllocationPolicy.FIRST_FIT, True),
+        (AllocationPolicy.BEST_FIT, True),
+    ]:
+        start = time.perf_counter()
+        allocator = AddressAllocator(domain_length, policy, natural_alignment)
+        for address, size in fixed:
+            allocator.reserve(address, size)
+        placed = [allocator.allocate(size) for size in lengths]
+        elapsed = time.perf_counter() - start
+
+        if policy == AllocationPolicy.FIRST_FIT and not natural_alignment:
+            offsets = [r.start if r is not None else None for r in placed]
+        label = policy.value + (" aligned" if natural_alignment else "")
+        print(f"  {label:<18} {elapsed * 1000:9.1f} ms")
+
+    if compare:
+        start = time.perf_counter()
+        reference = _linear_first_fit(domain_length, fixed, lengths)
+        elapsed = time.perf_counter() - start
+        print(f"  {'linear first_fit':<18} {elapsed * 1000:9.1f} ms")
+        if reference != offsets:
+            raise RuntimeError("The first-fit placement differs from the linear scan")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark of the address allocator used by mcu-gen"
+    )
+    parser.add_argument(
+        "--peripherals",
+        type=int,
+        default=10000,
+        help="Number of synthetic peripherals to place",
+    )
+    parser.add_argument(
+        "--no_compare",
+        action="store_true",
+        help="Do not run the linear reference implementation",
+    )
+    args = parser.parse_args()
+    benchmark(args.peripherals, compare=not args.no_compare)
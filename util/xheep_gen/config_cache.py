@@ -0,0 +1,172 @@
+# Copyright 2026 EPFL
+# Licensed under the Apache License, Version 2.0, see LICENSE for details.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Description: Persistent cache of the parsed configuration files used by load_config.py, so
+#   that repeated mcu-gen invocations skip parsing and executing unchanged configurations.
+
+import os
+import pathlib
+import pickle
+import sys
+import tempfile
+from enum import Enum
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from incremental import generator_digest, hash_bytes, hash_file
+
+CACHE_VERSION = 1
+"""Version of the cache entries. Bump it to invalidate every existing entry."""
+
+
+def _loaded_source_files() -> Iterable[pathlib.Path]:
+    """
+    :return: the source files of the loaded modules that are not part of the Python installation.
+    """
+    prefixes = {os.path.realpath(p) for p in (sys.prefix, sys.base_prefix)}
+    for mod in list(sys.modules.values()):
+        filename = getattr(mod, "__file__", None)
+        if not filename or not filename.endswith(".py"):
+            continue
+        filename = os.path.realpath(filename)
+        if any(filename.startswith(p + os.sep) for p in prefixes):
+            continue
+        if os.path.isfile(filename):
+            yield pathlib.Path(filename)
+
+
+def _canonical(obj: Any, path: tuple = ()) -> str:
+    """
+    Builds a textual representation of an object that only depends on its content, and not on the
+    identity of its members nor on the hash seed of the process.
+    """
+    if id(obj) in path:
+        return "<cycle>"
+    path = path + (id(obj),)
+
+    if obj is None or isinstance(obj, (bool, int, float, str, bytes, Enum)):
+        return repr(obj)
+    if isinstance(obj, dict):
+        items = sorted(
+            f"{_canonical(k, path)}:{_canonical(v, path)}" for k, v in obj.items()
+        )
+        return "{" + ",".join(items) + "}"
+    if isinstance(obj, (set, frozenset)):
+        return "set(" + ",".join(sorted(_canonical(v, path) for v in obj)) + ")"
+    if isinstance(obj, (list, tuple)):
+        return "[" + ",".join(_canonical(v, path) for v in obj) + "]"
+    if hasattr(obj, "__dict__"):
+        return f"{type(obj).__qualname__}({_canonical(vars(obj), path)})"
+    return repr(obj)
+
+
+def stable_digest(obj: Any) -> str:
+    """
+    Hashes an object by content, in a way that is stable across processes.
+
+    :param Any obj: the object to hash.
+    :return: the hexadecimal SHA-256 digest of the object.
+    :rtype: str
+    """
+    return hash_bytes(_canonical(obj).encode())
+
+
+class ConfigCache:
+    """
+    Stores built configuration objects (X-HEEP model, parsed HJSON, pad ring) as versioned pickles.
+
+    Each entry is keyed by the content of its source files and records the digest of every file it
+    depends on, including the Python modules imported while building it. An entry is only used if
+    none of these files changed since it was stored.
+
+    :param pathlib.Path cache_dir: directory where the entries are stored.
+    """
+
+    def __init__(self, cache_dir: pathlib.Path):
+        self._cache_dir = pathlib.Path(cache_dir)
+        self._generator_digest = generator_digest()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, kind: str, sources: Iterable[pathlib.Path], extra: bytes) -> str:
+        return hash_bytes(
+            kind.encode(),
+            str(CACHE_VERSION).encode(),
+            sys.version.encode(),
+            self._generator_digest.encode(),
+            extra,
+            *(
+                str(pathlib.Path(s).absolute()).encode() + hash_file(s).encode()
+                for s in sources
+            ),
+        )
+
+    def _load(self, entry_path: pathlib.Path) -> Optional[Any]:
+        try:
+            with open(entry_path, "rb") as file:
+                entry = pickle.load(file)
+        except Exception:
+            # Missing, corrupted or incompatible entry
+            return None
+
+        if entry.get("version") != CACHE_VERSION:
+            return None
+        for dep, digest in entry["deps"].items():
+            try:
+                if hash_file(pathlib.Path(dep)) != digest:
+                    return None
+            except OSError:
+                return None
+        return entry["value"]
+
+    def _store(self, entry_path: pathlib.Path, value: Any, deps: Dict[str, str]):
+        try:
+            data = pickle.dumps(
+                {"version": CACHE_VERSION, "deps": deps, "value": value}
+            )
+        except (pickle.PicklingError, AttributeError, TypeError):
+            # Objects defined in the configuration files themselves cannot be pickled
+            return
+
+        self._cache_dir.mkdir(parents=True, exist_ok=True)
+        # Write atomically, several mcu-gen processes may share the same cache
+        fd, tmp = tempfile.mkstemp(dir=self._cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+        os.replace(tmp, entry_path)
+
+    def get_or_build(
+        self,
+        kind: str,
+        sources: Iterable[pathlib.Path],
+        build: Callable[[], Any],
+        extra: bytes = b"",
+    ) -> Any:
+        """
+        Returns the cached object built from sources, or builds and stores it.
+
+        :param str kind: kind of the object, part of the key.
+        :param Iterable[pathlib.Path] sources: the files the object is built from.
+        :param Callable build: function building the object when it is not cached.
+        :param bytes extra: additional data the object depends on, part of the key.
+        :return: the built object. A new copy is returned on every call.
+        """
+        sources = list(sources)
+        entry_path = (
+            self._cache_dir / f"{kind}-{self._key(kind, sources, extra)}.pickle"
+        )
+
+        value = self._load(entry_path)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = build()
+
+        deps = {str(pathlib.Path(s).absolute()): hash_file(s) for s in sources}
+        for f in _loaded_source_files():
+            deps.setdefault(str(f), hash_file(f))
+        self._store(entry_path, value, deps)
+
+        return value
@@ -0,0 +1,248 @@
+# Copyright 2026 EPFL
+# Licensed under the Apache License, Version 2.0, see LICENSE for details.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Description: Content-addressed bookkeeping used by mcu_gen.py to only rewrite the generated
+#   files whose inputs or contents actually changed.
+
+import argparse
+import hashlib
+import json
+import pathlib
+from typing import Dict, Iterable, List, Optional
+
+import mako
+
+MANIFEST_VERSION = 2
+"""Version of the manifest format. Bump it to invalidate every existing manifest."""
+
+GENERATOR_DIR = pathlib.Path(__file__).resolve().parent
+"""Directory of the generator sources, which are part of every input digest."""
+
+
+def hash_bytes(*chunks: bytes) -> str:
+    """
+    :param bytes chunks: the byte strings to hash, in order.
+    :return: the hexadecimal SHA-256 digest of the concatenated chunks.
+    :rtype: str
+    """
+    h = hashlib.sha256()
+    for chunk in chunks:
+        h.update(hashlib.sha256(chunk).digest())
+    return h.hexdigest()
+
+
+def hash_file(path: Optional[pathlib.Path]) -> str:
+    """
+    :param pathlib.Path path: the file to hash. None or an empty path hashes as an empty file.
+    :return: the hexadecimal SHA-256 digest of the file content.
+    :rtype: str
+    """
+    if path is None or str(path) == "":
+        return hash_bytes(b"")
+    return hash_bytes(pathlib.Path(path).read_bytes())
+
+
+def generator_digest() -> str:
+    """
+    Hashes the Python sources of the generator, so that a change in the X-HEEP model invalidates
+    every previously generated file.
+
+    :return: the hexadecimal SHA-256 digest of the generator sources.
+    :rtype: str
+    """
+    sources = sorted(GENERATOR_DIR.rglob("*.py"))
+    return hash_bytes(
+        *(str(p.relative_to(GENERATOR_DIR)).encode() + p.read_bytes() for p in sources)
+    )
+
+
+def config_digest(
+    config_files: Iterable[Optional[pathlib.Path]], overrides: Dict
+) -> str:
+    """
+    Computes the digest shared by all the templates of one mcu-gen run.
+
+    :param Iterable[pathlib.Path] config_files: the configuration files (HJSON, Python and pads configurations).
+    :param dict overrides: the command line overrides (CPU, bus, memory banks...).
+    :return: the hexadecimal SHA-256 digest of the configuration.
+    :rtype: str
+    """
+    return hash_bytes(
+        str(MANIFEST_VERSION).encode(),
+        mako.__version__.encode(),
+        generator_digest().encode(),
+        json.dumps(overrides, sort_keys=True).encode(),
+        *(hash_file(f).encode() for f in config_files),
+    )
+
+
+class GenManifest:
+    """
+    Records, for each generated file, the digest of its inputs, the digest of the content
+    rendered from them and the size and modification time of the file on disk. It is stored as a
+    JSON file between mcu-gen runs.
+
+    :param pathlib.Path path: the location of the manifest file.
+    """
+
+    def __init__(self, path: pathlib.Path):
+        self._path = pathlib.Path(path)
+        self._entries: Dict[str, Dict] = {}
+        self._changed = []
+        self._modified = False
+
+        try:
+            with open(self._path, "r") as file:
+                content = json.load(file)
+            if content.get("version") == MANIFEST_VERSION:
+                self._entries = content.get("outputs", {})
+        except (OSError, ValueError):
+            # Missing or corrupted manifest, everything is regenerated
+            self._entries = {}
+
+    @staticmethod
+    def _key(outfile: pathlib.Path) -> str:
+        return str(pathlib.Path(outfile).absolute())
+
+    @staticmethod
+    def _disk_state(outfile: pathlib.Path) -> Optional[List[int]]:
+        """
+        :param pathlib.Path outfile: the generated file.
+        :return: the size and modification time (in ns) of outfile, or None if it does not exist.
+        :rtype: List[int]
+        """
+        try:
+            stat = pathlib.Path(outfile).stat()
+        except OSError:
+            return None
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def _is_untouched(self, outfile: pathlib.Path, entry: Dict) -> bool:
+        """
+        :return: `True` if outfile exists and was not modified since it was last recorded, e.g. by
+            a non-incremental mcu-gen run with another configuration.
+        :rtype: bool
+        """
+        disk = self._disk_state(outfile)
+        return disk is not None and entry.get("disk") == disk
+
+    def template_digest(self, cfg_digest: str, tpl_path: pathlib.Path, outfile) -> str:
+        """
+        :param str cfg_digest: the digest returned by config_digest().
+        :param pathlib.Path tpl_path: the template to render.
+        :param pathlib.Path outfile: the file the template is rendered into.
+        :return: the digest of all the inputs of one generated file.
+        :rtype: str
+        """
+        return hash_bytes(
+            cfg_digest.encode(),
+            hash_file(tpl_path).encode(),
+            self._key(outfile).encode(),
+        )
+
+    def is_up_to_date(self, outfile: pathlib.Path, input_digest: str) -> bool:
+        """
+        :param pathlib.Path outfile: the generated file.
+        :param str input_digest: the digest returned by template_digest().
+        :return: `True` if outfile was generated from the same inputs and was not modified since.
+        :rtype: bool
+        """
+        entry = self._entries.get(self._key(outfile))
+        return (
+            entry is not None
+            and entry.get("input") == input_digest
+            and self._is_untouched(outfile, entry)
+        )
+
+    def write_if_changed(
+        self, outfile: pathlib.Path, input_digest: str, content: str
+    ) -> bool:
+        """
+        Writes content to outfile unless the same content was already generated there and the
+        file was not modified since. The comparison is done against the last rendered content and
+        not the file itself, as the generated files are reformatted (e.g. by verible) after being
+        written; call refresh() once they are.
+
+        :param pathlib.Path outfile: the generated file.
+        :param str input_digest: the digest returned by template_digest().
+        :param str content: the rendered content.
+        :return: `True` if the file was written.
+        :rtype: bool
+        """
+        key = self._key(outfile)
+        output_digest = hash_bytes(content.encode())
+        entry = self._entries.get(key, {})
+
+        written = False
+        if entry.get("output") != output_digest or not self._is_untouched(
+            outfile, entry
+        ):
+            with open(outfile, "w") as file:
+                file.write(content)
+            self._changed.append(key)
+            written = True
+
+        new_entry = {
+            "input": input_digest,
+            "output": output_digest,
+            "disk": self._disk_state(outfile),
+        }
+        if new_entry != entry:
+            self._entries[key] = new_entry
+            self._modified = True
+        return written
+
+    def refresh(self):
+        """
+        Records the current size and modification time of every generated file, so that the
+        changes made by the formatters are not mistaken for external modifications.
+        """
+        for key, entry in self._entries.items():
+            disk = self._disk_state(key)
+            if entry.get("disk") != disk:
+                entry["disk"] = disk
+                self._modified = True
+
+    def changed_files(self):
+        """
+        :return: the files written since the manifest was loaded.
+        :rtype: List[str]
+        """
+        return list(self._changed)
+
+    def save(self):
+        """
+        Stores the manifest on disk, creating its parent directory if needed. The file is left
+        untouched if nothing changed since it was loaded, so that its modification time tells
+        when the generated files last changed.
+        """
+        if not self._modified and self._path.exists():
+            return
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self._path, "w") as file:
+            json.dump(
+                {"version": MANIFEST_VERSION, "outputs": self._entries},
+                file,
+                indent=2,
+                sort_keys=True,
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Records the current state of the files tracked by an mcu-gen manifest, "
+        "after they were reformatted by the steps following mcu-gen."
+    )
+    parser.add_argument(
+        "manifest", type=pathlib.Path, help="The manifest written by mcu_gen.py."
+    )
+    args = parser.parse_args()
+
+    manifest = GenManifest(args.manifest)
+    manifest.refresh()
+    manifest.save()
+
+
+if __name__ == "__main__":
+    main()
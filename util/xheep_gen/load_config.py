@@ -1,7 +1,9 @@
 import importlib
+import sys
 from pathlib import PurePath
-from typing import List, Union
+from typing import List, Optional, Union
 import hjson
+from jsonref import JsonRef
 
 from cpu.cpu import CPU
 from cpu.cv32e20 import cv32e20
@@ -12,6 +14,7 @@ from memory_ss.memory_ss import MemorySS
 from memory_ss.linker_section import LinkerSection
 from memory_ss.linker_subsection import LinkerSubsection
 from peripherals.peripheral_config_loader import load_peripherals_config
+from config_cache import ConfigCache, stable_digest
 from xheep import BusType, XHeep, CvXIf, PadRing
 
 
@@ -296,11 +299,12 @@ def load_cfg_hjson(src: str) -> XHeep:
     return system
 
 
-def load_cfg_file(f: PurePath) -> XHeep:
+def load_cfg_file(f: PurePath, cache: Optional[ConfigCache] = None) -> XHeep:
     """
     Load the Configuration by extension type. It currently supports .hjson and .py
 
     :param PurePath f: path of the configuration
+    :param Optional[ConfigCache] cache: cache of the built configurations, or None to always load the file.
     :return: the object representing the mcu configuration
     :rtype: XHeep
     :raise RuntimeError: when and invalid configuration is passed or when the sanity checks failed
@@ -308,11 +312,17 @@ def load_cfg_file(f: PurePath) -> XHeep:
     if not isinstance(f, PurePath):
         raise TypeError("parameter should be of type PurePath")
 
+    if f.suffix not in [".hjson", ".py"]:
+        raise RuntimeError(f"unsupported file extension {f.suffix}")
+
+    if cache is not None:
+        return cache.get_or_build("xheep", [f], lambda: load_cfg_file(f))
+
     if f.suffix == ".hjson":
         with open(f, "r") as file:
             return load_cfg_hjson(file.read())
 
-    elif f.suffix == ".py":
+    else:
         # The python script should have a function config() that takes no parameters and
         # returns an instance of the XHeep type.
         spec = importlib.util.spec_from_file_location("configs._config", f)
@@ -320,11 +330,32 @@ def load_cfg_file(f: PurePath) -> XHeep:
         spec.loader.exec_module(mod)
         return mod.config()
 
-    else:
-        raise RuntimeError(f"unsupported file extension {f.suffix}")
 
+def load_hjson_file(f: PurePath, cache: Optional[ConfigCache] = None):
+    """
+    Load a hjson configuration file as a dictionary, with decimals and resolved references.
+
+    This is used for the configuration options that are not yet supported in the Python model of X-HEEP.
 
-def load_pad_cfg(pad_cfg_path: PurePath, xheep: XHeep) -> PadRing:
+    :param PurePath f: path of the configuration
+    :param Optional[ConfigCache] cache: cache of the parsed configurations, or None to always parse the file.
+    :return: the parsed configuration
+    :raise SystemExit: when the file is not a valid hjson file
+    """
+    if cache is not None:
+        return cache.get_or_build("hjson", [f], lambda: load_hjson_file(f))
+
+    with open(f, "r") as file:
+        try:
+            config = hjson.loads(file.read(), use_decimal=True)
+            return JsonRef.replace_refs(config)
+        except ValueError:
+            raise SystemExit(sys.exc_info()[1])
+
+
+def load_pad_cfg(
+    pad_cfg_path: PurePath, xheep: XHeep, cache: Optional[ConfigCache] = None
+) -> PadRing:
     """
     Load pad configuration a Python file and build the PadRing.
 
@@ -333,6 +364,7 @@ def load_pad_cfg(pad_cfg_path: PurePath, xheep: XHeep) -> PadRing:
 
     :param PurePath pad_cfg_path: Path to .py configuration file
     :param XHeep xheep: the XHeep object representing the system configuration
+    :param Optional[ConfigCache] cache: cache of the built pad rings, or None to always load the file.
     :return: Built PadRing object ready for template generation
     """
     if not isinstance(pad_cfg_path, PurePath):
@@ -341,6 +373,15 @@ def load_pad_cfg(pad_cfg_path: PurePath, xheep: XHeep) -> PadRing:
     if pad_cfg_path.suffix != ".py":
         raise RuntimeError(f"unsupported file extension {pad_cfg_path.suffix}")
 
+    if cache is not None:
+        # The pad ring depends on the system configuration it is built for
+        return cache.get_or_build(
+            "padring",
+            [pad_cfg_path],
+            lambda: load_pad_cfg(pad_cfg_path, xheep),
+            extra=stable_digest(xheep).encode(),
+        )
+
     spec = importlib.util.spec_from_file_location("configs._config", pad_cfg_path)
     mod = importlib.util.module_from_spec(spec)
     spec.loader.exec_module(mod)
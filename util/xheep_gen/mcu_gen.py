@@ -7,14 +7,18 @@
 # Simplified version of occamygen.py https://github.com/pulp-platform/snitch/blob/master/util/occamygen.py
 
 import argparse
-import hjson
+import copy
 import pathlib
-import sys
+import pickle
 import re
 import logging
-from jsonref import JsonRef
-from mako.template import Template
+import time
+from concurrent.futures import ProcessPoolExecutor
 import load_config
+from config_cache import ConfigCache
+from incremental import GenManifest, config_digest
+from render_engine import RenderEngine, RenderJob, make_lookup, render_template
+from sweep import load_sweep_file, variant_outfile
 from xheep import BusType
 from cpu.cpu import CPU
 
@@ -29,80 +33,150 @@ class Colors:
     BOLD = "\033[1m"
 
 
-# Compile a regex to trim trailing whitespaces on lines.
-re_trailws = re.compile(r"[ \t\r]+$", re.MULTILINE)
-
-
 def string2int(hex_json_string):
     return (hex_json_string.split("x")[1]).split(",")[0]
 
 
-def write_template(tpl_path, outfile, **kwargs):
+def template_outfile(tpl):
+    """
+    Generate the output filename from the template name by removing the .tpl extension.
+
+    :param tpl: path to the template.
+    :return: path to the generated file.
+    """
+    tpl_path = pathlib.Path(str(tpl).strip())
+    tpl_str = str(tpl_path)
+    if tpl_str.endswith(".tpl"):
+        return pathlib.Path(tpl_str[:-4])
+    return tpl_path
+
+
+def print_render_results(jobs):
+    """
+    Print the outcome and render time of each template.
+
+    :param List[RenderJob] jobs: the rendered templates.
+    """
+    for idx, job in enumerate(jobs, 1):
+        if job.up_to_date:
+            status = "up to date"
+        elif not job.written:
+            status = f"unchanged, {job.render_time_s * 1000:.1f} ms"
+        else:
+            status = f"{job.render_time_s * 1000:.1f} ms"
+        print(
+            f"{Colors.YELLOW}[MCU-GEN]{Colors.RESET} [{idx}/{len(jobs)}] {job.tpl_path.name} {Colors.YELLOW}→{Colors.RESET} {job.outfile.name} ({status})"
+        )
+
+
+def write_template(tpl_path, outfile, manifest=None, cfg_digest=None, **kwargs):
+    """
+    Render a template into outfile.
+
+    If a manifest is provided, the template is only rendered when its inputs changed and the
+    output is only written when the rendered content changed, leaving the modification time of
+    up-to-date files untouched.
+
+    :param tpl_path: path to the template.
+    :param outfile: path to the output file. If None, the template path without its last suffix is used.
+    :param GenManifest manifest: incremental generation manifest, or None to always write the output.
+    :param str cfg_digest: digest of the configuration, required when manifest is provided.
+    :return: True if the output file was written.
+    """
     if tpl_path:
         tpl_path = pathlib.Path(tpl_path).absolute()
         if tpl_path.exists():
-            tpl = Template(filename=str(tpl_path))
             if outfile:
                 filename = outfile
             else:
                 filename = tpl_path.with_suffix("")
 
-            with open(filename, "w") as file:
-                code = tpl.render_unicode(**kwargs, strict_undefined=True)
-                code = re_trailws.sub("", code)
-                file.write(code)
+            job = RenderJob(tpl_path, filename)
+            RenderEngine(1, None, manifest, cfg_digest).render([job], **kwargs)
+            return job.written
         else:
             raise FileNotFoundError("Template file not found: {0}".format(tpl_path))
     else:
         raise FileNotFoundError("Template file not provided")
 
 
-def generate_xheep(args):
+def load_xheep(args):
+    """
+    Load the X-HEEP model, the HJSON configuration and the pad ring, without applying the command
+    line overrides nor building the model.
 
+    :param args: the parsed command line arguments.
+    :return: the X-HEEP model and the HJSON configuration.
+    """
     if args.verbose:
         logging.basicConfig(level=logging.DEBUG)
 
+    cache = ConfigCache(args.config_cache) if args.config_cache else None
+    return load_xheep_files(args.config, args.python_config, args.pads_cfg, cache)
+
+
+def load_xheep_files(config, python_config, pads_cfg, cache=None):
+    """
+    Load the X-HEEP model, the HJSON configuration and the pad ring from the configuration files.
+
+    :param config: path to the X-HEEP general HJSON configuration.
+    :param python_config: path to the X-HEEP general Python configuration, empty to use the HJSON one.
+    :param pads_cfg: path to the pads configuration.
+    :param ConfigCache cache: cache of the parsed configurations, or None to always parse the files.
+    :return: the X-HEEP model and the HJSON configuration.
+    """
     # Load general configuration file.
     # This can be either the Python or HJSON config file.
     # If using the Python config file, the HJSON parameters that are supported by Python will be ignored
     # except for the peripherals. Any peripheral not configured in Python will be added from the HJSON config.
-    if args.python_config != None and args.python_config != "":
-        xheep = load_config.load_cfg_file(pathlib.PurePath(str(args.python_config)))
+    if python_config != None and python_config != "":
+        xheep = load_config.load_cfg_file(pathlib.PurePath(str(python_config)), cache)
     else:
-        xheep = load_config.load_cfg_file(pathlib.PurePath(str(args.config)))
+        xheep = load_config.load_cfg_file(pathlib.PurePath(str(config)), cache)
 
     # We still need to load from the HJSON config the configuration options that are not yet supported in the Python model of X-HEEP
-    with open(args.config, "r") as file:
-        try:
-            srcfull = file.read()
-            config = hjson.loads(srcfull, use_decimal=True)
-            config = JsonRef.replace_refs(config)
-        except ValueError:
-            raise SystemExit(sys.exc_info()[1])
+    hjson_config = load_config.load_hjson_file(pathlib.PurePath(str(config)), cache)
 
     # Load pads HJSON configuration file
-    pad_ring = load_config.load_pad_cfg(pathlib.PurePath(str(args.pads_cfg)), xheep)
+    pad_ring = load_config.load_pad_cfg(pathlib.PurePath(str(pads_cfg)), xheep, cache)
     if pad_ring is None:
-        exit(f"Error loading pads configuration file: {args.pads_cfg}")
+        exit(f"Error loading pads configuration file: {pads_cfg}")
     xheep.set_padring(pad_ring)
 
+    return xheep, hjson_config
+
+
+def configure_xheep(xheep, config, cpu="", bus="", memorybanks="", memorybanks_il=""):
+    """
+    Apply the overrides to a loaded X-HEEP model, build and validate it, and compute the
+    variables passed to the templates.
+
+    :param XHeep xheep: the model returned by load_xheep(). It is modified in place.
+    :param config: the HJSON configuration returned by load_xheep().
+    :param str cpu: CPU override, empty to keep the configured one.
+    :param str bus: bus type override, empty to keep the configured one.
+    :param memorybanks: number of continuous 32KB banks override, empty to keep the configured ones.
+    :param memorybanks_il: number of interleaved 32KB banks override, empty to keep the configured ones.
+    :return: the template variables.
+    :rtype: dict
+    """
     try:
         has_spi_slave = 1 if config["debug"]["has_spi_slave"] == "yes" else 0
     except KeyError:
         has_spi_slave = 0
 
-    if args.bus != None and args.bus != "":
-        xheep.set_bus_type(BusType(args.bus))
+    if bus != None and bus != "":
+        xheep.set_bus_type(BusType(bus))
 
-    if args.memorybanks != None and args.memorybanks != "":
-        xheep.memory_ss().override_ram_banks(int(args.memorybanks))
+    if memorybanks != None and memorybanks != "":
+        xheep.memory_ss().override_ram_banks(int(memorybanks))
 
-    if args.memorybanks_il != None and args.memorybanks_il != "":
-        xheep.memory_ss().override_ram_banks_il(int(args.memorybanks_il))
+    if memorybanks_il != None and memorybanks_il != "":
+        xheep.memory_ss().override_ram_banks_il(int(memorybanks_il))
 
     # Override CPU setting if specified in the make arguments
-    if args.cpu != None and args.cpu != "":
-        xheep.set_cpu(CPU(args.cpu))
+    if cpu != None and cpu != "":
+        xheep.set_cpu(CPU(cpu))
 
     debug_start_address = string2int(config["debug"]["address"])
     if int(debug_start_address, 16) < int("10000", 16):
@@ -164,6 +238,212 @@ def generate_xheep(args):
     return kwargs
 
 
+def generate_xheep(args):
+    """
+    Load, configure, build and validate X-HEEP as requested by the command line arguments.
+
+    :param args: the parsed command line arguments.
+    :return: the template variables.
+    :rtype: dict
+    """
+    xheep, config = load_xheep(args)
+    return configure_xheep(
+        xheep, config, args.cpu, args.bus, args.memorybanks, args.memorybanks_il
+    )
+
+
+def generate(
+    config,
+    python_config,
+    pads_cfg,
+    cpu="",
+    bus="",
+    memorybanks="",
+    memorybanks_il="",
+    config_cache=None,
+):
+    """
+    Programmatic equivalent of the command line: load, configure, build and validate X-HEEP,
+    without rendering any template. The template variables can then be rendered with render().
+
+    :param config: path to the X-HEEP general HJSON configuration.
+    :param python_config: path to the X-HEEP general Python configuration, empty to use the HJSON one.
+    :param pads_cfg: path to the pads configuration.
+    :param str cpu: CPU override, empty to keep the configured one.
+    :param str bus: bus type override, empty to keep the configured one.
+    :param memorybanks: number of continuous 32KB banks override, empty to keep the configured ones.
+    :param memorybanks_il: number of interleaved 32KB banks override, empty to keep the configured ones.
+    :param pathlib.Path config_cache: directory of the parsed configurations cache, or None.
+    :return: the X-HEEP model and the template variables.
+    :rtype: tuple[XHeep, dict]
+    """
+    cache = ConfigCache(pathlib.Path(config_cache)) if config_cache else None
+    xheep, hjson_config = load_xheep_files(config, python_config, pads_cfg, cache)
+    kwargs = configure_xheep(xheep, hjson_config, cpu, bus, memorybanks, memorybanks_il)
+    return xheep, kwargs
+
+
+def render(tpl_path, **kwargs):
+    """
+    Render a template in memory.
+
+    :param tpl_path: path to the template.
+    :return: the rendered content.
+    :rtype: str
+    """
+    return render_template(
+        make_lookup(None), pathlib.Path(tpl_path).absolute(), **kwargs
+    )
+
+
+# Base X-HEEP model and configuration shared by the sweep worker processes, set once by
+# _init_sweep_worker()
+_sweep_base = None
+
+
+def generate_variant(
+    base,
+    variant,
+    templates,
+    outdir,
+    config_files,
+    template_cache=None,
+    incremental=False,
+):
+    """
+    Generate one variant of a sweep into its own output tree.
+
+    :param base: the X-HEEP model and HJSON configuration returned by load_xheep(). It is not modified.
+    :param SweepVariant variant: the variant to generate.
+    :param List[str] templates: the templates to render.
+    :param pathlib.Path outdir: output directory of the sweep. The variant is generated in outdir/<variant name>.
+    :param List config_files: the configuration files, used to compute the digests in incremental mode.
+    :param pathlib.Path template_cache: directory of the compiled templates, or None.
+    :param bool incremental: only write the outputs whose content changed.
+    :return: the name of the variant, the number of written files, the generation time in seconds and the error message (None on success).
+    """
+    start = time.perf_counter()
+    xheep, config = copy.deepcopy(base)
+    try:
+        kwargs = configure_xheep(xheep, config, **variant.overrides())
+    except (SystemExit, Exception) as exc:
+        return variant.name, 0, time.perf_counter() - start, str(exc)
+
+    variant_dir = pathlib.Path(outdir) / variant.name
+    manifest = None
+    cfg_digest = None
+    if incremental:
+        manifest = GenManifest(variant_dir / "mcu_gen_manifest.json")
+        cfg_digest = config_digest(config_files, variant.overrides())
+
+    jobs = [
+        RenderJob(
+            pathlib.Path(tpl.strip()),
+            variant_outfile(variant_dir, template_outfile(tpl)),
+        )
+        for tpl in templates
+    ]
+    for job in jobs:
+        job.outfile.parent.mkdir(parents=True, exist_ok=True)
+
+    RenderEngine(1, template_cache, manifest, cfg_digest).render(jobs, **kwargs)
+    if manifest is not None:
+        manifest.save()
+
+    return (
+        variant.name,
+        sum(job.written for job in jobs),
+        time.perf_counter() - start,
+        None,
+    )
+
+
+def _init_sweep_worker(pickled_base):
+    """
+    Initializes a sweep worker process with the already loaded base configuration.
+    """
+    global _sweep_base
+    _sweep_base = pickle.loads(pickled_base)
+
+
+def _generate_variant_in_worker(variant, *args):
+    return generate_variant(_sweep_base, variant, *args)
+
+
+def run_sweep(args, templates):
+    """
+    Generate all the variants of a sweep. The base configuration is loaded once and each variant
+    is derived from a copy of it, in parallel when more than one job is requested.
+
+    :param args: the parsed command line arguments.
+    :param List[str] templates: the templates to render for each variant.
+    :return: the number of variants that could not be generated.
+    :rtype: int
+    """
+    variants, sweep_outdir = load_sweep_file(pathlib.Path(args.sweep))
+    outdir = args.sweep_outdir or sweep_outdir or pathlib.Path("build/sweep")
+
+    # The command line overrides are the defaults of the variants
+    defaults = {
+        "cpu": args.cpu,
+        "bus": args.bus,
+        "memorybanks": args.memorybanks,
+        "memorybanks_il": args.memorybanks_il,
+    }
+    variants = [v.with_defaults(defaults) for v in variants]
+
+    print(
+        f"{Colors.BLUE}[MCU-GEN]{Colors.RESET} Loading base X-HEEP configuration for {Colors.BOLD}{len(variants)}{Colors.RESET} variants..."
+    )
+    base = load_xheep(args)
+    common_args = (
+        templates,
+        outdir,
+        [args.config, args.python_config, args.pads_cfg],
+        args.template_cache,
+        args.incremental,
+    )
+
+    pickled_base = None
+    if args.jobs > 1 and len(variants) > 1:
+        try:
+            pickled_base = pickle.dumps(base)
+        except (pickle.PicklingError, AttributeError, TypeError):
+            print(
+                f"{Colors.YELLOW}[MCU-GEN]{Colors.RESET} The configuration cannot be shared with worker processes, generating serially"
+            )
+
+    if pickled_base is None:
+        results = [generate_variant(base, v, *common_args) for v in variants]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=min(args.jobs, len(variants)),
+            initializer=_init_sweep_worker,
+            initargs=(pickled_base,),
+        ) as pool:
+            results = list(
+                pool.map(
+                    _generate_variant_in_worker,
+                    variants,
+                    *[[a] * len(variants) for a in common_args],
+                )
+            )
+
+    failed = 0
+    for idx, (name, written, gen_time_s, error) in enumerate(results, 1):
+        if error is None:
+            print(
+                f"{Colors.YELLOW}[MCU-GEN]{Colors.RESET} [{idx}/{len(results)}] {name} {Colors.YELLOW}→{Colors.RESET} {outdir / name} ({written} file(s) written, {gen_time_s:.2f} s)"
+            )
+        else:
+            failed += 1
+            print(
+                f"{Colors.RED}[MCU-GEN]{Colors.RESET} [{idx}/{len(results)}] {name} failed: {error}"
+            )
+
+    return failed
+
+
 def main():
     parser = argparse.ArgumentParser(prog="mcugen")
 
@@ -255,14 +535,104 @@ def main():
         "Intended for templates that are not in the X-HEEP repository, e.g. in the user's CHEEP repository.",
     )
 
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only render the templates whose inputs changed and only write the outputs whose content changed.",
+    )
+
+    parser.add_argument(
+        "--manifest",
+        type=pathlib.Path,
+        default=pathlib.Path("build/mcu_gen_manifest.json"),
+        help="Manifest storing the digests of the generated files in incremental mode (default: build/mcu_gen_manifest.json).",
+    )
+
+    parser.add_argument(
+        "--changed_list",
+        type=pathlib.Path,
+        required=False,
+        help="In incremental mode, file where the list of written outputs is stored (one per line).",
+    )
+
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="Number of worker processes used to render the templates (default: 1, render serially).",
+    )
+
+    parser.add_argument(
+        "--template_cache",
+        type=pathlib.Path,
+        required=False,
+        help="Directory where the compiled templates are cached between runs. If not provided, templates are compiled in memory.",
+    )
+
+    parser.add_argument(
+        "--config_cache",
+        type=pathlib.Path,
+        required=False,
+        help="Directory where the parsed configurations are cached between runs. If not provided, the configuration files are always parsed.",
+    )
+
+    parser.add_argument(
+        "--sweep",
+        metavar="file",
+        type=str,
+        required=False,
+        help="Sweep HJSON configuration. Generates every variant it defines into its own output tree.",
+    )
+
+    parser.add_argument(
+        "--sweep_outdir",
+        type=pathlib.Path,
+        required=False,
+        help="Output directory of the sweep (default: output_dir of the sweep configuration, or build/sweep).",
+    )
+
     args = parser.parse_args()
 
+    if args.sweep:
+        if args.outfile is not None:
+            parser.error("Cannot specify --outfile when using --sweep.")
+        templates = [
+            t
+            for t in re.split(r"[,\s]+", f"{args.outtpl} {args.externaltpl or ''}")
+            if t
+        ]
+        failed = run_sweep(args, templates)
+        if failed > 0:
+            exit(f"{failed} sweep variant(s) could not be generated")
+        print(
+            f"{Colors.GREEN}[MCU-GEN]{Colors.RESET} All sweep variants generated successfully"
+        )
+        return
+
     print(f"{Colors.BLUE}[MCU-GEN]{Colors.RESET} Generating X-HEEP configuration...")
     kwargs = generate_xheep(args)
     print(
         f"{Colors.GREEN}[MCU-GEN]{Colors.RESET} X-HEEP configuration generated successfully"
     )
 
+    # In incremental mode, every output is tracked in a manifest keyed by the digest of its inputs
+    manifest = None
+    cfg_digest = None
+    if args.incremental:
+        manifest = GenManifest(args.manifest)
+        cfg_digest = config_digest(
+            [args.config, args.python_config, args.pads_cfg],
+            {
+                "cpu": args.cpu,
+                "bus": args.bus,
+                "memorybanks": args.memorybanks,
+                "memorybanks_il": args.memorybanks_il,
+            },
+        )
+
+    engine = RenderEngine(args.jobs, args.template_cache, manifest, cfg_digest)
+
     # Handle single template or multiple templates
     outtpl_list = [t for t in re.split(r"[,\s]+", args.outtpl or "") if t]
     externaltpl_list = [t for t in re.split(r"[,\s]+", args.externaltpl or "") if t]
@@ -273,7 +643,9 @@ def main():
         print(
             f"{Colors.BLUE}[MCU-GEN]{Colors.RESET} Processing template: {Colors.BOLD}{outtpl_list[0]}{Colors.RESET}"
         )
-        write_template(pathlib.Path(outtpl_list[0]), args.outfile, **kwargs)
+        tpl_path = pathlib.Path(outtpl_list[0]).absolute()
+        outfile = args.outfile if args.outfile else tpl_path.with_suffix("")
+        engine.render([RenderJob(tpl_path, outfile)], **kwargs)
         print(f"{Colors.GREEN}[MCU-GEN]{Colors.RESET} Template processed successfully")
     else:
         # Multiple templates case
@@ -281,21 +653,16 @@ def main():
             parser.error(
                 "Cannot specify --outfile when using multiple templates. Filenames will be generated from template names."
             )
+        # Internal and external templates are independent, they are rendered together
+        jobs = [
+            RenderJob(pathlib.Path(tpl.strip()), template_outfile(tpl))
+            for tpl in outtpl_list + externaltpl_list
+        ]
         print(
             f"{Colors.BLUE}[MCU-GEN]{Colors.RESET} Processing {Colors.BOLD}{len(outtpl_list)}{Colors.RESET} templates..."
         )
-        for idx, tpl in enumerate(outtpl_list, 1):
-            tpl_path = pathlib.Path(tpl.strip())
-            # Generate output filename from template name by removing .tpl extension
-            tpl_str = str(tpl_path)
-            if tpl_str.endswith(".tpl"):
-                generated_outfile = pathlib.Path(tpl_str[:-4])
-            else:
-                generated_outfile = tpl_path
-            print(
-                f"{Colors.YELLOW}[MCU-GEN]{Colors.RESET} [{idx}/{len(outtpl_list)}] {tpl_path.name} {Colors.YELLOW}→{Colors.RESET} {generated_outfile.name}"
-            )
-            write_template(tpl_path, generated_outfile, **kwargs)
+        engine.render(jobs, **kwargs)
+        print_render_results(jobs[: len(outtpl_list)])
         print(
             f"{Colors.GREEN}[MCU-GEN]{Colors.RESET} All templates processed successfully"
         )
@@ -304,22 +671,22 @@ def main():
             print(
                 f"{Colors.BLUE}[MCU-GEN]{Colors.RESET} Processing {Colors.BOLD}{len(externaltpl_list)}{Colors.RESET} external templates..."
             )
-            for idx, tpl in enumerate(externaltpl_list, 1):
-                tpl_path = pathlib.Path(tpl.strip())
-                # Generate output filename from template name by removing .tpl extension
-                tpl_str = str(tpl_path)
-                if tpl_str.endswith(".tpl"):
-                    generated_outfile = pathlib.Path(tpl_str[:-4])
-                else:
-                    generated_outfile = tpl_path
-                print(
-                    f"{Colors.YELLOW}[MCU-GEN]{Colors.RESET} [{idx}/{len(externaltpl_list)}] {tpl_path.name} {Colors.YELLOW}→{Colors.RESET} {generated_outfile.name}"
-                )
-                write_template(tpl_path, generated_outfile, **kwargs)
+            print_render_results(jobs[len(outtpl_list) :])
             print(
                 f"{Colors.GREEN}[MCU-GEN]{Colors.RESET} All external templates processed successfully"
             )
 
+    if manifest is not None:
+        manifest.save()
+        changed = manifest.changed_files()
+        if args.changed_list is not None:
+            args.changed_list.parent.mkdir(parents=True, exist_ok=True)
+            with open(args.changed_list, "w") as file:
+                file.writelines(f"{f}\n" for f in changed)
+        print(
+            f"{Colors.GREEN}[MCU-GEN]{Colors.RESET} Incremental mode: {Colors.BOLD}{len(changed)}{Colors.RESET} file(s) written, the others are up to date"
+        )
+
 
 if __name__ == "__main__":
     main()
@@ -1,9 +1,10 @@
 from copy import deepcopy
-from typing import List, Set, Iterable, Generator, Optional, Union
+from typing import List, Set, Iterable, Generator, Optional
 from .ram_bank import Bank, is_pow2
 from .il_ram_group import ILRamGroup
 from .linker_section import LinkerSection
 from .linker_subsection import LinkerSubsection
+from address_allocator import AddressAllocator
 
 
 class MemorySS:
@@ -373,7 +374,8 @@ class MemorySS:
         for l in self._linker_sections:
             l.check()
 
-        old_sec: Union[LinkerSection, None] = None
+        # Address ranges of the already checked sections
+        sections = AddressAllocator(max(sec.end for sec in self._linker_sections))
 
         for i, sec in enumerate(self._linker_sections):
             if i == 0 and sec.name != "code":
@@ -385,11 +387,12 @@ class MemorySS:
                     "[MCU-GEN - MemorySS] ERROR: The second linker section should be called data."
                 )
 
-            if old_sec is not None:
-                if sec.start < old_sec.end:
-                    raise RuntimeError(
-                        f"[MCU-GEN - MemorySS] ERROR: Section {sec.name} and {old_sec.name} overlap."
-                    )
+            overlap = sections.find_overlap(sec.start, sec.end - sec.start)
+            if overlap is not None:
+                raise RuntimeError(
+                    f"[MCU-GEN - MemorySS] ERROR: Section {sec.name} and {overlap.owner.name} overlap."
+                )
+            sections.reserve(sec.start, sec.end - sec.start, sec)
 
             start = sec.start
             found_start = False
@@ -420,5 +423,3 @@ class MemorySS:
                 raise RuntimeError(
                     f"[MCU-GEN - MemorySS] ERROR: Section {sec.name} does not end in any ram bank."
                 )
-
-            old_sec = sec
@@ -9,6 +9,8 @@ from enum import Enum
 from copy import deepcopy
 from typing import List
 
+from address_allocator import AddressAllocator, AllocationPolicy
+
 
 class Peripheral(ABC):
     """
@@ -93,6 +95,8 @@ class PeripheralDomain(ABC):
     _peripherals: List[
         Peripheral
     ]  # type has to be precised for filtering in validation
+    _allocation_policy: AllocationPolicy
+    _natural_alignment: bool
 
     @abstractmethod
     def __init__(self, name: str, start_address: int, length: int):
@@ -107,6 +111,8 @@ class PeripheralDomain(ABC):
         self._start_address = start_address
         self._length = length
         self._peripherals = []
+        self._allocation_policy = AllocationPolicy.FIRST_FIT
+        self._natural_alignment = False
 
     @abstractmethod
     def add_peripheral(self, peripheral: Peripheral):
@@ -163,11 +169,45 @@ class PeripheralDomain(ABC):
 
     # Build function
 
+    def set_allocation_policy(
+        self, policy: AllocationPolicy, natural_alignment: bool = False
+    ):
+        """
+        Set how build() places the peripherals that have no offset.
+
+        :param AllocationPolicy policy: first-fit (default) or best-fit placement.
+        :param bool natural_alignment: if True, align every placed peripheral on its length rounded up to a power of two.
+        """
+        self._allocation_policy = policy
+        self._natural_alignment = natural_alignment
+
     def build(self):
         """
         Build the peripheral domain. This function will compute the offset of the peripherals that have no offset.
+
+        :raise ValueError: if a peripheral with an offset is out of the domain or overlaps another one, or if there is not enough free space for the peripherals without offset.
         """
-        # Setup
+        allocator = AddressAllocator(
+            self._length,
+            self._allocation_policy,
+            self._natural_alignment,
+        )
+
+        # Reserve the ranges of the peripherals with an address
+        for p in self._peripherals:
+            if p is None or p.get_address() is None:
+                continue
+
+            if p.get_address() < 0 or p.get_address() + p.get_length() > self._length:
+                raise ValueError(
+                    f"Peripheral {p.get_name()} is out of the domain ({p.get_name()} ends at {hex(p.get_address() + p.get_length())} but the domain ends at {hex(self._length)})"
+                )
+            overlap = allocator.find_overlap(p.get_address(), p.get_length())
+            if overlap is not None:
+                raise ValueError(
+                    f"Peripheral {p.get_name()} overlaps peripheral {overlap.owner.get_name()} ({p.get_name()} spans {hex(p.get_address())}-{hex(p.get_address() + p.get_length())} but {overlap.owner.get_name()} spans {hex(overlap.start)}-{hex(overlap.end)})"
+                )
+            allocator.reserve(p.get_address(), p.get_length(), p)
 
         # List of peripherals without address, sorted by length in descending order. Original index is kept to update the peripheral with the offset after placement.
         peripherals_without_address = [
@@ -177,110 +217,19 @@ class PeripheralDomain(ABC):
             key=lambda tuple: tuple[1].get_length(), reverse=True
         )
 
-        # List of peripherals with address, sorted by address. Original index is kept to update the peripheral with the offset after placement.
-        peripherals_with_address = [
-            (i, p)
-            for i, p in enumerate(self._peripherals)
-            if p is not None and p.get_address() is not None
-        ]
-        peripherals_with_address.sort(key=lambda tuple: tuple[1].get_address())
-
-        # List of free spaces of intervals of free memory space in the domain. In the beggining, there is only one free space, the whole domain.
-        free_space = [[0, self._length]]
-
-        # Number of peripherals with address
-        num_peripherals_with_address = (
-            0 if peripherals_with_address == None else len(peripherals_with_address)
-        )
-
-        # Number of peripherals without address
-        num_peripherals_without_address = (
-            0
-            if peripherals_without_address == None
-            else len(peripherals_without_address)
-        )
-
-        # Creating the list of intervals of free space
-
-        # Works because peripherals_with_address is sorted by address
-        # Splits the last free space into two new lists, one before the peripheral and one after
-        for i in range(num_peripherals_with_address):
-            # Removes last free space to split it
-            last_free_space = free_space[-1]
-            free_space.pop()
-            current_peripheral = peripherals_with_address[i][1]
-
-            # Checks if the peripheral domain is in free space
-            if current_peripheral.get_address() < last_free_space[0]:
-                if i == 0:
-                    raise ValueError(
-                        f"Peripheral {current_peripheral.get_name()} has an address that starts before the first free space ({current_peripheral.get_name()} starts at {hex(current_peripheral.get_address())} but first free space starts at {hex(last_free_space[0])})"
-                    )
-                else:
-                    raise ValueError(
-                        f"Peripheral {current_peripheral.get_name()} has an address that starts in {peripherals_with_address[i-1].get_name()} domain ({current_peripheral.get_name()} starts at {hex(current_peripheral.get_address())} but {peripherals_with_address[i-1].get_name()} ends at {hex(last_free_space[0])}"
-                    )
-
-            if (
-                current_peripheral.get_address() + current_peripheral.get_length()
-            ) > last_free_space[1]:
-                raise ValueError(
-                    f"Peripheral {current_peripheral.get_name()} has an address that ends after the last free space ({current_peripheral.get_name()} ends at {hex(current_peripheral.get_address() + current_peripheral.get_length())} but last free space ends at {hex(last_free_space[1])})"
-                )
-
-            # If the peripheral starts after the last free space, add it to the free space before the peripheral
-            if last_free_space[0] > current_peripheral.get_address():
-                free_space.append(
-                    [last_free_space[0], current_peripheral.get_address()]
-                )
-
-            # If the peripheral ends before the last free space, add it to the free space after the peripheral
-            if (
-                current_peripheral.get_address() + current_peripheral.get_length()
-            ) < last_free_space[1]:
-                free_space.append(
-                    [
-                        current_peripheral.get_address()
-                        + current_peripheral.get_length(),
-                        last_free_space[1],
-                    ]
-                )
-
         # Placing peripherals in free spaces
-
-        # Place peripherals where in the first free space where they fit, works because peripherals_without_address is sorted by length in descending order
         offsets = (
             {}
         )  # Will contain the offsets of the peripherals, and then update the peripherals with the offsets if they all fit
 
-        for i in range(num_peripherals_without_address):
-            fit = False  # Check if the peripheral fits in the free space
-            current_peripheral = peripherals_without_address[i][1]
-            for j in range(len(free_space)):
-                if (
-                    current_peripheral.get_length()
-                    <= free_space[j][1] - free_space[j][0]
-                ):
-                    offsets[peripherals_without_address[i][0]] = free_space[j][
-                        0
-                    ]  # Since there can be multiple instances of the same peripheral, we must map indexes from self._peripherals instead of peripheral names (two peripherals can have the same name)
-
-                    # Either remove space if the peripheral exactly fits the space, or shrinks the space
-                    if (
-                        free_space[j][0] + current_peripheral.get_length()
-                        == free_space[j][1]
-                    ):
-                        free_space.pop(j)
-                    else:
-                        free_space[j][0] += current_peripheral.get_length()
-
-                    # Ends search for free space
-                    fit = True
-                    break
-            if not fit:
+        for idx, p in peripherals_without_address:
+            placed = allocator.allocate(p.get_length(), p)
+            if placed is None:
                 raise ValueError(
-                    f"Could not find a free space large enough for peripheral {current_peripheral.get_name()} with length {hex(current_peripheral.get_length())}"
+                    f"Could not find a free space large enough for peripheral {p.get_name()} with length {hex(p.get_length())}"
                 )
+            # Since there can be multiple instances of the same peripheral, we must map indexes from self._peripherals instead of peripheral names (two peripherals can have the same name)
+            offsets[idx] = placed.start
 
         # Setting peripherals addresses if there is enough space
         for idx, _ in peripherals_without_address:
@@ -293,50 +242,36 @@ class PeripheralDomain(ABC):
         Checks if the peripherals do not overlap and if the peripheral domain is within the bounds.
         """
 
-        # Check if the peripherals do not overlap
-        if self._peripherals is None or len(self._peripherals) == 0:
-            print(
-                f"[MCU-GEN - PeripheralDomain] WARNING: No peripherals in {self._name}"
-            )
-            return
-
-        peripherals_sorted = sorted(
-            filter(lambda x: x != None, self._peripherals),
-            key=lambda x: x.get_address(),
-        )  # Filter out None values and sort by offset in growing order
-
-        if len(peripherals_sorted) == 0:
+        peripherals = [p for p in (self._peripherals or []) if p is not None]
+        if len(peripherals) == 0:
             print(
                 f"[MCU-GEN - PeripheralDomain] WARNING: No peripherals in {self._name}"
             )
             return
 
-        # Check if every peripheral does not overlap with the next one (works because peripherals_sorted is sorted by address)
-        for i in range(len(peripherals_sorted) - 1):
+        allocator = AddressAllocator(self._length)
+        for p in peripherals:
             if (
-                peripherals_sorted[i].get_address() + peripherals_sorted[i].get_length()
-                > peripherals_sorted[i + 1].get_address()
+                p.get_address() >= self._length
+                or p.get_address() + p.get_length() > self._length
             ):
                 raise RuntimeError(
-                    f"[MCU-GEN - PeripheralDomain] ERROR: The peripheral {peripherals_sorted[i].get_name()} overflows over the domain (starts at {peripherals_sorted[i].get_address():#08X} and ends at {peripherals_sorted[i].get_address() + peripherals_sorted[i].get_length():#08X}, peripheral {peripherals_sorted[i+1].get_name()} starts at {peripherals_sorted[i+1].get_address():#08X})."
+                    f"[MCU-GEN - PeripheralDomain] ERROR: The peripheral {p.get_name()} is out of the domain (starts at {p.get_address():#08X}, domain ends at {self._length:#08X})."
+                )
+
+            # Check if the peripheral does not overlap with an already checked one
+            overlap = allocator.find_overlap(p.get_address(), p.get_length())
+            if overlap is not None:
+                # Report the overlap from the lowest peripheral, as if sorted by address
+                first, second = (
+                    (overlap.owner, p)
+                    if overlap.start <= p.get_address()
+                    else (p, overlap.owner)
                 )
-            if peripherals_sorted[i].get_address() >= self._length:
                 raise RuntimeError(
-                    f"[MCU-GEN - PeripheralDomain] ERROR: The peripheral {peripherals_sorted[i].get_name()} is out of the domain (starts at {peripherals_sorted[i].get_address():#08X}, domain ends at {self._length:#08X})."
+                    f"[MCU-GEN - PeripheralDomain] ERROR: The peripheral {first.get_name()} overflows over the domain (starts at {first.get_address():#08X} and ends at {first.get_address() + first.get_length():#08X}, peripheral {second.get_name()} starts at {second.get_address():#08X})."
                 )
-
-        # Check if the last peripheral is out of the domain
-        if (
-            peripherals_sorted[-1].get_address() + peripherals_sorted[-1].get_length()
-            > self._length
-        ):
-            raise RuntimeError(
-                f"[MCU-GEN - PeripheralDomain] ERROR: The peripheral {peripherals_sorted[-1].get_name()} is out of the domain (starts at {peripherals_sorted[-1].get_address():#08X}, domain ends at {self._length:#08X})."
-            )
-        if peripherals_sorted[-1].get_address() >= self._length:
-            raise RuntimeError(
-                f"[MCU-GEN - PeripheralDomain] ERROR: The peripheral {peripherals_sorted[-1].get_name()} is out of the domain (starts at {peripherals_sorted[-1].get_address():#08X}, domain ends at {self._length:#08X})."
-            )
+            allocator.reserve(p.get_address(), p.get_length(), p)
 
         # Check if the peripheral domain is within the bounds it can use (being above 0x10000)
         if self.get_start_address() < int("10000", 16):
@@ -0,0 +1,660 @@
+# Copyright 2026 EPFL
+# Licensed under the Apache License, Version 2.0, see LICENSE for details.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Description: Bank-aware data placement optimizer. From an application ELF and an access profile,
+#   proposes a linker sections layout where buffers accessed concurrently (e.g. DMA source and
+#   destination, matmul operands) are placed in different RAM banks or interleaved groups.
+
+import argparse
+import pathlib
+import sys
+from typing import Dict, List, Optional, Tuple
+
+import hjson
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from elf_reader import ElfFile
+
+from address_allocator import AddressAllocator
+from memory_ss.linker_section import LinkerSection
+from memory_ss.memory_ss import MemorySS
+
+WORD_SIZE = 4
+"""Buffers are accounted in multiples of this size, as the linker aligns them."""
+
+
+class Buffer:
+    """
+    A data object of the application that can be moved to another linker section.
+
+    :param str name: name of the symbol.
+    :param int size: size in bytes.
+    :param int accesses: number of accesses, used to weight the conflicts of this buffer.
+    :param Optional[int] address: current address of the symbol, if known.
+    """
+
+    def __init__(
+        self, name: str, size: int, accesses: int, address: Optional[int] = None
+    ):
+        self.name = name
+        self.size = size
+        self.accesses = accesses
+        self.address = address
+
+    def __str__(self) -> str:
+        return (
+            f"Buffer(name={self.name}, size={self.size:#x}, accesses={self.accesses})"
+        )
+
+    def footprint(self) -> int:
+        """
+        :return: the space taken by the buffer once aligned.
+        :rtype: int
+        """
+        return (self.size + WORD_SIZE - 1) // WORD_SIZE * WORD_SIZE
+
+
+class PlacementProfile:
+    """
+    Access profile of an application: the buffers to place and the groups of buffers that are
+    accessed at the same time.
+
+    :param List[Buffer] buffers: the buffers that can be moved.
+    :param List[List[str]] concurrent: groups of buffer names accessed concurrently.
+    :param int data_size: space needed in the data section by everything but the buffers, used when there is no ELF.
+    """
+
+    def __init__(
+        self,
+        buffers: List[Buffer],
+        concurrent: List[List[str]],
+        data_size: int = 0,
+    ):
+        self.buffers = {b.name: b for b in buffers}
+        self.concurrent = concurrent
+        self.data_size = data_size
+
+        for group in concurrent:
+            for name in group:
+                if name not in self.buffers:
+                    raise RuntimeError(
+                        f"[MCU-GEN - Placement] ERROR: Symbol {name} is used in a concurrent group but not declared in symbols"
+                    )
+
+    def conflicts(self) -> Dict[Tuple[str, str], int]:
+        """
+        :return: for each pair of buffers accessed concurrently, the number of accesses that can collide.
+        :rtype: Dict[Tuple[str, str], int]
+        """
+        weights = {}
+        for group in self.concurrent:
+            for i, a in enumerate(group):
+                for b in group[i + 1 :]:
+                    if a == b:
+                        continue
+                    key = (a, b) if a < b else (b, a)
+                    weights[key] = weights.get(key, 0) + min(
+                        self.buffers[a].accesses, self.buffers[b].accesses
+                    )
+        return weights
+
+
+def load_profile_hjson(
+    src: str, symbols: Optional[Dict[str, Tuple[int, int]]] = None
+) -> PlacementProfile:
+    """
+    Parses an access profile:
+
+    .. code-block:: hjson
+
+        {
+            symbols: [
+                { name: "m_a", accesses: 65536 }
+                { name: "m_b", hint: "hot" }
+                { name: "lut", size: 1024, hint: "cold" }
+            ]
+            concurrent: [
+                ["m_a", "m_b", "m_c"]
+            ]
+            data_size: 0x4000
+        }
+
+    Sizes are taken from the ELF when not given. Without an access count, a hot buffer is assumed
+    to be accessed once per word and a cold one never.
+
+    :param str src: profile content.
+    :param Dict[str, Tuple[int, int]] symbols: address and size of the ELF symbols, by name.
+    :return: the profile.
+    :rtype: PlacementProfile
+    :raise RuntimeError: when an invalid profile is passed.
+    """
+    symbols = symbols or {}
+    config = hjson.loads(src, parse_int=int, object_pairs_hook=hjson.OrderedDict)
+    for key in config:
+        if key not in ["symbols", "concurrent", "data_size"]:
+            raise RuntimeError(f"Unknown key {key} in the placement profile")
+
+    buffers = []
+    for entry in config.get("symbols", []):
+        if type(entry) is not hjson.OrderedDict or "name" not in entry:
+            raise RuntimeError("Profile symbols should be dictionaries with a name")
+        name = entry["name"]
+        address, size = symbols.get(name, (None, None))
+        size = int(str(entry.get("size", size)), 0) if "size" in entry else size
+        if size is None:
+            raise RuntimeError(
+                f"The size of symbol {name} is not given and it was not found in the ELF"
+            )
+
+        hint = entry.get("hint", "hot")
+        if hint not in ["hot", "cold"]:
+            raise RuntimeError(f"The hint of symbol {name} should be hot or cold")
+        if "accesses" in entry:
+            accesses = int(entry["accesses"])
+        else:
+            accesses = size // WORD_SIZE if hint == "hot" else 0
+
+        buffers.append(Buffer(name, size, accesses, address))
+
+    concurrent = config.get("concurrent", [])
+    if type(concurrent) is not list or any(type(g) is not list for g in concurrent):
+        raise RuntimeError("concurrent should be a list of lists of symbol names")
+
+    data_size = config.get("data_size", 0)
+    return PlacementProfile(
+        buffers,
+        [list(g) for g in concurrent],
+        int(str(data_size), 0) if type(data_size) is str else data_size,
+    )
+
+
+def read_elf(elf: pathlib.Path):
+    """
+    Reads the allocated sections and the data symbols of an ELF.
+
+    :param pathlib.Path elf: the ELF file.
+    :return: the sections as (start, size) pairs and the symbols as a dictionary of name to (address, size).
+    :rtype: Tuple[List[Tuple[int, int]], Dict[str, Tuple[int, int]]]
+    """
+    if not pathlib.Path(elf).is_file():
+        raise FileNotFoundError(f"ELF file not found: {elf}")
+
+    with ElfFile(elf) as f:
+        sections = [(s.address, s.size) for s in f.alloc_sections()]
+        symbols = {
+            name: (sym.value, sym.size)
+            for name, sym in f.symbol_map(types=("OBJECT",)).items()
+        }
+    return sections, symbols
+
+
+class _Resource:
+    """
+    A set of banks where buffers can be placed, and the linker section that holds them.
+    """
+
+    def __init__(
+        self,
+        section: LinkerSection,
+        capacity: int,
+        share: float,
+        new: bool,
+        freed_bank: bool = False,
+    ):
+        self.section = section
+        self.capacity = capacity
+        # Fraction of the concurrent accesses to two of its buffers that target the same bank
+        self.share = share
+        # Whether the section has to be created, and whether it is a bank freed from the data section
+        self.new = new
+        self.freed_bank = freed_bank
+        self.buffers: List[Buffer] = []
+
+    def contains(self, address: int) -> bool:
+        return self.section.start <= address < self.section.end
+
+    def free(self) -> int:
+        return self.capacity - sum(b.footprint() for b in self.buffers)
+
+    def input_section(self) -> str:
+        return self.section.subsections[0].subsections_names[0]
+
+
+class Placement:
+    """
+    A proposed layout: the linker sections and the section of each buffer.
+
+    :param List[LinkerSection] sections: the code, data and newly created sections.
+    :param Dict[str, LinkerSection] assignment: the section of each buffer.
+    :param Dict[str, str] input_sections: the input section to use for each buffer.
+    :param float cost: estimated number of colliding accesses.
+    :param float baseline_cost: estimated number of colliding accesses with the current placement.
+    """
+
+    def __init__(self, sections, assignment, input_sections, cost, baseline_cost):
+        self.sections: List[LinkerSection] = sections
+        self.assignment: Dict[str, LinkerSection] = assignment
+        self.input_sections: Dict[str, str] = input_sections
+        self.cost: float = cost
+        self.baseline_cost: float = baseline_cost
+
+    def moved(self) -> Dict[str, str]:
+        """
+        :return: the input section of the buffers that leave the data section, by buffer name.
+        :rtype: Dict[str, str]
+        """
+        return {
+            name: self.input_sections[name]
+            for name, section in sorted(self.assignment.items())
+            if section.name != "data"
+        }
+
+
+def _used_space(
+    start: int,
+    end: int,
+    sections: List[Tuple[int, int]],
+    buffers: List[Buffer],
+) -> int:
+    """
+    :return: the space used in [start, end) by the ELF sections, excluding the given buffers.
+    """
+    used = sum(max(0, min(end, s + size) - max(start, s)) for s, size in sections)
+    used -= sum(
+        b.footprint()
+        for b in buffers
+        if b.address is not None and start <= b.address < end
+    )
+    return max(0, used)
+
+
+def _unique_name(name: str, used: set) -> str:
+    candidate = name
+    i = 1
+    while candidate in used:
+        candidate = f"{name}_{i}"
+        i += 1
+    used.add(candidate)
+    return candidate
+
+
+def _assign(
+    resources: List[_Resource], profile: PlacementProfile, conflicts
+) -> Optional[float]:
+    """
+    Greedily assigns the buffers to the resources, the most conflicting buffers first, each one to
+    the resource where it adds the least conflicts.
+
+    :return: the estimated number of colliding accesses, or None if a buffer does not fit.
+    """
+    neighbours: Dict[str, Dict[str, int]] = {n: {} for n in profile.buffers}
+    for (a, b), w in conflicts.items():
+        neighbours[a][b] = w
+        neighbours[b][a] = w
+
+    order = sorted(
+        profile.buffers.values(),
+        key=lambda b: (-sum(neighbours[b.name].values()), -b.size, b.name),
+    )
+
+    cost = 0.0
+    for buffer in order:
+        best = None
+        for resource in resources:
+            if resource.free() < buffer.footprint():
+                continue
+            added = resource.share * sum(
+                neighbours[buffer.name].get(other.name, 0) for other in resource.buffers
+            )
+            # Ties keep the buffer in the first resources (the data section first)
+            if best is None or added < best[0]:
+                best = (added, resource)
+        if best is None:
+            return None
+        best[1].buffers.append(buffer)
+        cost += best[0]
+    return cost
+
+
+def optimize_placement(
+    memory_ss: MemorySS,
+    profile: PlacementProfile,
+    elf_sections: Optional[List[Tuple[int, int]]] = None,
+) -> Placement:
+    """
+    Proposes a linker sections layout for the buffers of a profile.
+
+    The data section is shortened to free its last continuous banks, each of which gets its own
+    linker section. Interleaved groups that have their own linker section, or none at all, can hold
+    buffers too. Every number of freed banks is tried and the layout with the least estimated
+    collisions, then the fewest freed banks, is kept.
+
+    :param MemorySS memory_ss: the built memory subsystem.
+    :param PlacementProfile profile: the buffers to place.
+    :param List[Tuple[int, int]] elf_sections: the allocated ELF sections as (start, size) pairs, to know the space used by the rest of the application.
+    :return: the proposed placement.
+    :rtype: Placement
+    :raise RuntimeError: if the buffers cannot fit in the memory.
+    """
+    sections = list(memory_ss.iter_linker_sections())
+    data = next((s for s in sections if s.name == "data"), None)
+    code = next((s for s in sections if s.name == "code"), None)
+    if data is None or code is None or data.end is None:
+        raise RuntimeError(
+            "[MCU-GEN - Placement] ERROR: The memory subsystem should be built with code and data sections"
+        )
+
+    buffers = list(profile.buffers.values())
+    conflicts = profile.conflicts()
+    used_names = {s.name for s in sections}
+
+    if elf_sections is not None:
+        data_required = _used_space(data.start, data.end, elf_sections, buffers)
+    else:
+        data_required = profile.data_size
+
+    # Continuous banks entirely in the data section, that can be freed from the top
+    free_banks = [
+        b
+        for b in memory_ss.iter_ram_banks()
+        if b.il_level() == 0
+        and b.start_address() >= data.start
+        and b.end_address() <= data.end
+    ]
+
+    # Interleaved groups with their own section or none, but not covered by code or data
+    il_resources = []
+    for group in memory_ss.iter_il_groups():
+        own = next(
+            (
+                s
+                for s in sections
+                if s.start == group.start and s.end == group.start + group.size
+            ),
+            None,
+        )
+        covered = any(
+            s.start < group.start + group.size and group.start < s.end
+            for s in (code, data)
+        )
+        if covered:
+            continue
+        if own is None:
+            section = LinkerSection(
+                _unique_name(f"il_{group.id}", used_names),
+                group.start,
+                group.start + group.size,
+            )
+        else:
+            section = own
+        used = (
+            _used_space(group.start, group.start + group.size, elf_sections, buffers)
+            if elf_sections is not None
+            else 0
+        )
+        il_resources.append((section, group.size - used, 1 / group.n, own is None))
+
+    def resources_for(num_freed: int) -> List[_Resource]:
+        freed = free_banks[len(free_banks) - num_freed :] if num_freed else []
+        data_end = freed[0].start_address() if freed else data.end
+        resources = [
+            _Resource(
+                LinkerSection(data.name, data.start, data_end, data.subsections),
+                data_end - data.start - data_required,
+                1.0,
+                False,
+            )
+        ]
+        for bank in freed:
+            resources.append(
+                _Resource(
+                    LinkerSection(
+                        f"bank{bank.name()}", bank.start_address(), bank.end_address()
+                    ),
+                    bank.size(),
+                    1.0,
+                    True,
+                    freed_bank=True,
+                )
+            )
+        for section, capacity, share, new in il_resources:
+            resources.append(_Resource(section, capacity, share, new))
+        return resources
+
+    best = None
+    for num_freed in range(len(free_banks) + 1):
+        resources = resources_for(num_freed)
+        if resources[0].capacity < 0:
+            break
+        cost = _assign(resources, profile, conflicts)
+        if cost is not None and (best is None or cost < best[0]):
+            best = (cost, resources)
+
+    if best is None:
+        raise RuntimeError(
+            "[MCU-GEN - Placement] ERROR: The buffers of the profile and the rest of the data do not fit in the memory"
+        )
+    cost, resources = best
+
+    # Freed banks that received nothing are given back to the previous section
+    kept = [resources[0]]
+    for resource in resources[1:]:
+        if resource.freed_bank and not resource.buffers:
+            prev = kept[-1]
+            prev.section = LinkerSection(
+                prev.section.name,
+                prev.section.start,
+                resource.section.end,
+                prev.section.subsections,
+            )
+            continue
+        kept.append(resource)
+
+    # The current placement, buffers without address being in the data section
+    current = resources_for(0)
+    location = {}
+    for b in buffers:
+        address = data.start if b.address is None else b.address
+        location[b.name] = next((r for r in current if r.contains(address)), None)
+    baseline = sum(
+        w * location[a].share
+        for (a, b), w in conflicts.items()
+        if location[a] is not None and location[a] is location[b]
+    )
+
+    new_sections = [code] + [
+        r.section for r in kept if r is kept[0] or (r.new and r.buffers)
+    ]
+    assignment = {}
+    input_sections = {}
+    for r in kept:
+        for b in r.buffers:
+            assignment[b.name] = r.section
+            input_sections[b.name] = r.input_section()
+
+    _check_layout(
+        memory_ss, new_sections + [s for s in sections if s not in (code, data)]
+    )
+
+    return Placement(
+        sorted(new_sections, key=lambda s: s.start),
+        assignment,
+        input_sections,
+        cost,
+        baseline,
+    )
+
+
+def _check_layout(memory_ss: MemorySS, sections: List[LinkerSection]):
+    """
+    Checks that the sections do not overlap and are inside the RAM.
+    """
+    ram_end = max(b.end_address() for b in memory_ss.iter_ram_banks())
+    allocator = AddressAllocator(ram_end)
+    for s in sections:
+        if s.end > ram_end:
+            raise RuntimeError(
+                f"[MCU-GEN - Placement] ERROR: Section {s.name} ends after the RAM."
+            )
+        overlap = allocator.find_overlap(s.start, s.end - s.start)
+        if overlap is not None:
+            raise RuntimeError(
+                f"[MCU-GEN - Placement] ERROR: Section {s.name} and {overlap.owner.name} overlap."
+            )
+        allocator.reserve(s.start, s.end - s.start, s)
+
+
+def emit_hjson(placement: Placement) -> str:
+    """
+    :param Placement placement: the proposed placement.
+    :return: a ``linker_sections`` entry for an HJSON configuration.
+    :rtype: str
+    """
+    lines = [
+        "// Generated by placement_optimizer.py, replaces the linker_sections of the configuration.",
+        "// Sections created by the ram_banks configuration (auto_section) are not listed and are kept.",
+        "{",
+        "    linker_sections: [",
+    ]
+    for s in placement.sections:
+        lines += [
+            "        {",
+            f"            name: {s.name}",
+            f"            start: {s.start:#010x}",
+            f"            end: {s.end:#010x}",
+            "        }",
+        ]
+    lines += ["    ]", "}", ""]
+    return "\n".join(lines)
+
+
+def emit_python(placement: Placement) -> str:
+    """
+    :param Placement placement: the proposed placement.
+    :return: the calls adding the proposed sections to a Python configuration.
+    :rtype: str
+    """
+    lines = [
+        "# Generated by placement_optimizer.py, replaces the code and data linker sections of the configuration.",
+        "from memory_ss.linker_section import LinkerSection",
+        "",
+        "",
+        "def add_linker_sections(memory_ss):",
+    ]
+    for s in placement.sections:
+        lines.append(
+            f'    memory_ss.add_linker_section(LinkerSection("{s.name}", {s.start:#010x}, {s.end:#010x}))'
+        )
+    lines.append("")
+    return "\n".join(lines)
+
+
+def emit_header(placement: Placement) -> str:
+    """
+    :param Placement placement: the proposed placement.
+    :return: a C header defining, for each moved buffer, the attribute that places it.
+    :rtype: str
+    """
+    lines = [
+        "// Generated by placement_optimizer.py",
+        "// Use XHEEP_PLACE_<symbol> in the declaration of each buffer, e.g.",
+        "//   int32_t m_a[N] XHEEP_PLACE_m_a;",
+        "",
+        "#ifndef XHEEP_PLACEMENT_H_",
+        "#define XHEEP_PLACEMENT_H_",
+        "",
+    ]
+    for name, input_section in placement.moved().items():
+        lines.append(
+            f'#define XHEEP_PLACE_{name} __attribute__((section(".{input_section}")))'
+        )
+    lines += ["", "#endif // XHEEP_PLACEMENT_H_", ""]
+    return "\n".join(lines)
+
+
+def print_placement(placement: Placement):
+    """
+    Prints the section of each buffer and the estimated gain.
+
+    :param Placement placement: the proposed placement.
+    """
+    print("Proposed linker sections:")
+    for s in placement.sections:
+        print(f"  {s.name:<16} {s.start:#010x} - {s.end:#010x}")
+    print("Buffer placement:")
+    for name, section in sorted(placement.assignment.items()):
+        print(f"  {name:<24} -> {section.name}")
+    print(
+        f"Estimated colliding accesses: {placement.baseline_cost:.0f} -> {placement.cost:.0f}"
+    )
+
+
+def main():
+    # Imported here as mcu_gen imports the whole generator
+    import mcu_gen
+
+    parser = argparse.ArgumentParser(
+        prog="placement_optimizer",
+        description="Propose a bank-aware linker sections layout for an application",
+    )
+    parser.add_argument("--config", type=str, required=True)
+    parser.add_argument("--python_config", type=str, nargs="?", default="")
+    parser.add_argument("--pads_cfg", "-pc", type=str, required=True)
+    parser.add_argument("--cpu", nargs="?", default="")
+    parser.add_argument("--bus", nargs="?", default="")
+    parser.add_argument("--memorybanks", nargs="?", default="")
+    parser.add_argument("--memorybanks_il", nargs="?", default="")
+    parser.add_argument("--config_cache", type=pathlib.Path, default=None)
+    parser.add_argument(
+        "--profile",
+        type=pathlib.Path,
+        required=True,
+        help="HJSON access profile of the application",
+    )
+    parser.add_argument(
+        "--elf",
+        type=pathlib.Path,
+        default=None,
+        help="ELF of the application, to read the symbol sizes and the used space",
+    )
+    parser.add_argument(
+        "--outdir",
+        type=pathlib.Path,
+        required=True,
+        help="Directory of the generated placement.hjson, placement.py and placement.h",
+    )
+    parser.add_argument(
+        "-v", "--verbose", help="increase output verbosity", action="store_true"
+    )
+    args = parser.parse_args()
+
+    xheep, config = mcu_gen.load_xheep(args)
+    mcu_gen.configure_xheep(
+        xheep, config, args.cpu, args.bus, args.memorybanks, args.memorybanks_il
+    )
+
+    elf_sections, symbols = read_elf(args.elf) if args.elf else (None, {})
+    with open(args.profile, "r") as file:
+        profile = load_profile_hjson(file.read(), symbols)
+
+    try:
+        placement = optimize_placement(xheep.memory_ss(), profile, elf_sections)
+    except RuntimeError as e:
+        sys.exit(str(e))
+
+    print_placement(placement)
+
+    args.outdir.mkdir(parents=True, exist_ok=True)
+    for name, content in [
+        ("placement.hjson", emit_hjson(placement)),
+        ("placement.py", emit_python(placement)),
+        ("placement.h", emit_header(placement)),
+    ]:
+        with open(args.outdir / name, "w") as file:
+            file.write(content)
+    print(f"Placement written to {args.outdir}")
+
+
+if __name__ == "__main__":
+    main()
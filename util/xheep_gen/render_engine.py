@@ -0,0 +1,210 @@
+# Copyright 2026 EPFL
+# Licensed under the Apache License, Version 2.0, see LICENSE for details.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Description: Template render engine used by mcu_gen.py. Templates are compiled once into an
+#   on-disk module cache and independent templates can be rendered concurrently.
+
+import os
+import pathlib
+import pickle
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import mako
+from mako.lookup import TemplateLookup
+
+from incremental import GenManifest, hash_bytes, hash_file
+
+# Compile a regex to trim trailing whitespaces on lines.
+re_trailws = re.compile(r"[ \t\r]+$", re.MULTILINE)
+
+# Template variables shared by the worker processes, set once by _init_worker()
+_worker_kwargs: Dict = None
+_worker_lookup: TemplateLookup = None
+
+
+class RenderJob:
+    """
+    A template to render and the file it is rendered into.
+
+    :param pathlib.Path tpl_path: path to the template.
+    :param pathlib.Path outfile: path to the generated file.
+    """
+
+    def __init__(self, tpl_path: pathlib.Path, outfile: pathlib.Path):
+        self.tpl_path = pathlib.Path(tpl_path).absolute()
+        self.outfile = pathlib.Path(outfile)
+
+        # Filled by RenderEngine.render()
+        self.input_digest: Optional[str] = None
+        self.written: bool = False
+        self.up_to_date: bool = False
+        self.render_time_s: float = 0.0
+
+
+def make_lookup(module_directory: Optional[pathlib.Path]) -> TemplateLookup:
+    """
+    Creates the template lookup shared by all the renders of a process.
+
+    When a module directory is given, each template is compiled into a Python module named after
+    the digest of its content and of the Mako version, so an unchanged template is never compiled
+    again, even across mcu-gen runs.
+
+    :param pathlib.Path module_directory: directory of the compiled templates, or None to keep them in memory only.
+    :return: the template lookup.
+    :rtype: TemplateLookup
+    """
+    if module_directory is None:
+        return TemplateLookup(directories=[os.sep])
+
+    module_directory = pathlib.Path(module_directory).absolute()
+    module_directory.mkdir(parents=True, exist_ok=True)
+
+    def modulename(filename, uri):
+        digest = hash_bytes(mako.__version__.encode(), hash_file(filename).encode())
+        return str(module_directory / f"{digest}.py")
+
+    return TemplateLookup(
+        directories=[os.sep],
+        module_directory=str(module_directory),
+        modulename_callable=modulename,
+    )
+
+
+def render_template(lookup: TemplateLookup, tpl_path: pathlib.Path, **kwargs) -> str:
+    """
+    Renders a template with the given variables.
+
+    :param TemplateLookup lookup: the lookup used to get the (compiled) template.
+    :param pathlib.Path tpl_path: absolute path to the template.
+    :return: the rendered content, without trailing whitespaces.
+    :rtype: str
+    """
+    tpl = lookup.get_template(pathlib.Path(tpl_path).as_posix())
+    code = tpl.render_unicode(**kwargs, strict_undefined=True)
+    return re_trailws.sub("", code)
+
+
+def _init_worker(pickled_kwargs: bytes, module_directory: Optional[pathlib.Path]):
+    """
+    Initializes a worker process with the already built X-HEEP configuration.
+    """
+    global _worker_kwargs, _worker_lookup
+    _worker_kwargs = pickle.loads(pickled_kwargs)
+    _worker_lookup = make_lookup(module_directory)
+
+
+def _render_in_worker(tpl_path: pathlib.Path):
+    """
+    Renders a template in a worker process.
+
+    :return: the rendered content and the render time in seconds.
+    """
+    start = time.perf_counter()
+    code = render_template(_worker_lookup, tpl_path, **_worker_kwargs)
+    return code, time.perf_counter() - start
+
+
+class RenderEngine:
+    """
+    Renders the mcu-gen templates, optionally in parallel and incrementally.
+
+    :param int jobs: number of worker processes. With 1, templates are rendered in this process.
+    :param pathlib.Path module_directory: directory of the compiled templates, or None to compile them in memory.
+    :param GenManifest manifest: incremental generation manifest, or None to always write the outputs.
+    :param str cfg_digest: digest of the configuration, required when manifest is provided.
+    """
+
+    def __init__(
+        self,
+        jobs: int = 1,
+        module_directory: Optional[pathlib.Path] = None,
+        manifest: Optional[GenManifest] = None,
+        cfg_digest: Optional[str] = None,
+    ):
+        if jobs < 1:
+            raise ValueError(f"The number of jobs should be at least 1, got {jobs}")
+        if manifest is not None and cfg_digest is None:
+            raise ValueError("cfg_digest is required when a manifest is provided")
+
+        self._jobs = jobs
+        self._module_directory = module_directory
+        self._manifest = manifest
+        self._cfg_digest = cfg_digest
+        self._lookup = make_lookup(module_directory)
+
+    def render(self, jobs: List[RenderJob], **kwargs) -> List[RenderJob]:
+        """
+        Renders all the jobs with the given template variables and writes the outputs.
+
+        :param List[RenderJob] jobs: the templates to render.
+        :return: the same jobs, with their results filled.
+        :rtype: List[RenderJob]
+        """
+        to_render = []
+        for job in jobs:
+            if not job.tpl_path.exists():
+                raise FileNotFoundError(f"Template file not found: {job.tpl_path}")
+
+            if self._manifest is not None:
+                job.input_digest = self._manifest.template_digest(
+                    self._cfg_digest, job.tpl_path, job.outfile
+                )
+                if self._manifest.is_up_to_date(job.outfile, job.input_digest):
+                    job.up_to_date = True
+                    continue
+            to_render.append(job)
+
+        if self._jobs == 1 or len(to_render) <= 1:
+            results = self._render_serial(to_render, kwargs)
+        else:
+            results = self._render_parallel(to_render, kwargs)
+
+        for job, (code, render_time_s) in zip(to_render, results):
+            job.render_time_s = render_time_s
+            job.written = self._write(job, code)
+
+        return jobs
+
+    def _render_serial(self, jobs: List[RenderJob], kwargs: Dict):
+        """
+        Renders the jobs one after the other in this process.
+        """
+        results = []
+        for job in jobs:
+            start = time.perf_counter()
+            code = render_template(self._lookup, job.tpl_path, **kwargs)
+            results.append((code, time.perf_counter() - start))
+        return results
+
+    def _render_parallel(self, jobs: List[RenderJob], kwargs: Dict):
+        """
+        Renders the jobs in a process pool. The template variables are pickled once and shared by
+        all the workers. Falls back to rendering in this process if they cannot be pickled (e.g.
+        objects defined in a Python configuration file).
+        """
+        try:
+            pickled_kwargs = pickle.dumps(kwargs)
+        except (pickle.PicklingError, AttributeError, TypeError):
+            print(
+                "[MCU-GEN] WARNING: The configuration cannot be shared with worker processes, rendering serially"
+            )
+            return self._render_serial(jobs, kwargs)
+
+        with ProcessPoolExecutor(
+            max_workers=min(self._jobs, len(jobs)),
+            initializer=_init_worker,
+            initargs=(pickled_kwargs, self._module_directory),
+        ) as pool:
+            return list(pool.map(_render_in_worker, [job.tpl_path for job in jobs]))
+
+    def _write(self, job: RenderJob, code: str) -> bool:
+        if self._manifest is not None:
+            return self._manifest.write_if_changed(job.outfile, job.input_digest, code)
+
+        with open(job.outfile, "w") as file:
+            file.write(code)
+        return True
@@ -0,0 +1,174 @@
+# Copyright 2026 EPFL
+# Licensed under the Apache License, Version 2.0, see LICENSE for details.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Description: Sweep configuration for mcu_gen.py, used to generate many variants of X-HEEP
+#   (CPU, bus, memory banks) from a single base configuration in one run.
+
+import itertools
+import pathlib
+from typing import Dict, List
+
+import hjson
+
+OVERRIDE_KEYS = ["cpu", "bus", "memorybanks", "memorybanks_il"]
+"""Fields of a variant that override the base configuration, as the mcu_gen.py arguments"""
+
+
+class SweepVariant:
+    """
+    One configuration of a sweep. Empty overrides keep the value of the base configuration.
+
+    :param str name: name of the variant, used as the name of its output directory.
+    :param str cpu: CPU type override.
+    :param str bus: bus type override.
+    :param str memorybanks: number of continuous 32KB banks override.
+    :param str memorybanks_il: number of interleaved 32KB banks override.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        cpu: str = "",
+        bus: str = "",
+        memorybanks: str = "",
+        memorybanks_il: str = "",
+    ):
+        if type(name) is not str or name == "":
+            raise RuntimeError("Sweep variant names should be non-empty strings")
+        if "/" in name or name in [".", ".."]:
+            raise RuntimeError(
+                f"Sweep variant name {name} cannot be used as a directory name"
+            )
+
+        self.name = name
+        self.cpu = str(cpu)
+        self.bus = str(bus)
+        self.memorybanks = str(memorybanks)
+        self.memorybanks_il = str(memorybanks_il)
+
+    def __str__(self) -> str:
+        return f"SweepVariant(name={self.name}, cpu={self.cpu}, bus={self.bus}, memorybanks={self.memorybanks}, memorybanks_il={self.memorybanks_il})"
+
+    def overrides(self) -> Dict[str, str]:
+        """
+        :return: the overrides of this variant, with the same keys as the mcu_gen.py arguments.
+        :rtype: Dict[str, str]
+        """
+        return {k: getattr(self, k) for k in OVERRIDE_KEYS}
+
+    def with_defaults(self, defaults: Dict[str, str]) -> "SweepVariant":
+        """
+        :param Dict[str, str] defaults: overrides used for the fields not set in this variant.
+        :return: a new variant where the empty fields are taken from defaults.
+        :rtype: SweepVariant
+        """
+        overrides = {
+            k: v if v != "" else str(defaults.get(k) or "")
+            for k, v in self.overrides().items()
+        }
+        return SweepVariant(self.name, **overrides)
+
+
+def _default_name(overrides: Dict) -> str:
+    return "-".join(str(overrides[k]) for k in OVERRIDE_KEYS if k in overrides)
+
+
+def _check_keys(entry: Dict, allowed: List[str], where: str):
+    for key in entry:
+        if key not in allowed:
+            raise RuntimeError(
+                f"Unknown key {key} in {where}, allowed keys are {allowed}"
+            )
+
+
+def load_sweep_hjson(src: str):
+    """
+    Parses a sweep configuration. It can contain a list of explicit variants, a matrix whose
+    cartesian product is swept, or both, and optionally the output directory of the sweep:
+
+    .. code-block:: hjson
+
+        {
+            output_dir: "build/sweep"
+            variants: [
+                { name: "small", cpu: "cv32e20", memorybanks: 2 }
+            ]
+            matrix: {
+                cpu: ["cv32e20", "cv32e40p"]
+                bus: ["onetoM", "NtoM"]
+            }
+        }
+
+    Variants generated from the matrix are named after their overrides (e.g. ``cv32e40p-NtoM``).
+
+    :param str src: sweep configuration content.
+    :return: the variants to generate and the output directory of the sweep (None if not set).
+    :raise RuntimeError: when an invalid sweep configuration is passed.
+    """
+    config = hjson.loads(src, parse_int=int, object_pairs_hook=hjson.OrderedDict)
+    _check_keys(config, ["variants", "matrix", "output_dir"], "the sweep configuration")
+
+    variants: List[SweepVariant] = []
+
+    for entry in config.get("variants", []):
+        if type(entry) is not hjson.OrderedDict:
+            raise RuntimeError("Sweep variants should be dictionaries")
+        _check_keys(entry, ["name"] + OVERRIDE_KEYS, "a sweep variant")
+        overrides = {k: entry[k] for k in OVERRIDE_KEYS if k in entry}
+        variants.append(
+            SweepVariant(entry.get("name", _default_name(overrides)), **overrides)
+        )
+
+    matrix = config.get("matrix", hjson.OrderedDict())
+    if type(matrix) is not hjson.OrderedDict:
+        raise RuntimeError("The sweep matrix should be a dictionary")
+    _check_keys(matrix, OVERRIDE_KEYS, "the sweep matrix")
+    if len(matrix) > 0:
+        keys = list(matrix.keys())
+        values = [v if type(v) is list else [v] for v in matrix.values()]
+        for combination in itertools.product(*values):
+            overrides = dict(zip(keys, combination))
+            variants.append(SweepVariant(_default_name(overrides), **overrides))
+
+    if len(variants) == 0:
+        raise RuntimeError("The sweep configuration does not define any variant")
+
+    names = [v.name for v in variants]
+    duplicates = sorted({n for n in names if names.count(n) > 1})
+    if duplicates:
+        raise RuntimeError(f"Sweep variant names should be unique: {duplicates}")
+
+    output_dir = config.get("output_dir", None)
+    return variants, pathlib.Path(output_dir) if output_dir is not None else None
+
+
+def load_sweep_file(f: pathlib.Path):
+    """
+    Loads a sweep configuration file.
+
+    :param pathlib.Path f: path of the sweep configuration.
+    :return: the variants to generate and the output directory of the sweep (None if not set).
+    :raise RuntimeError: when an invalid sweep configuration is passed.
+    """
+    with open(f, "r") as file:
+        return load_sweep_hjson(file.read())
+
+
+def variant_outfile(variant_dir: pathlib.Path, outfile: pathlib.Path) -> pathlib.Path:
+    """
+    Maps a generated file to its location in the output tree of a variant, keeping its path
+    relative to the current directory (the X-HEEP root when run from the Makefile).
+
+    :param pathlib.Path variant_dir: output directory of the variant.
+    :param pathlib.Path outfile: the file that mcu-gen would generate without sweep.
+    :return: the file to generate for the variant.
+    :rtype: pathlib.Path
+    """
+    outfile = pathlib.Path(outfile).absolute()
+    try:
+        rel = outfile.relative_to(pathlib.Path.cwd())
+    except ValueError:
+        # Templates outside the current directory (e.g. external templates)
+        rel = pathlib.Path("external") / outfile.name
+    return pathlib.Path(variant_dir) / rel